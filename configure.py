@@ -6,6 +6,9 @@ with open("src/setenv_template.py", "r") as inf:
 setenv_txt = setenv_txt.replace("%%hspice_call%%", hspice_call)
 setenv_txt = setenv_txt.replace("%%max_hspice_cpu%%", str(max_hspice_cpu))
 setenv_txt = setenv_txt.replace("%%max_vpr_cpu%%", str(max_vpr_cpu))
+setenv_txt = setenv_txt.replace("%%arc_gen_store_path%%", arc_gen_store_path)
+setenv_txt = setenv_txt.replace("%%max_arc_gen_store_size%%", str(max_arc_gen_store_size))
+setenv_txt = setenv_txt.replace("%%load_model_cache_path%%", load_model_cache_path)
 
 exploration_txt = setenv_txt.replace("%%vpr_run_path%%", vpr_exploration_run_path)
 exploration_txt = exploration_txt.replace("%%vpr_container%%", vpr_exploration_container)
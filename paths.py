@@ -25,3 +25,12 @@ max_hspice_cpu = 20
 
 #Maximum number of parallel VPR and other non-SPICE jobs:
 max_vpr_cpu = 47
+
+#Directory of the store shared by all architecture generation runs (empty string disables it):
+arc_gen_store_path = "/home/snikolic/FPGA23/arc_gen_store/"
+
+#Maximum size of the architecture generation store in MB:
+max_arc_gen_store_size = 20000
+
+#Directory of the load-model calibrations shared by all architecture generation runs:
+load_model_cache_path = "/home/snikolic/FPGA23/load_model_cache/"
@@ -1,11 +1,14 @@
 import argparse
 import copy
 import os
+import sys
+sys.path.insert(0,'src')
 
 from parallelize import Parallel
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--max_cpu")
+parser.add_argument("--resume")
 args = parser.parse_args()
 
 max_cpu = 1
@@ -13,7 +16,20 @@ try:
     max_cpu = int(args.max_cpu)
 except:
     pass
-sleep_interval = 5
+
+RESUME = False
+try:
+    RESUME = int(args.resume)
+except:
+    pass
+#If set, the run directories are left as they are and only the jobs that
+#did not finish in the previous run are started.
+
+state_files = ["run_exploration.jobs", "run_exploration_avalanche_only.jobs"]
+if not RESUME:
+    for state_file in state_files:
+        if os.path.exists(state_file):
+            os.remove(state_file)
 
 param_combs = {
                 "unconstrained" : {"ENFORCE_HOP_OPTIMALITY"       : False,\
@@ -131,31 +147,32 @@ with open("src/setenv.py", "r") as inf:
 
 run = lambda d : "cd run_exploration/%s/src/generate_architecture/ && python -u ilp_setup.py --config config --vpr_log sample_vpr.log && mkdir ../test_%s && cp sample_ilp.log ../test_%s/ilp_iter_1.log && cp sample_ilp.log ../test_%s/ilp_iter_2.log && rm sample_ilp.log" % (d, d, d, d)
 
-for seed in (19225, 25124, 43033, 50936, 5300):
-    key = "wl_1.0_%d" % seed
-    comb = copy.deepcopy(param_combs["wl_0.1"])
-    comb["WL_TRADEOFF"] = 1.0
-    comb["FLOORPLAN_SEED"] = seed
-    param_combs.update({key : comb})
-    txt = fill_in(key)
-    del param_combs[key]
-    os.system("mkdir run_exploration/wl_1.0_shuffle_seed_%d" % seed) 
-    os.system("cp -r src run_exploration/wl_1.0_shuffle_seed_%d/" % seed)
-    with open("run_exploration/wl_1.0_shuffle_seed_%d/src/generate_architecture/config.py" % seed, "w") as outf:
-       outf.write(txt)
-    with open("run_exploration/wl_1.0_shuffle_seed_%d/src/setenv.py" % seed, "w") as outf:
-       outf.write(setenv_txt.replace("%SHUFFLE_SEED%", str(seed)))
-    os.system(run("wl_1.0_shuffle_seed_%d" % seed))
-
-for comb in param_combs:
-    txt = fill_in(comb)
+if not RESUME:
     for seed in (19225, 25124, 43033, 50936, 5300):
-        os.system("mkdir run_exploration/%s_shuffle_seed_%d" % (comb, seed))
-        os.system("cp -r src run_exploration/%s_shuffle_seed_%d/" % (comb, seed))
-        with open("run_exploration/%s_shuffle_seed_%d/src/generate_architecture/config.py" % (comb, seed), "w") as outf:
-            outf.write(txt)
-        with open("run_exploration/%s_shuffle_seed_%d/src/setenv.py" % (comb, seed), "w") as outf:
-            outf.write(setenv_txt.replace("%SHUFFLE_SEED%", str(seed)))
+        key = "wl_1.0_%d" % seed
+        comb = copy.deepcopy(param_combs["wl_0.1"])
+        comb["WL_TRADEOFF"] = 1.0
+        comb["FLOORPLAN_SEED"] = seed
+        param_combs.update({key : comb})
+        txt = fill_in(key)
+        del param_combs[key]
+        os.system("mkdir run_exploration/wl_1.0_shuffle_seed_%d" % seed) 
+        os.system("cp -r src run_exploration/wl_1.0_shuffle_seed_%d/" % seed)
+        with open("run_exploration/wl_1.0_shuffle_seed_%d/src/generate_architecture/config.py" % seed, "w") as outf:
+           outf.write(txt)
+        with open("run_exploration/wl_1.0_shuffle_seed_%d/src/setenv.py" % seed, "w") as outf:
+           outf.write(setenv_txt.replace("%SHUFFLE_SEED%", str(seed)))
+        os.system(run("wl_1.0_shuffle_seed_%d" % seed))
+
+    for comb in param_combs:
+        txt = fill_in(comb)
+        for seed in (19225, 25124, 43033, 50936, 5300):
+            os.system("mkdir run_exploration/%s_shuffle_seed_%d" % (comb, seed))
+            os.system("cp -r src run_exploration/%s_shuffle_seed_%d/" % (comb, seed))
+            with open("run_exploration/%s_shuffle_seed_%d/src/generate_architecture/config.py" % (comb, seed), "w") as outf:
+                outf.write(txt)
+            with open("run_exploration/%s_shuffle_seed_%d/src/setenv.py" % (comb, seed), "w") as outf:
+                outf.write(setenv_txt.replace("%SHUFFLE_SEED%", str(seed)))
 
 run = lambda d : "cd run_exploration/%s/src/generate_architecture/ && python -u explore_avalanche.py --base_cost 1.0 --scaling_factor 9 --avalanche_iter 25 --adoption_threshold 1.1 --wd test_%s" % (d, d)
 
@@ -166,7 +183,7 @@ for d in all_dirs:
         continue
     calls.append(run(d))
 
-runner = Parallel(max_cpu, sleep_interval)
+runner = Parallel(max_cpu, state_file = state_files[0])
 runner.init_cmd_pool(calls)
 runner.run()
 
@@ -177,12 +194,13 @@ del runner
 comb = "avalanche_only"
 calls = []
 for seed in (19225, 25124, 43033, 50936, 5300):
-    os.system("mkdir run_exploration/%s_shuffle_seed_%d" % (comb, seed))
-    os.system("cp -r src run_exploration/%s_shuffle_seed_%d/" % (comb, seed))
-    with open("run_exploration/%s_shuffle_seed_%d/src/setenv.py" % (comb, seed), "w") as outf:
-        outf.write(setenv_txt.replace("%SHUFFLE_SEED%", str(seed)))
+    if not RESUME:
+        os.system("mkdir run_exploration/%s_shuffle_seed_%d" % (comb, seed))
+        os.system("cp -r src run_exploration/%s_shuffle_seed_%d/" % (comb, seed))
+        with open("run_exploration/%s_shuffle_seed_%d/src/setenv.py" % (comb, seed), "w") as outf:
+            outf.write(setenv_txt.replace("%SHUFFLE_SEED%", str(seed)))
     calls.append(run("%s_shuffle_seed_%d" % (comb, seed)).replace("explore_avalanche.py", "explore_avalanche_no_ilp.py"))
 
-runner = Parallel(max_cpu, sleep_interval)
+runner = Parallel(max_cpu, state_file = state_files[1])
 runner.init_cmd_pool(calls)
 runner.run()
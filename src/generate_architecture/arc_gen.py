@@ -74,6 +74,20 @@ load_mux_stack_order : Optional[str], default = None
 load_cost_scaling_info : Optional[str], default = None
     Specifies the file from which to load per-switch cost scaling information.
     Useful for e.g., scaling costs according to the probability of the switch participating in an ILP solution.
+spice_cache : Optional[str], default = "spice_cache"
+    Directory in which the HSPICE results are cached, keyed by the hash of the netlist.
+artifact_store : Optional[str], default = $ARC_GEN_STORE
+    Directory of the store in which the generated delays, RR-graph, architecture file,
+    and placement delay matrix are kept, keyed by the fingerprint of their inputs.
+    If neither the argument nor the environment variable is set, nothing is stored.
+artifact_store_size : Optional[int], default = $ARC_GEN_STORE_SIZE
+    Maximum size of the artifact store in MB. Least-recently used entries are evicted beyond it.
+load_model_cache : Optional[str], default = $ARC_GEN_LOAD_MODEL_CACHE or "load_model_cache"
+    Directory in which the load-model calibration measurements are cached,
+    keyed by the fingerprint of the sweep netlists.
+recalibrate_load_model : Optional[bool], default = False
+    Instructs the script to rerun the load-model sweep, ignoring all cached results,
+    store the new calibration, and exit.
 
 Returns
 -------
@@ -96,6 +110,11 @@ import setenv
 import tech
 
 import parse_routing
+import spice_engine
+import artifact_store
+import rr_writer
+import rr_binary
+import base_costs
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--K")
@@ -122,6 +141,11 @@ parser.add_argument("--pick_top_only")
 parser.add_argument("--adoption_threshold")
 parser.add_argument("--load_mux_stack_order")
 parser.add_argument("--load_cost_scaling_info")
+parser.add_argument("--spice_cache")
+parser.add_argument("--artifact_store")
+parser.add_argument("--artifact_store_size")
+parser.add_argument("--load_model_cache")
+parser.add_argument("--recalibrate_load_model")
 
 args = parser.parse_args()
 K = int(args.K)
@@ -318,6 +342,37 @@ except:
     pass
 
 SB_MUX_ORDER = None
+
+SPICE_CACHE = "spice_cache"
+if args.spice_cache is not None:
+    SPICE_CACHE = args.spice_cache
+
+artifact_store_root = args.artifact_store
+if artifact_store_root is None:
+    artifact_store_root = os.environ.get("ARC_GEN_STORE", None)
+if not artifact_store_root:
+    artifact_store_root = None
+artifact_store_size = 0
+try:
+    artifact_store_size = int(args.artifact_store_size if args.artifact_store_size is not None\
+                              else os.environ["ARC_GEN_STORE_SIZE"])
+except:
+    pass
+ARTIFACT_STORE = artifact_store.ArtifactStore(artifact_store_root, max_size = artifact_store_size * 2 ** 20)
+
+LOAD_MODEL_CACHE = args.load_model_cache
+if LOAD_MODEL_CACHE is None:
+    LOAD_MODEL_CACHE = os.environ.get("ARC_GEN_LOAD_MODEL_CACHE", '') or "load_model_cache"
+
+LOAD_MODEL_VERSION = 1
+#Version of the load-model calibration format. Must be increased whenever the
+#meaning of the stored measurements changes, so that stale calibrations are ignored.
+
+RECALIBRATE_LOAD_MODEL = False
+try:
+    RECALIBRATE_LOAD_MODEL = int(args.recalibrate_load_model)
+except:
+    pass
 ##########################################################################
 def read_buffer_cache(tech_name):
     """Reads the buffer sizes from the cache.
@@ -829,11 +884,8 @@ def read_sb_pattern_from_vpr(vpr_log_filename, rr_graph_filename, ilp_log_filena
         max_usage = 0.0
         global FINALIZE_CLIQUE
         if NO_STORED_UNUSED_EDGE_INCREASE:
-            with open("base_costs.dump", "r") as inf:
-                lines = inf.readlines()
-    
-                if lines[2][0] == '0':
-                    FINALIZE_CLIQUE = True
+            if base_costs.get_edge_count() == 0:
+                FINALIZE_CLIQUE = True
         else:
             FINALIZE_CLIQUE = True
         print "V1: No new switches added to the pattern. Finalizing the clique."
@@ -845,11 +897,8 @@ def read_sb_pattern_from_vpr(vpr_log_filename, rr_graph_filename, ilp_log_filena
         used_potential_edges = []
         global FINALIZE_CLIQUE
         if NO_STORED_UNUSED_EDGE_INCREASE:
-            with open("base_costs.dump", "r") as inf:
-                lines = inf.readlines()
-    
-                if lines[2][0] == '0':
-                    FINALIZE_CLIQUE = True
+            if base_costs.get_edge_count() == 0:
+                FINALIZE_CLIQUE = True
         else:
             FINALIZE_CLIQUE = True
         print "V2: No new switches added to the pattern. Finalizing the clique."
@@ -1780,7 +1829,7 @@ def export_grid(grid):
 ##########################################################################
 
 ##########################################################################
-def export_rr_nodes(G, grid, init = 0):
+def export_rr_nodes(G, grid, outf, init = 0):
     """Exports all nodes of the RR-graph, in the VTR8 RR-graph format.
 
     Parameters
@@ -1789,13 +1838,13 @@ def export_rr_nodes(G, grid, init = 0):
         The routing-resource graph.
     grid : Dict[Tuple[int], str]
         A dictionary of block types, indexed by the grid coordinates.
+    outf : rr_writer.RRWriter
+        Writer to which the nodes are streamed.
     init : Optional[int], default = 0
         The initial value of the ID counter.
 
     Returns
     -------
-    str
-        Text of the tags.
     Dict[str, Dict[Tuple[int], int]]
         Mapping between the RR-graph nodes in the static form (G)
         and the tile coordinates and node ids.
@@ -1803,12 +1852,8 @@ def export_rr_nodes(G, grid, init = 0):
 
     node_id = init
 
-    template = 2 * indent + "<node id=\"%d\" type=\"%s\" capacity=\"%d\">\n"\
-             + 3 * indent + "<loc xlow=\"%d\" ylow=\"%d\" xhigh=\"%d\" yhigh=\"%d\" %sptc=\"%d\"/>\n"\
-             + 3 * indent + "<timing R=\"0\" C=\"0\"/>\n%s"\
-             + 2 * indent + "</node>\n"
-
-    txt = indent + "<rr_nodes>\n"
+    outf.begin_section("rr_nodes")
+    outf.write(indent + "<rr_nodes>\n", records = 0)
 
     u_counts = {G.node[u]['p'] : u for u in G if G.node[u]["node_type"] in ("cb_out", "clb_out", "clb_clk")}
     export_u_counts = {}
@@ -1822,7 +1867,7 @@ def export_rr_nodes(G, grid, init = 0):
         x, y = coords
         ptc = 0
         for i in range(0, IO_CAPACITY):
-            txt += template % (node_id, "SINK", 1, x, y, x, y, '', ptc, '')
+            outf.write_node(node_id, "SINK", 1, x, y, x, y, ptc)
             u = "IO_%d_OPAD_SINK" % i
             try:
                 export_u_counts[u].update({coords : node_id})
@@ -1830,7 +1875,7 @@ def export_rr_nodes(G, grid, init = 0):
                 export_u_counts.update({u : {coords : node_id}})
             node_id += 1
             ptc += 1
-            txt += template % (node_id, "SOURCE", 1, x, y, x, y, '', ptc, '')
+            outf.write_node(node_id, "SOURCE", 1, x, y, x, y, ptc)
             u = "IO_%d_IPAD_SOURCE" % i
             try:
                 export_u_counts[u].update({coords : node_id})
@@ -1838,7 +1883,7 @@ def export_rr_nodes(G, grid, init = 0):
                 export_u_counts.update({u : {coords : node_id}})
             node_id += 1
             ptc += 1
-            txt += template % (node_id, "SINK", 1, x, y, x, y, '', ptc, '')
+            outf.write_node(node_id, "SINK", 1, x, y, x, y, ptc)
             u = "IO_%d_CLK_SINK" % i
             try:
                 export_u_counts[u].update({coords : node_id})
@@ -1848,7 +1893,7 @@ def export_rr_nodes(G, grid, init = 0):
             ptc += 1
         ptc = 0
         for i in range(0, IO_CAPACITY):
-            txt += template % (node_id, "IPIN", 1, x, y, x, y, "side=\"LEFT\" ", ptc, '')
+            outf.write_node(node_id, "IPIN", 1, x, y, x, y, ptc, side = "LEFT")
             u = "io_%d_opad_in" % i
             try:
                 export_u_counts[u].update({coords : node_id})
@@ -1856,7 +1901,7 @@ def export_rr_nodes(G, grid, init = 0):
                 export_u_counts.update({u : {coords : node_id}})
             node_id += 1
             ptc += 1
-            txt += template % (node_id, "OPIN", 1, x, y, x, y, "side=\"LEFT\" ", ptc, '')
+            outf.write_node(node_id, "OPIN", 1, x, y, x, y, ptc, side = "LEFT")
             u = "io_%d_ipad_out" % i
             try:
                 export_u_counts[u].update({coords : node_id})
@@ -1864,7 +1909,7 @@ def export_rr_nodes(G, grid, init = 0):
                 export_u_counts.update({u : {coords : node_id}})
             node_id += 1
             ptc += 1
-            txt += template % (node_id, "IPIN", 1, x, y, x, y, "side=\"LEFT\" ", ptc, '')
+            outf.write_node(node_id, "IPIN", 1, x, y, x, y, ptc, side = "LEFT")
             u = "io_%d_clk_in" % i
             try:
                 export_u_counts[u].update({coords : node_id})
@@ -1882,21 +1927,21 @@ def export_rr_nodes(G, grid, init = 0):
         #Export the cluster_inputs and clk sinks and the O source.
         #TODO: Once we switch to multiple equivalence classes, we will need to create multiple nodes.
         
-        txt += template % (node_id, "SINK", cluster_inputs, x, y, x, y, '', 0, '')
+        outf.write_node(node_id, "SINK", cluster_inputs, x, y, x, y, 0)
         u = "I_SINK"
         try:
             export_u_counts[u].update({coords : node_id})
         except:
             export_u_counts.update({u : {coords : node_id}})
         node_id += 1
-        txt += template % (node_id, "SOURCE", N * O, x, y, x, y, '', 1, '')
+        outf.write_node(node_id, "SOURCE", N * O, x, y, x, y, 1)
         u = "O_SOURCE"
         try:
             export_u_counts[u].update({coords : node_id})
         except:
             export_u_counts.update({u : {coords : node_id}})
         node_id += 1
-        txt += template % (node_id, "SINK", 1, x, y, x, y, '', 2, '')
+        outf.write_node(node_id, "SINK", 1, x, y, x, y, 2)
         u = "CLK_SINK"
         try:
             export_u_counts[u].update({coords : node_id})
@@ -1907,8 +1952,8 @@ def export_rr_nodes(G, grid, init = 0):
         ptc = -1
         for p in range(0, cluster_inputs + N * O + 1):
             ptc += 1
-            txt += template % (node_id, ('I' if p < cluster_inputs  or p >= cluster_inputs + N * O  else 'O') + "PIN", 1,\
-                               x, y, x, y, "side=\"LEFT\" ", ptc, '')
+            outf.write_node(node_id, ('I' if p < cluster_inputs  or p >= cluster_inputs + N * O  else 'O') + "PIN", 1,\
+                            x, y, x, y, ptc, side = "LEFT")
             u = u_counts.get(p)
             try:
                 export_u_counts[u].update({coords : node_id})
@@ -1978,9 +2023,8 @@ def export_rr_nodes(G, grid, init = 0):
                     ptc += (x % L) * len([t for t in h_tracks if "H%d" % L in t])
                     visited.add(L)
                 seg_id = seg_ids[u.split('_')[2]]
-                seg_decl = 3 * indent + "<segment segment_id=\"%d\"/>\n" % seg_id
                 if d == 'L':
-                    track_type = "CHANX\" direction=\"DEC_DIR"
+                    track_type, direction = "CHANX", "DEC_DIR"
                     xlow = x - L + 1
                     xhigh = x
                     ylow = yhigh = y
@@ -2012,7 +2056,7 @@ def export_rr_nodes(G, grid, init = 0):
                         except:
                             io_fanout_dict.update({(xhigh, y + 1) : [(node_id, mux_type)]})
                 elif d == 'R':
-                    track_type = "CHANX\" direction=\"INC_DIR"
+                    track_type, direction = "CHANX", "INC_DIR"
                     xlow = x
                     xhigh = x + L - 1
                     ylow = yhigh = y
@@ -2048,7 +2092,8 @@ def export_rr_nodes(G, grid, init = 0):
                 except:
                     export_u_counts.update({u : {coords : node_id}})
     
-                txt += template % (node_id, track_type, 1, xlow, ylow, xhigh, yhigh, '', ptc, seg_decl)
+                outf.write_node(node_id, track_type, 1, xlow, ylow, xhigh, yhigh, ptc,\
+                                direction = direction, segment_id = seg_id)
                 node_id += 1
                 for potential_edge in potential_edges.get(u, []):
                     pptc = potential_edge_indices[potential_edge]
@@ -2057,9 +2102,9 @@ def export_rr_nodes(G, grid, init = 0):
                     except:
                         export_u_counts.update({potential_edge : {coords : node_id}})
                     seg_id = seg_ids[lut_canonical_potential_edge(potential_edge)]
-                    seg_decl = 3 * indent + "<segment segment_id=\"%d\"/>\n" % seg_id
-                    txt += template % (node_id, track_type, 1, xlow if d == 'R' else xhigh, ylow,\
-                                       xlow if d == 'R' else xhigh, yhigh, '', pptc + chanx_width, seg_decl)
+                    outf.write_node(node_id, track_type, 1, xlow if d == 'R' else xhigh, ylow,\
+                                    xlow if d == 'R' else xhigh, yhigh, pptc + chanx_width,\
+                                    direction = direction, segment_id = seg_id)
                     node_id += 1
 
         if x < 0 or x > max_x:
@@ -2085,9 +2130,8 @@ def export_rr_nodes(G, grid, init = 0):
                     ptc += len([t for t in v_tracks if "V%d" % L_visited in t]) * L_visited
                 ptc += (y % L) * len([t for t in v_tracks if "V%d" % L in t])
                 visited.add(L)
-            seg_decl = 3 * indent + "<segment segment_id=\"%d\"/>\n" % seg_id
             if d == 'D':
-                track_type = "CHANY\" direction=\"DEC_DIR"
+                track_type, direction = "CHANY", "DEC_DIR"
                 xlow = xhigh = x
                 ylow = y - L + 1
                 yhigh = y
@@ -2125,7 +2169,7 @@ def export_rr_nodes(G, grid, init = 0):
                     except:
                         io_fanout_dict.update({(x + 1, yhigh) : [(node_id, mux_type)]})
             elif d == 'U':
-                track_type = "CHANY\" direction=\"INC_DIR"
+                track_type, direction = "CHANY", "INC_DIR"
                 xlow = xhigh = x
                 ylow = y
                 yhigh = y + L - 1
@@ -2167,7 +2211,8 @@ def export_rr_nodes(G, grid, init = 0):
             except:
                 export_u_counts.update({u : {coords : node_id}})
 
-            txt += template % (node_id, track_type, 1, xlow, ylow, xhigh, yhigh, '', ptc, seg_decl)
+            outf.write_node(node_id, track_type, 1, xlow, ylow, xhigh, yhigh, ptc,\
+                                direction = direction, segment_id = seg_id)
             node_id += 1
             for potential_edge in potential_edges.get(u, []):
                 pptc = potential_edge_indices[potential_edge]
@@ -2176,18 +2221,18 @@ def export_rr_nodes(G, grid, init = 0):
                 except:
                     export_u_counts.update({potential_edge : {coords : node_id}})
                 seg_id = seg_ids[lut_canonical_potential_edge(potential_edge)]
-                seg_decl = 3 * indent + "<segment segment_id=\"%d\"/>\n" % seg_id
-                txt += template % (node_id, track_type, 1, xlow, ylow if d == 'U' else yhigh, xhigh,\
-                                   ylow if d == 'U' else yhigh, '', pptc + chany_width, seg_decl)
+                outf.write_node(node_id, track_type, 1, xlow, ylow if d == 'U' else yhigh, xhigh,\
+                                ylow if d == 'U' else yhigh, pptc + chany_width,\
+                                direction = direction, segment_id = seg_id)
                 node_id += 1
 
-    txt += "</rr_nodes>\n"
+    outf.write("</rr_nodes>\n", records = 0)
 
-    return txt, export_u_counts, io_fanin_dict, io_fanout_dict
+    return export_u_counts, io_fanin_dict, io_fanout_dict
 ##########################################################################
 
 ##########################################################################
-def export_rr_edges(G, u_counts, io_fanin_dict, io_fanout_dict):
+def export_rr_edges(G, u_counts, io_fanin_dict, io_fanout_dict, outf):
     """Exports the RR graph edges in the VTR8 format. 
 
     Parameters
@@ -2197,16 +2242,26 @@ def export_rr_edges(G, u_counts, io_fanin_dict, io_fanout_dict):
     u_counts : Dict[str, Dict[Tuple[int], int]]
         Mapping between the RR-graph nodes in the static form (G)
         and the tile coordinates and node ids.
+    outf : rr_writer.RRWriter
+        Writer to which the edges are streamed.
 
     Returns
     -------
-    str
-        Text of the tags.
+    None
+
+    Notes
+    -----
+    Edges are collected as integers packing (src, sink, switch_id), which both
+    keeps the memory footprint several times below that of the edge strings and
+    makes the integer order equal to the order in which the edges are written.
     """
    
-    txt = indent + "<rr_edges>\n"
     beg = 2 * indent + "<edge src_node=\""
     lines = set()
+    #NOTE: In human-readable mode, the edges between named nodes are stored as strings.
+
+    pack = lambda uc, vc, mux_id : (uc << 48) | (vc << 16) | mux_id
+    unpack = lambda e : (e >> 48, (e >> 16) & 0xffffffff, e & 0xffff)
 
     #------------------------------------------------------------------------#
     def terminates_early(u, coords, u_counts):
@@ -2274,8 +2329,7 @@ def export_rr_edges(G, u_counts, io_fanin_dict, io_fanout_dict):
             if G.node[u]["node_type"] in ("h_track", "v_track") and not "potential_edge" in u: 
                 reflection = terminates_early(u, coords, u_counts)
                 if reflection is not None:
-                    mux_id = " switch_id=\"%d\"/>\n" % mux_ids["__vpr_delayless_switch__"]
-                    lines.add("%s%d\" sink_node=\"%d\"%s" % (beg, uc, reflection, mux_id))
+                    lines.add(pack(uc, reflection, mux_ids["__vpr_delayless_switch__"]))
                     reflections.add(reflection)
                     reflected.add(uc)
                     continue
@@ -2313,7 +2367,7 @@ def export_rr_edges(G, u_counts, io_fanin_dict, io_fanout_dict):
                             offset[1] = - y
                             #NOTE: There is a (x, 0) horizontal channel, but not (x, grid_h - 1).
 
-                    mux_id = " switch_id=\"%d\"/>\n" % mux_ids[attrs["mux_type"]]
+                    mux_id = mux_ids[attrs["mux_type"]]
                     try:
                         vc = u_counts[v][(x + offset[0], y + offset[1])]
                     except:
@@ -2325,9 +2379,9 @@ def export_rr_edges(G, u_counts, io_fanin_dict, io_fanout_dict):
                         u_str = u + '_' + str(coords)
                         v_str = v + '_' + str((coords[0] + attrs.get("offset", (0, 0))[0],\
                                                coords[1] + attrs.get("offset", (0, 0))[1]))
-                        lines.add("%s%s\" sink_node=\"%s\"%s" % (beg, u_str, v_str, mux_id))
+                        lines.add("%s%s\" sink_node=\"%s\" switch_id=\"%d\"/>\n" % (beg, u_str, v_str, mux_id))
                     else:
-                        lines.add("%s%d\" sink_node=\"%d\"%s" % (beg, uc, vc, mux_id))
+                        lines.add(pack(uc, vc, mux_id))
 
     for coords in sorted(io_fanin_dict):
         for i in range(0, IO_CAPACITY):
@@ -2337,14 +2391,12 @@ def export_rr_edges(G, u_counts, io_fanin_dict, io_fanout_dict):
                 uc, mux = u
                 if uc in reflected:
                     continue
-                mux_id = " switch_id=\"%d\"/>\n" % mux_ids[mux]
-                lines.add("%s%d\" sink_node=\"%d\"%s" % (beg, uc, vc, mux_id))
+                lines.add(pack(uc, vc, mux_ids[mux]))
             v = "io_%d_clk_in" % i
             vc = u_counts[v][coords]
             for u in io_fanin_dict[coords]:
                 uc, mux = u
-                mux_id = " switch_id=\"%d\"/>\n" % mux_ids[mux]
-                lines.add("%s%d\" sink_node=\"%d\"%s" % (beg, uc, vc, mux_id))
+                lines.add(pack(uc, vc, mux_ids[mux]))
 
     for coords in sorted(io_fanout_dict):
         for i in range(0, IO_CAPACITY):
@@ -2352,29 +2404,37 @@ def export_rr_edges(G, u_counts, io_fanin_dict, io_fanout_dict):
                 vc, mux = v
                 if vc in reflections:
                     continue
-                mux_id = " switch_id=\"%d\"/>\n" % mux_ids[mux]
                 u = "io_%d_ipad_out" % i
                 uc = u_counts[u][coords]
-                lines.add("%s%d\" sink_node=\"%d\"%s" % (beg, uc, vc, mux_id))
+                lines.add(pack(uc, vc, mux_ids[mux]))
 
     #Now remove any remaining reflections on edge-splitters from the edge list.
-    get_attr = lambda line, attr : line.split("%s=\"" % attr)[1].split('"')[0]
     rm_set = set()
     for line in lines:
-        if int(get_attr(line, "sink_node")) in reflections or int(get_attr(line, "src_node")) in reflected:
-            if int(get_attr(line, "switch_id")) != mux_ids["__vpr_delayless_switch__"]:
+        if HUMAN_READABLE and isinstance(line, str):
+            continue
+        uc, vc, mux_id = unpack(line)
+        if vc in reflections or uc in reflected:
+            if mux_id != mux_ids["__vpr_delayless_switch__"]:
                 rm_set.add(line)
-    for line in rm_set:
-        lines.remove(line)
+    lines -= rm_set
             
+    #NOTE: Sorting rebinds >>lines<<, so the set is freed before the text is produced.
+    if HUMAN_READABLE:
+        #NOTE: Human-readable graphs keep the lexicographic order of the edge strings.
+        lines = sorted([line if isinstance(line, str) else rr_binary.edge_template % unpack(line)\
+                        for line in lines])
+    else:
+        lines = sorted(lines)
 
-    sort_key = lambda l : (int(l.split("=\"")[1].split('"')[0]), int(l.split("=\"")[2].split('"')[0]))\
-                          if not HUMAN_READABLE else l
-
-    txt += ''.join(sorted(lines, key = sort_key))
-    txt += indent + "</rr_edges>\n"
-
-    return txt
+    outf.begin_section("rr_edges")
+    outf.write(indent + "<rr_edges>\n", records = 0)
+    for line in lines:
+        if HUMAN_READABLE:
+            outf.write(line)
+        else:
+            outf.write_edge(*unpack(line))
+    outf.write(indent + "</rr_edges>\n", records = 0)
 ##########################################################################            
 
 ##########################################################################
@@ -2410,6 +2470,92 @@ def generate_rr_graph(make_sb_clique = False):
     return G, grid
 ##########################################################################
 
+##########################################################################
+def get_source_files():
+    """Lists the sources of the code that determines the generated architecture.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    List[str]
+        Absolute paths of the source files.
+
+    Notes
+    -----
+    These are this script, all modules of the repository that it has imported,
+    directly or through other modules, and the wire-delay script that it calls
+    for measuring the connection-block delays.
+    """
+
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sources = set([os.path.abspath(__file__), os.path.join(src_dir, "wire_delays", "local_wires.py")])
+    for mod in sys.modules.values():
+        filename = getattr(mod, "__file__", None)
+        if filename is None:
+            continue
+        filename = os.path.abspath(filename)
+        if filename.endswith(".pyc"):
+            filename = filename[:-1]
+        if filename.startswith(src_dir + os.sep):
+            sources.add(filename)
+
+    return sorted(sources)
+##########################################################################
+
+##########################################################################
+def get_input_fingerprint():
+    """Fingerprints the effective inputs of architecture generation.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    str
+        Key identifying the inputs.
+
+    Notes
+    -----
+    The fingerprint is taken just before export, once the switch pattern and the
+    multiplexer stacking order have been settled. Hence, >>stored_edges.save<<
+    (which by then reflects the pattern read from the VPR and ILP logs) and
+    the stacking order (which is what >>sb_mux.order<< holds) describe the graph
+    completely, together with the arguments, the files they point to, the technology
+    parameters, the buffer sizes, and the sources listed by >>get_source_files<<.
+    """
+
+    arg_parts = []
+    for arg, val in sorted(vars(args).items()):
+        if arg in ("spice_cache", "artifact_store", "artifact_store_size", "load_model_cache", "recalibrate_load_model"):
+            continue
+        arg_parts.append("%s=%s" % (arg, str(val)))
+        if val is not None and os.path.isfile(str(val)):
+            arg_parts.append(artifact_store.fingerprint_file(str(val)))
+
+    tech_parts = []
+    for attr in sorted(dir(tech)):
+        val = getattr(tech, attr)
+        if attr.startswith('_') or not isinstance(val, (int, float, str, list, tuple, dict)):
+            continue
+        tech_parts.append("%s=%s" % (attr, repr(sorted(val.items()) if isinstance(val, dict) else val)))
+
+    source_parts = ["%s=%s" % (os.path.basename(f), artifact_store.fingerprint_file(f)) for f in get_source_files()]
+
+    return artifact_store.fingerprint(' '.join(source_parts),\
+                                      ' '.join(arg_parts), ' '.join(tech_parts),\
+                                      artifact_store.fingerprint_file(args.wire_file),\
+                                      artifact_store.fingerprint_file(args.import_padding)\
+                                      if args.import_padding is not None else None,\
+                                      artifact_store.fingerprint_file("stored_edges.save"),\
+                                      repr(SB_MUX_ORDER), repr(sorted(H)), repr(sorted(V)), grid_w, grid_h,\
+                                      FINALIZE_CLIQUE, repr(sorted(H_drivers.items())),\
+                                      repr(sorted(V_drivers.items())), local_driver, repr(default_cb_delay))
+##########################################################################
+
 ##########################################################################
 def export_rr_graph(G, grid, filename, potential_edge_delays = None):
     """Exports the RR-graph in the VTR8 RR-graph format.
@@ -2439,8 +2585,19 @@ def export_rr_graph(G, grid, filename, potential_edge_delays = None):
         inherit = args.change_grid_dimensions
     except:
         pass
+    input_key = get_input_fingerprint()
     if inherit is None:
-        td_dict = spice_all_wires(G)
+        delay_key = artifact_store.fingerprint("delays", input_key)
+        delay_filename = "spice_delays.dump"
+        if ARTIFACT_STORE.fetch("delays", delay_key, [delay_filename]):
+            with open(delay_filename, "r") as inf:
+                td_dict = ast.literal_eval(inf.read())
+        else:
+            td_dict = spice_all_wires(G)
+            with open(delay_filename, "w") as outf:
+                outf.write(repr(td_dict))
+            ARTIFACT_STORE.store("delays", delay_key, [delay_filename])
+        os.remove(delay_filename)
         cb_delay = 0.5 * (td_dict["cb_h"] + td_dict["cb_v"])
     else:
         td_dict = read_delays_from_arc(inherit)
@@ -2455,42 +2612,59 @@ def export_rr_graph(G, grid, filename, potential_edge_delays = None):
         for u, v in rem_list:
             G.remove_edge(u, v)
 
-    with open(filename, "w") as outf:
-        potential_edges = sorted(set([attrs["seg"] for u, attrs in G.nodes(data = True)\
-                                     if u.startswith("potential_edge")])) if MAKE_SB_CLIQUE else None
-        txt = header + export_chan_tags(H, V, grid_w, grid_h,\
-                                        potential_edge_no = N * len(potential_edges) if MAKE_SB_CLIQUE else 0)
-
-        #Determine which potential delays will be used (default, measured, or inherited).
-        potential_edge_fwd = potential_edges
-        if potential_edge_delays is not None:
-            potential_edge_fwd = potential_edge_delays
-        if inherit is not None:
-            if not potential_edges:
-                potential_edge_fwd = {}
-            else:
-                potential_edge_fwd = {e : td_dict[e] for e in potential_edges}
-
-        outf.write(txt)
-        global mux_ids
-        txt, mux_ids = export_switches(H, V, cb_delay, td_dict, potential_edges = potential_edge_fwd)
-        outf.write(txt)
-        global seg_ids
-        txt, seg_ids = export_segments(H, V, potential_edges = potential_edge_fwd)
-        outf.write(txt)
-        txt = export_blocks()
-        outf.write(txt)
-        txt = export_grid(grid)
-        outf.write(txt)
-        txt, counts, io_fanin_dict, io_fanout_dict = export_rr_nodes(G, grid)
-        outf.write(txt)
-        txt = export_rr_edges(G, counts, io_fanin_dict, io_fanout_dict) + footer
-        outf.write(txt)
-    if COMPRESS_RR:
-        os.system("lz4 --rm %s %s.lz4" % (filename, filename)) 
+    potential_edges = sorted(set([attrs["seg"] for u, attrs in G.nodes(data = True)\
+                                 if u.startswith("potential_edge")])) if MAKE_SB_CLIQUE else None
 
+    #Determine which potential delays will be used (default, measured, or inherited).
+    potential_edge_fwd = potential_edges
+    if potential_edge_delays is not None:
+        potential_edge_fwd = potential_edge_delays
+    if inherit is not None:
+        if not potential_edges:
+            potential_edge_fwd = {}
+        else:
+            potential_edge_fwd = {e : td_dict[e] for e in potential_edges}
+
+    #Switch and segment ids are needed for the architecture file even if the RR-graph is reused.
+    global mux_ids
+    switch_txt, mux_ids = export_switches(H, V, cb_delay, td_dict, potential_edges = potential_edge_fwd)
+    global seg_ids
+    seg_txt, seg_ids = export_segments(H, V, potential_edges = potential_edge_fwd)
+
+    delay_repr = repr(sorted(td_dict.items()))
+    potential_repr = repr(sorted(potential_edge_fwd.items()) if isinstance(potential_edge_fwd, dict)\
+                          else potential_edge_fwd)
+
+    rr_key = artifact_store.fingerprint("rr", input_key, delay_repr, potential_repr)
+    rr_artifacts = [filename + (".lz4" if COMPRESS_RR else '')]
+    if not HUMAN_READABLE:
+        rr_artifacts.append(rr_binary.sidecar_filename(filename))
+    if not ARTIFACT_STORE.fetch("rr", rr_key, rr_artifacts):
+        outf = rr_writer.RRWriter(filename, compress = COMPRESS_RR, sidecar = not HUMAN_READABLE)
+        outf.begin_section("channels")
+        outf.write(header, records = 0)
+        outf.write(export_chan_tags(H, V, grid_w, grid_h,\
+                                    potential_edge_no = N * len(potential_edges) if MAKE_SB_CLIQUE else 0))
+        outf.begin_section("switches")
+        outf.write(switch_txt)
+        outf.begin_section("segments")
+        outf.write(seg_txt)
+        outf.begin_section("block_types")
+        outf.write(export_blocks())
+        outf.begin_section("grid")
+        outf.write(export_grid(grid))
+        counts, io_fanin_dict, io_fanout_dict = export_rr_nodes(G, grid, outf)
+        export_rr_edges(G, counts, io_fanin_dict, io_fanout_dict, outf)
+        outf.write(footer, records = 0)
+        outf.close()
+        outf.report()
+        ARTIFACT_STORE.store("rr", rr_key, rr_artifacts)
+
+    arc_key = artifact_store.fingerprint("arc", input_key, delay_repr, potential_repr)
     if True:#inherit is None
-        fill_in_template(G, cb_delay, td_dict, potential_edges = potential_edge_fwd)
+        if not ARTIFACT_STORE.fetch("arc", arc_key, [args.arc_name]):
+            fill_in_template(G, cb_delay, td_dict, potential_edges = potential_edge_fwd)
+            ARTIFACT_STORE.store("arc", arc_key, [args.arc_name])
     else:
         with open(inherit, "r") as inf:
             lines = inf.readlines()
@@ -2506,8 +2680,15 @@ def export_rr_graph(G, grid, filename, potential_edge_delays = None):
         with open(args.arc_name, "w") as outf:
             outf.write(txt)
 
+    #The matrix depends only on the delays and the channel composition, so it is often
+    #reusable even when the pattern changes.
     placement_delay_matrix_filename = args.arc_name.rsplit(".xml", 1)[0] + "_placement_delay.matrix" 
-    generate_optimal_placement_delay_matrix(cb_delay, td_dict, placement_delay_matrix_filename)
+    matrix_key = artifact_store.fingerprint("matrix", artifact_store.fingerprint_file(os.path.abspath(__file__)),\
+                                            repr(cb_delay), delay_repr, repr(sorted(H)), repr(sorted(V)),\
+                                            grid_w, grid_h)
+    if not ARTIFACT_STORE.fetch("matrix", matrix_key, [placement_delay_matrix_filename]):
+        generate_optimal_placement_delay_matrix(cb_delay, td_dict, placement_delay_matrix_filename)
+        ARTIFACT_STORE.store("matrix", matrix_key, [placement_delay_matrix_filename])
 ##########################################################################
 
 ##########################################################################
@@ -2772,6 +2953,33 @@ def stack_muxes(G, get_pins = False):
     else:
         muxes += copy.copy(SB_MUX_ORDER)
 
+    pins, width = place_muxes(muxes, all_sizes)
+
+    if get_pins:
+        return pins, all_sizes
+
+    return width
+##########################################################################
+
+##########################################################################
+def place_muxes(muxes, all_sizes):
+    """Places the routing multiplexers in columns, in the given order.
+
+    Parameters
+    ----------
+    muxes : List[str]
+        Multiplexers in the stacking order.
+    all_sizes : Dict[str, int]
+        A dictionary of multiplexer sizes.
+
+    Returns
+    -------
+    Dict[str, Dict[str, Tuple[float]]]
+        Input and output pin coordinates of each multiplexer.
+    int
+        Total routing mux width in fin pitches.
+    """
+
     cols = [[0, []]]
 
     get_w = lambda row_cnt : 21 + row_cnt
@@ -2830,10 +3038,7 @@ def stack_muxes(G, get_pins = False):
         cols[-1][0] += h
         cols[-1][1].append((w, h))
 
-    if get_pins:
-        return pins, all_sizes
-
-    return sum([max(mux[0] for mux in col[1]) for col in cols])
+    return pins, sum([max(mux[0] for mux in col[1]) for col in cols])
 ##########################################################################
 
 ##########################################################################
@@ -3177,7 +3382,7 @@ def meas_lut_access_delay(G):
 ##########################################################################
 
 ##########################################################################
-def get_netlist(G, wire, source, get_cb_delay = False):
+def get_netlist(G, wire, source, get_cb_delay = False, layout = None):
     """Assembles a netlist for Spice measurement of the given wire type.
 
     Parameters
@@ -3191,6 +3396,9 @@ def get_netlist(G, wire, source, get_cb_delay = False):
     get_cb_delay : Optional[bool], default = False
         Determines the position of the wire and the connection block and then calls
         >>local_wires.py<< to obtain the delay from the wire to a LUT input pin.
+    layout : Optional[Tuple[Dict]], default = None
+        Multiplexer layout of G, as returned by >>get_mux_layout<<.
+        If None, it is computed.
    
     Returns
     -------
@@ -3264,10 +3472,15 @@ def get_netlist(G, wire, source, get_cb_delay = False):
         return lattice
     #------------------------------------------------------------------------#
 
-    tile_width = max(get_metal_dimensions()[0], get_tile_dimensions(G)[0]) / FP
-    tile_height = max(get_metal_dimensions()[1], get_tile_dimensions(G)[1]) / GP
+    if layout is None:
+        layout = get_mux_layout(G)
+    pins, all_sizes, tile_dimensions = layout
+    #The pins of the children at other BLEs are added below, so the layout must not be shared.
+    pins = copy.copy(pins)
+    all_sizes = copy.copy(all_sizes)
 
-    pins, all_sizes = stack_muxes(G, get_pins = True)
+    tile_width = max(get_metal_dimensions()[0], tile_dimensions[0]) / FP
+    tile_height = max(get_metal_dimensions()[1], tile_dimensions[1]) / GP
 
     L = int(wire[1:])
 
@@ -3301,18 +3514,12 @@ def get_netlist(G, wire, source, get_cb_delay = False):
                     if "potential_edge" in child:
                         continue
                     if not child in pins:
-                        if G.node[child]["node_type"] == "h_track":
-                            child_ble = int(child.split("_H")[0].split("ble_")[1])
-                        elif G.node[child]["node_type"] == "v_track":
-                            child_ble = int(child.split("_V")[0].split("ble_")[1])
-                        else:
-                            child_ble = NEUTRAL_BLE
-                        child_ble_offset = child_ble - NEUTRAL_BLE
-                        child_pins = pins[child.replace("ble_%d" % child_ble, "ble_%d" % NEUTRAL_BLE)]
+                        neutral_child, child_ble_offset = get_neutral_equivalent(G, child)
+                        child_pins = pins[neutral_child]
                         child_i = (child_pins['i'][0], child_pins['i'][1] + child_ble_offset * lut_height)
                         child_o = (child_pins['o'][0], child_pins['o'][1] + child_ble_offset * lut_height)
                         pins.update({child : {'i' : child_i, 'o' : child_o}})
-                        all_sizes.update({child : all_sizes[child.replace("ble_%d" % child_ble, "ble_%d" % NEUTRAL_BLE)]})
+                        all_sizes.update({child : all_sizes[neutral_child]})
 
                     for e in G[source + "_tap_0"][child]:
                         e_tap = G[source + "_tap_0"][child][e]["tap"]
@@ -3435,18 +3642,12 @@ def get_netlist(G, wire, source, get_cb_delay = False):
         fanout = set()
         for child in all_fanout:
             if not child in pins:
-                if G.node[child]["node_type"] == "h_track":
-                    child_ble = int(child.split("_H")[0].split("ble_")[1])
-                elif G.node[child]["node_type"] == "v_track":
-                    child_ble = int(child.split("_V")[0].split("ble_")[1])
-                else:
-                    child_ble = NEUTRAL_BLE
-                child_ble_offset = child_ble - NEUTRAL_BLE
-                child_pins = pins[child.replace("ble_%d" % child_ble, "ble_%d" % NEUTRAL_BLE)]
+                neutral_child, child_ble_offset = get_neutral_equivalent(G, child)
+                child_pins = pins[neutral_child]
                 child_i = (child_pins['i'][0], child_pins['i'][1] + child_ble_offset * lut_height)
                 child_o = (child_pins['o'][0], child_pins['o'][1] + child_ble_offset * lut_height)
                 pins.update({child : {'i' : child_i, 'o' : child_o}})
-                all_sizes.update({child : all_sizes[child.replace("ble_%d" % child_ble, "ble_%d" % NEUTRAL_BLE)]})
+                all_sizes.update({child : all_sizes[neutral_child]})
 
             fanout.add(child)
         fanout = list(fanout)
@@ -3545,233 +3746,699 @@ def get_netlist(G, wire, source, get_cb_delay = False):
 ##########################################################################
 
 ##########################################################################
-def look_up_load_delay(G, mux):
-    """Extracts the delay change from the precomputed load-delay model.
+def get_load_fanout(G, mux, pins):
+    """Returns the targets that load the wire driven by the given multiplexer,
+    in the order in which >>get_netlist<< connects them.
 
     Parameters
     ----------
     G : nx.MultiDiGraph
         The routing-resource graph.
     mux : str
-        Multiplexer whose load is being assessed.
-
-    Returns
-    -------
-    float
-        The predicted delay.
-    float
-        Loading length.
-    """
-
-    wire = mux.split('_')[2]
-    net = get_netlist(G, wire, mux)
-
-    load_length = 0.0
-    for u, v in sorted(net.edges()):
-        if "wire" in u and "wire" in v:
-            continue
-        u_coords = net.node[u]["coords"]
-        v_coords = net.node[v]["coords"]
-
-        L = abs(u_coords[1] - v_coords[1]) * GP
-        L += abs(u_coords[0] - v_coords[0]) * FP
-        
-        #NOTE: We sum up all Mx wires, as this will approximate also the effect
-        #of moving the multiplexer away from the LUT driver, which is important,
-        #although not modeled separately at the moment. In the future, we may want
-        #to be more precise.
-        if net[u][v]["layer"] == "Mx":
-            load_length += L
-    
-    #print load_length
-
-    #NOTE: The polynomial approximation might be off and it may return negative values,
-    #which we of course want to cap.
-
-    return max(0.0, load_model[wire].evaluate(load_length)), load_length
-##########################################################################
-
-##########################################################################
-def optimize_pattern_layout(G, criticalities = None):
-    """Optimizes the switch-pattern using simulated annealing.
-
-    Parameters
-    ----------
-    G : nx.MultiDiGraph
-        The routing-resource graph.
-    criticalities : Optional[Dict[str, float]], default = None
-        A dictionary of wire-type criticalities, extracted from some VPR run.
-        If not specified, all wire types will be assigned a criticality of 1.
+        Switch-block multiplexer.
+    pins : Dict[str, Dict[str, Tuple[float]]]
+        Pin coordinates of all multiplexers. Only the keys and their order are used,
+        so the fanout stays valid for any stacking order of the same multiplexers.
 
     Returns
     -------
-    List[str]
-        The final switch-block multiplexer order.
+    List[List[Tuple[str, str, int]]]
+        For each tap of a vertical wire, or just once for a horizontal one, the targets
+        as (name, multiplexer at the neutral BLE, BLE offset) triples.
     """
 
     #------------------------------------------------------------------------#
-    def evaluate_move(prev_td, prev_wl, new_td, new_wl, T):
-        """Evaluates the move
+    def get_fanout(u):
+        """Returns the real fanout of a node.
 
         Parameters
         ----------
-        prev_td : float
-            Previous timing cost.
-        prev_wl : float
-            Previous wirelength cost.
-        new_td : float
-            New timing cost.
-        new_wl : float
-            New wirelength cost.
-        T : float
-            Temperature.
-        
+        u : str
+            Node identifier.
+
         Returns
         -------
-        bool
-            Indicator of acceptance.
+        List[str]
+            Children of the node.
         """
 
-        td_vs_wl = 0.5
-
-        delta_td = (new_td - prev_td) / float(prev_td)
-        delta_wl = (new_wl - prev_wl) / float(prev_wl)
-        delta_c = td_vs_wl * delta_td + (1.0 - td_vs_wl) * delta_wl
-
-        if delta_c < 0:
-            return True
-
-        energy_threshold = random.random()
-        energy = math.exp(-1 * delta_c / T)
+        all_fanout = [c for c in G[u] if not "potential_edge" in c]
+        if not FIRST_CLIQUE_ITER:
+            real_fanout = [c for c in all_fanout if not G[u][c].get("delay_operating_point_only", False)]
+            if real_fanout:
+                all_fanout = real_fanout
 
-        return energy > energy_threshold
+        return all_fanout
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
-    def swap_pair(a, b, l):
-        """Swaps two pairs in a list.
+    def place_child(child):
+        """Returns the target entry of a child.
 
         Parameters
         ----------
-        a : int
-            First index.
-        b : int
-            Second index.
-        l : List[str]
-            List.
-    
+        child : str
+            Node identifier.
+
         Returns
         -------
-        List[str]
-            List with the swap committed.
+        Tuple[str, str, int]
+            The target.
         """
 
-        cp = l[a]
-        l[a] = l[b]
-        l[b] = cp
+        if child in pins:
+            return child, child, 0
 
-        return l
+        return (child, ) + get_neutral_equivalent(G, child)
     #------------------------------------------------------------------------#
 
-    global SB_MUX_ORDER
-
-    #Make a copy of the routing graph without the potential edges, so as to
-    #make the optimization faster.
-    G_real = copy.deepcopy(G)
-    rm_list = [u for u in G if "potential_edge" in u]
-    for u in rm_list:
-        G_real.remove_node(u)
-
-    cb_muxes, sb_muxes = export_mux_sizes(G_real)
-    sb_muxes = list(sb_muxes.keys())
-
-    random.seed(19225)
-    random.shuffle(sb_muxes)
-    SB_MUX_ORDER = sb_muxes
-    sb_mux_indices = [i for i in range(0, len(sb_muxes))]
-    prev_td, prev_wl = evaluate_pattern_layout_cost(G_real, criticalities = criticalities)
-
-    #SA parameters:
-    init_t = 1.0
-    t_red = 0.8
-    outer_iters = 30
-    inner_iters = 100
-
-    T = init_t
-    move = -1
-    for tcnt in range(0, outer_iters):
-        for mcnt in range(0, inner_iters):
-            move += 1
-            swap_a, swap_b = random.sample(sb_mux_indices, 2)
-            print move, T, "swapping", sb_muxes[swap_a], sb_muxes[swap_b]
-            sb_muxes = swap_pair(swap_a, swap_b, sb_muxes)
-            SB_MUX_ORDER = sb_muxes
-            new_td, new_wl = evaluate_pattern_layout_cost(G_real, criticalities = criticalities)
-            accept = evaluate_move(prev_td, prev_wl, new_td, new_wl, T)
-            if accept:
-                prev_td = new_td
-                prev_wl = new_wl
-                print "accepted", new_td, new_wl
-            else:
-                sb_muxes = swap_pair(swap_a, swap_b, sb_muxes)
-                SB_MUX_ORDER = sb_muxes
-                print "rejected"
-        T *= t_red
+    wire = mux.split('_')[2]
+    if wire[0] != 'V':
+        fanout = set(get_fanout(mux))
+        return [[place_child(child) for child in fanout]]
 
-    with open("sb_mux.order", "w") as outf:
-        outf.write(str(SB_MUX_ORDER))
+    source = mux.split("_tap")[0]
+    fanouts = []
+    for tap in range(0, tap_M):
+        if SEPARATE_TAPS:
+            try:
+                fanout = [u for u in pins if u in G[source + ("_tap_%d" % tap)]]
+            except:
+                fanout = []
+            fanouts.append([(u, u, 0) for u in fanout])
+            continue
+        local_fanout = set()
+        for child in get_fanout(source + "_tap_0"):
+            for e in G[source + "_tap_0"][child]:
+                e_tap = G[source + "_tap_0"][child][e]["tap"]
+                if e_tap == -1:
+                    e_tap = tap_M - 1
+                if e_tap == tap:
+                    local_fanout.add(child)
+        fanouts.append([place_child(child) for child in local_fanout])
+
+    return fanouts
 ##########################################################################
 
 ##########################################################################
-def evaluate_pattern_layout_cost(G, criticalities = None, do_spice = False):
-    """Returns the delay and wirelength cost of the pattern's current layout.
+def get_load_length(mux, fanouts, pins):
+    """Computes the length of the Mx wires that load the wire driven by the given multiplexer,
+    directly from the stacking geometry.
 
     Parameters
     ----------
-    G : nx.MultiDiGraph
-        The routing-resource graph.
-    criticalities : Optional[Dict[str, float]], default = None
-        A dictionary of wire-type criticalities, extracted from some VPR run.
-        If not specified, all wire types will be assigned a criticality of 1.
-    do_spice : Optional[bool], default = False
-        Specifies that the delays should be measured again.
+    mux : str
+        Switch-block multiplexer.
+    fanouts : List[List[Tuple[str, str, int]]]
+        Targets, as returned by >>get_load_fanout<<.
+    pins : Dict[str, Dict[str, Tuple[float]]]
+        Pin coordinates of all multiplexers.
 
     Returns
     -------
     float
-        Timing cost.
-    float
-        Wirelength cost.
-    """
-
-    #TODO: See if we want to do full measurements at all, or operate merely
-    #on the variable parts of the delay, which may bring more fidelity.
-    #If we do want, then we should save the delays of the first architecture
-    #in the clique search, which has the absolute minimum loading of wires,
-    #then add the variable part that is being looked up.
+        Loading length.
 
+    Notes
+    -----
+    This is the sum of the Mx edges of the netlist built by >>get_netlist<<:
+    the lattice connecting the targets of each tap to the wire and, for vertical
+    wires, the segments from the wire to the lattices of all taps but the last one.
+    Translating a lattice does not change its length, so the tile dimensions play no role.
+    """
 
-    #Cost function parameters:
-    crit_exp = 8.0
+    #------------------------------------------------------------------------#
+    def get_lattice_length(targets, wire_x, tap = None):
+        """Computes the length of the lattice built by >>connect_targets<< of >>get_netlist<<.
 
-    if criticalities is None:
-        criticalities = {}
+        Parameters
+        ----------
+        targets : List[Tuple[float]]
+            Input pin coordinates of the targets, in the connection order.
+        wire_x : float
+            Horizontal offset of the global wire junction point.
+        tap : Optional[int], default = None
+            Tap, if the wire is vertical.
 
-    #TODO: Separate the wire types into individual wires per BLE as their delays may differ!
+        Returns
+        -------
+        float
+            Lattice length.
+        """
 
-    total_wl = 0.0
-    total_td = 0.0
+        wire_y = sum([y for x, y in targets]) / len(targets)
 
-    cb_muxes, sb_muxes = export_mux_sizes(G)
-    for mux in sb_muxes:
-        wire = mux.split('_')[2]
-        crit = criticalities.get(wire, 1.0)
-        delay, wirelength = look_up_load_delay(G, mux)
-        delay *= (crit ** crit_exp)
-        total_wl += wirelength
-        total_td += delay
+        cols = {}
+        col_thr = 10
+        coords = {}
+        for t, (x, y) in enumerate(targets):
+            u = ("t%d" % t) if tap is None else "t_%d_%d" % (tap, t)
+            if u == target_mux:
+                u = 't'
+            coords.update({u : (x, y)})
+            found = False
+            for col in cols:
+                if abs(x - col) <= col_thr:
+                    cols[col].append((y, u))
+                    found = True
+                    break
+            if not found:
+                cols.update({x : [(y, u)]})
+
+        length = 0.0
+        sorted_cols = sorted(cols)
+        fuse_index = len(cols) / 2
+        for i, col in enumerate(sorted_cols):
+            junction = "%sjunction_%d" % (("tp_%d_" % tap) if tap is not None else '', i)
+            coords.update({junction : (col, wire_y)})
+            cols[col].append((wire_y, junction))
+            if i == fuse_index:
+                length += abs(wire_x - col) * FP
+            if i != 0:
+                length += abs(col - sorted_cols[i - 1]) * FP
+            cols[col].sort()
+            for j in range(1, len(cols[col])):
+                u_x, u_y = coords[cols[col][j][1]]
+                v_x, v_y = coords[cols[col][j - 1][1]]
+                length += abs(u_y - v_y) * GP + abs(u_x - v_x) * FP
+
+        return length, wire_y
+    #------------------------------------------------------------------------#
+
+    get_pin = lambda target : (pins[target[1]]['i'][0], pins[target[1]]['i'][1] + target[2] * lut_height)
+
+    wire = mux.split('_')[2]
+    if wire[0] != 'V':
+        wire_s_x = pins[mux]['o'][0]
+        wire_s_y = 0.5 * lut_height
+        targets = [get_pin(target) for target in fanouts[0]]
+        order = sorted(range(0, len(targets)), key = lambda t : abs(targets[t][0] - wire_s_x) * FP\
+                                                              + abs(targets[t][1] - wire_s_y) * GP)
+        names = [fanouts[0][t][0] for t in order]
+        targets = [targets[t] for t in order]
+        sb_muxes = [t for t, name in enumerate(names) if not "cb_out" in name]
+        target_mux = "t%d" % sb_muxes[len(sb_muxes) / 2]
+        avg_load_x = sum([x for x, y in targets]) / len(targets)
+        length, wire_y = get_lattice_length(targets, avg_load_x)
+
+        return length
+
+    length = 0.0
+    min_x = float("inf")
+    tap_offsets = []
+    for tap in range(0, tap_M):
+        targets = [get_pin(target) for target in fanouts[tap]]
+        if SEPARATE_TAPS:
+            order = sorted(range(0, len(targets)), key = lambda t : (targets[t][1], targets[t][0]))
+        else:
+            order = sorted(range(0, len(targets)), key = lambda t : targets[t][0] * FP - abs(targets[t][1]) * GP)
+        names = [fanouts[tap][t][0] for t in order]
+        targets = [targets[t] for t in order]
+        target_mux = None
+        if tap == tap_M - 1:
+            sb_muxes = [t for t, name in enumerate(names) if not "cb_out" in name]
+            target_mux = "t_%d_%d" % (tap, sb_muxes[len(sb_muxes) / 2])
+        local_fanout_x = sum([x for x, y in targets]) / float(len(targets))
+        min_x = min([min_x] + [x for x, y in targets])
+        lattice_length, wire_y = get_lattice_length(targets, local_fanout_x, tap = tap)
+        length += lattice_length
+        if tap != tap_M - 1:
+            tap_offsets.append((local_fanout_x, wire_y))
+
+    wire_s_x = 0.5 * (min_x + lut_width)
+    for x, y in tap_offsets:
+        length += abs(x - wire_s_x) * FP + abs(y) * GP
+
+    return length
+##########################################################################
+
+##########################################################################
+def look_up_load_delay(G, mux, layout = None):
+    """Extracts the delay change from the precomputed load-delay model.
+
+    Parameters
+    ----------
+    G : nx.MultiDiGraph
+        The routing-resource graph.
+    mux : str
+        Multiplexer whose load is being assessed.
+    layout : Optional[Tuple[Dict]], default = None
+        Multiplexer layout of G, as returned by >>get_mux_layout<<.
+
+    Returns
+    -------
+    float
+        The predicted delay.
+    float
+        Loading length.
+    """
+
+    if layout is None:
+        layout = get_mux_layout(G)
+    pins = layout[0]
+
+    delays, lengths = look_up_load_delays([mux], [get_load_fanout(G, mux, pins)], pins)
+
+    return delays[0], lengths[0]
+##########################################################################
+
+##########################################################################
+def look_up_load_delays(muxes, fanouts, pins):
+    """Evaluates the precomputed load-delay model for several multiplexers at once.
+
+    Parameters
+    ----------
+    muxes : List[str]
+        Multiplexers whose load is being assessed.
+    fanouts : List[List[List[Tuple[str, str, int]]]]
+        Targets of each multiplexer, as returned by >>get_load_fanout<<.
+    pins : Dict[str, Dict[str, Tuple[float]]]
+        Pin coordinates of all multiplexers.
+
+    Returns
+    -------
+    np.ndarray
+        The predicted delays.
+    np.ndarray
+        Loading lengths.
+    """
+
+    #NOTE: We sum up all Mx wires, as this will approximate also the effect
+    #of moving the multiplexer away from the LUT driver, which is important,
+    #although not modeled separately at the moment. In the future, we may want
+    #to be more precise.
+    lengths = np.array([get_load_length(mux, fanout, pins) for mux, fanout in zip(muxes, fanouts)], dtype = float)
+    wires = np.array([mux.split('_')[2] for mux in muxes])
+
+    delays = np.zeros(len(muxes))
+    for wire in set(wires.tolist()):
+        indices = np.flatnonzero(wires == wire)
+        delays[indices] = load_model[wire].evaluate_array(lengths[indices])
+
+    #NOTE: The polynomial approximation might be off and it may return negative values,
+    #which we of course want to cap.
+
+    return np.maximum(0.0, delays), lengths
+##########################################################################
+
+##########################################################################
+def get_neutral_equivalent(G, node):
+    """Returns the node at the neutral BLE that corresponds to the given one.
+
+    Parameters
+    ----------
+    G : nx.MultiDiGraph
+        The routing-resource graph.
+    node : str
+        Node identifier.
+
+    Returns
+    -------
+    str
+        Identifier of the corresponding node at the neutral BLE.
+    int
+        Offset of the node's BLE from the neutral one.
+    """
+
+    if G.node[node]["node_type"] == "h_track":
+        ble = int(node.split("_H")[0].split("ble_")[1])
+    elif G.node[node]["node_type"] == "v_track":
+        ble = int(node.split("_V")[0].split("ble_")[1])
+    else:
+        ble = NEUTRAL_BLE
+
+    return node.replace("ble_%d" % ble, "ble_%d" % NEUTRAL_BLE), ble - NEUTRAL_BLE
+##########################################################################
+
+##########################################################################
+def get_load_dependencies(mux, fanouts):
+    """Returns the multiplexers whose pins determine the load of the given one.
+
+    Parameters
+    ----------
+    mux : str
+        Switch-block multiplexer.
+    fanouts : List[List[Tuple[str, str, int]]]
+        Targets, as returned by >>get_load_fanout<<.
+
+    Returns
+    -------
+    Set[str]
+        The multiplexer itself and all of its targets, brought to the neutral BLE.
+    """
+
+    deps = set([mux])
+    for targets in fanouts:
+        deps.update([target[1] for target in targets])
+
+    return deps
+##########################################################################
+
+##########################################################################
+def optimize_pattern_layout(G, criticalities = None, init_t = 1.0, t_red = 0.8, outer_iters = 30,\
+                            inner_iters = 100, stop_iters = None):
+    """Optimizes the switch-pattern using simulated annealing.
+
+    Parameters
+    ----------
+    G : nx.MultiDiGraph
+        The routing-resource graph.
+    criticalities : Optional[Dict[str, float]], default = None
+        A dictionary of wire-type criticalities, extracted from some VPR run.
+        If not specified, all wire types will be assigned a criticality of 1.
+    init_t : Optional[float], default = 1.0
+        Initial temperature.
+    t_red : Optional[float], default = 0.8
+        Temperature reduction factor.
+    outer_iters : Optional[int], default = 30
+        Number of temperatures.
+    inner_iters : Optional[int], default = 100
+        Number of moves per temperature.
+    stop_iters : Optional[int], default = None
+        Number of consecutive temperatures without any accepted move after which
+        the annealing stops. If None, all temperatures are visited.
+
+    Returns
+    -------
+    List[str]
+        The final switch-block multiplexer order.
+
+    Notes
+    -----
+    A swap of two multiplexers moves only their pins, unless their sizes differ,
+    in which case the multiplexers stacked in between move as well. The cost of
+    each multiplexer is kept separately and only those whose load depends on
+    a moved pin (see >>get_load_dependencies<<) are evaluated again. The layout
+    itself is recomputed by >>place_muxes<< and the loads by >>get_load_length<<,
+    both without touching the graph.
+    With the default schedule, the moves and the result are the same as when
+    the entire layout was evaluated after each move.
+    """
+
+    #------------------------------------------------------------------------#
+    def evaluate_move(prev_td, prev_wl, new_td, new_wl, T):
+        """Evaluates the move
+
+        Parameters
+        ----------
+        prev_td : float
+            Previous timing cost.
+        prev_wl : float
+            Previous wirelength cost.
+        new_td : float
+            New timing cost.
+        new_wl : float
+            New wirelength cost.
+        T : float
+            Temperature.
+        
+        Returns
+        -------
+        bool
+            Indicator of acceptance.
+        """
+
+        td_vs_wl = 0.5
+
+        delta_td = (new_td - prev_td) / float(prev_td)
+        delta_wl = (new_wl - prev_wl) / float(prev_wl)
+        delta_c = td_vs_wl * delta_td + (1.0 - td_vs_wl) * delta_wl
+
+        if delta_c < 0:
+            return True
+
+        energy_threshold = random.random()
+        energy = math.exp(-1 * delta_c / T)
+
+        return energy > energy_threshold
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def propose_moves():
+        """Generates the swap moves.
+
+        Parameters
+        ----------
+        None
+
+        Yields
+        ------
+        int
+            First index.
+        int
+            Second index.
+        """
+
+        sb_mux_indices = [i for i in range(0, len(sb_muxes))]
+        while True:
+            swap_a, swap_b = random.sample(sb_mux_indices, 2)
+            yield swap_a, swap_b
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def get_layout(order):
+        """Returns the multiplexer layout for the given switch-block multiplexer order.
+
+        Parameters
+        ----------
+        order : List[str]
+            Switch-block multiplexer order.
+
+        Returns
+        -------
+        Tuple[Dict]
+            The layout, as returned by >>get_mux_layout<<.
+        """
+
+        pins, width = place_muxes(fixed_muxes + order, all_sizes)
+
+        return pins, all_sizes, ((lut_width + width) * FP, lut_height * N * GP)
+    #------------------------------------------------------------------------#
+
+    global SB_MUX_ORDER
+
+    #Make a copy of the routing graph without the potential edges, so as to
+    #make the optimization faster.
+    G_real = copy.deepcopy(G)
+    rm_list = [u for u in G if "potential_edge" in u]
+    for u in rm_list:
+        G_real.remove_node(u)
+
+    cb_muxes, sb_sizes = export_mux_sizes(G_real)
+    sb_muxes = list(sb_sizes.keys())
+
+    random.seed(19225)
+    random.shuffle(sb_muxes)
+    SB_MUX_ORDER = sb_muxes
+
+    crossbar_muxes = {"crossbar%d" % i : crossbar_mux_size for i in range(0, K)}
+    all_sizes = {}
+    all_sizes.update(crossbar_muxes)
+    all_sizes.update(cb_muxes)
+    all_sizes.update(sb_sizes)
+    fixed_muxes = list(sorted(crossbar_muxes, key = lambda m : crossbar_muxes[m], reverse = True))
+    fixed_muxes += list(sorted(cb_muxes, key = lambda m : cb_muxes[m], reverse = True))
+
+    layout = get_layout(sb_muxes)
+    fanouts = {mux : get_load_fanout(G_real, mux, layout[0]) for mux in sb_sizes}
+    terms = get_mux_cost_terms(G_real, sb_sizes, criticalities, layout = layout, fanouts = fanouts)
+    prev_td, prev_wl = sum_mux_cost_terms(sb_sizes, terms)
+
+    dependents = {}
+    for mux in sb_sizes:
+        for dep in get_load_dependencies(mux, fanouts[mux]):
+            try:
+                dependents[dep].add(mux)
+            except:
+                dependents.update({dep : set([mux])})
+
+    T = init_t
+    moves = propose_moves()
+    reevaluated = 0
+    idle_temperatures = 0
+    start_time = time.time()
+    for tcnt in range(0, outer_iters):
+        accepted = 0
+        for mcnt in range(0, inner_iters):
+            swap_a, swap_b = next(moves)
+            sb_muxes[swap_a], sb_muxes[swap_b] = sb_muxes[swap_b], sb_muxes[swap_a]
+            new_layout = get_layout(sb_muxes)
+            stale = set()
+            for mux in new_layout[0]:
+                if new_layout[0][mux] != layout[0][mux]:
+                    stale |= dependents.get(mux, set())
+            reevaluated += len(stale)
+            new_terms = copy.copy(terms)
+            new_terms.update(get_mux_cost_terms(G_real, stale, criticalities, layout = new_layout, fanouts = fanouts))
+            new_td, new_wl = sum_mux_cost_terms(sb_sizes, new_terms)
+            if evaluate_move(prev_td, prev_wl, new_td, new_wl, T):
+                prev_td = new_td
+                prev_wl = new_wl
+                layout = new_layout
+                terms = new_terms
+                accepted += 1
+            else:
+                sb_muxes[swap_a], sb_muxes[swap_b] = sb_muxes[swap_b], sb_muxes[swap_a]
+        print "T = %g: accepted %d of %d moves, td = %g, wl = %g" % (T, accepted, inner_iters, prev_td, prev_wl)
+        T *= t_red
+        idle_temperatures = 0 if accepted else idle_temperatures + 1
+        if stop_iters is not None and idle_temperatures >= stop_iters:
+            print "No moves accepted at %d consecutive temperatures. Stopping." % idle_temperatures
+            break
+
+    print "Annealed the layout in %.2f s, reevaluating %d multiplexer loads."\
+          % (time.time() - start_time, reevaluated)
+
+    SB_MUX_ORDER = sb_muxes
+    with open("sb_mux.order", "w") as outf:
+        outf.write(str(SB_MUX_ORDER))
+
+    return SB_MUX_ORDER
+##########################################################################
+
+##########################################################################
+def evaluate_pattern_layout_cost(G, criticalities = None, do_spice = False):
+    """Returns the delay and wirelength cost of the pattern's current layout.
+
+    Parameters
+    ----------
+    G : nx.MultiDiGraph
+        The routing-resource graph.
+    criticalities : Optional[Dict[str, float]], default = None
+        A dictionary of wire-type criticalities, extracted from some VPR run.
+        If not specified, all wire types will be assigned a criticality of 1.
+    do_spice : Optional[bool], default = False
+        Specifies that the delays should be measured again.
+
+    Returns
+    -------
+    float
+        Timing cost.
+    float
+        Wirelength cost.
+    """
+
+    #TODO: See if we want to do full measurements at all, or operate merely
+    #on the variable parts of the delay, which may bring more fidelity.
+    #If we do want, then we should save the delays of the first architecture
+    #in the clique search, which has the absolute minimum loading of wires,
+    #then add the variable part that is being looked up.
+
+
+    #TODO: Separate the wire types into individual wires per BLE as their delays may differ!
+
+    cb_muxes, sb_muxes = export_mux_sizes(G)
+    terms = get_mux_cost_terms(G, sb_muxes, criticalities)
+
+    return sum_mux_cost_terms(sb_muxes, terms)
+##########################################################################
+
+##########################################################################
+def get_mux_cost_terms(G, muxes, criticalities = None, layout = None, fanouts = None):
+    """Returns the contribution of each given switch-block multiplexer to the
+    cost of the pattern's current layout.
+
+    Parameters
+    ----------
+    G : nx.MultiDiGraph
+        The routing-resource graph.
+    muxes : List[str]
+        Switch-block multiplexers to evaluate.
+    criticalities : Optional[Dict[str, float]], default = None
+        A dictionary of wire-type criticalities, extracted from some VPR run.
+        If not specified, all wire types will be assigned a criticality of 1.
+    layout : Optional[Tuple[Dict]], default = None
+        Multiplexer layout of G, as returned by >>get_mux_layout<<.
+        If None, it is computed.
+    fanouts : Optional[Dict[str, List]], default = None
+        Targets of the multiplexers, as returned by >>get_load_fanout<<.
+        Those that are missing are computed.
+
+    Returns
+    -------
+    Dict[str, Tuple[float]]
+        Criticality-weighted delay and the loading length of each multiplexer.
+    """
+
+    #Cost function parameters:
+    crit_exp = 8.0
+
+    if criticalities is None:
+        criticalities = {}
+
+    muxes = list(muxes)
+    if not muxes:
+        return {}
+    if layout is None:
+        layout = get_mux_layout(G)
+    pins = layout[0]
+    if fanouts is None:
+        fanouts = {}
+
+    mux_fanouts = [fanouts[mux] if mux in fanouts else get_load_fanout(G, mux, pins) for mux in muxes]
+    delays, wirelengths = look_up_load_delays(muxes, mux_fanouts, pins)
+    crits = np.array([criticalities.get(mux.split('_')[2], 1.0) for mux in muxes])
+    delays *= (crits ** crit_exp)
+
+    return dict(zip(muxes, zip(delays.tolist(), wirelengths.tolist())))
+##########################################################################
+
+##########################################################################
+def sum_mux_cost_terms(muxes, terms):
+    """Sums up the cost terms of the multiplexers.
+
+    Parameters
+    ----------
+    muxes : List[str]
+        Switch-block multiplexers, in the order of summation.
+    terms : Dict[str, Tuple[float]]
+        Cost terms, as returned by >>get_mux_cost_terms<<.
+
+    Returns
+    -------
+    float
+        Timing cost.
+    float
+        Wirelength cost.
+    """
+
+    total_wl = 0.0
+    total_td = 0.0
+    for mux in muxes:
+        delay, wirelength = terms[mux]
+        total_wl += wirelength
+        total_td += delay
+
+    return total_td, total_wl
+##########################################################################
+
+##########################################################################
+def get_mux_layout(G):
+    """Returns the multiplexer layout that the load netlists (>>get_netlist<<) depend on.
+
+    Parameters
+    ----------
+    G : nx.MultiDiGraph
+        The routing-resource graph.
+
+    Returns
+    -------
+    Dict[str, Dict[str, Tuple[float]]]
+        Pin coordinates of all multiplexers.
+    Dict[str, int]
+        Sizes of all multiplexers.
+    Tuple[int]
+        Tile dimensions.
+
+    Notes
+    -----
+    The loading lengths depend only on the relative positions of the pins,
+    while the sizes only determine the states of the multiplexers.
+    """
 
-    return total_td, total_wl
+    pins, all_sizes = stack_muxes(G, get_pins = True)
+
+    return pins, all_sizes, get_tile_dimensions(G)
 ##########################################################################
 
 ##########################################################################
@@ -3995,7 +4662,206 @@ def conv_nx_to_spice(net, meas_lut_access = False):
 ##########################################################################
 
 ##########################################################################
-def measure(G, wire, get_cb_delay = False, meas_lut_access = False):
+def parse_measurement(lines, wire, meas_lut_access = False):
+    """Parses the delays from the HSPICE output.
+
+    Parameters
+    ----------
+    lines : List[str]
+        Lines of the HSPICE standard output.
+    wire : str
+        Wire type.
+    meas_lut_access : Optional[bool], default = False
+        Specifies that the LUT access delay was measured.
+
+    Returns
+    -------
+    float | Dict[str, float]
+        Delay of a horizontal wire, or a dictionary of tap delays
+        of a vertical wire, or the LUT access delays.
+    """
+
+    scale_dict = {'f' : 1e-15, 'p' : 1e-12, 'n' : 1e-9}
+
+    td_dict = {}
+  
+    get_td = lambda l :  round(float(l.split()[1][:-1]), 1) * scale_dict[l.split()[1][-1]]
+    get_tap = lambda l : wire + '_' + l.split('=', 1)[0].split('_', 1)[1]
+    for line in lines:
+        if "tfall=" in line:
+            tfall = get_td(line) 
+        elif "trise=" in line:
+            trise = get_td(line)
+        elif meas_lut_access:
+            if "tfall_ble_mux" in line or "trise_ble_mux" in line:
+                td = get_td(line)
+                if td < 0:
+                    print "Negative time!"
+                    raise ValueError
+                try:
+                    td_dict["ble_mux"] = 0.5 * (td_dict["ble_mux"] + td)
+                except:
+                    td_dict.update({"ble_mux" : td})
+        elif wire[0] == 'V':
+            if "tfall_tap" in line or "trise_tap" in line:
+                tap = get_tap(line)
+                td = get_td(line)
+                if td < 0:
+                    print "Negative time!"
+                    raise ValueError
+                try:
+                    td_dict[tap] = 0.5 * (td_dict[tap] + td)
+                except:
+                    td_dict.update({tap : td})
+            
+    if trise < 0 or tfall < 0:
+        print "Negative time!"
+        raise ValueError
+ 
+    if wire[0] == 'V':
+        td_dict.update({"whole" : 0.5 * (trise + tfall)})
+
+    if meas_lut_access:
+        td_dict.update({"lut_access" : 0.5 * (trise + tfall) - td_dict["ble_mux"]})
+        return td_dict
+    if wire[0] == 'V':
+        return td_dict
+  
+    return 0.5 * (trise + tfall)
+##########################################################################
+
+##########################################################################
+def select_measurement_sources(G, wire, get_cb_delay = False):
+    """Picks the multiplexers driving the wires that are to be measured,
+    according to the robustness level.
+
+    Parameters
+    ----------
+    G : nx.MultiDiGraph
+        The routing-resource graph.
+    wire : str
+        Wire type.
+    get_cb_delay : Optional[bool], default = False
+        Specifies that the source is needed for connection-block measurement.
+
+    Returns
+    -------
+    List[str]
+        Source multiplexers.
+    """
+
+    pins, all_sizes = stack_muxes(G, get_pins = True)
+    source_dict = {}
+    for mux in pins:
+        if wire in mux and mux.startswith("ble_%d_" % NEUTRAL_BLE):
+
+            if ROBUSTNESS_LEVEL == 0:
+                return [mux]
+
+            key = mux.split("_tap")[0]
+            offset = pins[mux]['o'][0 if wire[0] == 'V' else 1]
+            deg = 0
+            for fanout in G:
+                if fanout.startswith(key):
+                    deg += G.in_degree(fanout) + G.out_degree(fanout)
+            source_dict.update({key : {"mux" : mux, "deg" : deg, "offset" : offset}})
+
+    sorted_keys = sorted(source_dict, key = lambda s : source_dict[s]["deg"]\
+                         * abs(source_dict[s]["offset"]))
+
+    if ROBUSTNESS_LEVEL == 1 or get_cb_delay:
+        #NOTE: Connection-block delays are very robust to changing the multiplexer as they usually
+        #assume only one or two columns, immediately next to the crossbar. Hence, the x-offset is
+        #less varialbe. Also, the load is within the cluster itself. If there is any variation in
+        #multiplexer sizes, that is more of an artifact of parametrized architecture generation.
+        #Median fanin should be a good representative in this case.
+        return [source_dict[sorted_keys[len(source_dict) / 2]]["mux"]]
+
+    return [source_dict[source_key]["mux"] for source_key in sorted_keys]
+##########################################################################
+
+##########################################################################
+def build_measurement_netlists(G, wire, meas_lut_access = False):
+    """Assembles all SPICE netlists needed for measuring the delay of the wire.
+
+    Parameters
+    ----------
+    G : nx.MultiDiGraph
+        The routing-resource graph.
+    wire : str
+        Wire type.
+    meas_lut_access : Optional[bool], default = False
+        Specifies that the LUT access delay should be measured instead.
+
+    Returns
+    -------
+    List[str]
+        Netlists, in the order in which their results are to be averaged.
+
+    Notes
+    -----
+    The driver sizes are read from the D0 and D1 globals when converting
+    the netlists, so they must be set before calling this function.
+    """
+
+    if meas_lut_access:
+        return [conv_nx_to_spice(meas_lut_access_delay(G), meas_lut_access = True)]
+
+    netlists = []
+    for source in select_measurement_sources(G, wire):
+        net = get_netlist(G, wire, source)
+        netlists.append(conv_nx_to_spice(net))
+       
+        if ROBUSTNESS_LEVEL == 3: 
+            potential_targets = [u for u, attrs in net.nodes(data = True) if attrs.get("potential_target", False)]
+            for i, u in enumerate(potential_targets):
+                relabeling_dict = {}
+                if u == 't':
+                    continue
+                relabeling_dict.update({'t' : "prev_t_%d" % i})
+                relabeling_dict.update({u : 't'})
+                net = nx.relabel_nodes(net, relabeling_dict)
+                netlists.append(conv_nx_to_spice(net))
+
+    return netlists
+##########################################################################
+
+##########################################################################
+def collect_measurements(engine, keys, wire, meas_lut_access = False):
+    """Parses the simulation results of the given netlists and averages them.
+
+    Parameters
+    ----------
+    engine : spice_engine.SpiceEngine
+        Engine that ran the simulations.
+    keys : List[str]
+        Keys of the simulated netlists.
+    wire : str
+        Wire type.
+    meas_lut_access : Optional[bool], default = False
+        Specifies that the LUT access delay was measured.
+
+    Returns
+    -------
+    float | Dict[str, float]
+        Averaged delay(s), as returned by >>parse_measurement<<.
+    """
+
+    td_dicts = [parse_measurement(engine.get_dump(key), wire, meas_lut_access) for key in keys]
+
+    if wire[0] == 'H' and not meas_lut_access:
+        return sum(td_dicts) / len(td_dicts)
+
+    for v in td_dicts[0]:
+        for td_dict in td_dicts[1:]:
+            td_dicts[0][v] += td_dict[v]
+        td_dicts[0][v] /= len(td_dicts)
+
+    return td_dicts[0]
+##########################################################################
+
+##########################################################################
+def measure(G, wire, get_cb_delay = False, meas_lut_access = False, engine = None):
     """Calls HSPICE to obtain the delay of the wire.
     
     Parameters
@@ -4007,6 +4873,10 @@ def measure(G, wire, get_cb_delay = False, meas_lut_access = False):
     get_cb_delay : Optional[bool], default = False
         Determines the position of the wire and the connection block and then calls
         >>meas_local_wire.py<< to obtain the delay from the wire to a LUT input pin.
+    meas_lut_access : Optional[bool], default = False
+        Specifies that the LUT access delay should be measured instead.
+    engine : Optional[spice_engine.SpiceEngine], default = None
+        Engine used to run the simulations. A new one is created if not specified.
 
     Returns
     -------
@@ -4014,139 +4884,17 @@ def measure(G, wire, get_cb_delay = False, meas_lut_access = False):
         Delay.
     """
 
-    #------------------------------------------------------------------------#
-    def run():
-        """Runs HSPICE and parses the delay."""
- 
-        with open(netlist_filename, "w") as outf:
-           outf.write(conv_nx_to_spice(net, meas_lut_access = meas_lut_access))
-       
-        hspice_call = os.environ["HSPICE"] + " %s > %s" % (netlist_filename, hspice_dump)
-        os.system(hspice_call)
-       
-        scale_dict = {'f' : 1e-15, 'p' : 1e-12, 'n' : 1e-9}
-       
-        with open(hspice_dump, "r") as inf:
-            lines = inf.readlines()
-    
-        #os.system("rm " + hspice_dump)
-       
-        td_dict = {}
-      
-        get_td = lambda l :  round(float(l.split()[1][:-1]), 1) * scale_dict[l.split()[1][-1]]
-        get_tap = lambda l : wire + '_' + l.split('=', 1)[0].split('_', 1)[1]
-        for line in lines:
-            if "tfall=" in line:
-                tfall = get_td(line) 
-            elif "trise=" in line:
-                trise = get_td(line)
-            elif meas_lut_access:
-                if "tfall_ble_mux" in line or "trise_ble_mux" in line:
-                    td = get_td(line)
-                    if td < 0:
-                        print "Negative time!"
-                        raise ValueError
-                    try:
-                        td_dict["ble_mux"] = 0.5 * (td_dict["ble_mux"] + td)
-                    except:
-                        td_dict.update({"ble_mux" : td})
-            elif wire[0] == 'V':
-                if "tfall_tap" in line or "trise_tap" in line:
-                    tap = get_tap(line)
-                    td = get_td(line)
-                    if td < 0:
-                        print "Negative time!"
-                        raise ValueError
-                    try:
-                        td_dict[tap] = 0.5 * (td_dict[tap] + td)
-                    except:
-                        td_dict.update({tap : td})
-                
-        if trise < 0 or tfall < 0:
-            print "Negative time!"
-            raise ValueError
-     
-        if wire[0] == 'V':
-            td_dict.update({"whole" : 0.5 * (trise + tfall)})
-
-        if meas_lut_access:
-            td_dict.update({"lut_access" : 0.5 * (trise + tfall) - td_dict["ble_mux"]})
-            return td_dict
-        if wire[0] == 'V':
-            return td_dict
-      
-        return 0.5 * (trise + tfall)
-    #------------------------------------------------------------------------#
+    if get_cb_delay:
+        source = select_measurement_sources(G, wire, get_cb_delay = True)[0]
+        return get_netlist(G, wire, source, get_cb_delay = True)
 
-    netlist_filename = "sim_global_%s_%s.sp" % (args.arc_name, wire)
-    hspice_dump = "hspice_%s_%s.dump" % (args.arc_name, wire)
+    if engine is None:
+        engine = spice_engine.SpiceEngine(cache_dir = SPICE_CACHE)
 
-    if meas_lut_access:
-        net = meas_lut_access_delay(G)
-        return run()
-    else:
-        pins, all_sizes = stack_muxes(G, get_pins = True)
-        source_dict = {}
-        for mux in pins:
-            if wire in mux and mux.startswith("ble_%d_" % NEUTRAL_BLE):
-
-                if ROBUSTNESS_LEVEL == 0:
-                    source = mux
-                    if get_cb_delay:
-                        return get_netlist(G, wire, source, get_cb_delay = True)
-                    net = get_netlist(G, wire, source)
-                    return run()                   
-
-                key = mux.split("_tap")[0]
-                offset = pins[mux]['o'][0 if wire[0] == 'V' else 1]
-                deg = 0
-                for fanout in G:
-                    if fanout.startswith(key):
-                        deg += G.in_degree(fanout) + G.out_degree(fanout)
-                source_dict.update({key : {"mux" : mux, "deg" : deg, "offset" : offset}})
-
-        sorted_keys = sorted(source_dict, key = lambda s : source_dict[s]["deg"]\
-                             * abs(source_dict[s]["offset"]))
-
-        if ROBUSTNESS_LEVEL == 1 or get_cb_delay:
-            #NOTE: Connection-block delays are very robust to changing the multiplexer as they usually
-            #assume only one or two columns, immediately next to the crossbar. Hence, the x-offset is
-            #less varialbe. Also, the load is within the cluster itself. If there is any variation in
-            #multiplexer sizes, that is more of an artifact of parametrized architecture generation.
-            #Median fanin should be a good representative in this case.
-            source = source_dict[sorted_keys[len(source_dict) / 2]]["mux"]
-
-            if get_cb_delay:
-                return get_netlist(G, wire, source, get_cb_delay = True)
-            net = get_netlist(G, wire, source)
-            return run()                   
-
-        td_dicts = []
-        for source_key in sorted_keys:
-            source = source_dict[source_key]["mux"]
-            net = get_netlist(G, wire, source)
-            td_dicts.append(run())
-           
-            if ROBUSTNESS_LEVEL == 3: 
-                potential_targets = [u for u, attrs in net.nodes(data = True) if attrs.get("potential_target", False)]
-                for i, u in enumerate(potential_targets):
-                    relabeling_dict = {}
-                    if u == 't':
-                        continue
-                    relabeling_dict.update({'t' : "prev_t_%d" % i})
-                    relabeling_dict.update({u : 't'})
-                    net = nx.relabel_nodes(net, relabeling_dict)
-                    td_dicts.append(run())
-            
-        if (wire[0] == 'H' and not meas_lut_access) or get_cb_delay:
-            return sum(td_dicts) / len(td_dicts)
+    keys = [engine.submit(netlist) for netlist in build_measurement_netlists(G, wire, meas_lut_access)]
+    engine.run()
 
-        for v in td_dicts[0]:
-            for td_dict in td_dicts[1:]:
-                td_dicts[0][v] += td_dict[v]
-            td_dicts[0][v] /= len(td_dicts)
-    
-        return td_dicts[0]
+    return collect_measurements(engine, keys, wire, meas_lut_access)
 ##########################################################################
 
 ##########################################################################
@@ -4162,6 +4910,8 @@ class TimingModelEntry(object):
     -------
     float evaluate(l : int)
         Evaluates the model
+    np.ndarray evaluate_array(ls : np.ndarray)
+        Evaluates the model for several lengths at once
     """
 
     #------------------------------------------------------------------------#
@@ -4202,27 +4952,56 @@ class TimingModelEntry(object):
 
         return self.curve(l)
     #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def evaluate_array(self, ls):
+        """Evaluates the model for several lengths at once.
+
+        Parameters
+        ----------
+        ls : np.ndarray
+            Load wire lengths in nm.
+        
+        Returns
+        -------
+        np.ndarray
+            The modeled delays.
+        """
+
+        ls = np.asarray(ls, dtype = float)
+
+        return np.where(ls < self.first_point, ls * self.t_per_nm, self.curve(ls))
+    #------------------------------------------------------------------------#
 ##########################################################################
 
 ##########################################################################
-def create_load_model():
+def create_load_model(recalibrate = False):
     """Creates a load model for the given wire, depending on the length of
     the Mx wires at its output, which is the predominant factor influencing the
     observed delay (much more than the muxes themselves).
 
     Parameters
     ----------
-    None
+    recalibrate : Optional[bool], default = False
+        Instructs the function to rerun all sweep points, ignoring any cached results.
     
     Returns
     -------
-    numpy.poly1d
-        A polynomial that interpolates the few measurements that are actually performed.
+    Dict[str, TimingModelEntry]
+        The load model of each wire type, interpolating the few measurements that are actually performed.
+
+    Notes
+    -----
+    The measurements depend only on the sweep netlists, which carry the technology
+    parameters, the driver sizes, and the wire lengths. Their fingerprint keys the
+    calibration stored in LOAD_MODEL_CACHE, so that subsequent calls only need to
+    refit the polynomials. Otherwise, all sweep points are simulated in one batch.
     """
 
     #------------------------------------------------------------------------#
-    def measure_load_impact(global_wire_length, sb_wire_length):
-        """Measures the impact of the increased load, for the given global and intra-sb wire lengths.
+    def get_load_netlist(global_wire_length, sb_wire_length, drivers):
+        """Returns the netlist measuring the impact of the increased load,
+        for the given global and intra-sb wire lengths.
 
         Parameters
         ----------
@@ -4230,8 +5009,17 @@ def create_load_model():
             Length of the global wire, that is being loaded, in um.
         sb_wire_length : float
             Length of the intra-sb wire exercising the load, in um.
+        drivers : Tuple[int]
+            Sizes of the two stages of the wire driver.
+
+        Returns
+        -------
+        str
+            Spice netlist text.
         """
  
+        D0, D1 = drivers
+ 
         txt = ".TITLE LOAD_MODEL_MEAS\n\n"
         txt += ".LIB %s\n" % (spice_model_path % (int(tech_node), int(tech_node)))
         txt += ".TRAN 0.1p 16n\n.OPTIONS BRIEF=1\n\n"
@@ -4312,54 +5100,97 @@ def create_load_model():
     
         txt += ".END"
 
-    #........................................................................#
-        def run(txt):
-            """Runs HSPICE and parses the delay.
-            
-            Parameters
-            ----------
-            txt : str
-                Spice netlist text.
-            
-
-            Returns
-            -------
-            float
-                The measured delay.
-            """
+        return txt
+    #------------------------------------------------------------------------#
 
-            with open("meas.sp", "w") as outf:
-               outf.write(txt)
-           
-            hspice_call = os.environ["HSPICE"] + " meas.sp > meas.dump"
-            os.system(hspice_call)
-           
-            scale_dict = {'a' : 1e-18, 'f' : 1e-15, 'p' : 1e-12, 'n' : 1e-9}
-           
-            with open("meas.dump", "r") as inf:
-                lines = inf.readlines()
+    #------------------------------------------------------------------------#
+    def parse_load_delay(lines):
+        """Parses the delay from the HSPICE output.
         
-            os.system("rm meas.sp meas.dump")
-           
-            td_dict = {}
-          
-            get_td = lambda l : 0 if l.split()[1] == "0." else round(float(l.split()[1][:-1]), 1) * scale_dict[l.split()[1][-1]]
-            for line in lines:
-                if "tfall=" in line:
-                    tfall = get_td(line) 
-                elif "trise=" in line:
-                    trise = get_td(line)
-                    
-            if trise < 0 or tfall < 0:
-                print "Negative time!"
-                raise ValueError
-         
-            return 0.5 * (trise + tfall)
-        #........................................................................#
+        Parameters
+        ----------
+        lines : List[str]
+            Lines of the HSPICE standard output.
 
-    
-        return run(txt)
-    #-----------------------------------------------------------------------#
+        Returns
+        -------
+        float
+            The measured delay.
+        """
+
+        scale_dict = {'a' : 1e-18, 'f' : 1e-15, 'p' : 1e-12, 'n' : 1e-9}
+       
+        get_td = lambda l : 0 if l.split()[1] == "0." else round(float(l.split()[1][:-1]), 1) * scale_dict[l.split()[1][-1]]
+        for line in lines:
+            if "tfall=" in line:
+                tfall = get_td(line) 
+            elif "trise=" in line:
+                trise = get_td(line)
+                
+        if trise < 0 or tfall < 0:
+            print "Negative time!"
+            raise ValueError
+     
+        return 0.5 * (trise + tfall)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def read_calibration(filename):
+        """Reads the stored measurements, if they are valid.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the calibration file.
+
+        Returns
+        -------
+        Dict[str, Dict[float, float]] | None
+            Load-induced delay of each wire type for each load length,
+            or None if the file does not exist or does not match the current version.
+        """
+
+        try:
+            with open(filename, "r") as inf:
+                calibration = ast.literal_eval(inf.read())
+        except:
+            return None
+
+        if not isinstance(calibration, dict) or calibration.get("version", None) != LOAD_MODEL_VERSION:
+            return None
+
+        return calibration.get("measurements", None)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def store_calibration(filename, measurements):
+        """Stores the measurements.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the calibration file.
+        measurements : Dict[str, Dict[float, float]]
+            Load-induced delay of each wire type for each load length.
+
+        Returns
+        -------
+        None
+        """
+
+        cache_dir = os.path.dirname(filename)
+        if not os.path.isdir(cache_dir):
+            try:
+                os.makedirs(cache_dir)
+            except OSError:
+                pass
+
+        #NOTE: The rename is atomic, so concurrent runs never read a partially written file.
+        tmp_filename = filename + ".tmp%d" % os.getpid()
+        with open(tmp_filename, "w") as outf:
+            outf.write(repr({"version" : LOAD_MODEL_VERSION, "measurements" : measurements}))
+        os.rename(tmp_filename, filename)
+    #------------------------------------------------------------------------#
 
     measure_count = 8
     max_reasonable_fanout = 16
@@ -4380,30 +5211,45 @@ def create_load_model():
     tile_width = max(get_metal_dimensions()[0], get_tile_dimensions(G)[0])
     tile_height = max(get_metal_dimensions()[1], get_tile_dimensions(G)[1])
 
-    model = {}
-
+    sweep = []
     for h in sorted(H):
         L = float(h[0]) * tile_width
         h_id = "H%d" % h[0]
-        D0, D1 = H_drivers[h[0]]
-        model.update({h_id : {}})
-        unloaded_delay = measure_load_impact(L, 0.0)
+        unloaded = get_load_netlist(L, 0.0, H_drivers[h[0]])
         for l in (low_lengths + high_lengths):
-            model[h_id].update({l : measure_load_impact(L, l) - unloaded_delay})
+            sweep.append((h_id, l, unloaded, get_load_netlist(L, l, H_drivers[h[0]])))
 
     for v in sorted(V):
         L = float(v[0]) * tile_height
         v_id = "V%d" % v[0]
-        D0, D1 = V_drivers[v[0]]
-        model.update({v_id : {}})
-        unloaded_delay = measure_load_impact(L, 0.0)
+        unloaded = get_load_netlist(L, 0.0, V_drivers[v[0]])
         for l in (low_lengths + high_lengths):
-            model[v_id].update({l : measure_load_impact(L, l) - unloaded_delay})
+            sweep.append((v_id, l, unloaded, get_load_netlist(L, l, V_drivers[v[0]])))
+
+    key = artifact_store.fingerprint(LOAD_MODEL_VERSION, *[p for point in sweep for p in point])
+    calibration_filename = os.path.join(os.path.abspath(LOAD_MODEL_CACHE), "%s.model" % key)
+
+    measurements = None if recalibrate else read_calibration(calibration_filename)
+    if measurements is None:
+        engine = spice_engine.SpiceEngine(cache_dir = SPICE_CACHE, refresh = recalibrate)
+        keys = [(engine.submit(unloaded), engine.submit(loaded)) for w, l, unloaded, loaded in sweep]
+        engine.run()
+
+        measurements = {}
+        for point, point_keys in zip(sweep, keys):
+            w, l = point[:2]
+            unloaded_delay, loaded_delay = [parse_load_delay(engine.get_dump(k)) for k in point_keys]
+            try:
+                measurements[w].update({l : loaded_delay - unloaded_delay})
+            except:
+                measurements.update({w : {l : loaded_delay - unloaded_delay}})
+        store_calibration(calibration_filename, measurements)
+    else:
+        print "Load model read from %s." % calibration_filename
 
-    polydeg = 3
-    #Degree of the approximating polynomial
-    for w in model:
-        model[w] = TimingModelEntry(model[w])
+    model = {}
+    for w in sorted(measurements):
+        model[w] = TimingModelEntry(measurements[w])
         print w, model[w].evaluate(100), model[w].evaluate(500), model[w].evaluate(1000), model[w].evaluate(10000)
 
     return model
@@ -4421,34 +5267,53 @@ def spice_all_wires(G):
     -------
     Dict[str, float]
         A dictionary of delays.
+
+    Notes
+    -----
+    All netlists are assembled first and then simulated in one batch,
+    so that the independent HSPICE runs can proceed in parallel.
     """
 
     td_dict = {}
     global D0
     global D1
 
+    engine = spice_engine.SpiceEngine(cache_dir = SPICE_CACHE)
+
+    jobs = []
     for h in sorted(H):
         h_id = "H%d" % h[0]
         D0, D1 = H_drivers[h[0]]
-        td_dict.update({h_id : measure(G, h_id)})
+        jobs.append((h_id, False, [engine.submit(netlist) for netlist in build_measurement_netlists(G, h_id)]))
     for v in sorted(V):
         v_id = "V%d" % v[0]
         D0, D1 = V_drivers[v[0]]
-        td_dict.update(measure(G, v_id))
-        if not SEPARATE_TAPS:
-            for tap in range(1, tap_M):
-                try:
-                    td_dict.pop(v_id + "_tap_%d" % tap)
-                except:
-                    pass
-            td_dict[v_id + "_tap_0"] = td_dict["whole"]
-            td_dict.pop("whole")
+        jobs.append((v_id, False, [engine.submit(netlist) for netlist in build_measurement_netlists(G, v_id)]))
+    lut_access_netlists = build_measurement_netlists(G, "H1", meas_lut_access = True)
+    jobs.append(("H1", True, [engine.submit(netlist) for netlist in lut_access_netlists]))
+
+    engine.run()
+
+    for wire, meas_lut_access, keys in jobs:
+        if meas_lut_access:
+            td_dict.update(collect_measurements(engine, keys, wire, meas_lut_access = True))
+        elif wire[0] == 'H':
+            td_dict.update({wire : collect_measurements(engine, keys, wire)})
+        else:
+            td_dict.update(collect_measurements(engine, keys, wire))
+            if not SEPARATE_TAPS:
+                for tap in range(1, tap_M):
+                    try:
+                        td_dict.pop(wire + "_tap_%d" % tap)
+                    except:
+                        pass
+                td_dict[wire + "_tap_0"] = td_dict["whole"]
+                td_dict.pop("whole")
 
     VL = "V%d" % (max(1, K6N8_LUT4 / KN_LUT4))
 
     td_dict.update({"cb_h" : measure(G, h_id, get_cb_delay = True)})
     td_dict.update({"cb_v" : measure(G, v_id, get_cb_delay = True)})
-    td_dict.update(measure(G, "H1", meas_lut_access = True))
 
     to_remove = []
     for f in os.listdir('.'):
@@ -4602,16 +5467,82 @@ def get_cost_changes_per_switch(G, criticalities = None):
     for u in rm_list:
         G_real.remove_node(u)
 
+    #........................................................................#
+    def add_to_mux_sizes(cb_muxes, sb_muxes, p, c):
+        """Updates the multiplexer sizes, as returned by >>export_mux_sizes<<,
+        to account for a new edge.
+
+        Parameters
+        ----------
+        cb_muxes : Dict[str, int]
+            Connection block multiplexer sizes. Updated in place.
+        sb_muxes : Dict[str, int]
+            Switch block multiplexer sizes. Updated in place.
+        p : str
+            Source of the edge.
+        c : str
+            Target of the edge.
+
+        Returns
+        -------
+        Dict[str, int]
+            The updated size dictionary, or None if the target is not a multiplexer.
+        int
+            Previous size of the target, or None if it had no entry.
+        """
+
+        if not c.startswith("ble_%d_" % NEUTRAL_BLE) or "_o_" in c:
+            return None, None
+        if "cb_out" in c:
+            sizes = cb_muxes
+        elif not "_tap" in c or "_tap_0" in c:
+            sizes = sb_muxes
+        else:
+            return None, None
+        prev = sizes.get(c, None)
+        inc = 0 if "io" in p or "potential_edge" in p else 1
+        sizes.update({c : (0 if prev is None else prev) + inc})
+
+        return sizes, prev
+    #........................................................................#
+
     print len(potential_switches)
     max_td = 1e-12
     max_wl = 1e-12
     changes = {}
     cur_td, cur_wl = evaluate_pattern_layout_cost(G, criticalities) 
+
+    #A switch changes only the fanout of its driver and the size of its target. The load of
+    #every other multiplexer depends on the graph only through the layout, so as long as
+    #the new size does not move any pins, only the driver's multiplexer must be evaluated again.
+    #Likewise, the sizes are computed once and only the target's is changed for each switch.
+    cb_muxes, sb_muxes = export_mux_sizes(G_real)
+    base_layout = get_mux_layout(G_real)
+    base_terms = get_mux_cost_terms(G_real, sb_muxes, criticalities, layout = base_layout)
+    layouts = {}
+    #Indexed by the target and its new size, as these determine the layout.
+    reevaluated = 0
     for switch in sorted(potential_switches):
         p = list(G.pred[switch])[0]
         c = list(G[switch])[0]
         G_real.add_edge(p, c, tap = -1)
-        new_td, new_wl = evaluate_pattern_layout_cost(G_real, criticalities)
+        updated, prev = add_to_mux_sizes(cb_muxes, sb_muxes, p, c)
+        layout_key = (c, sb_muxes.get(c, cb_muxes.get(c, None)))
+        try:
+            layout = layouts[layout_key]
+        except:
+            layout = get_mux_layout(G_real)
+            layouts.update({layout_key : layout})
+        if layout[0] == base_layout[0]:
+            driver = p.split("_tap")[0]
+            terms = {m : base_terms[m] for m in sb_muxes if m in base_terms and m.split("_tap")[0] != driver}
+            stale = [m for m in sb_muxes if not m in terms]
+        else:
+            terms = {}
+            stale = list(sb_muxes)
+        reevaluated += len(stale)
+        terms.update(get_mux_cost_terms(G_real, stale, criticalities, layout = layout))
+        new_td, new_wl = sum_mux_cost_terms(sb_muxes, terms)
         delta_td = max(0.0, (new_td - cur_td) / float(cur_td))
         max_td = max(max_td, delta_td)
         delta_wl = max(0.0, (new_wl - cur_wl) / float(cur_wl))
@@ -4619,6 +5550,13 @@ def get_cost_changes_per_switch(G, criticalities = None):
         #Also store the intrinsic switch delay. Could be useful to avoid further tuning parameters.
         changes.update({lut_canonical_potential_edge(switch) : (delta_td, delta_wl, max(0.0, new_td - cur_td))})
         G_real.remove_edge(p, c)
+        if updated is not None:
+            if prev is None:
+                del updated[c]
+            else:
+                updated[c] = prev
+
+    print "Reevaluated %d multiplexer loads." % reevaluated
 
     #Now normalize the costs.
     for e in changes:
@@ -4690,8 +5628,7 @@ def export_base_costs(G, filename, criticalities = None):
 
     potential_edges = sorted([u for u in G if u.startswith("potential_edge")])
     if not potential_edges:
-        with open(filename, "w") as outf:
-            outf.write("0 0 0 0 0 0\n1 %f\n0 -%d" % (splitter_target_crit_cost, scaling_factor))
+        base_costs.BaseCosts(["0 0 0 0 0 0", "1 %f" % splitter_target_crit_cost, "0 -%d" % scaling_factor]).store(filename)
         return
 
     pins, all_sizes = stack_muxes(G, get_pins = True)
@@ -4736,15 +5673,15 @@ def export_base_costs(G, filename, criticalities = None):
         avalanche_p = avalanche_h = avalanche_d = reset_cost = 0.0
         avalanche_iter = 1
  
-    txt = "%f %f %f %d %f %f\n" % (avalanche_p, avalanche_h, avalanche_d, avalanche_iter, reset_cost, wire_lookahead_weight)
+    header = ["%f %f %f %d %f %f" % (avalanche_p, avalanche_h, avalanche_d, avalanche_iter, reset_cost, wire_lookahead_weight)]
     #Avalanche cost update: proportional, historical, and differential terms.
     #All quantities are scaled by 10^(-scaling_factor).
     #NOTE: If costs are -1, they will be dynamically determined on the VPR side.
 
-    txt += "%f %f\n" % (splitter_crit_exponent, splitter_target_crit_cost)
+    header.append("%f %f" % (splitter_crit_exponent, splitter_target_crit_cost))
     #Exponent to scale net criticality when multiplying the edge-splitter cost, target cost visible to a net at criticality of 0.99.
 
-    txt += "%d -%d\n" % (len(costs), scaling_factor)
+    header.append("%d -%d" % (len(costs), scaling_factor))
     #Number of potential .edges and the scaling factor.
 
     CHANX_START_INDEX = 4
@@ -4760,16 +5697,18 @@ def export_base_costs(G, filename, criticalities = None):
     #NOTE: VPR assumes that both the vertical and the horizontal channel contain all segments and duplicates the datastructure.
     #This is a waste of space, but likely has no real consequences.
     index_log = ""
+    indices = []
+    edge_costs = []
     for e in sorted(costs, key = lambda k : seg_ids[k]):
         ecnt += 1
         cost = costs[e] if e in predetermined_costs\
                else base_cost + (costs[e] * variable_cost) 
         cost *= cost_scaling_info.get(e, 1.0)
-        txt += "%d %f\n" % (CHANX_START_INDEX + ecnt, cost if not GREEDY_SWITCH_SEARCH else 0.0)
+        indices.append(CHANX_START_INDEX + ecnt)
+        edge_costs.append(cost if not GREEDY_SWITCH_SEARCH else 0.0)
         index_log += "%s %d\n" % (e, CHANX_START_INDEX + ecnt)
 
-    with open(filename, "w") as outf:
-        outf.write(txt[:-1])
+    base_costs.BaseCosts(header, indices, edge_costs).store(filename)
     with open("index.log", "w") as outf:
         outf.write(index_log[:-1])
 
@@ -4995,6 +5934,10 @@ if not ONLY_PAD:
     G, grid = generate_rr_graph(make_sb_clique = MAKE_SB_CLIQUE)
     criticalities = None
     potential_edge_delays = None
+    if RECALIBRATE_LOAD_MODEL:
+        create_load_model(recalibrate = True)
+        print "Load model recalibrated."
+        exit(0)
     if args.change_grid_dimensions is None:
         if args.load_mux_stack_order is not None:
             with open(args.load_mux_stack_order, "r") as inf:
@@ -0,0 +1,245 @@
+"""Content-addressed store of architecture-generation artifacts, shared
+between exploration runs and bounded in size by least-recently-used eviction.
+"""
+
+import os
+import shutil
+import hashlib
+import tempfile
+
+##########################################################################
+def fingerprint(*parts):
+    """Combines the given parts into a single key.
+
+    Parameters
+    ----------
+    *parts : str
+        Textual representations of the inputs.
+
+    Returns
+    -------
+    str
+        Hexadecimal SHA-256 digest.
+    """
+
+    h = hashlib.sha256()
+    for part in parts:
+        part = str(part)
+        h.update("%d:" % len(part))
+        h.update(part)
+
+    return h.hexdigest()
+##########################################################################
+
+##########################################################################
+def fingerprint_file(filename):
+    """Returns the key of a file's contents. Missing files have a fixed key.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the file.
+
+    Returns
+    -------
+    str
+        Hexadecimal SHA-256 digest.
+    """
+
+    h = hashlib.sha256()
+    try:
+        with open(filename, "rb") as inf:
+            for chunk in iter(lambda : inf.read(1 << 20), b''):
+                h.update(chunk)
+    except IOError:
+        return "missing"
+
+    return h.hexdigest()
+##########################################################################
+
+##########################################################################
+class ArtifactStore(object):
+    """Stores groups of files under a key computed from their inputs.
+
+    Parameters
+    ----------
+    root : str
+        Root directory of the store. If None, the store is disabled:
+        nothing is ever found and nothing is stored.
+    max_size : Optional[int], default = 0
+        Maximum total size of the store in bytes. Nonpositive values disable eviction.
+
+    Notes
+    -----
+    Each entry lives in <root>/<group>/<key>/ and holds the files under their basenames.
+    Entries are first assembled in a temporary directory and then renamed into place,
+    so concurrent runs sharing the same store never observe partial entries.
+    The modification time of the entry directory records its last use.
+    """
+
+    #------------------------------------------------------------------------#
+    def __init__(self, root, max_size = 0):
+        """Constructor of the ArtifactStore class.
+        """
+
+        self.root = os.path.abspath(root) if root is not None else None
+        self.max_size = max_size
+        if self.root is not None and not os.path.isdir(self.root):
+            try:
+                os.makedirs(self.root)
+            except OSError:
+                #Another run may have just created it.
+                pass
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def entry_dir(self, group, key):
+        """Returns the directory of an entry.
+
+        Parameters
+        ----------
+        group : str
+            Artifact group.
+        key : str
+            Input fingerprint.
+
+        Returns
+        -------
+        str
+            Entry directory.
+        """
+
+        return os.path.join(self.root, group, key)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def fetch(self, group, key, filenames):
+        """Copies the stored artifacts to the given locations.
+
+        Parameters
+        ----------
+        group : str
+            Artifact group.
+        key : str
+            Input fingerprint.
+        filenames : List[str]
+            Destinations of the artifacts. The basenames must match the stored ones.
+
+        Returns
+        -------
+        bool
+            True if all artifacts were found and copied, else False.
+        """
+
+        if self.root is None:
+            return False
+
+        entry = self.entry_dir(group, key)
+        try:
+            for filename in filenames:
+                shutil.copyfile(os.path.join(entry, os.path.basename(filename)), filename)
+            os.utime(entry, None)
+        except (IOError, OSError):
+            return False
+
+        print "Reusing stored %s artifacts (%s)." % (group, key[:12])
+
+        return True
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def store(self, group, key, filenames):
+        """Stores the given artifacts and evicts the least-recently used entries
+        if the store grows beyond its size limit.
+
+        Parameters
+        ----------
+        group : str
+            Artifact group.
+        key : str
+            Input fingerprint.
+        filenames : List[str]
+            Artifacts to be stored.
+
+        Returns
+        -------
+        None
+        """
+
+        if self.root is None:
+            return
+
+        entry = self.entry_dir(group, key)
+        if os.path.isdir(entry):
+            os.utime(entry, None)
+            return
+
+        group_dir = os.path.join(self.root, group)
+        if not os.path.isdir(group_dir):
+            try:
+                os.makedirs(group_dir)
+            except OSError:
+                pass
+
+        tmp_dir = tempfile.mkdtemp(prefix = ".tmp_%s_" % key[:12], dir = group_dir)
+        try:
+            for filename in filenames:
+                shutil.copyfile(filename, os.path.join(tmp_dir, os.path.basename(filename)))
+            os.rename(tmp_dir, entry)
+        except (IOError, OSError):
+            #Either an artifact is missing or another run stored the same entry first.
+            shutil.rmtree(tmp_dir, ignore_errors = True)
+            return
+
+        self.evict()
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def evict(self):
+        """Removes the least-recently used entries until the store fits its size limit.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        int
+            Number of removed entries.
+        """
+
+        if self.root is None or self.max_size <= 0:
+            return 0
+
+        entries = []
+        total_size = 0
+        for group in os.listdir(self.root):
+            group_dir = os.path.join(self.root, group)
+            if not os.path.isdir(group_dir):
+                continue
+            for key in os.listdir(group_dir):
+                if key.startswith(".tmp_"):
+                    continue
+                entry = os.path.join(group_dir, key)
+                try:
+                    size = sum([os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry)])
+                    last_used = os.path.getmtime(entry)
+                except OSError:
+                    continue
+                entries.append((last_used, size, entry))
+                total_size += size
+
+        removed = 0
+        for last_used, size, entry in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors = True)
+            total_size -= size
+            removed += 1
+
+        if removed:
+            print "Evicted %d stored artifact groups." % removed
+
+        return removed
+    #------------------------------------------------------------------------#
+##########################################################################
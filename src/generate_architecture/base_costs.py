@@ -0,0 +1,211 @@
+"""Avalanche base costs of the potential edges, as exchanged with VPR through >>base_costs.dump<<.
+
+The file starts with three header lines:
+    avalanche_p avalanche_h avalanche_d avalanche_iter reset_cost wire_lookahead_weight
+    splitter_crit_exponent splitter_target_crit_cost
+    potential_edge_count -scaling_factor
+followed by one >>segment_index cost<< line per potential edge, without a trailing newline.
+"""
+
+import os
+import numpy as np
+
+FILENAME = "base_costs.dump"
+
+##########################################################################
+class BaseCosts(object):
+    """Contents of a base-cost file, with the per-edge data held in arrays.
+
+    Parameters
+    ----------
+    header : List[str]
+        The three header lines, without newlines.
+    indices : Optional[np.ndarray], default = None
+        Segment indices of the potential edges.
+    costs : Optional[np.ndarray], default = None
+        Base costs of the potential edges.
+    """
+
+    #------------------------------------------------------------------------#
+    def __init__(self, header, indices = None, costs = None):
+        """Constructor of the BaseCosts class.
+        """
+
+        self.header = list(header)
+        self.indices = np.zeros(0, dtype = np.int64) if indices is None else np.asarray(indices, dtype = np.int64)
+        self.costs = np.zeros(0) if costs is None else np.asarray(costs, dtype = np.float64)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def scale(self, fac):
+        """Multiplies all costs by a constant factor.
+
+        Parameters
+        ----------
+        fac : float
+            Multiplication factor.
+
+        Returns
+        -------
+        None
+        """
+
+        self.costs *= fac
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def drop(self, selected, fac):
+        """Multiplies the costs of the selected edges by a constant factor.
+
+        Parameters
+        ----------
+        selected : Set[int]
+            Segment indices of the selected edges.
+        fac : float
+            Multiplication factor.
+
+        Returns
+        -------
+        None
+        """
+
+        mask = np.in1d(self.indices, np.array(sorted(selected), dtype = np.int64))
+        self.costs[mask] *= fac
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def reset(self, cost = 0.0):
+        """Sets all costs to the same value.
+
+        Parameters
+        ----------
+        cost : Optional[float], default = 0.0
+            The new cost.
+
+        Returns
+        -------
+        None
+        """
+
+        self.costs.fill(cost)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def scale_avalanche(self, fac):
+        """Multiplies the proportional, historical, and differential avalanche terms by a constant factor.
+
+        Parameters
+        ----------
+        fac : float
+            Multiplication factor.
+
+        Returns
+        -------
+        None
+        """
+
+        words = self.header[0].split()
+        for i in range(0, 3):
+            words[i] = "%f" % (float(words[i]) * fac)
+        self.header[0] = ' '.join(words)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def store(self, filename = FILENAME):
+        """Writes the costs to a file.
+
+        Parameters
+        ----------
+        filename : Optional[str], default = FILENAME
+            Name of the file.
+
+        Returns
+        -------
+        None
+
+        Notes
+        -----
+        The file is written under a temporary name and then renamed, so that readers
+        (including VPR sandboxes holding hardlinks to it) never see a partial file.
+        """
+
+        words = self.header[2].split()
+        words[0] = "%d" % self.indices.size
+        self.header[2] = ' '.join(words)
+
+        lines = self.header + ["%d %f" % (i, c) for i, c in zip(self.indices.tolist(), self.costs.tolist())]
+
+        tmp_filename = "%s.tmp%d" % (filename, os.getpid())
+        with open(tmp_filename, "w") as outf:
+            outf.write('\n'.join(lines))
+        os.rename(tmp_filename, filename)
+    #------------------------------------------------------------------------#
+##########################################################################
+
+##########################################################################
+def load(filename = FILENAME):
+    """Reads a base-cost file.
+
+    Parameters
+    ----------
+    filename : Optional[str], default = FILENAME
+        Name of the file.
+
+    Returns
+    -------
+    BaseCosts
+        The costs.
+    """
+
+    with open(filename, "r") as inf:
+        header = [inf.readline().rstrip('\n') for i in range(0, 3)]
+        data = np.array(inf.read().split(), dtype = np.float64).reshape(-1, 2)
+
+    return BaseCosts(header, data[:, 0].astype(np.int64), data[:, 1])
+##########################################################################
+
+##########################################################################
+def get_edge_count(filename = FILENAME):
+    """Reads the number of potential edges from the header of a base-cost file.
+
+    Parameters
+    ----------
+    filename : Optional[str], default = FILENAME
+        Name of the file.
+
+    Returns
+    -------
+    int
+        Number of potential edges.
+    """
+
+    with open(filename, "r") as inf:
+        header = [inf.readline() for i in range(0, 3)]
+
+    return int(header[2].split()[0])
+##########################################################################
+
+##########################################################################
+def read_index_log(filename = "index.log"):
+    """Reads the segment indices assigned to the potential edges.
+
+    Parameters
+    ----------
+    filename : Optional[str], default = "index.log"
+        Name of the index log, written alongside the base costs.
+
+    Returns
+    -------
+    Dict[str, int]
+        Segment index of each potential edge.
+    """
+
+    index_dict = {}
+    with open(filename, "r") as inf:
+        for line in inf:
+            words = line.split()
+            if len(words) == 2:
+                index_dict.update({words[0] : int(words[1])})
+
+    return index_dict
+##########################################################################
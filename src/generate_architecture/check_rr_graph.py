@@ -1,6 +1,11 @@
 import argparse
 import networkx as nx
+import numpy as np
 from collections import namedtuple
+import sys
+sys.path.insert(0,'..')
+
+import rr_binary
 
 get_attr = lambda attr, line : line.split("%s=\"" % attr, 1)[1].split('"', 1)[0]
 
@@ -107,6 +112,50 @@ def parse_wires(lines):
     return G
 ##########################################################################
 
+##########################################################################
+def parse_wires_binary(rr):
+    """Parses wire nodes from the binary sidecar of an rr-graph.
+
+    Parameters
+    ----------
+    rr : rr_binary.RRBinary
+        The memory-mapped sidecar.
+
+    Returns
+    -------
+    nx.DiGraph
+        A graph with wires instantiated as nodes.
+    """
+
+    global max_x
+    global max_y
+    global min_x
+    global min_y
+
+    nodes = rr.nodes
+    chan_types = [rr_binary.NODE_TYPES.index("CHANX"), rr_binary.NODE_TYPES.index("CHANY")]
+    chans = np.flatnonzero(np.in1d(nodes["type"], chan_types))
+    ids, xlows, ylows, xhighs, yhighs, dirs, segs\
+    = [nodes[col][chans].tolist() for col in ("id", "xlow", "ylow", "xhigh", "yhigh", "direction", "segment_id")]
+    inc_dir = rr_binary.DIRECTIONS.index("INC_DIR")
+
+    G = nx.DiGraph()
+    for i, node in enumerate(ids):
+        low = Coord(xlows[i], ylows[i])
+        high = Coord(xhighs[i], yhighs[i])
+        if dirs[i] == inc_dir:
+            wire = Wire(segs[i], low, high)
+        else:
+            wire = Wire(segs[i], high, low)
+        G.add_node(node, wire = wire)
+        max_x = max(max_x, high.x)
+        max_y = max(max_y, high.y)
+        min_x = min(min_x, low.x)
+        min_y = min(min_y, low.y)
+
+    return G
+##########################################################################
+
 ##########################################################################
 def parse_edges(lines, G):
     """Parses wire nodes from an rr-graph. 
@@ -135,6 +184,30 @@ def parse_edges(lines, G):
             G.add_edge(u, v, switch = sw_id, persistance = "real")
 ##########################################################################
 
+##########################################################################
+def parse_edges_binary(rr, G):
+    """Parses the edges between wire nodes from the binary sidecar of an rr-graph.
+
+    Parameters
+    ----------
+    rr : rr_binary.RRBinary
+        The memory-mapped sidecar.
+    G : nx.DiGraph
+        A graph with wires instantiated as nodes.
+
+    Returns
+    -------
+    None
+    """
+
+    is_wire = np.zeros(rr.edge_row_ptr.size - 1, dtype = bool)
+    is_wire[list(G)] = True
+    src = rr.edge_src()
+    kept = np.flatnonzero(is_wire[src] & is_wire[rr.edge_sink])
+    for u, v, sw_id in zip(src[kept].tolist(), rr.edge_sink[kept].tolist(), rr.edge_switch[kept].tolist()):
+        G.add_edge(u, v, switch = sw_id, persistance = "real")
+##########################################################################
+
 ##########################################################################
 def get_all_wires_ending_at_coord(G, inv_seg_dict, x, y):
     """Returns all wires that are ending at the particular coordinate.
@@ -556,18 +629,26 @@ def check_rr_all(rr_graph_file, store_file):
     MAX_BLE_SPAN = 3
     channel_composition = {"H1" : 2, "H2" : 1, "H4" : 1, "H6" : 1, "V1" : 2, "V4" : 1}
 
-    with open(rr_graph_file, "r") as inf:
-        lines = inf.readlines()
     #TODO: Read this in from the other files.
     #########################################
 
-    switch_dict = parse_switches(lines)
-    inv_switch_dict = {i : s for s, i in switch_dict.items()}
-    seg_dict = parse_segments(lines)
-    inv_seg_dict = {i : s for s, i in seg_dict.items()}
+    rr = rr_binary.load_rr_binary(rr_graph_file)
+    if rr is not None:
+        inv_switch_dict = {i : s[0] for i, s in rr.switches.items()}
+        inv_seg_dict = dict(rr.segments)
+        G = parse_wires_binary(rr)
+        parse_edges_binary(rr, G)
+    else:
+        with open(rr_graph_file, "r") as inf:
+            lines = inf.readlines()
+
+        switch_dict = parse_switches(lines)
+        inv_switch_dict = {i : s for s, i in switch_dict.items()}
+        seg_dict = parse_segments(lines)
+        inv_seg_dict = {i : s for s, i in seg_dict.items()}
     
-    G = parse_wires(lines)
-    parse_edges(lines, G)
+        G = parse_wires(lines)
+        parse_edges(lines, G)
 
     total_graph_size = G.number_of_nodes()    
     boundary_affected = flatten_potential(G, inv_seg_dict, inv_switch_dict)
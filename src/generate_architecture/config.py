@@ -1,6 +1,7 @@
 import math
 
 cplex_path = "/home/snikolic/CPLEX_Studio1210/cplex/bin/x86-64_linux/cplex"
+cbc_lib = None #Path to the CBC C library (e.g., libCbcSolver.so). None searches the system library path.
 
 #Physical settings:
 ##########################################################################
@@ -110,6 +111,11 @@ USAGE_SEED     = 19225      #Seed for approximating usage at the desired distanc
 ##########################################################################
 
 SRV       = True      #Specifies that the script is being run on the server (changes CPLEX path).
+
+MILP_SOLVER     = "cplex"   #MILP backend: "cplex" (calls the CPLEX binary) or "cbc" (runs the open-source CBC in-process).
+MILP_THREADS    = 0         #Number of solver threads. Zero leaves the choice to the solver.
+MILP_TIME_LIMIT = 3600      #Solver time limit in seconds.
+
 verbose   = False     #Specifies that comments in the ILP should be preserved.
 
 LP_RELAX  = False     #Converts binary variables to 0-1 bounded continuous.
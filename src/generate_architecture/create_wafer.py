@@ -42,7 +42,16 @@ import time
 import os
 import argparse
 import hashlib
+import subprocess
 from ast import literal_eval
+from multiprocessing.pool import ThreadPool
+import sys
+sys.path.insert(0,'..')
+
+import rr_binary
+import vpr_sandbox
+import rr_artifacts
+import base_costs
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--arc")
@@ -158,7 +167,7 @@ def resize_fpgas():
                        ]
         arc_gen_call = ' '.join(["python -u arc_gen.py"] + arc_gen_switches + arc_gen_args)
         os.system(arc_gen_call)
-        os.system("lz4 -d %s.lz4" % (rr_template % (size, size)))
+        rr_artifacts.decompress(rr_template % (size, size) + ".lz4", rr_template % (size, size))
 ##########################################################################
 
 ##########################################################################
@@ -265,27 +274,31 @@ def merge_arcs(filename, out_filename):
 ##########################################################################
 
 ##########################################################################
-def translate_rr_graph(filename, x_offset, y_offset, init_node):
-    """Translates the RR-graph of a single FPGA to be put on the wafer.
+def translate_prologue(lines, x_offset, y_offset, pad = None):
+    """Translates the channels and the grid of the RR-graph of a single FPGA.
 
     Parameters
     ----------
-    filename : str
-        Name of the file containing the RR-graph.
+    lines : List[str]
+        Lines read from the RR-graph file.
     x_offset : int
         Horizontal shift of the RR-graph in the number of tiles.
     y_offset : int
         Vertical shift of the RR-graph in the number of tiles.
-    init_node : int
-        New first node count, to appear in the merged graph.
+    pad : Optional[Tuple[int]], default = None
+        Width and height of the grid of this FPGA and the height of the wafer,
+        if the grid is to be padded with empty tiles up to it.
 
     Returns
     -------
-    List[str]
-        A list of all coordinate-dependant tags
-        (channels, grid, rr_nodes, rr_edges).
+    str
+        Text of the translated x-channels.
+    str
+        Text of the translated y-channels.
+    str
+        Text of the translated grid.
     int
-        Largest node id.
+        Number of the first line right after the grid.
     """
 
     #------------------------------------------------------------------------#
@@ -376,12 +389,8 @@ def translate_rr_graph(filename, x_offset, y_offset, init_node):
             if empty_line is None:
                 empty_line = line
 
-        if FPGA_SIZES is not None:
-            dimensions = [tuple(get_fpga_dimensions("%s_W%d_H%d.xml" % (args.arc.rsplit(".xml", 1)[0], s, s)))
-                          for s in FPGA_SIZES]
-            total_w = sum([s[0] for s in dimensions])
-            total_h = max([s[1] for s in dimensions])
-            grid_w, grid_h = dimensions[FPGA_SIZES.index(int(filename.split("_H")[1].split("_rr.xml")[0]))]
+        if pad is not None:
+            grid_w, grid_h, total_h = pad
             for y in range(grid_h, total_h):
                 for x in range(0, grid_w):
                     line = empty_line.replace(empty_line.split()[1], "x=\"%d\""\
@@ -392,159 +401,10 @@ def translate_rr_graph(filename, x_offset, y_offset, init_node):
         return txt, lcnt + l + 1
     #------------------------------------------------------------------------#
 
-    #------------------------------------------------------------------------#
-    def translate_node(lines, lcnt):
-        """Parses and translates a single node.
-
-        Parameters
-        ----------
-        lines : List[str]
-            Lines read from the RR-graph file.
-        lcnt : int
-            Number of the start line of the node to be parsed.
-
-        Returns
-        -------
-        str
-            Text of the translated node.
-        int
-            Number of the first line right after the node.
-        int
-            New ID of the parsed node.
-        """
-
-        get_attr_word = lambda line, attr : [w for w in line.split() if "%s=\"" % attr in w][0]\
-                                            if "%s=\"" % attr in line else None
-
-        #........................................................................#
-        def advance(line, attrs, inc):
-            """Advances line updating by one line.
-
-            Parameters
-            ----------
-            line : str
-                Line to be modified.
-            attr : List[str]
-                Attributes to be changed.
-            inc : List[int]
-                Values by which to increase the attributes.
-
-            Returns
-            -------
-            str
-                The updated line.
-            """
-      
-            if attrs is None:
-                return line
-
-            for i, attr in enumerate(attrs):
-                attr_word = get_attr_word(line, attr)
-                line = line.replace(attr_word, "%s=\"%d\"" % (attr, int(attr_word.split('"')[1]) + inc[i]))
-            
-            return line
-        #........................................................................#
-
-        attrs = [["id"], ["xlow", "ylow", "xhigh", "yhigh"], None, None]\
-              + ([None] if "CHAN" in lines[lcnt] else [])
-        inc = [[init_node], [x_offset, y_offset, x_offset, y_offset], 0, 0]\
-            + ([0] if "CHAN" in lines[lcnt] else [])
-    
-        endlcnt = lcnt + len(attrs)
-        node_lines = [advance(line, attrs[l], inc[l]) for l, line in enumerate(lines[lcnt : endlcnt])] 
-        node_cnt = int(get_attr(node_lines[0], "id"))
-
-        return ''.join(node_lines), endlcnt, node_cnt
-    #------------------------------------------------------------------------#
-
-    #------------------------------------------------------------------------#
-    def translate_nodes(lines, lcnt):
-        """Parses and translates all nodes.
-
-        Parameters
-        ----------
-        lines : List[str]
-            Lines read from the RR-graph file.
-        lcnt : int
-            Number of the line from which to start searching for nodes.
-
-        Returns
-        -------
-        str
-            Text of the translated nodes.
-        int
-            Number of the first line right after the nodes.
-        int
-            Largest node ID.
-        """
-
-        while True:
-            if not "<rr_nodes>" in lines[lcnt]:
-                lcnt += 1
-                continue
-            lcnt += 1
-            break
-
-        max_node_cnt = -1
-        txt = ""
-        while True:
-            if "</rr_nodes>" in lines[lcnt]:
-                break
-            node, lcnt, node_cnt = translate_node(lines, lcnt)
-            txt += node
-            max_node_cnt = max(max_node_cnt, node_cnt)
-
-        return txt, lcnt, max_node_cnt
-    #------------------------------------------------------------------------#
-
-    #------------------------------------------------------------------------#
-    def translate_edges(lines, lcnt):
-        """Parses and translates all edges.
-
-        Parameters
-        ----------
-        lines : List[str]
-            Lines read from the RR-graph file.
-        lcnt : int
-            Number of the line from which to start searching for edges.
-
-        Returns
-        -------
-        str
-            Text of the translated edges.
-        int
-            Number of the first line right after the edges.
-        """
-
-        while True:
-            if not "<rr_edges>" in lines[lcnt]:
-                lcnt += 1
-                continue
-            lcnt += 1
-            break
-
-        txt = ""
-        for l, line in enumerate(lines[lcnt:]):
-            if "</rr_edges>" in line:
-                break
-            line = line.replace(line.split()[1], "src_node=\"%d\""\
-                 % (int(line.split()[1].split('"')[1]) + init_node))
-            line = line.replace(line.split()[2], "sink_node=\"%d\""\
-                 % (int(line.split()[2].split('"')[1]) + init_node))
-            txt += line
-            
-        return txt, lcnt + l + 1
-    #------------------------------------------------------------------------#
-
-    with open(filename, "r") as inf:
-        lines = inf.readlines()
-
     x_chans, y_chans, lcnt = translate_channels(lines, 0)
     grid, lcnt = translate_grid(lines, lcnt)
-    nodes, lcnt, max_node_cnt = translate_nodes(lines, lcnt)
-    edges, lcnt = translate_edges(lines, lcnt)
 
-    return x_chans, y_chans, grid, nodes, edges, max_node_cnt
+    return x_chans, y_chans, grid, lcnt
 ##########################################################################
 
 ##########################################################################
@@ -561,11 +421,46 @@ def merge_rr_graphs(filename, out_filename):
     Returns
     -------
     None
+
+    Notes
+    -----
+    Each distinct RR-graph is parsed only once, into an offsettable template
+    (memory-mapped from the binary sidecar, if there is one). The copies placed
+    on the wafer are then produced from the template by adding the node-id and
+    coordinate offsets to its arrays, and streamed to the output one by one.
     """
 
-    with open(filename, "r") as inf:
-        lines = inf.readlines()
+    templates = {}
+
+    #------------------------------------------------------------------------#
+    def get_template(rr_filename):
+        """Returns the template of an RR-graph, parsing it on first use.
+
+        Parameters
+        ----------
+        rr_filename : str
+            Name of the RR-graph file.
+
+        Returns
+        -------
+        rr_binary.RRBinary
+            The template.
+        """
+
+        try:
+            return templates[rr_filename]
+        except:
+            pass
 
+        rr = rr_binary.load_rr_binary(rr_filename)
+        if rr is None:
+            rr = rr_binary.parse_rr_xml(rr_filename)
+        templates.update({rr_filename : rr})
+
+        return rr
+    #------------------------------------------------------------------------#
+
+    lines = get_template(filename).prologue.splitlines(True)
     header = ''.join(lines[:3])
     invariant = "" 
     rd = False
@@ -577,23 +472,13 @@ def merge_rr_graphs(filename, out_filename):
         if "</block_types>" in line:
             break
 
-    all_chans = []
-    all_grids = []
-    all_nodes = []
-    all_edges = []
-    init_node = 0
-   
+    tiles = []
+    pads = []
     if FPGA_SIZES is None: 
         for x in range(0, wafer_w):
             for y in range(0, wafer_h):
-                x_chans, y_chans, grid, nodes, edges, last_used_node\
-                = translate_rr_graph(filename, x * grid_w, y * grid_h, init_node)
-                init_node = last_used_node + 1
-                all_chans.append(x_chans)
-                all_chans.append(y_chans)
-                all_grids.append(grid)
-                all_nodes.append(nodes)
-                all_edges.append(edges)
+                tiles.append((filename, x * grid_w, y * grid_h))
+                pads.append(None)
     else:
         dimensions = [tuple(get_fpga_dimensions("%s_W%d_H%d.xml" % (args.arc.rsplit(".xml", 1)[0], s, s)))
                       for s in FPGA_SIZES]
@@ -602,36 +487,45 @@ def merge_rr_graphs(filename, out_filename):
             print x, y
             w, h = dim
             local_filename = "%s_W%d_H%d_rr.xml" % (filename.rsplit("_rr.xml", 1)[0], FPGA_SIZES[i], FPGA_SIZES[i])
-            x_chans, y_chans, grid, nodes, edges, last_used_node\
-            = translate_rr_graph(local_filename, x, y, init_node)
-            init_node = last_used_node + 1
-            all_chans.append(x_chans)
-            all_chans.append(y_chans)
-            all_grids.append(grid)
-            all_nodes.append(nodes)
-            all_edges.append(edges)
+            tiles.append((local_filename, x, y))
+            pads.append((w, h, max([d[1] for d in dimensions])))
             x += w
 
+    all_chans = []
+    all_grids = []
+    init_nodes = []
+    init_node = 0
+    for (rr_filename, x_offset, y_offset), pad in zip(tiles, pads):
+        rr = get_template(rr_filename)
+        x_chans, y_chans, grid, lcnt = translate_prologue(rr.prologue.splitlines(True), x_offset, y_offset, pad)
+        all_chans.append(x_chans)
+        all_chans.append(y_chans)
+        all_grids.append(grid)
+        init_nodes.append(init_node)
+        last_used_node = int(rr.nodes["id"].max()) + init_node if rr.nodes["id"].size else -1
+        init_node = last_used_node + 1
+
     all_chans = sorted(list(set(all_chans)), key = lambda c : (int(get_attr(c.splitlines()[0], "index")), c))
 
     indent = "    "
-    txt = header
-    txt += ''.join(all_chans)
-    txt += indent + "</channels>\n"
-    txt += invariant
-    txt += indent + "<grid>\n"
-    txt += ''.join(all_grids)
-    txt += indent + "</grid>\n" 
-    txt += indent + "<rr_nodes>\n"
-    txt += ''.join(all_nodes)
-    txt += indent + "</rr_nodes>\n"
-    txt += indent + "<rr_edges>\n"
-    txt += ''.join(all_edges)
-    txt += indent + "</rr_edges>\n"
-    txt += "</rr_graph>\n"
-
     with open(out_filename, "w") as outf:
-        outf.write(txt)
+        outf.write(header)
+        outf.write(''.join(all_chans))
+        outf.write(indent + "</channels>\n")
+        outf.write(invariant)
+        outf.write(indent + "<grid>\n")
+        outf.write(''.join(all_grids))
+        outf.write(indent + "</grid>\n")
+        outf.write(indent + "<rr_nodes>\n")
+        for tile, init_node in zip(tiles, init_nodes):
+            rr_filename, x_offset, y_offset = tile
+            outf.write(get_template(rr_filename).node_text(init_node, x_offset, y_offset))
+        outf.write(indent + "</rr_nodes>\n")
+        outf.write(indent + "<rr_edges>\n")
+        for tile, init_node in zip(tiles, init_nodes):
+            outf.write(get_template(tile[0]).edge_text(init_node))
+        outf.write(indent + "</rr_edges>\n")
+        outf.write("</rr_graph>\n")
 ##########################################################################
 
 ##########################################################################
@@ -654,6 +548,12 @@ def merge_circuits(circs, arc_filename, rr_filename, arc_hash):
     Returns
     -------
     None
+
+    Notes
+    -----
+    Each circuit is packed and placed in its own directory and VPR sandbox,
+    so the VPR runs are dispatched concurrently, on at most VPR_CPU workers.
+    Merging starts only once all of them have succeeded.
     """
 
     #------------------------------------------------------------------------#
@@ -664,7 +564,8 @@ def merge_circuits(circs, arc_filename, rr_filename, arc_hash):
         Parameters
         ----------
         circ : str
-            Name of the .blif file.
+            Name of the .blif file. The prefixed copy is written to the directory
+            named after the prefix.
         prefix : str
             Prefix to be prepended to the signal names.
         
@@ -719,10 +620,34 @@ def merge_circuits(circs, arc_filename, rr_filename, arc_hash):
                     processed_words.append("%s_%s" % (prefix, w))
             txt += ' '.join(processed_words) + "\n"
 
-        with open("%s_%s.blif" % (circ.rsplit(".blif", 1)[0], prefix), "w") as outf:
+        with open(os.path.join(prefix, "%s_%s.blif" % (circ.rsplit(".blif", 1)[0], prefix)), "w") as outf:
             outf.write(txt[:-1])
     #------------------------------------------------------------------------#
 
+    #------------------------------------------------------------------------#
+    def get_local_filenames(ind):
+        """Returns the names of the architecture and RR-graph files of a circuit's FPGA.
+
+        Parameters
+        ----------
+        ind : int
+            Index of the (circ, seed) pair.
+
+        Returns
+        -------
+        str
+            Name of the architecture file.
+        str
+            Name of the RR-graph file.
+        """
+
+        if FPGA_SIZES is None:
+            return arc_filename, rr_filename
+
+        return "%s_W%d_H%d.xml" % (arc_filename.rsplit(".xml", 1)[0], FPGA_SIZES[ind], FPGA_SIZES[ind]),\
+               "%s_W%d_H%d_rr.xml" % (rr_filename.rsplit("_rr.xml", 1)[0], FPGA_SIZES[ind], FPGA_SIZES[ind])
+    #------------------------------------------------------------------------#
+
     #------------------------------------------------------------------------#
     def produce_files(ind, x, y):
         """Calls VPR to produce the packing and placement files.
@@ -738,42 +663,36 @@ def merge_circuits(circs, arc_filename, rr_filename, arc_hash):
 
         Returns
         -------
-        None
+        str | None
+            Description of the failure, or None if the files were produced.
+
+        Notes
+        -----
+        All files are addressed relative to the working directory, without changing it,
+        so that several circuits can be processed concurrently. The shared inputs
+        are staged into the VPR sandbox directly from the working directory,
+        and only the prefixed circuit and the VPR outputs live in the circuit's own directory.
         """
 
-        local_arc_filename = arc_filename if FPGA_SIZES is None else\
-                             "%s_W%d_H%d.xml" % (arc_filename.rsplit(".xml", 1)[0],\
-                                                 FPGA_SIZES[ind], FPGA_SIZES[ind])
-        local_rr_filename = rr_filename if FPGA_SIZES is None else\
-                            "%s_W%d_H%d_rr.xml" % (rr_filename.rsplit("_rr.xml", 1)[0],\
-                                                   FPGA_SIZES[ind], FPGA_SIZES[ind])
+        local_arc_filename, local_rr_filename = get_local_filenames(ind)
 
         circ, seed = circs[ind]
         delay_matrix = local_arc_filename.replace(".xml", "_placement_delay.matrix")
         prefix = "circ_%d" % ind
-        wd = os.getcwd()
-        os.system("mkdir %s" % prefix)
+        if not os.path.isdir(prefix):
+            os.makedirs(prefix)
+
+        prefix_signals(circ, prefix)
+        circ = "%s_%s.blif" % (circ.rsplit(".blif", 1)[0], prefix)
 
         run_req_files = ["base_costs.dump",\
-                         circ,\
                          local_arc_filename,\
                          local_rr_filename,\
-                         delay_matrix\
+                         delay_matrix,\
+                         os.path.join(prefix, circ)\
                         ]
-    
-        for f in run_req_files:
-            os.system("cp %s %s/" % (f, prefix))
-        os.chdir(prefix)
-
-        prefix_signals(circ, prefix)
-        os.system("rm -f %s" % circ)
-        run_req_files.remove(circ)
-        circ = "%s_%s.blif" % (circ.rsplit(".blif", 1)[0], prefix)
-        run_req_files.append(circ)
 
-        with open(local_rr_filename, "r") as inf:
-            lines = inf.readlines()
-            chan_w = int(get_attr(lines[2], "chan_width_max"))
+        chan_w = chan_ws[local_rr_filename]
 
         vpr_arguments = [local_arc_filename,\
                          circ\
@@ -787,19 +706,23 @@ def merge_circuits(circs, arc_filename, rr_filename, arc_hash):
                         "--route_chan_width %d" % chan_w\
                        ]
 
-        sandbox = "sandbox_%s_%s" % (os.getcwd().replace('/', "__"), str(time.time()))
-        os.system("mkdir %s" % (os.environ["VPR_RUN_PATH"] % sandbox))
-
-        for f in run_req_files:
-            os.system("cp %s %s/" % (f, os.environ["VPR_RUN_PATH"] % sandbox))
+        sandbox = vpr_sandbox.Sandbox("sandbox_%s__%s_%s" % (os.getcwd().replace('/', "__"), prefix, str(time.time())),\
+                                      run_req_files)
+        sandbox.stage()
 
-        vpr_call = "time %s" % (os.environ["VPR"] % (sandbox, ' '.join(vpr_arguments + vpr_switches)))
-        os.system(vpr_call)
-    
-        for f in os.listdir(os.environ["VPR_RUN_PATH"] % sandbox):
-            os.system("cp %s/%s ./" % (os.environ["VPR_RUN_PATH"] % sandbox, f))
+        vpr_call = "time %s" % (os.environ["VPR"] % (sandbox.name, ' '.join(vpr_arguments + vpr_switches)))
+        status = subprocess.call(vpr_call, shell = True)
     
-        os.system("rm -rf %s" % (os.environ["VPR_RUN_PATH"] % sandbox))
+        sandbox.collect(prefix)
+        sandbox.remove()
+
+        placement_filename = os.path.join(prefix, circ.replace(".blif", ".place"))
+        packing_filename = os.path.join(prefix, circ.replace(".blif", ".net"))
+        if status:
+            return "VPR exited with status %d" % status
+        for filename in (packing_filename, placement_filename):
+            if not os.path.exists(filename):
+                return "%s not produced" % filename
 
         #........................................................................#
         def translate_placement():
@@ -814,7 +737,6 @@ def merge_circuits(circs, arc_filename, rr_filename, arc_hash):
             None
             """
 
-            placement_filename = circ.replace(".blif", ".place")
             with open(placement_filename, "r") as inf:
                 lines = inf.readlines()
            
@@ -834,7 +756,28 @@ def merge_circuits(circs, arc_filename, rr_filename, arc_hash):
 
         translate_placement()
 
-        os.chdir(wd)
+        return None
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def run_circuit(job):
+        """Produces the packing and placement files of one circuit, catching any errors.
+
+        Parameters
+        ----------
+        job : Tuple[int]
+            Index of the (circ, seed) pair and the start column and row of its placement.
+
+        Returns
+        -------
+        str | None
+            Description of the failure, or None if the files were produced.
+        """
+
+        try:
+            return produce_files(*job)
+        except Exception as e:
+            return "%s: %s" % (type(e).__name__, str(e))
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -1035,8 +978,9 @@ def merge_circuits(circs, arc_filename, rr_filename, arc_hash):
     #------------------------------------------------------------------------#
 
     x = y = 0
+    jobs = []
     for ind in range(0, len(circs)):
-        produce_files(ind, x, y)
+        jobs.append((ind, x, y))
         if FPGA_SIZES is None:
             x += 1
             if x >= wafer_w:
@@ -1046,6 +990,30 @@ def merge_circuits(circs, arc_filename, rr_filename, arc_hash):
             x += tuple(get_fpga_dimensions("%s_W%d_H%d.xml" % (args.arc.rsplit(".xml", 1)[0],\
                                                                FPGA_SIZES[ind], FPGA_SIZES[ind])))[0]
 
+    #NOTE: All circuits on an FPGA of the same size share its RR-graph, so its channel width is read only once.
+    chan_ws = {}
+    for ind in range(0, len(circs)):
+        local_rr_filename = get_local_filenames(ind)[1]
+        if not local_rr_filename in chan_ws:
+            with open(local_rr_filename, "r") as inf:
+                lines = [inf.readline() for i in range(0, 3)]
+            chan_ws.update({local_rr_filename : int(get_attr(lines[2], "chan_width_max"))})
+
+    #NOTE: VPR runs as a separate process, so threads suffice for keeping the pool busy.
+    #The inputs are staged into the sandboxes without copying, so concurrent runs share them.
+    pool = ThreadPool(max(1, min(int(os.environ.get("VPR_CPU", 1)), len(jobs))))
+    try:
+        failures = pool.map(run_circuit, jobs)
+    finally:
+        pool.close()
+        pool.join()
+
+    failed = [(ind, failure) for (ind, x, y), failure in zip(jobs, failures) if failure is not None]
+    if failed:
+        for ind, failure in failed:
+            print "Packing and placement of %s (circ_%d) failed: %s" % (circs[ind][0], ind, failure)
+        raise ValueError
+
     merge_blifs()
     net_hash = merge_packings(arc_hash)
     place_hash = merge_placements(net_hash)
@@ -1149,17 +1117,9 @@ def rescale_avalanche_costs():
     None
     """
 
-    with open("base_costs.dump", "r") as inf:
-        lines = inf.readlines()
-
-    avalanche_p = float(lines[0].split()[0]) / (wafer_w * wafer_h)
-    avalanche_h = float(lines[0].split()[1]) / (wafer_w * wafer_h)
-    avalanche_d = float(lines[0].split()[2]) / (wafer_w * wafer_h)
-    lines[0] = "%f %f %f\n" % (avalanche_p, avalanche_h, avalanche_d)
-
-    txt = ''.join(lines)
-    with open("base_costs.dump", "w") as outf:
-        outf.write(txt)
+    costs = base_costs.load()
+    costs.scale_avalanche(1.0 / (wafer_w * wafer_h))
+    costs.store()
 ##########################################################################
 
 if not REPLACE_CIRCS_ONLY: 
@@ -36,6 +36,9 @@ sys.path.insert(0,'..')
 
 import setenv
 import check_rr_graph
+import vpr_sandbox
+import rr_artifacts
+import base_costs
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--base_cost")
@@ -307,48 +310,14 @@ def call_vpr(arc, circ, seed = None):
                           "%s.place" % circ\
                          ]
 
-    sandbox = "sandbox_%s_%s" % (os.getcwd().rsplit('/', 1)[1], str(time.time()))
-    os.system("mkdir %s" % (os.environ["VPR_RUN_PATH"] % sandbox))
+    sandbox = vpr_sandbox.Sandbox("sandbox_%s_%s" % (os.getcwd().rsplit('/', 1)[1], str(time.time())), run_req_files)
+    sandbox.stage()
 
-    for f in run_req_files:
-        os.system("cp %s %s/" % (f, os.environ["VPR_RUN_PATH"] % sandbox))
-
-    vpr_call = "time %s" % (os.environ["VPR"] % (sandbox, ' '.join(vpr_arguments + vpr_switches)))
+    vpr_call = "time %s" % (os.environ["VPR"] % (sandbox.name, ' '.join(vpr_arguments + vpr_switches)))
     os.system(vpr_call)
 
-    for f in os.listdir(os.environ["VPR_RUN_PATH"] % sandbox):
-        if f in run_req_files:
-            continue
-        os.system("cp %s/%s ./" % (os.environ["VPR_RUN_PATH"] % sandbox, f))
-
-    os.system("rm -rf %s" % (os.environ["VPR_RUN_PATH"] % sandbox))
-##########################################################################
-
-##########################################################################
-def multiply_base_costs(fac):
-    """Multiplies all the base costs by a constant factor.
-
-    Parameters
-    ----------
-    fac : float
-        Multiplication factor.
-
-    Returns
-    -------
-    None
-    """
-
-    with open("base_costs.dump", "r") as inf:
-        lines = inf.readlines()
-
-    txt = ''.join(lines[:3])
-    for line in lines[3:]:
-        cost = line.split()[1]
-        line = line.replace(cost, "%f" % (float(cost) * fac))
-        txt += line
-
-    with open("base_costs.dump", "w") as outf:
-        outf.write(txt)
+    sandbox.collect()
+    sandbox.remove()
 ##########################################################################
 
 ##########################################################################
@@ -482,7 +451,9 @@ def get_delay_lower_bounds():
     global lb_delays
 
     os.system("cp base_costs.dump base_costs.prev")
-    multiply_base_costs(0.0)
+    costs = base_costs.load()
+    costs.reset(0.0)
+    costs.store()
     #Lower bound is obtained when all switches are free.
 
     for seed in seeds:
@@ -518,60 +489,71 @@ done = False
 mult_fac = 1.0
 mult_fac_inc = 1.0
 init_reset_cost = reset_cost
-while not done:
-    circ = benchmarks[icnt % len(benchmarks)]
-    seed = seeds[icnt % len(seeds)]
-    icnt += 1
-    os.system("rm -f %s*.lz4" % arc_name)
-
-    if not GNL:
-        grid_w = grid_h = min(grid_sizes.values())
-    else:
-        grid_w = grid_h = grid_sizes[circ]
-    call_arc_gen(grid_w, grid_h, first_clique_iter = init)
-
-    with open("base_costs.dump", "r") as inf:
-        lines = inf.readlines()
-    
-    if lines[2][0] == '0':
-        done = True
-
-    os.system("lz4 -d %s_rr.xml.lz4" % arc_name)
-    
-    if not GNL:
-        circs = [(b + ".blif", seed) for b in benchmarks]
-        circs = str(sorted(circs, key = lambda c : grid_sizes[c[0].rsplit(".blif", 1)[0]]))
-        create_wafer(seed, init)
-
-    multiply_base_costs(mult_fac)
-    reset_cost = init_reset_cost * mult_fac
-    write_avalanche_conf()
-    mult_fac *= mult_fac_inc
+rr_filename = "%s_rr.xml" % arc_name
+held_rr = False
+#NOTE: The RR-graph of an iteration is held until arc_gen has read its switch delays
+#in the next iteration, as releasing it removes the uncompressed file.
+try:
+    while not done:
+        circ = benchmarks[icnt % len(benchmarks)]
+        seed = seeds[icnt % len(seeds)]
+        icnt += 1
+        os.system("rm -f %s*.lz4" % arc_name)
+
+        if not GNL:
+            grid_w = grid_h = min(grid_sizes.values())
+        else:
+            grid_w = grid_h = grid_sizes[circ]
+        call_arc_gen(grid_w, grid_h, first_clique_iter = init)
+        if held_rr:
+            rr_artifacts.release(rr_filename)
+            held_rr = False
 
-    if not GNL and (len(benchmarks) > 1):
-        call_vpr("wafer", "wafer", seed = None)
-    else:
-        call_vpr(arc_name, circ, seed = seed)
+        if base_costs.get_edge_count() == 0:
+            done = True
 
-    if CHECKS_ON:
-        if len(benchmarks) == 1:
-            reload(check_rr_graph)
-            check_rr_graph.check_rr_all("check_rr.xml", None if init else "stored_edges.save")
+        rr_artifacts.acquire(rr_filename)
+        held_rr = True
+    
+        if not GNL:
+            circs = [(b + ".blif", seed) for b in benchmarks]
+            circs = str(sorted(circs, key = lambda c : grid_sizes[c[0].rsplit(".blif", 1)[0]]))
+            create_wafer(seed, init)
+
+        costs = base_costs.load()
+        costs.scale(mult_fac)
+        costs.store()
+        reset_cost = init_reset_cost * mult_fac
+        write_avalanche_conf()
+        mult_fac *= mult_fac_inc
+
+        if not GNL and (len(benchmarks) > 1):
+            call_vpr("wafer", "wafer", seed = None)
         else:
-            print "WARNING: RR-graph checks work only for individual FPGAs, not wafers."
-            print "Runing checks on individual FPGAs. Pre-VPR RR-graphs will have to be used."
-            rr_names = ["%s_W%d_H%d_rr.xml" % (arc_name, grid_sizes[b], grid_sizes[b]) for b in benchmarks]
-            for rr_name in rr_names:
-                print "Checking %s..." % rr_name
+            call_vpr(arc_name, circ, seed = seed)
+
+        if CHECKS_ON:
+            if len(benchmarks) == 1:
                 reload(check_rr_graph)
-                check_rr_graph.check_rr_all(rr_name, None if init else "stored_edges.save")
+                check_rr_graph.check_rr_all("check_rr.xml", None if init else "stored_edges.save")
+            else:
+                print "WARNING: RR-graph checks work only for individual FPGAs, not wafers."
+                print "Runing checks on individual FPGAs. Pre-VPR RR-graphs will have to be used."
+                rr_names = ["%s_W%d_H%d_rr.xml" % (arc_name, grid_sizes[b], grid_sizes[b]) for b in benchmarks]
+                for rr_name in rr_names:
+                    print "Checking %s..." % rr_name
+                    reload(check_rr_graph)
+                    check_rr_graph.check_rr_all(rr_name, None if init else "stored_edges.save")
     
-    init = False
+        init = False
 
-    print "Iteration %d done." % icnt
-    print "Seed", seed
-    trim_vpr_log(icnt)
+        print "Iteration %d done." % icnt
+        print "Seed", seed
+        trim_vpr_log(icnt)
 
-    #done = True
+        #done = True
+finally:
+    if held_rr:
+        rr_artifacts.release(rr_filename)
 
 os.chdir(wd)
@@ -10,11 +10,20 @@ import importlib
 
 from collections import namedtuple
 
+import milp_solver
+from milp_solver import LE, GE, EQ, CONSTRAINT, LAZY
+
 parser = argparse.ArgumentParser()
 parser.add_argument("--vpr_log")
 parser.add_argument("--config")
 args = parser.parse_args()
 
+#Solver settings missing from older configurations:
+MILP_SOLVER = "cplex"
+cbc_lib = None
+MILP_THREADS = 0
+MILP_TIME_LIMIT = 3600
+
 #Load the specified configuration:
 if args.config is None:
     args.config = "config"
@@ -29,6 +38,10 @@ globals().update({k: getattr(config, k) for k in names})
 
 Switch = namedtuple("Switch", ["driver", "target", "lut_offset"])
 
+hop_lattice_cache = {}
+#Hop lattices of the full switch patterns, keyed by the wire set, the grid size,
+#the maximum LUT offset, and whether U-turns are allowed.
+
 ##########################################################################
 def euclidean(vec1, vec2):
     """Computes the Euclidean distance between two vectors.
@@ -54,6 +67,196 @@ def euclidean(vec1, vec2):
     return distance
 ##########################################################################
 
+##########################################################################
+def shift(a, d_x, d_y, fill = 0):
+    """Shifts the first two dimensions of an array, filling the vacated entries.
+
+    Parameters
+    ----------
+    a : numpy.ndarray
+        Array to be shifted.
+    d_x : int
+        Shift along the first dimension.
+    d_y : int
+        Shift along the second dimension.
+    fill : Optional[int], default = 0
+        Value of the vacated entries.
+
+    Returns
+    -------
+    numpy.ndarray
+        The shifted array, so that result[x + d_x, y + d_y] = a[x, y].
+    """
+
+    res = numpy.full(a.shape, fill, dtype = a.dtype)
+    w, h = a.shape[:2]
+    if abs(d_x) >= w or abs(d_y) >= h:
+        return res
+
+    res[max(d_x, 0) : w + min(d_x, 0), max(d_y, 0) : h + min(d_y, 0)]\
+        = a[max(-d_x, 0) : w - max(d_x, 0), max(-d_y, 0) : h - max(d_y, 0)]
+
+    return res
+##########################################################################
+
+##########################################################################
+class HopLattice(object):
+    """Computes the minimum hop counts over a region of offset space,
+    by a breadth-first search on integer arrays.
+
+    Parameters
+    ----------
+    wire_offsets : List[Tuple[int]]
+        Offset vector of each wire.
+    successors : List[List[int]]
+        Indices of the wires that each wire can drive.
+    grid_size : Tuple[int]
+        Half-widths of the region.
+
+    Attributes
+    ----------
+    dist : numpy.ndarray
+        Number of wires in the shortest path that ends with a given wire, starting at a given
+        position (indexed by x + grid_size[0], y + grid_size[1], wire), or -1 if unreachable.
+    counts : numpy.ndarray
+        Number of such shortest paths, saturated at >>max_count<<.
+    hops : Dict[Tuple[int], int]
+        Minimum hop count of each reachable offset, except for the origin.
+    path_counts : Dict[Tuple[int], int]
+        Number of shortest paths to each reachable offset, saturated at >>max_count<<.
+
+    Methods
+    -------
+    List[List[int]] get_paths(offset : Tuple[int])
+        Enumerates the shortest paths to the offset.
+
+    Notes
+    -----
+    The lattice is the same as the one of a graph in which the source connects to
+    each wire at the origin, each wire connects to each of its successors at its
+    end point, and each wire connects to the sink at its end point. Only wires
+    starting inside the region are expanded. All edges have unit weight, so the
+    breadth-first levels are the Dijkstra distances, and the shortest-path DAG
+    is implicit in >>dist<<.
+    """
+
+    max_count = 2 ** 40
+
+    #------------------------------------------------------------------------#
+    def __init__(self, wire_offsets, successors, grid_size):
+        """Constructor of the HopLattice class."""
+
+        self.wire_offsets = wire_offsets
+        self.successors = successors
+        self.grid_size = grid_size
+        self.predecessors = [[u for u in range(0, len(successors)) if v in successors[u]]\
+                             for v in range(0, len(successors))]
+
+        gx, gy = grid_size
+        shape = (2 * gx + 1, 2 * gy + 1, len(wire_offsets))
+        self.dist = numpy.full(shape, -1, dtype = numpy.int32)
+        self.counts = numpy.zeros(shape, dtype = numpy.int64)
+
+        self.dist[gx, gy, :] = 1
+        self.counts[gx, gy, :] = 1
+        frontier = self.counts.copy()
+        level = 1
+        while frontier.any():
+            level += 1
+            reached = numpy.zeros(shape, dtype = numpy.int64)
+            for u, (d_x, d_y) in enumerate(wire_offsets):
+                shifted = shift(frontier[:, :, u], d_x, d_y)
+                for v in successors[u]:
+                    reached[:, :, v] += shifted
+            new = (reached > 0) & (self.dist < 0)
+            self.dist[new] = level
+            frontier = numpy.where(new, numpy.minimum(reached, self.max_count), 0)
+            self.counts += frontier
+
+        sink_dist = numpy.full(shape[:2], -1, dtype = numpy.int32)
+        sink_counts = numpy.zeros(shape[:2], dtype = numpy.int64)
+        for u, (d_x, d_y) in enumerate(wire_offsets):
+            dist = shift(self.dist[:, :, u], d_x, d_y, fill = -1)
+            counts = shift(self.counts[:, :, u], d_x, d_y)
+            better = (dist > 0) & ((sink_dist < 0) | (dist < sink_dist))
+            equal = (dist > 0) & (dist == sink_dist)
+            sink_counts = numpy.where(better, counts, numpy.where(equal, sink_counts + counts, sink_counts))
+            sink_dist = numpy.where(better, dist, sink_dist)
+        sink_counts = numpy.minimum(sink_counts, self.max_count)
+
+        self.hops = {}
+        self.path_counts = {}
+        for i, j in zip(*numpy.nonzero(sink_dist > 0)):
+            offset = (int(i) - gx, int(j) - gy)
+            if offset == (0, 0):
+                continue
+            self.hops.update({offset : int(sink_dist[i, j])})
+            self.path_counts.update({offset : int(sink_counts[i, j])})
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def get_paths(self, offset):
+        """Enumerates the shortest paths to the offset.
+
+        Parameters
+        ----------
+        offset : Tuple[int]
+            Offset to be reached.
+
+        Returns
+        -------
+        List[List[int]]
+            Wire indices of each path, starting from the origin.
+        """
+
+        gx, gy = self.grid_size
+
+        #........................................................................#
+        def backtrack(x, y, u):
+            """Returns all shortest paths ending with wire u starting at (x, y).
+
+            Parameters
+            ----------
+            x : int
+                Starting x-coordinate of the last wire.
+            y : int
+                Starting y-coordinate of the last wire.
+            u : int
+                Index of the last wire.
+
+            Returns
+            -------
+            List[List[int]]
+                Wire indices of each path.
+            """
+
+            d = self.dist[x + gx, y + gy, u]
+            if d == 1:
+                return [[u]]
+
+            paths = []
+            for p in self.predecessors[u]:
+                p_x = x - self.wire_offsets[p][0]
+                p_y = y - self.wire_offsets[p][1]
+                if abs(p_x) > gx or abs(p_y) > gy or self.dist[p_x + gx, p_y + gy, p] != d - 1:
+                    continue
+                paths += [path + [u] for path in backtrack(p_x, p_y, p)]
+
+            return paths
+        #........................................................................#
+
+        paths = []
+        for u, (d_x, d_y) in enumerate(self.wire_offsets):
+            x = offset[0] - d_x
+            y = offset[1] - d_y
+            if abs(x) > gx or abs(y) > gy or self.dist[x + gx, y + gy, u] != self.hops[offset]:
+                continue
+            paths += backtrack(x, y, u)
+
+        return paths
+    #------------------------------------------------------------------------#
+##########################################################################
+
 ##########################################################################
 class OptimalDistances(object):
     """Models the constraints for enforcing that the switch pattern
@@ -73,15 +276,11 @@ class OptimalDistances(object):
         """Constructor of the OptimalDistances class."""
 
         self.wires = tuple(sorted(wires))
+        self.wire_ids = {wire : i for i, wire in enumerate(self.wires)}
         self.max_lut_offset = max_lut_offset
 
         self.offsets = None
-        self.bin_vars = []
-        self.general_vars = []
-        self.csts = []
-        self.user_cuts = []
-        self.lazy_csts = []
-        self.bounds = []
+        self.model = milp_solver.MILPModel(relax = LP_RELAX)
 
         self.all_switches = []
 
@@ -91,11 +290,26 @@ class OptimalDistances(object):
                     switch = Switch(driver, target, lut_offset)
                     if not self.is_u_turn(switch):
                         self.all_switches.append(switch)
-                        self.bin_vars.append(self.switch_var(switch))
+                        self.model.add_binary(self.switch_var(switch))
+
+        #Indices of the switch universe. Each list keeps the order of >>all_switches<<.
+        self.switch_set = set(self.all_switches)
+        self.switches_by_driver = {}
+        self.switches_by_target = {}
+        self.switches_by_pair = {}
+        self.switches_by_lut_offset = {}
+        for switch in self.all_switches:
+            for index, key in ((self.switches_by_driver, switch.driver), (self.switches_by_target, switch.target),\
+                               (self.switches_by_pair, (switch.driver, switch.target)),\
+                               (self.switches_by_lut_offset, switch.lut_offset)):
+                try:
+                    index[key].append(switch)
+                except:
+                    index.update({key : [switch]})
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
-    def land(self, a, b = None, res_var = None):
+    def land(self, a, b = None, res_var = None, kind = CONSTRAINT):
         """Generates constraints for forming a logical and between the two variables.
 
         Parameters
@@ -107,45 +321,36 @@ class OptimalDistances(object):
             If b is None, a is assumed to be a list of variables.
         res_var : Optional[str], default = None
             Specifies the name of the resulting variable.
+        kind : Optional[int], default = CONSTRAINT
+            Kind of the generated rows.
 
         Returns
         -------
-        List[str]
-            Constraints.
         str
             Result variable.
         """
 
 
         if b is not None:
-            csts = []
             ab = "%s_land_%s" % (a, b)
             if res_var is not None:
                 ab = res_var
-            csts.append("%s + %s - %s <= 1" % (a, b, ab))
-            csts.append("%s - %s <= 0" % (ab, a))
-            csts.append("%s - %s <= 0" % (ab, b))
+            self.model.add_row([a, b, ab], [1, 1, -1], LE, 1, kind)
+            self.model.add_row([ab, a], [1, -1], LE, 0, kind)
+            self.model.add_row([ab, b], [1, -1], LE, 0, kind)
         else:
-            ab = ""
-            for v in a:
-                ab += "%s_land_" % v
-            ab = ab[:-len("_land_")]
+            ab = "_land_".join(a)
             if res_var is not None:
                 ab = res_var
-            csts = []
-            cst = ""
+            self.model.add_row(list(a) + [ab], [1] * len(a) + [-1], LE, len(a) - 1, kind)
             for v in a:
-                cst += " + %s" % v
-                csts.append("%s - %s <= 0" % (ab, v))
-            cst += " - %s" % ab
-            cst += " <= %d" % (len(a) - 1)
-            csts.insert(0, cst[len(" + "):])
+                self.model.add_row([ab, v], [1, -1], LE, 0, kind)
 
-        return csts, ab
+        return ab
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
-    def lor(self, a, b = None, res_var = None):
+    def lor(self, a, b = None, res_var = None, kind = CONSTRAINT):
         """Generates constraints for forming a logical or between the two variables.
 
         Parameters
@@ -157,41 +362,32 @@ class OptimalDistances(object):
             If b is None, a is assumed to be a list of variables.
         res_var : Optional[str], default = None
             Specifies the name of the resulting variable.
+        kind : Optional[int], default = CONSTRAINT
+            Kind of the generated rows.
 
         Returns
         -------
-        List[str]
-            Constraints.
         str
             Result variable.
         """
 
 
         if b is not None:
-            csts = []
             ab = "%s_lor_%s" % (a, b)
             if res_var is not None:
                 ab = res_var
-            csts.append("%s + %s - %s >= 0" % (a, b, ab))
-            csts.append("%s - %s >= 0" % (ab, a))
-            csts.append("%s - %s >= 0" % (ab, b))
+            self.model.add_row([a, b, ab], [1, 1, -1], GE, 0, kind)
+            self.model.add_row([ab, a], [1, -1], GE, 0, kind)
+            self.model.add_row([ab, b], [1, -1], GE, 0, kind)
         else:
-            ab = ""
-            for v in a:
-                ab += "%s_lor_" % v
-            ab = ab[:-len("_lor_")]
+            ab = "_lor_".join(a)
             if res_var is not None:
                 ab = res_var
-            csts = []
-            cst = ""
+            self.model.add_row(list(a) + [ab], [1] * len(a) + [-1], GE, 0, kind)
             for v in a:
-                cst += " + %s" % v
-                csts.append("%s - %s >= 0" % (ab, v))
-            cst += " - %s" % ab
-            cst += " >= 0"
-            csts.insert(0, cst[len(" + "):])
+                self.model.add_row([ab, v], [1, -1], GE, 0, kind)
 
-        return csts, ab
+        return ab
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -219,12 +415,12 @@ class OptimalDistances(object):
 
         continuous_ub += shift
 
-        self.csts.append("%.4f %s - %s >= 0" % (continuous_ub, indicator_var, linearized_var))
-        self.csts.append("%s - %s <= %.4f" % (linearized_var, continuous_var, shift))
-        self.csts.append("%s + %.4f %s - %s <= %.4f" % (continuous_var, continuous_ub, indicator_var, linearized_var,\
-                                                        continuous_ub - shift))
+        self.model.add_row([indicator_var, linearized_var], [continuous_ub, -1], GE, 0)
+        self.model.add_row([linearized_var, continuous_var], [1, -1], LE, shift)
+        self.model.add_row([continuous_var, indicator_var, linearized_var], [1, continuous_ub, -1], LE,\
+                           continuous_ub - shift)
 
-        self.bounds.append("0 <= %s <= %.4f" % (linearized_var, continuous_ub))
+        self.model.set_bounds(linearized_var, 0, continuous_ub)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -256,22 +452,21 @@ class OptimalDistances(object):
         #so we need to make this fractional.
 
         #Mz1 >= x - (b - delta)
-        self.csts.append("%d %s - %s >= - %.4f" % (observed_ub, geq_ind, observed_var, target_value - delta))
+        self.model.add_row([geq_ind, observed_var], [observed_ub, -1], GE, -1 * (target_value - delta))
         #M(1-z1) >= (b - delta) - x
-        self.csts.append("%s - %d %s >= %.4f" % (observed_var, observed_ub, geq_ind, target_value - delta - observed_ub))
+        self.model.add_row([observed_var, geq_ind], [1, -1 * observed_ub], GE, target_value - delta - observed_ub)
 
         #Mz2 >= (b + delta) - x
-        self.csts.append("%d %s + %s >= %.4f" % (observed_ub, leq_ind, observed_var, target_value + delta))
+        self.model.add_row([leq_ind, observed_var], [observed_ub, 1], GE, target_value + delta)
         #M(1-z2) >= x - (b + delta)
-        self.csts.append("- %s - %d %s >= %.4f" % (observed_var, observed_ub, leq_ind, -1 * target_value - delta - observed_ub))
+        self.model.add_row([observed_var, leq_ind], [-1, -1 * observed_ub], GE, -1 * target_value - delta - observed_ub)
 
-        csts, prod_var = self.land(geq_ind, leq_ind)
-        self.csts += csts
-        self.csts.append("%s - %s = 0" % (indicator_var, prod_var))
+        prod_var = self.land(geq_ind, leq_ind)
+        self.model.add_row([indicator_var, prod_var], [1, -1], EQ, 0)
 
-        self.bin_vars.append(geq_ind)
-        self.bin_vars.append(leq_ind)
-        self.bin_vars.append(prod_var)
+        self.model.add_binary(geq_ind)
+        self.model.add_binary(leq_ind)
+        self.model.add_binary(prod_var)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -297,23 +492,16 @@ class OptimalDistances(object):
 
         #Add available mux size indicators and enforce that exactly one is true:
         for w, wire in enumerate(self.wires):
-            cst = ""
-            for switch in self.all_switches:
-                if bound_fanout:
-                    if switch.driver == wire:
-                        cst += " + %s" % self.switch_var(switch)
-                elif switch.target == wire:
-                    cst += " + %s" % self.switch_var(switch)
-            one_size_only_cst = ""
+            switches = self.switches_by_driver if bound_fanout else self.switches_by_target
+            switch_vars = [self.switch_var(switch) for switch in switches.get(wire, [])]
+            size_vars = []
             for size in allowed_mux_sizes:
                 var = size_wire_pair_var(w, size)
-                cst += " - %d %s" % (size, var)
-                one_size_only_cst += " + %s" % var
-                self.bin_vars.append(var)
-            cst += " = 0"
-            one_size_only_cst += " = 1"
-            self.csts.append(cst)
-            self.csts.append(one_size_only_cst)
+                size_vars.append(var)
+                self.model.add_binary(var)
+            self.model.add_row(switch_vars + size_vars, [1] * len(switch_vars) + [-1 * size for size in allowed_mux_sizes],\
+                               EQ, 0)
+            self.model.add_row(size_vars, None, EQ, 1)
 
         #Now loop over all wires and for each size, OR the appropriate indicators to track presence of size on any wire:
         lor_vars = []
@@ -322,17 +510,12 @@ class OptimalDistances(object):
             for w, wire in enumerate(self.wires):
                 wire_vars.append(size_wire_pair_var(w, size))
             lor_var = "%s_size_%d_present" % ("fanout" if bound_fanout else "mux", size)
-            lor_csts, lor_var = self.lor(wire_vars, res_var = lor_var)
-            self.csts += lor_csts
-            self.bin_vars.append(lor_var)
+            lor_var = self.lor(wire_vars, res_var = lor_var)
+            self.model.add_binary(lor_var)
             lor_vars.append(lor_var)
 
         #Finally, bound the number of resulting presence variables:
-        cst = ""
-        for lor_var in lor_vars:
-            cst += " + %s" % lor_var
-        cst += " <= %d" % max_size_number
-        self.csts.append(cst)
+        self.model.add_row(lor_vars, None, LE, max_size_number)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -350,42 +533,38 @@ class OptimalDistances(object):
         None
         """
 
-        get_wire_switches = lambda wire : {(sw.driver, sw.lut_offset) : sw for sw in sorted(self.all_switches) if sw.target == wire}
+        get_wire_switches = lambda wire : {(sw.driver, sw.lut_offset) : sw for sw in self.switches_by_target.get(wire, [])}
         share_single_input_var = lambda sw1, sw2 : "input_shared_%s_and_%s" % (self.switch_var(sw1), self.switch_var(sw2))
         share_meas_var = lambda w1, w2 : "sharing_%d_and_%d" % (w1, w2)
         force_share_var = lambda w1, w2 : "force_input_sharing_%d_and_%d" % (w1, w2)
 
-        assignment_csts = ["" for w in range(0, len(self.wires))]
+        assignment_vars = [[] for w in range(0, len(self.wires))]
         for w1 in range(0, len(self.wires)):
             wire1 = self.wires[w1]
             switches1 = get_wire_switches(wire1)
             for w2 in range(w1 + 1, len(self.wires)):
-                sharing_counter = ""
+                sharing_vars = []
                 wire2 = self.wires[w2]
                 switches2 = get_wire_switches(wire2)
                 for driver, sw1 in switches1.items():
                     sw2 = switches2.get(driver, None)
                     if sw2 is None:
                         continue
-                    land_csts, land_var = self.land(self.switch_var(sw1), self.switch_var(sw2),\
-                                                    res_var = share_single_input_var(sw1, sw2))
-                    self.csts += land_csts
-                    self.bin_vars.append(land_var)
-                    sharing_counter += " + %s" % land_var
-                sharing_counter += " - %s = 0" % share_meas_var(w1, w2)
-                self.csts.append(sharing_counter)
-                force_implication = "%d %s - %s <= 0" % (min_sharing, force_share_var(w1, w2), share_meas_var(w1, w2))
-                self.csts.append(force_implication)
-                self.bin_vars.append(force_share_var(w1, w2))
-
-                assignment_csts[w1] += " + %s" % force_share_var(w1, w2)
-                assignment_csts[w2] += " + %s" % force_share_var(w1, w2)
+                    land_var = self.land(self.switch_var(sw1), self.switch_var(sw2),\
+                                         res_var = share_single_input_var(sw1, sw2))
+                    self.model.add_binary(land_var)
+                    sharing_vars.append(land_var)
+                self.model.add_row(sharing_vars + [share_meas_var(w1, w2)], [1] * len(sharing_vars) + [-1], EQ, 0)
+                self.model.add_row([force_share_var(w1, w2), share_meas_var(w1, w2)], [min_sharing, -1], LE, 0)
+                self.model.add_binary(force_share_var(w1, w2))
+
+                assignment_vars[w1].append(force_share_var(w1, w2))
+                assignment_vars[w2].append(force_share_var(w1, w2))
     
         for w in range(0, len(self.wires)):
             #Force exactly one pair membership on each wire. Because we use implications and not equivalences,
             #each wire is free to belong to multiple pairs as well, but there will always exist at least one assignment of pairs.
-            assignment_csts[w] += " = 1"
-            self.csts.append(assignment_csts[w])
+            self.model.add_row(assignment_vars[w], None, EQ, 1)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -402,12 +581,7 @@ class OptimalDistances(object):
         None
         """
 
-        cst = ""
-        for switch in self.all_switches:
-            cst += " + %s" % self.switch_var(switch)
-        cst += " <= %d" % pattern_size
-
-        self.csts.append(cst)
+        self.model.add_row([self.switch_var(switch) for switch in self.all_switches], None, LE, pattern_size)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -435,43 +609,31 @@ class OptimalDistances(object):
         self.get_mux_pos_var = get_mux_pos_var
 
         #Unique position constraints:
-        unique_pos = []
-        listed_muxes = []
+        listed_muxes = set()
         for wire in self.wires:
-            cst = ""
+            wire_pos_vars = []
             for x in range(0, MUX_COL_CNT):
                 for y in range(0, MUX_COL_HEIGHT):
                     pos_var = get_mux_pos_var(wire, x, y)
-                    listed_muxes.append(pos_var)
-                    cst += " + %s" % pos_var
+                    listed_muxes.add(pos_var)
+                    wire_pos_vars.append(pos_var)
                     try:
                         mux_pos_vars[(x, y)].append(pos_var)
                     except:
                         mux_pos_vars.update({(x, y) : [pos_var]})
-            cst += " = 1"
-            unique_pos.append(cst)
+            self.model.add_row(wire_pos_vars, None, EQ, 1)
 
         #No overlaps:
-        no_overlap = []
         for coords, pos_vars in sorted(mux_pos_vars.items()):
-            cst = ""
+            self.model.add_row(pos_vars, None, LE, 1)
             for pos_var in pos_vars:
-                cst += " + %s" % pos_var
-            cst += " <= 1"
-            no_overlap.append(cst)
-            self.bin_vars += pos_vars
+                self.model.add_binary(pos_var)
         
         #Individual lengths:
-        len_csts = []
-        objs = {}
-        obj = ""
-        fanin_bounds = {}
+        obj_vars = []
+        obj_coeffs = []
         for switch in self.all_switches:
             drvr, trgt, lut_offset = switch
-            if not drvr in objs:
-                objs.update({drvr : ""})
-            if not trgt in fanin_bounds:
-                fanin_bounds.update({trgt : ""})
             for drvr_x in range(0, MUX_COL_CNT):
                 for drvr_y in range(0, MUX_COL_HEIGHT):
                     drvr_pos_var = get_mux_pos_var(drvr, drvr_x, drvr_y)
@@ -485,21 +647,13 @@ class OptimalDistances(object):
                             switch_width = abs(trgt_x - drvr_x) * MUX_WIDTH
                             switch_height = abs(trgt_y - drvr_y + lut_offset * MUX_COL_HEIGHT) * MUX_HEIGHT
                             switch_len = switch_width + switch_height
-                            csts, indicator_var = self.land([self.switch_var(switch), drvr_pos_var, trgt_pos_var])
-                            self.bin_vars.append(indicator_var)
-                            len_csts += csts
-                            objs[drvr] += " + %.4f %s" % (switch_len, indicator_var)
-                            fanin_bounds[trgt] += " + %.4f %s" % (switch_len, indicator_var)
-                            obj += " + %.4f %s" % (switch_len, indicator_var)
-
-        self.csts += unique_pos
-        self.csts += no_overlap
-        self.csts += len_csts
+                            indicator_var = self.land([self.switch_var(switch), drvr_pos_var, trgt_pos_var])
+                            self.model.add_binary(indicator_var)
+                            obj_vars.append(indicator_var)
+                            obj_coeffs.append(switch_len)
 
         obj_var = "total_wl"
-        obj += " - %s = 0" % obj_var
-
-        self.csts.append(obj)
+        self.model.add_row(obj_vars + [obj_var], obj_coeffs + [-1], EQ, 0)
 
         cheby = lambda x1, y1, x2, y2 : max([abs(x1 - x2), abs(y1 - y2)])
         if lock_positions is not None:
@@ -507,7 +661,7 @@ class OptimalDistances(object):
                 for wire, coords in sorted(lock_positions.items()):
                     mux_var = get_mux_pos_var(wire, coords[0], coords[1])
                     if mux_var in listed_muxes:
-                        self.csts.append("%s = 1" % mux_var)
+                        self.model.add_row([mux_var], None, EQ, 1)
             else:
                 for wire in self.wires:
                     init_loc = lock_positions[wire]
@@ -517,7 +671,7 @@ class OptimalDistances(object):
                             if dist <= limit_cheby:
                                 continue
                             mux_var = get_mux_pos_var(wire, x, y)
-                            self.csts.append("%s = 0" % mux_var)
+                            self.model.add_row([mux_var], None, EQ, 0)
 
         return obj_var
     #------------------------------------------------------------------------#
@@ -536,7 +690,7 @@ class OptimalDistances(object):
         None
         """
 
-        secondary_objective = ""
+        secondary_objective = []
 
         max_x_len = MUX_COL_CNT
         max_y_len = MUX_COL_HEIGHT - 1
@@ -547,63 +701,62 @@ class OptimalDistances(object):
         for wire in self.wires:
             x_var = "wire_%s_xcoord" % wire
             y_var = "wire_%s_ycoord" % wire
-            self.general_vars.append(x_var)
-            self.general_vars.append(y_var)
-            x_cst = ""
-            y_cst = ""
+            self.model.add_general(x_var)
+            self.model.add_general(y_var)
+            pos_vars = []
+            x_coeffs = []
+            y_coeffs = []
             for x in range(0, MUX_COL_CNT):
                 for y in range(0, MUX_COL_HEIGHT):
-                    x_cst += " + %d %s" % (x, self.get_mux_pos_var(wire, x, y))
-                    y_cst += " + %d %s" % (y + global_y_shift, self.get_mux_pos_var(wire, x, y))
-            x_cst += " - %s = 0" % x_var
-            y_cst += " - %s = 0" % y_var
+                    pos_vars.append(self.get_mux_pos_var(wire, x, y))
+                    x_coeffs.append(x)
+                    y_coeffs.append(y + global_y_shift)
             
-            self.csts.append(x_cst)
-            self.csts.append(y_cst)
-            self.bounds.append("0 <= %s <= %.4f" % (x_var, MUX_COL_CNT))
-            self.bounds.append("%.4f <= %s <= %.4f" % (global_y_shift, y_var, MUX_COL_HEIGHT + global_y_shift))
+            self.model.add_row(pos_vars + [x_var], x_coeffs + [-1], EQ, 0)
+            self.model.add_row(pos_vars + [y_var], y_coeffs + [-1], EQ, 0)
+            self.model.set_bounds(x_var, 0, MUX_COL_CNT)
+            self.model.set_bounds(y_var, global_y_shift, MUX_COL_HEIGHT + global_y_shift)
 
-            fanout_x_cst = ""
-            fanout_y_cst = ""
+            fanout_x_vars = []
+            fanout_y_vars = []
             for trgt in self.wires:
                 trgt_x_var = "wire_%s_xcoord" % trgt
                 trgt_y_var = "wire_%s_ycoord" % trgt
-                for lut_offset in range(-1 * self.max_lut_offset, self.max_lut_offset + 1):
-                    switch = Switch(wire, trgt, lut_offset)
-                    if not switch in self.all_switches:
-                        continue
+                for switch in self.switches_by_pair.get((wire, trgt), []):
+                    lut_offset = switch.lut_offset
                     self.continuous_indicator(self.switch_var(switch), trgt_x_var,\
                                               "%s___xcoord" % self.switch_var(switch), max_x_len)
                     self.continuous_indicator(self.switch_var(switch), trgt_y_var,\
                                               "%s___ycoord" % self.switch_var(switch), max_y_len + global_y_shift,\
                                               shift = lut_offset * MUX_COL_HEIGHT)
 
-                    fanout_x_cst += " + %.4f %s" % (1.0 / DEFAULT_FANIN * MUX_WIDTH, "%s___xcoord" % self.switch_var(switch))
-                    fanout_y_cst += " + %.4f %s" % (1.0 / DEFAULT_FANIN * MUX_HEIGHT, "%s___ycoord" % self.switch_var(switch))
-
-            fanout_x_cst += " - %s - %s = 0" % (x_var, "wire_%s_fanout_avg_x_delta" % wire)
-            fanout_y_cst += " - %s - %s = 0" % (y_var, "wire_%s_fanout_avg_y_delta" % wire)
+                    fanout_x_vars.append("%s___xcoord" % self.switch_var(switch))
+                    fanout_y_vars.append("%s___ycoord" % self.switch_var(switch))
 
-            self.csts.append(fanout_x_cst)
-            self.csts.append(fanout_y_cst)
+            x_delta_var = "wire_%s_fanout_avg_x_delta" % wire
+            y_delta_var = "wire_%s_fanout_avg_y_delta" % wire
+            self.model.add_row(fanout_x_vars + [x_var, x_delta_var],\
+                               [1.0 / DEFAULT_FANIN * MUX_WIDTH] * len(fanout_x_vars) + [-1, -1], EQ, 0)
+            self.model.add_row(fanout_y_vars + [y_var, y_delta_var],\
+                               [1.0 / DEFAULT_FANIN * MUX_HEIGHT] * len(fanout_y_vars) + [-1, -1], EQ, 0)
 
             x_ub = MUX_COL_CNT * MUX_WIDTH
             y_ub = (1 + self.max_lut_offset) * MUX_COL_HEIGHT * MUX_HEIGHT
-            self.bounds.append("%.4f <= %s <= %.4f" % (-1 * x_ub, "wire_%s_fanout_avg_x_delta" % wire, x_ub))
-            self.bounds.append("%.4f <= %s <= %.4f" % (-1 * y_ub, "wire_%s_fanout_avg_y_delta" % wire, y_ub))
+            self.model.set_bounds(x_delta_var, -1 * x_ub, x_ub)
+            self.model.set_bounds(y_delta_var, -1 * y_ub, y_ub)
 
             x_abs_delta_var = "wire_%s_fanout_avg_x_abs_delta" % wire
             y_abs_delta_var = "wire_%s_fanout_avg_y_abs_delta" % wire
 
-            self.csts.append("%s - wire_%s_fanout_avg_x_delta >= 0" % (x_abs_delta_var, wire))
-            self.csts.append("%s + wire_%s_fanout_avg_x_delta >= 0" % (x_abs_delta_var, wire))
-            self.csts.append("%s - wire_%s_fanout_avg_y_delta >= 0" % (y_abs_delta_var, wire))
-            self.csts.append("%s + wire_%s_fanout_avg_y_delta >= 0" % (y_abs_delta_var, wire))
+            self.model.add_row([x_abs_delta_var, x_delta_var], [1, -1], GE, 0)
+            self.model.add_row([x_abs_delta_var, x_delta_var], [1, 1], GE, 0)
+            self.model.add_row([y_abs_delta_var, y_delta_var], [1, -1], GE, 0)
+            self.model.add_row([y_abs_delta_var, y_delta_var], [1, 1], GE, 0)
 
-            self.bounds.append("0 <= %s <= %.4f" % (x_abs_delta_var, x_ub))
-            self.bounds.append("0 <= %s <= %.4f" % (y_abs_delta_var, y_ub))
+            self.model.set_bounds(x_abs_delta_var, 0, x_ub)
+            self.model.set_bounds(y_abs_delta_var, 0, y_ub)
 
-            secondary_objective += " + %s + %s" % (x_abs_delta_var, y_abs_delta_var)
+            secondary_objective += [x_abs_delta_var, y_abs_delta_var]
 
         self.secondary_objective = secondary_objective
     #------------------------------------------------------------------------#
@@ -704,11 +857,11 @@ class OptimalDistances(object):
 
     #Variables representing the position in the path occupied by a wire.
     wire_pos_var = lambda self, offset, wire, pos : "offset_%s_%s_%d_%d"\
-                 % (self.cplex_abs(offset[0]), self.cplex_abs(offset[1]), self.wires.index(wire), pos)
+                 % (self.cplex_abs(offset[0]), self.cplex_abs(offset[1]), self.wire_ids[wire], pos)
 
     #Switch variables.
     switch_var = lambda self, switch : "x_%d_%d_%s"\
-               % (self.wires.index(switch.driver), self.wires.index(switch.target), self.cplex_abs(switch.lut_offset))
+               % (self.wire_ids[switch.driver], self.wire_ids[switch.target], self.cplex_abs(switch.lut_offset))
 
     #------------------------------------------------------------------------#
     def single_offset_csts(self, offset, opt_len, lazy = False):
@@ -728,73 +881,57 @@ class OptimalDistances(object):
         None
         """
 
+        kind = LAZY if lazy else CONSTRAINT
+        model = self.model
+
         if verbose:
-            csts = ["\ Offset (%d, %d)\n" % (offset[0], offset[1])]
-        else:
-            csts = []
-        x_reach_cst = ""
-        y_reach_cst = ""
+            model.add_comment("Offset (%d, %d)" % (offset[0], offset[1]))
+        x_reach_vars = []
+        x_reach_coeffs = []
+        y_reach_vars = []
+        y_reach_coeffs = []
+        pos_var_names = [[self.wire_pos_var(offset, wire, pos) for wire in self.wires] for pos in range(0, opt_len)]
         for pos in range(0, opt_len):
             if verbose:
-                csts.append("\ Hop %d\n")
-            csts.append("")
-            for wire in self.wires:
-                var = self.wire_pos_var(offset, wire, pos)
-                self.bin_vars.append(var)
-                csts[-1] += " + %s" % var
+                model.add_comment("Hop %d" % pos)
+            pos_vars = pos_var_names[pos]
+            for wire, var in zip(self.wires, pos_vars):
+                model.add_binary(var)
                 d_x, d_y = self.get_offset(wire)
                 if d_x:
-                    x_reach_cst += "%s %d %s" % (" +" if d_x > 0 else '', d_x, var)
+                    x_reach_vars.append(var)
+                    x_reach_coeffs.append(d_x)
                 if d_y:
-                    y_reach_cst += "%s %d %s" % (" +" if d_y > 0 else '', d_y, var)
-            csts[-1] += " = 1"
+                    y_reach_vars.append(var)
+                    y_reach_coeffs.append(d_y)
+            model.add_row(pos_vars, None, EQ, 1, kind)
 
-        x_reach_cst += " = %d" % offset[0]
-        y_reach_cst += " = %d" % offset[1]
+        pair_vars = {pair : [self.switch_var(switch) for switch in switches]\
+                     for pair, switches in self.switches_by_pair.items()}
+        pair_coeffs = [1] + [-1] * (2 * self.max_lut_offset + 1)
 
         for pos in range(1, opt_len):
-            prev_pos = pos - 1
-            for u in self.wires:
-                u_var = self.wire_pos_var(offset, u, prev_pos)
-                for v in self.wires:
-                    v_var = self.wire_pos_var(offset, v, pos)
-                    w_sum = ""
-                    u_turn = False
-                    for w in range(-1 * self.max_lut_offset, self.max_lut_offset + 1):
-                        switch = Switch(u, v, w)
-                        if self.is_u_turn(switch):
-                            u_turn = True
-                            break
-                        w_sum += " - %s" % self.switch_var(switch)
-                    if u_turn:
+            for u, u_var in zip(self.wires, pos_var_names[pos - 1]):
+                for v, v_var in zip(self.wires, pos_var_names[pos]):
+                    w_vars = pair_vars.get((u, v), None)
+                    if w_vars is None:
                         #Eliminate U-turns.
-                        csts.append("%s + %s <= 1" % (u_var, v_var))
+                        model.add_row([u_var, v_var], None, LE, 1, kind)
                         continue
 
                     if verbose:
-                        csts.append("\ Connectivity: %s -> %s @ target hop %d" % (u, v, pos))
+                        model.add_comment("Connectivity: %s -> %s @ target hop %d" % (u, v, pos))
 
-                    uv_csts, uv_var = self.land(u_var, v_var)
-                    self.bin_vars.append(uv_var)
-                    csts += uv_csts
-                    csts.append("%s%s <= 0" % (uv_var, w_sum))
-                    
-        csts.append(x_reach_cst)
-        csts.append(y_reach_cst)
+                    uv_var = self.land(u_var, v_var, kind = kind)
+                    model.add_binary(uv_var)
+                    model.add_row([uv_var] + w_vars, pair_coeffs, LE, 0, kind)
 
-        for wire in self.wires:
+        model.add_row(x_reach_vars, x_reach_coeffs, EQ, offset[0], kind)
+        model.add_row(y_reach_vars, y_reach_coeffs, EQ, offset[1], kind)
+
+        for i, wire in enumerate(self.wires):
             max_count = self.max_counts[wire][offset]
-            cst = ""
-            for pos in range(0, opt_len):
-                var = self.wire_pos_var(offset, wire, pos)
-                cst += " + %s" % var
-            cst += " <= %d" % max_count
-            csts.append(cst)
-
-        if lazy:
-            self.lazy_csts += csts
-        else:
-            self.csts += csts
+            model.add_row([pos_vars[i] for pos_vars in pos_var_names], None, LE, max_count, kind)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -814,23 +951,9 @@ class OptimalDistances(object):
             True if optimal, False otherwise.
         """
 
-        G = nx.DiGraph()
-
-        for x, y in list(self.offsets.keys()) + [(0, 0)]:
-            for wire in self.wires:
-                d_x, d_y = self.get_offset(wire)
-                sink = "sink_%d_%d" % (x + d_x, y + d_y)
-                u = "%d_%d_%s" % (x, y, wire)
-                G.add_edge(u, sink)
-                for v_wire in self.wires:
-                    v = "%d_%d_%s" % (x + d_x, y + d_y, v_wire)
-                    if any(Switch(wire, v_wire, lut_offset) in switches for lut_offset\
-                           in range(-1 * self.max_lut_offset, self.max_lut_offset + 1)):
-                        G.add_edge(u, v)
-                if x == y == 0:
-                    G.add_edge("src", u)
-
-        distances = nx.single_source_dijkstra_path_length(G, "src")
+        pairs = set((switch.driver, switch.target) for switch in switches if abs(switch.lut_offset) <= self.max_lut_offset)
+        successors = [[self.wire_ids[v] for v in self.wires if (u, v) in pairs] for u in self.wires]
+        lattice = HopLattice([self.get_offset(wire) for wire in self.wires], successors, self.grid_size)
 
         differences = []
 
@@ -839,12 +962,12 @@ class OptimalDistances(object):
             if x == y == 0:
                 continue
             try:
-                if distances["sink_%d_%d" % (x, y)] - 1 != d:
-                    print "Offset = (%d, %d). Expected = %d; Observed = %d" % (x, y, d, distances["sink_%d_%d" % (x, y)] - 1)
+                if lattice.hops[offset] != d:
+                    print "Offset = (%d, %d). Expected = %d; Observed = %d" % (x, y, d, lattice.hops[offset])
                     if not get_differences:
                         return False
-                differences.append(float(distances["sink_%d_%d" % (x, y)] - 1 - d) / d * 100)
-            except:
+                differences.append(float(lattice.hops[offset] - d) / d * 100)
+            except KeyError:
                 #Disconnected sink.
                 print "Sink (%d, %d) disconnected" % (x, y)
                 if not get_differences:
@@ -857,6 +980,68 @@ class OptimalDistances(object):
         return differences
     #------------------------------------------------------------------------#
 
+    #------------------------------------------------------------------------#
+    def get_hop_lattice(self, grid_size, u_turns = False):
+        """Returns the hop lattice of the pattern containing all potential switches.
+
+        Parameters
+        ----------
+        grid_size : Tuple[int]
+            Half-widths of the region.
+        u_turns : Optional[bool], default = False
+            Specifies that U-turns should be allowed.
+
+        Returns
+        -------
+        HopLattice
+            The lattice, shared by all problems with the same wires and parameters.
+        """
+
+        key = (self.wires, tuple(grid_size), self.max_lut_offset, u_turns)
+        try:
+            return hop_lattice_cache[key]
+        except KeyError:
+            pass
+
+        #LUT-level offset does not matter for lower-bounding.
+        successors = [[self.wire_ids[v] for v in self.wires if u_turns or not self.is_u_turn(Switch(u, v, 0))]\
+                      for u in self.wires]
+        lattice = HopLattice([self.get_offset(wire) for wire in self.wires], successors, grid_size)
+        hop_lattice_cache.update({key : lattice})
+
+        return lattice
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def get_shortest_paths(self, offset):
+        """Lists the shortest paths to the given offset, for switch-set indexing constraints.
+
+        Parameters
+        ----------
+        offset : Tuple[int]
+            Offset that needs to be covered.
+
+        Returns
+        -------
+        Dict[str, List[List[str]]]
+            For each path variable, the switch variables realizing each hop of the path.
+            The path variable implies that at least one of the switches realizing the hop is present.
+        """
+
+        sp_var = lambda spcnt, offset : "sp%d_%s_%s" % (spcnt, self.cplex_abs(offset[0]), self.cplex_abs(offset[1])) 
+        lut_offsets = range(-1 * self.max_lut_offset, self.max_lut_offset + 1)
+
+        shortest_paths = {}
+        for spcnt, sp in enumerate(self.lattice.get_paths(offset)):
+            hops = []
+            for u, v in zip(sp[:-1], sp[1:]):
+                hops.append([self.switch_var(Switch(self.wires[u], self.wires[v], lut_offset))\
+                             for lut_offset in lut_offsets])
+            shortest_paths.update({sp_var(spcnt, offset) : hops})
+
+        return shortest_paths
+    #------------------------------------------------------------------------#
+
     #------------------------------------------------------------------------#
     def get_optimal_hop_counts(self, grid_size = None, check_only = False):
         """Computes the minimum hop counts for all offsets in the specified region,
@@ -874,66 +1059,23 @@ class OptimalDistances(object):
         Returns
         -------
         None
+
+        Notes
+        -----
+        The shortest paths are not enumerated here. >>get_shortest_paths<<
+        does so on demand, for the offsets that have few enough of them.
         """
 
         if grid_size is None:
             grid_size = (sum([self.get_offset(wire)[0] for wire in self.wires if "_R_" in wire]) * 2,\
                          sum([self.get_offset(wire)[1] for wire in self.wires if "_U_" in wire]) * 2)
 
-        G = nx.DiGraph()
-        G_with_u_turns = nx.DiGraph()
-
-        for x in range(-1 * grid_size[0], grid_size[0] + 1):
-            for y in range(-1 * grid_size[1], grid_size[1] + 1):
-                for wire in self.wires:
-                    d_x, d_y = self.get_offset(wire)
-                    sink = "sink_%d_%d" % (x + d_x, y + d_y)
-                    u = "%d_%d_%s" % (x, y, wire)
-                    G.add_edge(u, sink)
-                    G_with_u_turns.add_edge(u, sink)
-                    for v_wire in self.wires:
-                        v = "%d_%d_%s" % (x + d_x, y + d_y, v_wire)
-                        switch = Switch(wire, v_wire, 0) #LUT-level offset does not matter for lower-bounding.
-                        G_with_u_turns.add_edge(u, v)
-                        if self.is_u_turn(switch):
-                            continue
-                        G.add_edge(u, v)
-                    if x == y == 0:
-                        G.add_edge("src", u)
-                        G_with_u_turns.add_edge("src", u)
-
-        distances = nx.single_source_dijkstra_path_length(G, "src")
+        grid_size = tuple(grid_size)
+        self.grid_size = grid_size
+        self.lattice = self.get_hop_lattice(grid_size)
+        hops = self.lattice.hops
         if not check_only:
-            with_u_turns_distances = nx.single_source_dijkstra_path_length(G_with_u_turns, "src")
-        hops = {}
-        with_u_turns_hops = {}
-        sp_var = lambda spcnt, offset : "sp%d_%s_%s" % (spcnt, self.cplex_abs(offset[0]), self.cplex_abs(offset[1])) 
-        self.shortest_paths = {}
-        for x in range(-1 * grid_size[0], grid_size[0] + 1):
-            for y in range(-1 * grid_size[1], grid_size[1] + 1):
-                if x == y == 0:
-                    continue
-                sink = "sink_%d_%d" % (x, y)
-                hops.update({(x, y) : distances[sink] - 1})
-                #-1 for src itself.
-
-                if not check_only:
-                    with_u_turns_hops.update({(x, y) : with_u_turns_distances[sink] - 1})
-   
-                    #List shortest paths for switch set indexing constraints in case we want a combined modeling approach.
-                    self.shortest_paths.update({(x, y) : {}})
-                    for spcnt, sp in enumerate(list(nx.all_shortest_paths(G, "src", sink))):
-                        key = sp_var(spcnt, (x, y))
-                        self.shortest_paths[(x, y)].update({key : []})
-                        for u, v in zip(sp[1:-1], sp[2:-1]):
-                            cst = key 
-                            u = '_'.join(u.split('_')[2:])
-                            v = '_'.join(v.split('_')[2:])
-                            for lut_offset in range(-1 * self.max_lut_offset, self.max_lut_offset + 1):
-                                switch = Switch(u, v, lut_offset)
-                                cst += " - %s" % self.switch_var(switch)
-                            cst += " <= 0"
-                            self.shortest_paths[(x, y)][key].append(cst)
+            with_u_turns_hops = self.get_hop_lattice(grid_size, u_turns = True).hops
 
         self.offsets = hops
 
@@ -986,12 +1128,9 @@ class OptimalDistances(object):
         """
 
         for wire in self.wires:
-            cst = ""
-            for switch in self.all_switches:
-                if switch.target == wire:
-                    cst += " + %s" % self.switch_var(switch)
-            cst += " - fanin%s = 0" % (wire[0] if within_direction_only else '')
-            self.csts.append(cst)
+            switch_vars = [self.switch_var(switch) for switch in self.switches_by_target.get(wire, [])]
+            fan_var = "fanin%s" % (wire[0] if within_direction_only else '')
+            self.model.add_row(switch_vars + [fan_var], [1] * len(switch_vars) + [-1], EQ, 0)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -1009,12 +1148,7 @@ class OptimalDistances(object):
         """
 
         for wire, fanin in fanin_dict.items():
-            cst = ""
-            for switch in self.all_switches:
-                if switch.target == wire:
-                    cst += " + %s" % self.switch_var(switch)
-            cst += " = %d" % fanin
-            self.csts.append(cst)
+            self.model.add_row([self.switch_var(switch) for switch in self.switches_by_target.get(wire, [])], None, EQ, fanin)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -1033,12 +1167,9 @@ class OptimalDistances(object):
         """
 
         for wire in self.wires:
-            cst = ""
-            for switch in self.all_switches:
-                if switch.driver == wire:
-                    cst += " + %s" % self.switch_var(switch)
-            cst += " - fanout%s = 0" % (wire[0] if within_direction_only else '')
-            self.csts.append(cst)
+            switch_vars = [self.switch_var(switch) for switch in self.switches_by_driver.get(wire, [])]
+            fan_var = "fanout%s" % (wire[0] if within_direction_only else '')
+            self.model.add_row(switch_vars + [fan_var], [1] * len(switch_vars) + [-1], EQ, 0)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -1056,12 +1187,7 @@ class OptimalDistances(object):
         """
 
         for wire, fanout in fanout_dict.items():
-            cst = ""
-            for switch in self.all_switches:
-                if switch.driver == wire:
-                    cst += " + %s" % self.switch_var(switch)
-            cst += " = %d" % fanout
-            self.csts.append(cst)
+            self.model.add_row([self.switch_var(switch) for switch in self.switches_by_driver.get(wire, [])], None, EQ, fanout)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -1086,11 +1212,11 @@ class OptimalDistances(object):
                 continue
             if order == "nonincr":
                 if self.get_len(switch.target) > self.get_len(switch.driver):
-                    self.csts.append("%s <= 0" % self.switch_var(switch))
+                    self.model.add_row([self.switch_var(switch)], None, LE, 0)
             elif order == "nondecr":
                 if self.get_len(switch.target) < self.get_len(switch.driver):
                     print switch
-                    self.csts.append("%s <= 0" % self.switch_var(switch))
+                    self.model.add_row([self.switch_var(switch)], None, LE, 0)
             else:
                 print "Unknown order specification."
                 raise ValueError
@@ -1118,7 +1244,7 @@ class OptimalDistances(object):
             pairs.add(tuple(sorted((switch, opposite))))
 
         for switch, opposite in sorted(pairs):
-            self.csts.append("%s + %s <= 1" % (self.switch_var(switch), self.switch_var(opposite)))
+            self.model.add_row([self.switch_var(switch), self.switch_var(opposite)], None, LE, 1)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -1163,18 +1289,19 @@ class OptimalDistances(object):
             pairs.add(tuple(sorted((switch, sym))))
 
         if check_switches is not None:
+            check_switches = set(check_switches)
             for s1, s2 in pairs:
                 if (s1 in check_switches) != (s2 in check_switches):
                     return False
             return True
 
         for switch, sym in sorted(pairs):
-            if switch in self.all_switches and sym in self.all_switches:
-                self.csts.append("%s - %s = 0" % (self.switch_var(switch), self.switch_var(sym)))
-            elif not switch in self.all_switches:
-                self.csts.append("%s = 0" % self.switch_var(sym))
+            if switch in self.switch_set and sym in self.switch_set:
+                self.model.add_row([self.switch_var(switch), self.switch_var(sym)], [1, -1], EQ, 0)
+            elif not switch in self.switch_set:
+                self.model.add_row([self.switch_var(sym)], None, EQ, 0)
             else:
-                self.csts.append("%s = 0" % self.switch_var(switch))
+                self.model.add_row([self.switch_var(switch)], None, EQ, 0)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -1214,18 +1341,19 @@ class OptimalDistances(object):
             pairs.add(tuple(sorted((switch, sym))))
 
         if check_switches is not None:
+            check_switches = set(check_switches)
             for s1, s2 in pairs:
                 if (s1 in check_switches) != (s2 in check_switches):
                     return False
             return True
 
         for switch, sym in sorted(pairs):
-            if switch in self.all_switches and sym in self.all_switches:
-                self.csts.append("%s - %s = 0" % (self.switch_var(switch), self.switch_var(sym)))
-            elif not switch in self.all_switches:
-                self.csts.append("%s = 0" % self.switch_var(sym))
+            if switch in self.switch_set and sym in self.switch_set:
+                self.model.add_row([self.switch_var(switch), self.switch_var(sym)], [1, -1], EQ, 0)
+            elif not switch in self.switch_set:
+                self.model.add_row([self.switch_var(sym)], None, EQ, 0)
             else:
-                self.csts.append("%s = 0" % self.switch_var(switch))
+                self.model.add_row([self.switch_var(switch)], None, EQ, 0)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -1245,21 +1373,23 @@ class OptimalDistances(object):
         None
         """
 
+        if check_switches is not None:
+            check_switches = set(check_switches)
+
         for wire in self.wires:
             potential_switches = []
             switch = self.switch_var(Switch(wire, wire, 0))
             potential_switches.append(switch)
-            cst = switch
+            switch_vars = [switch]
             if can_swap_lut:
                 for lut_offset in range(-1 * self.max_lut_offset, self.max_lut_offset + 1):
                     if lut_offset == 0:
                         continue
                     switch = Switch(wire, wire, lut_offset)
                     potential_switches.append(switch)
-                    cst += " + %s" % self.switch_var(switch)
-            cst += " >= 1"
+                    switch_vars.append(self.switch_var(switch))
             if check_switches is None:
-                self.csts.append(cst)
+                self.model.add_row(switch_vars, None, GE, 1)
             elif not any(switch in check_switches for switch in potential_switches):
                 return False
 
@@ -1282,6 +1412,9 @@ class OptimalDistances(object):
         None
         """
 
+        if check_switches is not None:
+            check_switches = set(check_switches)
+
         directed_wires = {'U' : [w for w in self.wires if "_U_" in w],\
                           'D' : [w for w in self.wires if "_D_" in w],\
                           'R' : [w for w in self.wires if "_R_" in w],\
@@ -1290,15 +1423,12 @@ class OptimalDistances(object):
         for d, dw in directed_wires.items():
             for wire in dw:
                 potential_switches = []
-                cst = ""
                 for target in dw:
                     for lut_offset in range(-1 * self.max_lut_offset, self.max_lut_offset + 1):
                         switch = Switch(wire, target, lut_offset)
                         potential_switches.append(switch)
-                        cst += " + %s" % self.switch_var(switch)
-                cst += " >=1"
                 if check_switches is None:
-                    self.csts.append(cst)
+                    self.model.add_row([self.switch_var(switch) for switch in potential_switches], None, GE, 1)
                 elif not any(switch in check_switches for switch in potential_switches):
                     return False
 
@@ -1323,6 +1453,9 @@ class OptimalDistances(object):
         None
         """
 
+        if check_switches is not None:
+            check_switches = set(check_switches)
+
         directed_wires = {'U' : [w for w in self.wires if "_U_" in w],\
                           'D' : [w for w in self.wires if "_D_" in w],\
                           'R' : [w for w in self.wires if "_R_" in w],\
@@ -1335,28 +1468,24 @@ class OptimalDistances(object):
                 potential_switches = []
                 if turn_in_both_directions:
                     for fd in fanout:
-                        cst = ""
+                        switch_vars = []
                         for target in directed_wires[fd]:
                             for lut_offset in range(-1 * self.max_lut_offset, self.max_lut_offset + 1):
                                 switch = Switch(wire, target, lut_offset)
                                 potential_switches.append(switch)
-                                cst += " + %s" % self.switch_var(switch)
-                        cst += " >=1"
+                                switch_vars.append(self.switch_var(switch))
                         if check_switches is None:
-                            self.csts.append(cst)
+                            self.model.add_row(switch_vars, None, GE, 1)
                         elif not any(switch in check_switches for switch in potential_switches):
                             return False
                 else:
                     all_fanout = directed_wires[fanout[0]] + directed_wires[fanout[1]]
-                    cst = ""
                     for target in all_fanout:
                         for lut_offset in range(-1 * self.max_lut_offset, self.max_lut_offset + 1):
                             switch = Switch(wire, target, lut_offset)
                             potential_switches.append(switch)
-                            cst += " + %s" % self.switch_var(switch)
-                    cst += " >=1"
                     if check_switches is None:
-                        self.csts.append(cst)
+                        self.model.add_row([self.switch_var(switch) for switch in potential_switches], None, GE, 1)
                     elif not any(switch in check_switches for switch in potential_switches):
                         return False
 
@@ -1381,14 +1510,14 @@ class OptimalDistances(object):
             if ENFORCE_EXTERNAL_SYMMETRY and (offset[0] < 0 and offset[1] < 0):
                 #NOTE: If symmetric, we can skip checking the 3rd quadrant.
                 continue
-            if len(self.shortest_paths[offset]) <= INDEX_THR:
-                cst = ""
-                for sp, sp_csts in self.shortest_paths[offset].items():
-                    self.csts += sp_csts
-                    self.bin_vars.append(sp)
-                    cst += " + %s" % sp
-                cst += " = 1"
-                self.csts.append(cst)
+            if self.lattice.path_counts[offset] <= INDEX_THR:
+                sp_vars = []
+                for sp, hop_switch_vars in sorted(self.get_shortest_paths(offset).items()):
+                    for switch_vars in hop_switch_vars:
+                        self.model.add_row([sp] + switch_vars, [1] + [-1] * len(switch_vars), LE, 0)
+                    self.model.add_binary(sp)
+                    sp_vars.append(sp)
+                self.model.add_row(sp_vars, None, EQ, 1)
             else:
                 self.single_offset_csts(offset, hops)
     #------------------------------------------------------------------------#
@@ -1406,16 +1535,11 @@ class OptimalDistances(object):
         None
         """
 
-        objective = "Minimize\n"
-
         #Giving preference to some lut offsets can speed up the solution process.
         lut_offset_pondering = {0 : 1.0, 1 : 1.001, -1 : 1.002}
         
-        for switch in self.all_switches:
-            #objective += " + %.3f %s" % (lut_offset_pondering[switch.lut_offset], self.switch_var(switch))
-            objective += " + %s" % self.switch_var(switch)
-
-        self.objective = objective
+        #coeffs = [lut_offset_pondering[switch.lut_offset] for switch in self.all_switches]
+        self.model.set_objective([self.switch_var(switch) for switch in self.all_switches])
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -1453,29 +1577,47 @@ class OptimalDistances(object):
             wl_var = self.wl_opt(lock_positions = stacking, limit_cheby = limit_cheby)
             #self.add_fanout_center_constraints()
 
-        cst = ""
+        weights = []
         for switch in self.all_switches:
             weight = utilizations.get(switch, {}).get("cur", 0)
             if bump_up is not None:
                 weight += bump_up.get(switch, 0)
                 if switch in bump_up:
                     print "bump", switch, bump_up.get(switch, 0)
-            cst += " + %d %s" % (weight, self.switch_var(switch))
-        cst += " - max_util = 0"
-        self.csts.append(cst)
+            weights.append(int(weight))
+        self.model.add_row([self.switch_var(switch) for switch in self.all_switches] + ["max_util"], weights + [-1], EQ, 0)
 
-        objective = "Minimize\n"# multi-objectives\n"
-        #objective += "OBJ1: Priority=2 Weight=1 AbsTol=0.0 RelTol=0.0\n"
         if incorporate_wl is not None:
             util_coeff = (1.0 - incorporate_wl) / usage_norm
             wl_coeff = float(incorporate_wl) / wl_norm
-            objective += " - %g max_util + %g %s" % (util_coeff, wl_coeff, wl_var)
-            #objective += "\nOBJ2: Priority=1 Weight=1 AbsTol=0.0 RelTol=0.0\n"
-            #objective += self.secondary_objective
+            self.model.set_objective(["max_util", wl_var], [-1 * util_coeff, wl_coeff])
         else:
-            objective = "Maximize\nmax_util"
+            self.model.set_objective(["max_util"], maximize = True)
+    #------------------------------------------------------------------------#
 
-        self.objective = objective
+    #------------------------------------------------------------------------#
+    def get_floorplan(self, values):
+        """Extracts the mux placement from the ILP solution.
+
+        Parameters
+        ----------
+        values : Dict[str, float]
+            Nonzero variable values of the solution.
+
+        Returns
+        -------
+        Dict[str : Tuple[int]]
+            Coordinates of all muxes.
+        """
+
+        pos_dict = {}
+        for wire in self.wires:
+            for x in range(0, MUX_COL_CNT):
+                for y in range(0, MUX_COL_HEIGHT):
+                    if milp_solver.is_one(values.get(self.get_mux_pos_var(wire, x, y), 0)):
+                        pos_dict.update({wire : (x, y)})
+
+        return pos_dict
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -1493,32 +1635,28 @@ class OptimalDistances(object):
             Coordinates of all muxes.
         """
 
-        pos_vars = {self.get_mux_pos_var(wire, x, y) : {wire : (x, y)}\
-                    for wire in self.wires for x in range(0, MUX_COL_CNT) for y in range(0, MUX_COL_HEIGHT)}
+        return self.get_floorplan(milp_solver.parse_cplex_log(filename))
+    #------------------------------------------------------------------------#
 
-        with open(filename, "r") as inf:
-            lines = inf.readlines()
+    #------------------------------------------------------------------------#
+    def get_costs(self, values):
+        """Extracts the usage and wirelength of the solution.
+        Raises a KeyError if either is zero.
 
-        selected = []
-        rd = False
-        pos_dict = {}
-        for line in lines:
-            if not line or line.isspace():
-                continue
-            if line.startswith("Variable Name"):
-                rd = True
-                continue
-            if not rd:
-                continue
-            if "land" in line:
-                continue
-            val = line.split()[-1]
-            if val.startswith("1.0") and all(c == '0' for c in val.split("1.0", 1)[-1].strip()):
-                pos = pos_vars.get(line.split()[0], None)
-                if pos is not None:
-                    pos_dict.update(pos)
+        Parameters
+        ----------
+        values : Dict[str, float]
+            Nonzero variable values of the solution.
+        
+        Returns
+        -------
+        float
+            Usage.
+        float
+            Wirelength.
+        """
 
-        return pos_dict
+        return values["max_util"], values["total_wl"]
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -1538,16 +1676,26 @@ class OptimalDistances(object):
             Wirelength.
         """
 
-        with open(filename, "r") as inf:
-            lines = inf.readlines()
+        return self.get_costs(milp_solver.parse_cplex_log(filename))
+    #------------------------------------------------------------------------#
 
-        for line in lines:
-            if "max_util" in line:
-                max_util = float(line.split()[-1])
-            elif "total_wl" in line:
-                total_wl = float(line.split()[-1])
+    #------------------------------------------------------------------------#
+    def get_switches(self, values):
+        """Extracts switches from a solution.
 
-        return max_util, total_wl
+        Parameters
+        ----------
+        values : Dict[str, float]
+            Nonzero variable values of the solution.
+        
+        Returns
+        -------
+        List[Switch]
+            Switch selection.
+        """
+
+        return sorted([switch for switch in self.all_switches\
+                       if milp_solver.is_one(values.get(self.switch_var(switch), 0))])
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -1565,30 +1713,7 @@ class OptimalDistances(object):
             Switch selection.
         """
 
-        switch_vars = {self.switch_var(switch) : switch for switch in self.all_switches}
-
-        with open(filename, "r") as inf:
-            lines = inf.readlines()
-
-        selected = []
-        rd = False
-        for line in lines:
-            if not line or line.isspace():
-                continue
-            if line.startswith("Variable Name"):
-                rd = True
-                continue
-            if not rd:
-                continue
-            if "land" in line:
-                continue
-            val = line.split()[-1]
-            if val.startswith("1.0") and all(c == '0' for c in val.split("1.0", 1)[-1].strip()):
-                switch = switch_vars.get(line.split()[0], None)
-                if switch is not None:
-                    selected.append(switch)
-
-        return sorted(selected)
+        return self.get_switches(milp_solver.parse_cplex_log(filename))
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -1640,16 +1765,45 @@ class OptimalDistances(object):
         -------
         Dict[str, Tuple[int]]
             Quenched coordinates.
+
+        Notes
+        -----
+        Coordinates are kept in a NumPy array and each multiplexer knows its incident switches,
+        so a swap only reevaluates the switches touching the two swapped multiplexers.
+        All random draws come from a generator seeded with FLOORPLAN_SEED.
         """
 
+        muxes = sorted(floorplan)
+        if len(muxes) < 2:
+            return dict(floorplan)
+        mux_ids = {mux : i for i, mux in enumerate(muxes)}
+
+        pos = numpy.array([floorplan[mux] for mux in muxes], dtype = numpy.int64)
+        drivers = numpy.array([mux_ids[switch.driver] for switch in switches], dtype = numpy.int64)
+        targets = numpy.array([mux_ids[switch.target] for switch in switches], dtype = numpy.int64)
+        shifts = numpy.array([(0, switch.lut_offset * MUX_COL_HEIGHT) for switch in switches], dtype = numpy.int64).reshape(-1, 2)
+        scales = numpy.array([MUX_WIDTH, MUX_HEIGHT], dtype = numpy.float64)
+
+        incident = [[] for mux in muxes]
+        for s, switch in enumerate(switches):
+            incident[drivers[s]].append(s)
+            if targets[s] != drivers[s]:
+                incident[targets[s]].append(s)
+        incident = [numpy.array(switch_ids, dtype = numpy.int64) for switch_ids in incident]
+        pair_switches = {}
+
         #........................................................................#
-        def eval_floorplan(flp):
-            """Evaluates the wirelength of the floorplan.
+        def eval_switches(drvr, trgt, shift):
+            """Evaluates the wirelength of a subset of switches in the current floorplan.
 
             Parameters
             ----------
-            flp : Dict[str, Tuple[int]]
-                Floorplan to be evaluated.
+            drvr : numpy.ndarray
+                Driver multiplexer indices.
+            trgt : numpy.ndarray
+                Target multiplexer indices.
+            shift : numpy.ndarray
+                Coordinate shifts due to LUT offsets.
 
             Returns
             -------
@@ -1657,70 +1811,98 @@ class OptimalDistances(object):
                 Wirelength.
             """
 
-            switch_len = lambda switch : abs(flp[switch.target][0] - flp[switch.driver][0]) * MUX_WIDTH\
-                       + abs(flp[switch.target][1] - flp[switch.driver][1] + switch.lut_offset * MUX_COL_HEIGHT) * MUX_HEIGHT
+            return float(numpy.abs(pos[trgt] - pos[drvr] + shift).sum(axis = 0).dot(scales))
+        #........................................................................#
 
-            return sum([switch_len(switch) for switch in switches])
         #........................................................................#
+        def swap(a, b):
+            """Swaps two multiplexers and returns the resulting change in wirelength.
 
-        init_wl = eval_floorplan(floorplan)
-        coords = sorted(floorplan)
+            Parameters
+            ----------
+            a : int
+                Index of the first multiplexer.
+            b : int
+                Index of the second multiplexer.
+
+            Returns
+            -------
+            float
+                Wirelength change.
+            """
 
-        random.seed(FLOORPLAN_SEED)
+            try:
+                affected = pair_switches[(a, b)]
+            except:
+                switch_ids = numpy.union1d(incident[a], incident[b])
+                affected = (drivers[switch_ids], targets[switch_ids], shifts[switch_ids])
+                pair_switches.update({(a, b) : affected, (b, a) : affected})
+            before = eval_switches(*affected)
+            pos[[a, b]] = pos[[b, a]]
+
+            return eval_switches(*affected) - before
+        #........................................................................#
+
+        #........................................................................#
+        def draw_pairs(cnt):
+            """Draws random pairs of distinct multiplexers.
+
+            Parameters
+            ----------
+            cnt : int
+                Number of pairs.
+
+            Returns
+            -------
+            List[int]
+                First members.
+            List[int]
+                Second members.
+            """
+
+            a = rng.randint(0, len(muxes), size = cnt)
+            b = (a + rng.randint(1, len(muxes), size = cnt)) % len(muxes)
+
+            return a.tolist(), b.tolist()
+        #........................................................................#
+
+        init_wl = eval_switches(drivers, targets, shifts)
+
+        rng = numpy.random.RandomState(FLOORPLAN_SEED)
 
         init_temp_comp_moves = 1000
         deltas = []
-        for i in range(0, init_temp_comp_moves):
-            swap_a = random.choice(coords)
-            swap_b = swap_a
-            while swap_b == swap_a:
-                swap_b = random.choice(coords)
-            orig_a = floorplan[swap_a]
-            orig_b = floorplan[swap_b]
-            floorplan[swap_a] = orig_b
-            floorplan[swap_b] = orig_a
-            new_wl = eval_floorplan(floorplan)
-            deltas.append(new_wl - init_wl)
-            floorplan[swap_a] = orig_a
-            floorplan[swap_b] = orig_b
+        for swap_a, swap_b in zip(*draw_pairs(init_temp_comp_moves)):
+            deltas.append(swap(swap_a, swap_b))
+            swap(swap_a, swap_b)
 
         temperature = 2 * statistics.stdev(deltas)
         print temperature, init_wl
 
         best_wl = init_wl
-        best_floorplan = copy.deepcopy(floorplan)
+        best_pos = pos.copy()
 
         move_limit = int(math.ceil(10 * len(self.wires) ** (4.0 / 3)))
         wl = init_wl
         while temperature > (0.005 * wl) / len(self.wires):
             proposed = 0
             accepted = 0
-            for i in range(0, move_limit):
-                swap_a = random.choice(coords)
-                swap_b = swap_a
-                while swap_b == swap_a:
-                    swap_b = random.choice(coords)
+            swaps_a, swaps_b = draw_pairs(move_limit)
+            tosses = rng.random_sample(move_limit).tolist()
+            for swap_a, swap_b, toss in zip(swaps_a, swaps_b, tosses):
                 proposed += 1
-                orig_a = floorplan[swap_a]
-                orig_b = floorplan[swap_b]
-                floorplan[swap_a] = orig_b
-                floorplan[swap_b] = orig_a
-                new_wl = eval_floorplan(floorplan)
-                if new_wl < wl:
-                    wl = new_wl
+                delta = swap(swap_a, swap_b)
+                if delta < 0:
+                    wl += delta
                     accepted += 1
                     if wl <= best_wl:
                         best_wl = wl
-                        best_floorplan = copy.deepcopy(floorplan)            
+                        best_pos = pos.copy()
+                elif toss < math.exp(-1 * delta / temperature):
+                    wl += delta
+                    accepted += 1
                 else:
-                    energy = math.exp(-1 * float(new_wl - wl) / temperature)
-                    toss = random.random()
-                    if toss < energy:
-                        wl = new_wl
-                        accepted += 1
-                        continue
-                    floorplan[swap_a] = orig_a
-                    floorplan[swap_b] = orig_b
+                    swap(swap_a, swap_b)
 
             alpha = float(accepted) / proposed
             temp_scale_fac = 1.0
@@ -1736,9 +1918,11 @@ class OptimalDistances(object):
 
             print temperature, wl
 
+        pos = best_pos
+        best_wl = eval_switches(drivers, targets, shifts)
         print "Quenched", best_wl
 
-        return best_floorplan
+        return {mux : tuple(int(c) for c in pos[i]) for i, mux in enumerate(muxes)}
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -1972,7 +2156,7 @@ class OptimalDistances(object):
         all_usage = {}
         for line in lines[lcnt + 1:]:
             switch = parse_switch(line)
-            if not switch in self.all_switches:
+            if not switch in self.switch_set:
                 continue
             if switch is None:
                 break
@@ -2033,9 +2217,10 @@ class OptimalDistances(object):
         None
         """
 
+        selected_switches = set(selected_switches)
         for switch in self.all_switches:
             if not switch in selected_switches:
-                self.csts.append("%s = 0" % self.switch_var(switch))
+                self.model.add_row([self.switch_var(switch)], None, EQ, 0)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -2052,13 +2237,9 @@ class OptimalDistances(object):
         None
         """
 
-        for switch in self.all_switches:
-            if switch.lut_offset == 0:
-                cst = ""
-                for lut_offset in range(-1 * self.max_lut_offset, self.max_lut_offset + 1):
-                    cst += " + %s" % self.switch_var(Switch(switch.driver, switch.target, lut_offset))
-                cst += " <= %d" % limit
-                self.csts.append(cst)
+        for switch in self.switches_by_lut_offset.get(0, []):
+            self.model.add_row([self.switch_var(replica) for replica in self.switches_by_pair[(switch.driver, switch.target)]],\
+                               None, LE, limit)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -2072,53 +2253,28 @@ class OptimalDistances(object):
 
         Returns
         -------
+        List[str]
+            Variables in the order of their column indices.
+        """
+
+        return self.model.write_lp(filename)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def get_model(self):
+        """Returns the problem.
+
+        Parameters
+        ----------
         None
+
+        Returns
+        -------
+        milp_solver.MILPModel
+            The model.
         """
 
-        for ccnt, cst in enumerate(self.csts):
-            self.csts[ccnt] = "C%d: %s" % (ccnt, cst) 
-        with open(filename, "w") as outf:
-            outf.write(self.objective)
-            outf.write("\nSubject to\n")
-        
-            #import ast
-            #with open("store", "r") as inf:
-            #    lines  = inf.readlines()
-            #    sws = []
-            #    for line in lines:
-            #        drvr = line.split("driver='", 1)[1].split("'", 1)[0]
-            #        trgt = line.split("target='", 1)[1].split("'", 1)[0]
-            #        offset = int(line.split("lut_offset=", 1)[1].split(")", 1)[0])
-            #        sws.append(Switch(drvr, trgt, offset))
-
-            #self.csts += ["%s = 1" % self.switch_var(sw) for sw in sws]
-            #self.csts += ["%s = 0" % self.switch_var(sw) for sw in self.all_switches if not sw in sws]
-
-            outf.write("\n".join(self.csts))
-            if self.user_cuts:
-                outf.write("\nUser Cuts\n")
-                outf.write("\n".join(self.user_cuts))
-            if self.lazy_csts:
-                for ccnt, cst in enumerate(self.lazy_csts):
-                    self.lazy_csts[ccnt] = "L%d: %s" % (ccnt, cst) 
-                outf.write("\nLazy Constraints\n")
-                outf.write("\n".join(self.lazy_csts))
-            if self.bounds:
-                outf.write("\nBounds\n")
-                outf.write("\n".join(self.bounds))
-            if not LP_RELAX:
-                outf.write("\nBinary\n")
-                outf.write("\n".join(self.bin_vars))
-                if self.general_vars:
-                    outf.write("\nGeneral\n")
-                    outf.write("\n".join(self.general_vars))
-            else:
-                if not self.bounds:
-                    outf.write("\nBounds\n")
-                else:
-                    outf.write("\n")
-                outf.write("\n".join(["0 <= %s <= 1" % var for var in self.bin_vars]))
-            outf.write("\nEnd")
+        return self.model
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -2136,7 +2292,7 @@ class OptimalDistances(object):
         """
 
         for switch in switches:
-            self.csts.append("%s = 1" % self.switch_var(switch))
+            self.model.add_row([self.switch_var(switch)], None, EQ, 1)
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -2159,13 +2315,11 @@ class OptimalDistances(object):
         """
 
         for solution in solutions:
-            cst = ""
-            for switch in solution:
-                cst += "+ %s" % self.switch_var(switch)
+            switch_vars = [self.switch_var(switch) for switch in solution]
             if min_overlap > 0:
-                self.csts.append(cst + " >= %d" % min_overlap)
+                self.model.add_row(switch_vars, None, GE, min_overlap)
             if max_overlap > 0:
-                self.csts.append(cst + " <= %d" % max_overlap)
+                self.model.add_row(switch_vars, None, LE, max_overlap)
     #------------------------------------------------------------------------#
 ##########################################################################
 
@@ -2211,6 +2365,10 @@ def solve_log(filename, bump_up = None, solutions_to_ban = None, min_ban_differe
 
     stacking = default_stacking
 
+    solver = milp_solver.get_solver(MILP_SOLVER, cplex_path = cplex_path if SRV else "cplex", cbc_lib = cbc_lib,\
+                                    threads = MILP_THREADS, time_limit = MILP_TIME_LIMIT)
+    warm_start = None
+
     for quench in range(0, 5 if WL_TRADEOFF else 1):
         del prob
         prob = OptimalDistances(wires, MAX_LUT_OFFSET)
@@ -2258,46 +2416,21 @@ def solve_log(filename, bump_up = None, solutions_to_ban = None, min_ban_differe
         adopted = [switch for switch in prob.all_switches if not switch in usage]
         prob.set_adopted_switches(adopted)
         print "Adopted =", adopted
+        prob.model.report()
     
-        prob.write_problem("prob.lp")
-        sol_filename = "prob.log"
-    
-        timeout = 3600
-        call = "cplex -c \"set timelimit %d\" " % timeout
-        if SRV:
-            call = "%s -c \"set timelimit %d\" " % (cplex_path, timeout)
-    
-        #Optional:
-        #call += "\" set mip interval 1\" "
-        #call += "\" set mip strategy search 1\" "
-        #call += "\" set mip strategy heuristicfreq -1\" "
-        #call += "\" set mip strategy variableselect 4\" "
-        #call += "\" set mip strategy startalgorithm 4\" "
-        #call += "\" set mip strategy subalgorithm 4\" "
-        ###
-    
-        call += "\"read prob.lp\" "
-        call += "\"read prob.mst\" "
-        call += "\"optimize\" \"set logfile %s\" " % sol_filename
-        call += "\"display solution variables *\" "
-        call += "\"set output writelevel 4\" "
-        call += "\"write prob.mst\" "
-        call += "\"quit\" "
-
-        try:
-            repair_mst_indices("prob.lp", "prob.mst")
-        except:
-            pass
-
-        os.system(call)
+        sol = solver.solve(prob, warm_start = warm_start)
+        if sol.status != "solved":
+            print "The MILP solver returned no solution (%s)." % sol.status
+            raise ValueError
+        warm_start = sol.values if sol.values else None
     
-        sol_switches = prob.read_switches(sol_filename)
-        floorplan = prob.read_floorplan(sol_filename)
+        sol_switches = prob.get_switches(sol.values)
+        floorplan = prob.get_floorplan(sol.values)
 
         try:
-            usage_norm, wl_norm = prob.read_costs(sol_filename)
-        except:
-            #No switches with non-zero usage chosen (CPLEX does not display 0 variables by default).
+            usage_norm, wl_norm = prob.get_costs(sol.values)
+        except KeyError:
+            #No switches with non-zero usage chosen (zero variables are not reported).
             #Converged. Exit.
 
             return None, None
@@ -2388,74 +2521,6 @@ def analyze_similarity(solutions):
     return numpy.mean(set_differences), numpy.std(set_differences)
 ##########################################################################
 
-##########################################################################
-def repair_mst_indices(prob_file, mst_file):
-    """Repairs the indices of the variables in the mst file, so that they conform
-    to the new indices in the problem file.
-
-    Parameters
-    ----------
-    prob_file : str
-        Name of the new problem file.
-    mst_file : str
-        Name of the stored solution file.
-
-    Returns
-    -------
-    None
-    """
-
-    with open(prob_file, "r") as inf:                                                                                                     
-        txt = inf.read()
-    
-    variables = [v for v in txt.split() if v and not v.isspace()]
-    
-    seen = set()
-    vcnt = 0
-    clean = {}
-    for v in txt.split():
-        if not v or v.isspace():
-            continue
-        if v in ('+', '-', "to"):
-            continue
-        if "=" in v:
-            continue
-        try:
-            v = float(v)
-            continue
-        except:
-            pass
-        if v[0] != v.lower()[0]:
-            continue
-        if v in seen:
-            continue
-        clean.update({v : vcnt})
-        vcnt += 1
-        seen.add(v)
-
-    get_index = lambda line : line.split("index=\"", 1)[1].split('"', 1)[0]
-    get_name = lambda line : line.split("name=\"", 1)[1].split('"', 1)[0]
-    get_value = lambda line : line.split("value=\"", 1)[1].split('"', 1)[0]
-    with open(mst_file, "r") as inf:
-        lines = inf.readlines()
-    txt = ""
-    for line in lines:
-        try:
-            index = get_index(line)
-        except:
-            txt += line
-            continue
-        try:
-            line = line.replace(" index=\"%s\" " % index, " index=\"%d\" " % clean[get_name(line)])
-        except:
-            continue
-        line = line.replace(" value=\"%s\"" % get_value(line), " value=\"1\"")
-        txt += line
-
-    with open(mst_file, "w") as outf:
-        outf.write(txt)
-##########################################################################
-
 ##########################################################################
 def check_features(stored_pattern_filename, log_filename = None, problem_obj = None):
     """Checks which features the given stored pattern possesses.
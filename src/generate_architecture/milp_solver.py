@@ -0,0 +1,1270 @@
+"""MILP solver backends for the switch-pattern problems of ilp_setup.
+
+Problems are handed over as objects exposing >>write_problem(filename)<< (LP format)
+and >>get_model()<< (an in-memory MILPModel), and solutions come back as MILPSolution
+objects holding the nonzero variable values. Warm starts are passed as dictionaries
+of the same form.
+"""
+
+import os
+import ctypes
+import ctypes.util
+import numpy
+
+INF = float("inf")
+
+#Signature of CBC's cut callbacks: LP solver, cut pool, application data, node depth, pass number.
+CBC_CUT_CALLBACK = ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int, ctypes.c_int)
+
+#Row senses:
+LE = 0
+GE = 1
+EQ = 2
+SENSE_SYMBOLS = ("<=", ">=", "=")
+
+#Row kinds:
+CONSTRAINT = 0
+USER_CUT = 1
+LAZY = 2
+
+#Variable types:
+CONTINUOUS = 0
+BINARY = 1
+GENERAL = 2
+
+##########################################################################
+class MILPModel(object):
+    """Sparse in-memory mixed-integer linear program.
+
+    Parameters
+    ----------
+    relax : Optional[bool], default = False
+        Specifies that binary and general variables should be treated as continuous
+        (keeping the 0-1 bounds of the binaries).
+
+    Notes
+    -----
+    Variables are registered by name and receive integer ids in the order of registration.
+    Unless declared otherwise, they are continuous with the LP-format default bounds [0, inf).
+
+    Rows are stored in compressed sparse row form: the column ids and coefficients of
+    all rows are concatenated in >>row_cols<< and >>row_vals<<, and row r occupies the
+    range [row_starts[r], row_starts[r + 1]). Each row also has a sense (LE, GE, EQ),
+    a right-hand side, and a kind (CONSTRAINT, USER_CUT, LAZY).
+    """
+
+    #------------------------------------------------------------------------#
+    def __init__(self, relax = False):
+        """Constructor of the MILPModel class.
+        """
+
+        self.relax = relax
+
+        self.var_names = []
+        self.var_index = {}
+        self.lb = []
+        self.ub = []
+        self.var_types = []
+        self.bounded = set()
+
+        self.maximize = False
+        self.obj_cols = []
+        self.obj_vals = []
+
+        self.row_starts = [0]
+        self.row_cols = []
+        self.row_vals = []
+        self.row_senses = []
+        self.row_rhs = []
+        self.row_kinds = []
+        self.comments = {}
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def var(self, name):
+        """Returns the id of a variable, registering it if it does not exist.
+
+        Parameters
+        ----------
+        name : str
+            Variable name.
+
+        Returns
+        -------
+        int
+            Variable id.
+        """
+
+        try:
+            return self.var_index[name]
+        except KeyError:
+            index = len(self.var_names)
+            self.var_index.update({name : index})
+            self.var_names.append(name)
+            self.lb.append(0.0)
+            self.ub.append(INF)
+            self.var_types.append(CONTINUOUS)
+
+            return index
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def add_binary(self, name):
+        """Registers a binary variable.
+
+        Parameters
+        ----------
+        name : str
+            Variable name.
+
+        Returns
+        -------
+        int
+            Variable id.
+        """
+
+        index = self.var(name)
+        self.var_types[index] = BINARY
+        self.ub[index] = 1.0
+
+        return index
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def add_general(self, name):
+        """Registers a general integer variable.
+
+        Parameters
+        ----------
+        name : str
+            Variable name.
+
+        Returns
+        -------
+        int
+            Variable id.
+        """
+
+        index = self.var(name)
+        self.var_types[index] = GENERAL
+
+        return index
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def set_bounds(self, name, lb, ub):
+        """Sets the bounds of a variable.
+
+        Parameters
+        ----------
+        name : str
+            Variable name.
+        lb : float
+            Lower bound.
+        ub : float
+            Upper bound.
+
+        Returns
+        -------
+        None
+        """
+
+        index = self.var(name)
+        self.lb[index] = lb
+        self.ub[index] = ub
+        self.bounded.add(index)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def set_objective(self, names, coeffs = None, maximize = False):
+        """Sets the objective.
+
+        Parameters
+        ----------
+        names : List[str]
+            Variables appearing in the objective.
+        coeffs : Optional[List[float]], default = None
+            Their coefficients. If None, all are one.
+        maximize : Optional[bool], default = False
+            Specifies that the objective should be maximized.
+
+        Returns
+        -------
+        None
+        """
+
+        self.maximize = maximize
+        self.obj_cols = [self.var(name) for name in names]
+        self.obj_vals = [1.0] * len(names) if coeffs is None else [float(c) for c in coeffs]
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def add_row(self, names, coeffs, sense, rhs, kind = CONSTRAINT):
+        """Adds a row.
+
+        Parameters
+        ----------
+        names : List[str]
+            Variables appearing in the row.
+        coeffs : List[float]
+            Their coefficients. If None, all are one.
+        sense : int
+            LE, GE, or EQ.
+        rhs : float
+            Right-hand side.
+        kind : Optional[int], default = CONSTRAINT
+            CONSTRAINT, USER_CUT, or LAZY.
+
+        Returns
+        -------
+        int
+            Row id.
+
+        Raises
+        ------
+        ValueError
+            If the numbers of variables and coefficients differ.
+        """
+
+        if coeffs is not None and len(coeffs) != len(names):
+            print "Row with %d variables but %d coefficients." % (len(names), len(coeffs))
+            raise ValueError
+
+        cols = map(self.var_index.get, names)
+        if None in cols:
+            cols = [self.var(name) if col is None else col for col, name in zip(cols, names)]
+        if coeffs is None:
+            coeffs = [1.0] * len(cols)
+        if len(set(cols)) < len(cols):
+            merged = {}
+            for col, coeff in zip(cols, coeffs):
+                merged[col] = merged.get(col, 0.0) + coeff
+            cols = sorted(merged)
+            coeffs = [merged[col] for col in cols]
+
+        row_cols = self.row_cols
+        row_cols.extend(cols)
+        self.row_vals.extend(coeffs)
+        self.row_starts.append(len(row_cols))
+        self.row_senses.append(sense)
+        self.row_rhs.append(rhs)
+        self.row_kinds.append(kind)
+
+        return len(self.row_senses) - 1
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def add_comment(self, txt):
+        """Attaches a comment to the next row. Comments only appear in the LP file.
+
+        Parameters
+        ----------
+        txt : str
+            Comment.
+
+        Returns
+        -------
+        None
+        """
+
+        row = len(self.row_senses)
+        try:
+            self.comments[row].append(txt)
+        except:
+            self.comments.update({row : [txt]})
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def is_int(self, index):
+        """Checks if a variable is integral.
+
+        Parameters
+        ----------
+        index : int
+            Variable id.
+
+        Returns
+        -------
+        bool
+            True if binary or general and the model is not relaxed, else False.
+        """
+
+        return not self.relax and self.var_types[index] != CONTINUOUS
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def get_csr(self):
+        """Returns the constraint matrix in compressed sparse row form.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        numpy.ndarray
+            Row starts.
+        numpy.ndarray
+            Column ids.
+        numpy.ndarray
+            Coefficients.
+        """
+
+        return numpy.array(self.row_starts, dtype = numpy.int32), numpy.array(self.row_cols, dtype = numpy.int32),\
+               numpy.array(self.row_vals, dtype = numpy.float64)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def get_row_bounds(self):
+        """Returns the lower and upper bounds of the rows.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        numpy.ndarray
+            Lower bounds.
+        numpy.ndarray
+            Upper bounds.
+        """
+
+        senses = numpy.array(self.row_senses)
+        rhs = numpy.array(self.row_rhs, dtype = numpy.float64)
+
+        return numpy.where(senses == LE, -INF, rhs), numpy.where(senses == GE, INF, rhs)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def get_objective(self):
+        """Returns the dense objective vector.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        numpy.ndarray
+            Objective coefficients of all variables.
+        """
+
+        cost = numpy.zeros(len(self.var_names))
+        numpy.add.at(cost, numpy.array(self.obj_cols, dtype = numpy.int64), self.obj_vals)
+
+        return cost
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def report(self):
+        """Prints the size of the model.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+
+        kinds = numpy.bincount(numpy.array(self.row_kinds, dtype = numpy.int64), minlength = 3)
+        types = numpy.bincount(numpy.array(self.var_types, dtype = numpy.int64), minlength = 3)
+        print "Model: %d variables (%d binary, %d general), %d constraints (%d user cuts, %d lazy), %d nonzeros"\
+              % (len(self.var_names), types[BINARY], types[GENERAL], len(self.row_senses), kinds[USER_CUT],\
+                 kinds[LAZY], len(self.row_cols))
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def write_lp(self, filename, chunk_size = 65536):
+        """Writes the model in CPLEX LP format, in a single buffered pass.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the output file.
+        chunk_size : Optional[int], default = 65536
+            Number of lines buffered before they are handed to the file.
+
+        Returns
+        -------
+        List[str]
+            Variable names in the order in which CPLEX indexes the columns
+            (that of the first appearance in the file).
+        """
+
+        names = self.var_names
+        plus = ["+ " + name for name in names]
+        minus = ["- " + name for name in names]
+
+        #........................................................................#
+        def format_terms(cols, vals):
+            """Formats the individual terms of a linear expression.
+
+            Parameters
+            ----------
+            cols : List[int]
+                Variable ids.
+            vals : List[float]
+                Coefficients.
+
+            Returns
+            -------
+            List[str]
+                Terms.
+            """
+
+            return [plus[col] if val == 1 else minus[col] if val == -1\
+                    else "- %.10g %s" % (-val, names[col]) if val < 0\
+                    else "+ %.10g %s" % (val, names[col]) for col, val in zip(cols, vals)]
+        #........................................................................#
+
+        kinds = numpy.array(self.row_kinds, dtype = numpy.int8)
+        types = numpy.array(self.var_types, dtype = numpy.int8)
+        bounded = numpy.array(sorted(self.bounded), dtype = numpy.int_)
+        if self.relax:
+            bounded = numpy.union1d(bounded, numpy.flatnonzero(types == BINARY))
+
+        #CPLEX numbers the columns in the order of their first appearance in the file.
+        row_cols = numpy.array(self.row_cols, dtype = numpy.int_)
+        if numpy.any(kinds != CONSTRAINT):
+            nz_kinds = numpy.repeat(kinds, numpy.diff(numpy.array(self.row_starts, dtype = numpy.int_)))
+            row_cols = row_cols[numpy.argsort(nz_kinds, kind = "mergesort")]
+        appearances = [numpy.array(self.obj_cols, dtype = numpy.int_), row_cols, bounded]
+        if not self.relax:
+            appearances += [numpy.flatnonzero(types == BINARY), numpy.flatnonzero(types == GENERAL)]
+        cols, first = numpy.unique(numpy.concatenate(appearances), return_index = True)
+        order = cols[numpy.argsort(first)]
+
+        with open(filename, "w") as outf:
+            buf = ["Maximize" if self.maximize else "Minimize",\
+                   " obj: " + ' '.join(format_terms(self.obj_cols, self.obj_vals))]
+
+            starts = self.row_starts
+            terms = format_terms(self.row_cols, self.row_vals)
+            senses = [SENSE_SYMBOLS[sense] for sense in self.row_senses]
+            rhs = self.row_rhs
+            for kind, header, label in ((CONSTRAINT, "Subject To", 'C'), (USER_CUT, "User Cuts", 'U'),\
+                                        (LAZY, "Lazy Constraints", 'L')):
+                rows = numpy.flatnonzero(kinds == kind).tolist()
+                if not rows and kind != CONSTRAINT:
+                    continue
+                buf.append(header)
+                for first_row in range(0, len(rows), chunk_size):
+                    chunk = rows[first_row:first_row + chunk_size]
+                    lines = ["%s%d: %s %s %.10g" % (label, rcnt, ' '.join(terms[starts[r]:starts[r + 1]]), senses[r], rhs[r])\
+                             for rcnt, r in enumerate(chunk, first_row)]
+                    if self.comments:
+                        commented = []
+                        for r, line in zip(chunk, lines):
+                            commented += ["\\ %s" % comment for comment in self.comments.get(r, [])]
+                            commented.append(line)
+                        lines = commented
+                    buf += lines
+                    outf.write("\n".join(buf) + "\n")
+                    buf = []
+
+            if len(bounded):
+                buf.append("Bounds")
+                buf += ["%.10g <= %s <= %.10g" % (self.lb[i], names[i], self.ub[i]) for i in bounded.tolist()]
+            if not self.relax:
+                for var_type, header in ((BINARY, "Binary"), (GENERAL, "General")):
+                    cols = numpy.flatnonzero(types == var_type).tolist()
+                    if cols:
+                        buf.append(header)
+                        buf += [names[i] for i in cols]
+            buf.append("End\n")
+            outf.write("\n".join(buf))
+
+        return [names[i] for i in order.tolist()]
+    #------------------------------------------------------------------------#
+##########################################################################
+
+##########################################################################
+class MILPSolution(object):
+    """Solution returned by a solver backend.
+
+    Parameters
+    ----------
+    status : str
+        Solver status.
+    values : Dict[str, float]
+        Nonzero variable values. Empty if no solution was found.
+    objective : Optional[float], default = None
+        Objective value.
+    """
+
+    #------------------------------------------------------------------------#
+    def __init__(self, status, values, objective = None):
+        """Constructor of the MILPSolution class.
+        """
+
+        self.status = status
+        self.values = values
+        self.objective = objective
+    #------------------------------------------------------------------------#
+##########################################################################
+
+##########################################################################
+def is_one(val):
+    """Checks if a solution value is one, the way it is displayed by CPLEX.
+
+    Parameters
+    ----------
+    val : float
+        Value.
+
+    Returns
+    -------
+    bool
+        True if the value is one within the integrality tolerance, else False.
+    """
+
+    return abs(val - 1.0) < 1e-6
+##########################################################################
+
+##########################################################################
+def parse_cplex_log(filename):
+    """Reads the variable values from a CPLEX log with a displayed solution.
+
+    Parameters
+    ----------
+    filename : str
+        Log file name.
+
+    Returns
+    -------
+    Dict[str, float]
+        Displayed (nonzero) variable values.
+
+    Raises
+    ------
+    IOError
+        If the log does not exist.
+    """
+
+    values = {}
+    with open(filename, "r") as inf:
+        lines = inf.readlines()
+
+    rd = False
+    for line in lines:
+        if not line or line.isspace():
+            continue
+        if line.startswith("Variable Name"):
+            rd = True
+            continue
+        if not rd:
+            continue
+        words = line.split()
+        if len(words) < 2:
+            continue
+        try:
+            values.update({words[0] : float(words[-1])})
+        except ValueError:
+            continue
+
+    return values
+##########################################################################
+
+##########################################################################
+def get_cplex_status(filename):
+    """Determines if a CPLEX log holds a displayed solution.
+
+    Parameters
+    ----------
+    filename : str
+        Log file name.
+
+    Returns
+    -------
+    str
+        >>solved<< if a solution was displayed (including one with all variables at zero),
+        otherwise the last status line reported by CPLEX, or >>no log<< if there is no log.
+    """
+
+    if not os.path.exists(filename):
+        return "no log"
+
+    with open(filename, "r") as inf:
+        lines = inf.readlines()
+
+    status = "no solution"
+    for line in lines:
+        if line.startswith("Variable Name") or (line.startswith("All ") and " are 0" in line):
+            return "solved"
+        if line.startswith("MIP - ") or " simplex - " in line or line.startswith("CPLEX Error"):
+            status = line.strip()
+
+    return status
+##########################################################################
+
+##########################################################################
+def read_mst(filename):
+    """Reads a CPLEX MIP start file.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the file.
+
+    Returns
+    -------
+    Dict[str, float]
+        Stored variable values. None if the file does not exist.
+    """
+
+    if not os.path.exists(filename):
+        return None
+
+    get_name = lambda line : line.split("name=\"", 1)[1].split('"', 1)[0]
+    get_value = lambda line : line.split("value=\"", 1)[1].split('"', 1)[0]
+    with open(filename, "r") as inf:
+        lines = inf.readlines()
+
+    values = {}
+    for line in lines:
+        if not "<variable " in line:
+            continue
+        values.update({get_name(line) : float(get_value(line))})
+
+    return values
+##########################################################################
+
+##########################################################################
+def write_mst(filename, values, integer_vars = None):
+    """Writes a CPLEX MIP start file.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the file.
+    values : Dict[str, float]
+        Variable values.
+    integer_vars : Optional[Set[str]], default = None
+        If given, only these variables are written, as with CPLEX's writelevel 4.
+
+    Returns
+    -------
+    None
+    """
+
+    txt = "<?xml version = \"1.0\" encoding=\"UTF-8\" standalone=\"yes\"?>\n"
+    txt += "<CPLEXSolutions version=\"1.2\">\n <CPLEXSolution version=\"1.2\">\n  <variables>\n"
+    for index, name in enumerate(sorted(values)):
+        if integer_vars is not None and not name in integer_vars:
+            continue
+        txt += "   <variable name=\"%s\" index=\"%d\" value=\"%.17g\"/>\n" % (name, index, values[name])
+    txt += "  </variables>\n </CPLEXSolution>\n</CPLEXSolutions>\n"
+
+    with open(filename, "w") as outf:
+        outf.write(txt)
+##########################################################################
+
+##########################################################################
+def repair_mst_indices(var_order, mst_file):
+    """Repairs the indices of the variables in the mst file, so that they conform
+    to the new indices in the problem file.
+
+    Parameters
+    ----------
+    var_order : List[str]
+        Variables of the new problem, in the order of their column indices.
+    mst_file : str
+        Name of the stored solution file.
+
+    Returns
+    -------
+    None
+    """
+
+    clean = {v : vcnt for vcnt, v in enumerate(var_order)}
+
+    get_index = lambda line : line.split("index=\"", 1)[1].split('"', 1)[0]
+    get_name = lambda line : line.split("name=\"", 1)[1].split('"', 1)[0]
+    get_value = lambda line : line.split("value=\"", 1)[1].split('"', 1)[0]
+    with open(mst_file, "r") as inf:
+        lines = inf.readlines()
+    txt = ""
+    for line in lines:
+        try:
+            index = get_index(line)
+        except:
+            txt += line
+            continue
+        try:
+            line = line.replace(" index=\"%s\" " % index, " index=\"%d\" " % clean[get_name(line)])
+        except:
+            continue
+        line = line.replace(" value=\"%s\"" % get_value(line), " value=\"1\"")
+        txt += line
+
+    with open(mst_file, "w") as outf:
+        outf.write(txt)
+##########################################################################
+
+##########################################################################
+class CplexCLISolver(object):
+    """Solves the problem by calling the interactive CPLEX binary.
+
+    Parameters
+    ----------
+    cplex_path : Optional[str], default = "cplex"
+        Path to the CPLEX binary.
+    threads : Optional[int], default = 0
+        Number of threads. Zero leaves the choice to CPLEX.
+    time_limit : Optional[float], default = 3600
+        Time limit in seconds.
+    prefix : Optional[str], default = "prob"
+        Prefix of the problem (.lp), MIP start (.mst), and log (.log) files.
+
+    Notes
+    -----
+    The MIP start file persists between solver calls and processes. An in-memory
+    warm start replaces it; as with the files CPLEX writes itself, only the variables
+    set to one are kept. Either way, the variable indices are updated to match the new problem.
+    """
+
+    #------------------------------------------------------------------------#
+    def __init__(self, cplex_path = "cplex", threads = 0, time_limit = 3600, prefix = "prob"):
+        """Constructor of the CplexCLISolver class.
+        """
+
+        self.cplex_path = cplex_path
+        self.threads = threads
+        self.time_limit = time_limit
+        self.lp_filename = prefix + ".lp"
+        self.mst_filename = prefix + ".mst"
+        self.log_filename = prefix + ".log"
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def solve(self, problem, warm_start = None):
+        """Solves the problem.
+
+        Parameters
+        ----------
+        problem : object
+            Problem exposing >>write_problem<<, which returns the column order.
+        warm_start : Optional[Dict[str, float]], default = None
+            Initial solution.
+
+        Returns
+        -------
+        MILPSolution
+            Solution.
+        """
+
+        var_order = problem.write_problem(self.lp_filename)
+
+        call = "%s -c \"set timelimit %d\" " % (self.cplex_path, self.time_limit)
+        if self.threads > 0:
+            call += "\"set threads %d\" " % self.threads
+
+        #Optional:
+        #call += "\" set mip interval 1\" "
+        #call += "\" set mip strategy search 1\" "
+        #call += "\" set mip strategy heuristicfreq -1\" "
+        #call += "\" set mip strategy variableselect 4\" "
+        #call += "\" set mip strategy startalgorithm 4\" "
+        #call += "\" set mip strategy subalgorithm 4\" "
+        ###
+
+        call += "\"read %s\" " % self.lp_filename
+        call += "\"read %s\" " % self.mst_filename
+        call += "\"optimize\" \"set logfile %s\" " % self.log_filename
+        call += "\"display solution variables *\" "
+        call += "\"set output writelevel 4\" "
+        call += "\"write %s\" " % self.mst_filename
+        call += "\"quit\" "
+
+        if warm_start is not None:
+            write_mst(self.mst_filename, {v : val for v, val in warm_start.items() if is_one(val)})
+        try:
+            repair_mst_indices(var_order, self.mst_filename)
+        except:
+            pass
+
+        #NOTE: CPLEX appends to an existing log, so a stale one could pass for a fresh solution.
+        if os.path.exists(self.log_filename):
+            os.remove(self.log_filename)
+
+        os.system(call)
+
+        status = get_cplex_status(self.log_filename)
+        if status != "solved":
+            return MILPSolution(status, {})
+
+        return MILPSolution(status, parse_cplex_log(self.log_filename))
+    #------------------------------------------------------------------------#
+##########################################################################
+
+##########################################################################
+def load_cbc_library(cbc_lib = None):
+    """Loads the C interface of CBC and declares the signatures of the used functions.
+
+    Parameters
+    ----------
+    cbc_lib : Optional[str], default = None
+        Path to the shared library (e.g., libCbcSolver.so). If None,
+        the library is searched for on the system library path.
+
+    Returns
+    -------
+    ctypes.CDLL
+        Library handle.
+
+    Raises
+    ------
+    ValueError
+        If the library cannot be found or loaded.
+    """
+
+    if not cbc_lib:
+        for name in ("CbcSolver", "Cbc"):
+            cbc_lib = ctypes.util.find_library(name)
+            if cbc_lib:
+                break
+    if not cbc_lib:
+        print "CBC C library not found. Set cbc_lib in the configuration."
+        raise ValueError
+    try:
+        lib = ctypes.CDLL(cbc_lib)
+    except OSError:
+        print "Could not load the CBC C library %s." % cbc_lib
+        raise ValueError
+
+    c_int_p = ctypes.POINTER(ctypes.c_int)
+    c_double_p = ctypes.POINTER(ctypes.c_double)
+    model = ctypes.c_void_p
+    signatures = {\
+                  "Cbc_newModel" : (model, []),\
+                  "Cbc_deleteModel" : (None, [model]),\
+                  "Cbc_loadProblem" : (None, [model, ctypes.c_int, ctypes.c_int, c_int_p, c_int_p, c_double_p,\
+                                              c_double_p, c_double_p, c_double_p, c_double_p, c_double_p]),\
+                  "Cbc_setInteger" : (None, [model, ctypes.c_int]),\
+                  "Cbc_addLazyConstraint" : (None, [model, ctypes.c_int, c_int_p, c_double_p, ctypes.c_char,\
+                                                    ctypes.c_double]),\
+                  "Cbc_addCutCallback" : (None, [model, CBC_CUT_CALLBACK, ctypes.c_char_p, ctypes.c_void_p,\
+                                                 ctypes.c_int, ctypes.c_char]),\
+                  "Cbc_setMIPStartI" : (None, [model, ctypes.c_int, c_int_p, c_double_p]),\
+                  "Cbc_setParameter" : (None, [model, ctypes.c_char_p, ctypes.c_char_p]),\
+                  "Cbc_setMaximumSeconds" : (None, [model, ctypes.c_double]),\
+                  "Cbc_setLogLevel" : (None, [model, ctypes.c_int]),\
+                  "Cbc_solve" : (ctypes.c_int, [model]),\
+                  "Cbc_isAbandoned" : (ctypes.c_int, [model]),\
+                  "Cbc_isProvenOptimal" : (ctypes.c_int, [model]),\
+                  "Cbc_isProvenInfeasible" : (ctypes.c_int, [model]),\
+                  "Cbc_isSecondsLimitReached" : (ctypes.c_int, [model]),\
+                  "Cbc_numberSavedSolutions" : (ctypes.c_int, [model]),\
+                  "Cbc_bestSolution" : (c_double_p, [model]),\
+                  "Cbc_getColSolution" : (c_double_p, [model]),\
+                  "Osi_getNumCols" : (ctypes.c_int, [ctypes.c_void_p]),\
+                  "Osi_getColSolution" : (c_double_p, [ctypes.c_void_p]),\
+                  "OsiCuts_addRowCut" : (None, [ctypes.c_void_p, ctypes.c_int, c_int_p, c_double_p, ctypes.c_char,\
+                                                ctypes.c_double]),\
+                 }
+    for func, (restype, argtypes) in signatures.items():
+        getattr(lib, func).restype = restype
+        getattr(lib, func).argtypes = argtypes
+
+    return lib
+##########################################################################
+
+##########################################################################
+def int_p(a):
+    """Returns a C pointer to the data of an int32 array.
+
+    Parameters
+    ----------
+    a : numpy.ndarray
+        Array.
+
+    Returns
+    -------
+    ctypes.POINTER(ctypes.c_int)
+        Pointer.
+    """
+
+    return a.ctypes.data_as(ctypes.POINTER(ctypes.c_int))
+##########################################################################
+
+##########################################################################
+def double_p(a):
+    """Returns a C pointer to the data of a float64 array.
+
+    Parameters
+    ----------
+    a : numpy.ndarray
+        Array.
+
+    Returns
+    -------
+    ctypes.POINTER(ctypes.c_double)
+        Pointer.
+    """
+
+    return a.ctypes.data_as(ctypes.POINTER(ctypes.c_double))
+##########################################################################
+
+##########################################################################
+def get_row_activities(starts, cols, vals, x):
+    """Computes the left-hand sides of rows stored in compressed sparse row form.
+
+    Parameters
+    ----------
+    starts : numpy.ndarray
+        Row starts.
+    cols : numpy.ndarray
+        Column ids.
+    vals : numpy.ndarray
+        Coefficients.
+    x : numpy.ndarray
+        Variable values.
+
+    Returns
+    -------
+    numpy.ndarray
+        Row activities.
+    """
+
+    rows = numpy.repeat(numpy.arange(len(starts) - 1), numpy.diff(starts))
+
+    return numpy.bincount(rows, weights = vals * x[cols], minlength = len(starts) - 1)
+##########################################################################
+
+##########################################################################
+class CbcSolver(object):
+    """Solves the problem in-process, through the C interface of the open-source CBC solver.
+
+    Parameters
+    ----------
+    cbc_lib : Optional[str], default = None
+        Path to the CBC C library. If None, it is searched for on the system library path.
+    threads : Optional[int], default = 0
+        Number of threads. Zero leaves the choice to CBC.
+    time_limit : Optional[float], default = 3600
+        Time limit in seconds.
+    verbose : Optional[bool], default = True
+        Specifies that CBC should print its log.
+
+    Notes
+    -----
+    The model is handed over from MILPModel's arrays, without any files. Ordinary rows
+    are loaded into the problem matrix, lazy constraints are passed to CBC's lazy
+    constraint pool, which checks them only on integer solutions, and user cuts are
+    separated from the current LP solution by a cut callback.
+
+    As with the CPLEX backend, only the integer variables of a warm start are used.
+    CBC completes a partial MIP start without regard to the lazy constraints, so the
+    continuous variables are completed here, by an LP in which the integer variables are
+    fixed and all rows are ordinary. If the LP is infeasible, the start is dropped.
+    When CBC finds nothing better than the start, it reports the problem as infeasible
+    and returns no solution, in which case the completed start is returned.
+    """
+
+    #------------------------------------------------------------------------#
+    def __init__(self, cbc_lib = None, threads = 0, time_limit = 3600, verbose = True):
+        """Constructor of the CbcSolver class.
+        """
+
+        self.lib = load_cbc_library(cbc_lib)
+        self.threads = threads
+        self.time_limit = time_limit
+        self.verbose = verbose
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def load_rows(self, model, row_kinds, col_lb, col_ub, integer = True):
+        """Creates a CBC model holding the rows of the specified kinds as ordinary rows.
+
+        Parameters
+        ----------
+        model : MILPModel
+            Model.
+        row_kinds : Tuple[int]
+            Kinds of the rows to be loaded.
+        col_lb : numpy.ndarray
+            Lower bounds of the variables.
+        col_ub : numpy.ndarray
+            Upper bounds of the variables.
+        integer : Optional[bool], default = True
+            Specifies that the integer variables should be declared as such.
+
+        Returns
+        -------
+        int
+            Pointer to the CBC model.
+
+        Notes
+        -----
+        CBC mixes up the sign of the MIP start's objective when maximizing,
+        so the objective is negated instead of setting the sense.
+        """
+
+        lib = self.lib
+        col_cnt = len(model.var_names)
+
+        starts, cols, vals = model.get_csr()
+        row_lb, row_ub = model.get_row_bounds()
+        selected = numpy.in1d(numpy.array(model.row_kinds, dtype = numpy.int8), row_kinds)
+        lengths = numpy.diff(starts)
+        nz = numpy.repeat(selected, lengths)
+        nz_rows = (numpy.cumsum(selected) - 1)[numpy.repeat(numpy.arange(len(selected)), lengths)[nz]]
+
+        #Transpose to the compressed sparse column form that CBC loads:
+        order = numpy.argsort(cols[nz], kind = "mergesort")
+        col_starts = numpy.zeros(col_cnt + 1, dtype = numpy.int32)
+        col_starts[1:] = numpy.cumsum(numpy.bincount(cols[nz], minlength = col_cnt))
+        col_rows = nz_rows[order].astype(numpy.int32)
+        col_vals = vals[nz][order]
+
+        obj = model.get_objective()
+        if model.maximize:
+            obj = -obj
+        col_lb = numpy.ascontiguousarray(col_lb, dtype = numpy.float64)
+        col_ub = numpy.ascontiguousarray(col_ub, dtype = numpy.float64)
+        sub_lb = numpy.ascontiguousarray(row_lb[selected])
+        sub_ub = numpy.ascontiguousarray(row_ub[selected])
+
+        cbc = lib.Cbc_newModel()
+        lib.Cbc_loadProblem(cbc, col_cnt, len(sub_lb), int_p(col_starts), int_p(col_rows), double_p(col_vals),\
+                            double_p(col_lb), double_p(col_ub), double_p(obj), double_p(sub_lb), double_p(sub_ub))
+        if integer:
+            for i in range(col_cnt):
+                if model.is_int(i):
+                    lib.Cbc_setInteger(cbc, i)
+
+        return cbc
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def complete_start(self, model, warm_start, tol = 1e-6):
+        """Completes the integer part of a warm start to a full solution vector.
+
+        Parameters
+        ----------
+        model : MILPModel
+            Model.
+        warm_start : Dict[str, float]
+            Initial solution. Missing integer variables are zero and unknown ones are ignored.
+        tol : Optional[float], default = 1e-6
+            Feasibility tolerance.
+
+        Returns
+        -------
+        numpy.ndarray
+            Variable values, or None if the integer variables violate their bounds or
+            integrality, or no values of the continuous variables satisfy all rows (of any kind).
+        """
+
+        lib = self.lib
+        col_cnt = len(model.var_names)
+        ints = numpy.array([model.is_int(i) for i in range(col_cnt)], dtype = bool)
+        col_lb = numpy.array(model.lb, dtype = numpy.float64)
+        col_ub = numpy.array(model.ub, dtype = numpy.float64)
+
+        x = numpy.zeros(col_cnt)
+        for v, val in warm_start.items():
+            try:
+                x[model.var_index[v]] = val
+            except KeyError:
+                continue
+        x[~ints] = 0.0
+
+        if numpy.any(numpy.abs(x[ints] - numpy.round(x[ints])) > tol):
+            return None
+        x[ints] = numpy.round(x[ints])
+        if numpy.any(x[ints] < col_lb[ints] - tol) or numpy.any(x[ints] > col_ub[ints] + tol):
+            return None
+
+        if ints.all():
+            starts, cols, vals = model.get_csr()
+            row_lb, row_ub = model.get_row_bounds()
+            act = get_row_activities(starts, cols, vals, x)
+            if numpy.any(act < row_lb - tol) or numpy.any(act > row_ub + tol):
+                return None
+
+            return x
+
+        col_lb[ints] = x[ints]
+        col_ub[ints] = x[ints]
+        cbc = self.load_rows(model, (CONSTRAINT, USER_CUT, LAZY), col_lb, col_ub, integer = False)
+        lib.Cbc_setLogLevel(cbc, 0)
+        lib.Cbc_solve(cbc)
+        if lib.Cbc_isProvenOptimal(cbc):
+            x = numpy.ctypeslib.as_array(lib.Cbc_getColSolution(cbc), shape = (col_cnt, )).copy()
+        else:
+            x = None
+        lib.Cbc_deleteModel(cbc)
+
+        return x
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def solve(self, problem, warm_start = None):
+        """Solves the problem.
+
+        Parameters
+        ----------
+        problem : object
+            Problem exposing >>get_model<<.
+        warm_start : Optional[Dict[str, float]], default = None
+            Initial solution.
+
+        Returns
+        -------
+        MILPSolution
+            Solution.
+        """
+
+        lib = self.lib
+        model = problem.get_model()
+        col_cnt = len(model.var_names)
+
+        start = None
+        if warm_start:
+            start = self.complete_start(model, warm_start)
+            if start is None:
+                print "The warm start violates the model and is not used."
+
+        starts, cols, vals = model.get_csr()
+        row_lb, row_ub = model.get_row_bounds()
+        kinds = numpy.array(model.row_kinds, dtype = numpy.int8)
+        lengths = numpy.diff(starts)
+
+        cbc = self.load_rows(model, (CONSTRAINT, ), model.lb, model.ub)
+
+        senses = ('L', 'G', 'E')
+        for r in numpy.flatnonzero(kinds == LAZY).tolist():
+            row_cols = cols[starts[r]:starts[r + 1]]
+            row_vals = vals[starts[r]:starts[r + 1]]
+            lib.Cbc_addLazyConstraint(cbc, len(row_cols), int_p(row_cols), double_p(row_vals),\
+                                      senses[model.row_senses[r]], model.row_rhs[r])
+
+        cut_rows = numpy.flatnonzero(kinds == USER_CUT)
+        if len(cut_rows):
+            nz_cut = numpy.repeat(kinds == USER_CUT, lengths)
+            cut_starts = numpy.zeros(len(cut_rows) + 1, dtype = numpy.int32)
+            cut_starts[1:] = numpy.cumsum(lengths[cut_rows])
+            cut_cols = cols[nz_cut]
+            cut_vals = vals[nz_cut]
+            cut_lb = row_lb[cut_rows]
+            cut_ub = row_ub[cut_rows]
+
+            #........................................................................#
+            def separate_cuts(osi, cuts, app_data, depth, pass_no):
+                """Adds the user cuts violated by the current LP solution.
+
+                Parameters
+                ----------
+                osi : int
+                    Pointer to the LP solver.
+                cuts : int
+                    Pointer to the cut pool.
+                app_data : int
+                    Unused.
+                depth : int
+                    Depth of the current node.
+                pass_no : int
+                    Cut pass at the current node.
+
+                Returns
+                -------
+                None
+                """
+
+                if lib.Osi_getNumCols(osi) != col_cnt:
+                    return
+                x = numpy.ctypeslib.as_array(lib.Osi_getColSolution(osi), shape = (col_cnt, ))
+                act = get_row_activities(cut_starts, cut_cols, cut_vals, x)
+                for c in numpy.flatnonzero((act < cut_lb - 1e-6) | (act > cut_ub + 1e-6)).tolist():
+                    r = cut_rows[c]
+                    lib.OsiCuts_addRowCut(cuts, int(lengths[r]), int_p(cut_cols[cut_starts[c]:]),\
+                                          double_p(cut_vals[cut_starts[c]:]), senses[model.row_senses[r]],\
+                                          model.row_rhs[r])
+            #........................................................................#
+
+            #NOTE: The callback object must outlive the solve.
+            cut_callback = CBC_CUT_CALLBACK(separate_cuts)
+            lib.Cbc_addCutCallback(cbc, cut_callback, "UserCuts", None, 1, '\0')
+            #NOTE: The callback sees the columns of the original problem only if it is not preprocessed.
+            lib.Cbc_setParameter(cbc, "preprocess", "off")
+
+        if start is not None:
+            start_cols = numpy.arange(col_cnt, dtype = numpy.int32)
+            lib.Cbc_setMIPStartI(cbc, col_cnt, int_p(start_cols), double_p(start))
+
+        lib.Cbc_setLogLevel(cbc, 1 if self.verbose else 0)
+        lib.Cbc_setMaximumSeconds(cbc, self.time_limit)
+        if self.threads > 0:
+            lib.Cbc_setParameter(cbc, "threads", str(self.threads))
+
+        lib.Cbc_solve(cbc)
+
+        #NOTE: After an infeasible LP relaxation, >>Cbc_bestSolution<< still points to the last LP solution.
+        x = None
+        best = lib.Cbc_bestSolution(cbc)
+        found = not lib.Cbc_isAbandoned(cbc) and not lib.Cbc_isProvenInfeasible(cbc)\
+                and (lib.Cbc_isProvenOptimal(cbc) or lib.Cbc_numberSavedSolutions(cbc) > 0)
+        if found and best:
+            x = numpy.ctypeslib.as_array(best, shape = (col_cnt, )).copy()
+        elif start is not None and not lib.Cbc_isAbandoned(cbc):
+            x = start
+        if x is None:
+            if lib.Cbc_isProvenInfeasible(cbc):
+                status = "infeasible"
+            elif lib.Cbc_isSecondsLimitReached(cbc):
+                status = "time limit reached without a solution"
+            elif lib.Cbc_isAbandoned(cbc):
+                status = "abandoned"
+            else:
+                status = "no solution"
+            lib.Cbc_deleteModel(cbc)
+
+            return MILPSolution(status, {})
+        lib.Cbc_deleteModel(cbc)
+
+        values = {}
+        for i, val in enumerate(x.tolist()):
+            if model.is_int(i):
+                val = round(val)
+            if abs(val) > 1e-9:
+                values.update({model.var_names[i] : val})
+
+        return MILPSolution("solved", values, float(numpy.dot(model.get_objective(), x)))
+    #------------------------------------------------------------------------#
+##########################################################################
+
+##########################################################################
+def get_solver(name, cplex_path = "cplex", cbc_lib = None, threads = 0, time_limit = 3600):
+    """Constructs a solver backend.
+
+    Parameters
+    ----------
+    name : str
+        Backend name: >>cplex<< or >>cbc<<.
+    cplex_path : Optional[str], default = "cplex"
+        Path to the CPLEX binary.
+    cbc_lib : Optional[str], default = None
+        Path to the CBC C library. If None, it is searched for on the system library path.
+    threads : Optional[int], default = 0
+        Number of threads. Zero leaves the choice to the solver.
+    time_limit : Optional[float], default = 3600
+        Time limit in seconds.
+
+    Returns
+    -------
+    object
+        Solver exposing >>solve(problem, warm_start)<<.
+    """
+
+    if name == "cplex":
+        return CplexCLISolver(cplex_path = cplex_path, threads = threads, time_limit = time_limit)
+    if name == "cbc":
+        return CbcSolver(cbc_lib = cbc_lib, threads = threads, time_limit = time_limit)
+
+    print "Unknown MILP solver: %s" % name
+    raise ValueError
+##########################################################################
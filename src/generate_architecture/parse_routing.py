@@ -1,8 +1,211 @@
 """Parses the final routing and converts it into a Networkx graph.
 """
 
+import os
+import re
 import copy
+import numpy
+import cPickle
 import networkx as nx
+import sys
+sys.path.insert(0,'..')
+
+import rr_binary
+import artifact_store
+
+TIMING_CONTEXT_FILENAME = "timing_context.pkl"
+#File in which the parsed timing inputs are kept between calls to >>fetch_timing_data<<.
+
+ROUTE_NODE_TYPES = ("SOURCE", "SINK", "OPIN", "IPIN", "CHANX", "CHANY")
+#Types of rr-nodes appearing in the .route files. Route trees store positions in this tuple.
+
+LOC_RE = re.compile(r"\((\d+),(\d+)")
+#Matches the (first) coordinates of a node in a .route file.
+
+ATTR_RE = re.compile(r'(\w+)="([^"]*)"')
+#Matches the attributes of an XML tag in a .net file.
+
+##########################################################################
+def iter_global_routing(filename):
+    """Streams a .route global routing file, one net at a time.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the .route file.
+
+    Yields
+    ------
+    str
+        Name of the net.
+    List[str]
+        Lines of its route tree.
+    """
+
+    net = None
+    lines = []
+    with open(filename, "r") as inf:
+        for line in inf:
+            if line.startswith("Net"):
+                if net is not None:
+                    yield net, lines
+                net = line.split('(', 1)[1].split(')', 1)[0]
+                lines = [line]
+            elif net is not None:
+                lines.append(line)
+    if net is not None:
+        yield net, lines
+##########################################################################
+
+##########################################################################
+class RouteTree(object):
+    """Route tree of a single net, stored in flat arrays.
+
+    Parameters
+    ----------
+    nodes : List[int]
+        Ids of the rr-nodes, in the order of their first appearance.
+    parents : List[int]
+        Position of the parent of each node. -1 for the source.
+    switches : List[int]
+        Id of the switch driving each node.
+    types : List[int]
+        Type of each node, as a position in >>ROUTE_NODE_TYPES<<.
+    locs : List[Tuple[int]]
+        Coordinates of each node.
+    pins : List[str]
+        Pin of each IPIN and OPIN node. None for the other nodes.
+    last_switch : int
+        Switch of the last line of the net, passed on to the source of the next one.
+
+    Notes
+    -----
+    A node that reappears in the .route file (a branching point) is stored only once.
+    The edges of the tree are numbered in the order in which their sinks appear.
+    """
+
+    #------------------------------------------------------------------------#
+    def __init__(self, nodes, parents, switches, types, locs, pins, last_switch):
+        """Constructor of the RouteTree class.
+        """
+
+        self.nodes = numpy.array(nodes, dtype = numpy.int64)
+        self.parents = numpy.array(parents, dtype = numpy.int32)
+        self.switches = numpy.array(switches, dtype = numpy.int32)
+        self.types = numpy.array(types, dtype = numpy.int8)
+        self.locs = numpy.array(locs, dtype = numpy.int32).reshape(-1, 2)
+        self.pins = pins
+        self.last_switch = last_switch
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def __len__(self):
+        """Returns the number of nodes.
+        """
+
+        return self.nodes.size
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def node_attrs(self, i):
+        """Returns the attributes of a node in the form used by the routing netlist.
+
+        Parameters
+        ----------
+        i : int
+            Position of the node.
+
+        Returns
+        -------
+        Dict[str, object]
+            Attributes of the node.
+        """
+
+        return {"node_type" : ROUTE_NODE_TYPES[self.types[i]],\
+                "node_loc" : (int(self.locs[i, 0]), int(self.locs[i, 1])),\
+                "node_pin" : self.pins[i],\
+                "node_switch" : int(self.switches[i])}
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def edges(self):
+        """Returns the edges of the tree.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        List[Tuple[int]]
+            Positions of the parent and the child, and the edge number.
+        """
+
+        children = numpy.flatnonzero(self.parents >= 0)
+
+        return zip(self.parents[children].tolist(), children.tolist(), range(children.size))
+    #------------------------------------------------------------------------#
+##########################################################################
+
+##########################################################################
+def parse_route_tree(lines, prev_switch = -1):
+    """Parses the route tree of a single net.
+
+    Parameters
+    ----------
+    lines : List[str]
+        Lines of the net, as returned by >>iter_global_routing<<.
+    prev_switch : Optional[int], default = -1
+        Switch of the last node of the previous net.
+
+    Returns
+    -------
+    RouteTree
+        Route tree.
+    int
+        Switch of the last node of this net.
+    """
+
+    positions = {}
+    nodes = []
+    parents = []
+    switches = []
+    types = []
+    locs = []
+    pins = []
+    prev_node = None
+    for lcnt, line in enumerate(lines):
+        if not line.startswith("Node:"):
+            continue
+        words = line.split()
+        node_num = int(words[1])
+        node_switch = int(words[-1])
+        if not node_num in positions:
+            node_type = words[2]
+            if prev_node is None and node_type != "SOURCE":
+                print "No previous node and the current node is not a source."
+                print lcnt, line
+                raise ValueError
+            try:
+                node_type = ROUTE_NODE_TYPES.index(node_type)
+            except ValueError:
+                print "Unknown node type %s." % node_type
+                print lcnt, line
+                raise ValueError
+            loc = LOC_RE.search(line)
+            positions.update({node_num : len(nodes)})
+            nodes.append(node_num)
+            parents.append(-1 if node_type == 0 else positions[prev_node])
+            switches.append(prev_switch)
+            types.append(node_type)
+            locs.append((int(loc.group(1)), int(loc.group(2))))
+            pins.append(words[-3] if node_type in (2, 3) else None)
+        prev_node = node_num
+        prev_switch = node_switch
+        #FIXME: Check this again!
+
+    return RouteTree(nodes, parents, switches, types, locs, pins, prev_switch), prev_switch
+##########################################################################
 
 ##########################################################################
 def parse_global_routing(filename):
@@ -15,54 +218,84 @@ def parse_global_routing(filename):
 
     Returns
     -------
-    Dict[str, nx.DiGraph]
+    Dict[str, RouteTree]
         A dictionary of route trees, indexed by the net names.
     """
 
-    
-
-    with open(filename, "r") as inf:
-        lines = inf.readlines()
-    
     trees = {}
-    net = None
     prev_switch = -1
-    for lcnt, line in enumerate(lines):
-        if line.startswith("Net"):
-            #if trees.get(net, None) is not None:
-                #for e in sorted(trees[net].edges(), key = lambda e : trees[net][e[0]][e[1]]["ecnt"]):
-                #    print e
-                #raw_input()
-            net = line.split('(')[1].split(')')[0]
-            tree = nx.DiGraph()
-            trees.update({net : tree})
-            prev_node = None
-            ecnt = 0
-        elif line.startswith("Node:"):
-            node_num = int(line.split()[1])
-            node_type = line.split()[2]
-            node_loc = (int(line.split('(')[1].split(',')[0]), int(line.split(',')[1].split(')')[0]))
-            node_pin = line.split()[-3] if node_type in ("IPIN", "OPIN") else None
-            node_switch = int(line.split()[-1])
-            if not tree.has_node(node_num):
-                tree.add_node(node_num, node_type = node_type,\
-                                        node_loc = node_loc,\
-                                        node_pin = node_pin,\
-                                        node_switch = prev_switch)
-                if prev_node == None and node_type != "SOURCE":
-                    print "No previous node and the current node is not a source."
-                    print lcnt, line
-                    raise ValueError
-                if node_type != "SOURCE":
-                    tree.add_edge(prev_node, node_num, ecnt = ecnt)
-                    ecnt += 1
-            prev_node = node_num
-            prev_switch = node_switch
-            #FIXME: Check this again!
+    for net, lines in iter_global_routing(filename):
+        tree, prev_switch = parse_route_tree(lines, prev_switch)
+        trees.update({net : tree})
 
     return trees
 ##########################################################################
 
+##########################################################################
+def iter_packed_blocks(filename):
+    """Streams the blocks of a .net packing file.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the packing file.
+
+    Yields
+    ------
+    Dict[str, object]
+        Block record, holding the name, instance, and mode of the block, its first
+        and last line (the start line identifies the block), its depth (lvl), the start
+        of its parent, and its ports as (input|output, port name, pin list) triples.
+
+    Notes
+    -----
+    The file is read in a single pass. The blocks are yielded as they are closed,
+    so children always come before their parents. Only the blocks that are still
+    open are kept in memory.
+    """
+
+    stack = []
+    with open(filename, "r") as inf:
+        for lcnt, line in enumerate(inf):
+            if "<block name=" in line:
+                attrs = dict(ATTR_RE.findall(line))
+                stack.append({"name" : attrs["name"], "instance" : attrs["instance"], "mode" : attrs.get("mode", None),\
+                              "start" : lcnt, "end" : None, "lvl" : len(stack) + 1,\
+                              "parent" : stack[-1]["start"] if stack else None,\
+                              "ports" : [], "state" : "idle"})
+                if "/>" in line:
+                    block = stack.pop(-1)
+                    block["end"] = lcnt
+                    del block["state"]
+                    yield block
+                continue
+            if "</block>" in line:
+                block = stack.pop(-1)
+                block["end"] = lcnt
+                del block["state"]
+                yield block
+                continue
+            if not stack:
+                continue
+            #A block lists its own ports before its children, so they always belong to the innermost open block.
+            block = stack[-1]
+            if block["state"] == "done":
+                continue
+            if "<inputs>" in line:
+                block["state"] = "input"
+            elif "</inputs>" in line:
+                block["state"] = "idle"
+            elif "</outputs>" in line:
+                #Parsing of outputs of the top-level model will not be initiated, but we do not care for that in any case.
+                block["state"] = "done"
+            elif "<outputs>" in line:
+                block["state"] = "output"
+            elif block["state"] != "idle" and "<port " in line:
+                name = line.split("name=\"", 1)[1].split('"', 1)[0]
+                port_map = line.split('>', 1)[1].rsplit('<', 1)[0].split()
+                block["ports"].append((block["state"], name, port_map))
+##########################################################################
+
 ##########################################################################
 def parse_local_routing(filename):
     """Parses local routing information from a .net packing file.
@@ -80,44 +313,11 @@ def parse_local_routing(filename):
         Block tree.
     """
 
-    get_attr = lambda attr, line : line.split("%s=\"" % attr)[1].split('"')[0]
-
-    with open(filename, "r") as inf:
-        lines = inf.readlines()
-
     block_tree = nx.DiGraph()
-    block_stack = []
-    lvl = 0
-    parent_dict = {}
-    for lcnt, line in enumerate(lines):
-        if "<block name=" in line:
-            name = get_attr("name", line)
-            instance = get_attr("instance", line)
-            mode = None
-            start = lcnt
-            try:
-                mode = get_attr("mode", line)
-            except:
-                pass
-            lvl += 1
-            block_stack.append((name, instance, mode, start, lvl))
-            parent_dict.update({lvl : len(block_stack) - 1})
-            if "/>" in line:
-                name, instance, mode, start, lvl = block_stack.pop(-1)
-                block_tree.add_node(start, name = name, instance = instance, mode = mode,\
-                                    start = start, end = lcnt, lvl = lvl, parent  = None)
-                lvl -= 1
-                if lvl > 0:
-                    parent = block_stack[parent_dict[lvl]]
-                    block_tree.node[start]["parent"] = parent[3] #start
-        elif "</block>" in line:
-            name, instance, mode, start, lvl = block_stack.pop(-1)
-            block_tree.add_node(start, name = name, instance = instance, mode = mode,\
-                                start = start, end = lcnt, lvl = lvl, parent  = None)
-            lvl -= 1
-            if lvl > 0:
-                parent = block_stack[parent_dict[lvl]]
-                block_tree.node[start]["parent"] = parent[3] #start
+    block_ports = {}
+    for block in iter_packed_blocks(filename):
+        block_ports.update({block["start"] : block.pop("ports")})
+        block_tree.add_node(block["start"], **block)
 
     for u, attrs in block_tree.nodes(data = True):
         if attrs["parent"] is not None:
@@ -128,39 +328,18 @@ def parse_local_routing(filename):
     
     netlist = nx.DiGraph()
     for b, attrs in block_tree.nodes(data = True):
-        start = attrs["start"]
-        end = attrs["end"]
-        state = "idle"
-        for line in lines[start:end]:
-            if "<inputs>" in line:
-                state = "rd_inputs"
-                continue
-            if "</inputs>" in line:
-                state = "idle"
-                continue
-            if "</outputs>" in line:
-                #Parsing of outputs of the top-level model will not be initiated, but we do not care for that in any case.
-                state = "idle"
-                break
-            if "<outputs>" in line:
-                state = "rd_outputs"
-                continue
-            if state == "idle":
-                continue
-            if state in ("rd_inputs", "rd_outputs"):
-                if "<port " in line:
-                    name = get_attr("name", line)
-                    port_map = line.split('>', 1)[1].rsplit('<', 1)[0].split()
-                    for p, pin in enumerate(port_map):
-                        if pin == "open":
-                            driver, through = None, None
-                        elif (state == "rd_inputs" and attrs["lvl"] < 3)\
-                             or (state == "rd_outputs" and block_tree.out_degree(b) == 0):
-                            driver, through = pin, None
-                        else:
-                            driver, through = pin.split("-&gt;")
-                        netlist.add_node("%d.%s[%d]" % (b, name, p), block = b,\
-                                         node_type = state.split('_')[1][:-1], driver = driver, through = through)
+        for node_type, name, port_map in block_ports[b]:
+            for p, pin in enumerate(port_map):
+                if pin == "open":
+                    driver, through = None, None
+                elif (node_type == "input" and attrs["lvl"] < 3)\
+                     or (node_type == "output" and block_tree.out_degree(b) == 0):
+                    driver, through = pin, None
+                else:
+                    driver, through = pin.split("-&gt;")
+                netlist.add_node("%d.%s[%d]" % (b, name, p), block = b,\
+                                 node_type = node_type, driver = driver, through = through)
+    del block_ports
 
     for u, attrs in netlist.nodes(data = True):
         if attrs["node_type"] == "input":
@@ -226,21 +405,21 @@ def parse_local_routing(filename):
                     break 
 
     #Now annotate the placement locations to be able to merge the global routing.
-    with open(filename.replace(".net", ".place"), "r") as inf:
-        lines = inf.readlines()
-
     block_name_dict = {attrs["name"] : u for u, attrs in block_tree.nodes(data = True) if attrs["lvl"] == 2}
-    for line in lines[5:]:
-        name = line.split()[0]
-        x = int(line.split()[1])
-        y = int(line.split()[2])
-        block = block_name_dict[name]
-        stack = [block]
-        while stack:
-            block = stack.pop(-1)
-            block_tree.node[block]["loc"] = (x, y)
-            for child in block_tree[block]:
-                stack.append(child)
+    with open(filename.replace(".net", ".place"), "r") as inf:
+        for lcnt, line in enumerate(inf):
+            if lcnt < 5:
+                continue
+            name = line.split()[0]
+            x = int(line.split()[1])
+            y = int(line.split()[2])
+            block = block_name_dict[name]
+            stack = [block]
+            while stack:
+                block = stack.pop(-1)
+                block_tree.node[block]["loc"] = (x, y)
+                for child in block_tree[block]:
+                    stack.append(child)
 
     for u, attrs in netlist.nodes(data = True):
         block = attrs["block"]
@@ -257,7 +436,7 @@ def merge_global_and_local_routing(global_routing_trees, local_routing_netlist):
 
     Parameters
     ----------
-    global_routing_trees : Dict[str, nx.DiGraph]
+    global_routing_trees : Dict[str, RouteTree]
         A dictionary of routing trees, one for each net.
     local_routing_netlist : nx.DiGraph
         A local routing netlist.
@@ -304,10 +483,11 @@ def merge_global_and_local_routing(global_routing_trees, local_routing_netlist):
 
     for net in global_routing_trees:
         tree = global_routing_trees[net]
-        for u, attrs in tree.nodes(data = True):
-            merged_node = "global__%d" % u 
+        merged_nodes = ["global__%d" % u for u in tree.nodes.tolist()]
+        for i, merged_node in enumerate(merged_nodes):
+            attrs = tree.node_attrs(i)
             netlist.add_node(merged_node)
-            netlist.node[merged_node].update(copy.deepcopy(attrs))
+            netlist.node[merged_node].update(attrs)
             loc = attrs["node_loc"]
             if attrs["node_type"] == "IPIN":
                 for i in ipins[net]:
@@ -318,11 +498,11 @@ def merge_global_and_local_routing(global_routing_trees, local_routing_netlist):
                 for o in opins[net]:
                     if loc == local_routing_netlist.node[o]["loc"]:
                         netlist.add_edge(o, merged_node)
-        for u, v, attrs in tree.edges(data = True):
-            merged_u = "global__%d" % u 
-            merged_v = "global__%d" % v 
+        for u, v, ecnt in tree.edges():
+            merged_u = merged_nodes[u]
+            merged_v = merged_nodes[v]
             netlist.add_edge(merged_u, merged_v)
-            netlist[merged_u][merged_v].update(attrs)
+            netlist[merged_u][merged_v].update({"ecnt" : ecnt})
 
     #Remove the sink and the source nodes as they are irrelevant and create issues in
     #total slack computation.
@@ -339,46 +519,64 @@ def merge_global_and_local_routing(global_routing_trees, local_routing_netlist):
 ##########################################################################
 
 ##########################################################################
-def annotate_delays(netlist, block_tree, arc_filename, rr_filename):
-    """Parses the delays from the architecture file and annotates the netlist accordingly.
+def read_switch_delays(rr_filename):
+    """Reads the switch delays from the rr-graph.
 
     Parameters
     ----------
-    netlist : nx.DiGraph
-        Parsed routing graph (both local and global merged).
-    block_tree : nx.DiGraph
-        Tree of parsed packed blocks.
-    arc_filename : str
-        Name of the architecture file used to produce the routing.
     rr_filename : str
-        Name of the rr-graph file. Necessary for matching the switch types.
+        Name of the rr-graph file.
 
     Returns
     -------
-    nx.DiGraph
-        Delay-annotated netlist.
+    Dict[int, float]
+        Delay of each switch, indexed by its id. Id -1 has zero delay.
     """
 
     get_attr = lambda attr, line : line.split("%s=\"" % attr)[1].split('"')[0]
 
-    with open(rr_filename, "r") as inf:
-        lines = inf.readlines()
-
-    switch_delays = {}
-    rd_delays = False
-    for line in lines:
-        if "</switches>" in line:
-            break
-        if "<switch id" in line:
-            switch_id = int(get_attr("id", line))
-            rd_delays = True
-            continue
-        if rd_delays:
-            td = float(get_attr("Tdel", line))
-            switch_delays.update({switch_id : td})
-            rd_delays = False
+    rr = rr_binary.load_rr_binary(rr_filename)
+    if rr is not None:
+        switch_delays = {switch_id : td for switch_id, (name, td) in rr.switches.items()}
+    else:
+        with open(rr_filename, "r") as inf:
+            lines = inf.readlines()
+
+        switch_delays = {}
+        rd_delays = False
+        for line in lines:
+            if "</switches>" in line:
+                break
+            if "<switch id" in line:
+                switch_id = int(get_attr("id", line))
+                rd_delays = True
+                continue
+            if rd_delays:
+                td = float(get_attr("Tdel", line))
+                switch_delays.update({switch_id : td})
+                rd_delays = False
     switch_delays.update({-1 : 0.0})
 
+    return switch_delays
+##########################################################################
+
+##########################################################################
+def read_local_delays(arc_filename):
+    """Reads the delays of the local interconnect and the primitives from the architecture file.
+
+    Parameters
+    ----------
+    arc_filename : str
+        Name of the architecture file.
+
+    Returns
+    -------
+    Dict[object, float]
+        Delays indexed by (in_port, out_port) pairs, or by "lut", "tsu", and "tclkq".
+    """
+
+    get_attr = lambda attr, line : line.split("%s=\"" % attr)[1].split('"')[0]
+
     with open(arc_filename, "r") as inf:
         lines = inf.readlines()
 
@@ -397,6 +595,39 @@ def annotate_delays(netlist, block_tree, arc_filename, rr_filename):
         elif "<T_clock_to_Q" in line:
             local_delays.update({"tclkq" : float(get_attr("max", line))})    
 
+    return local_delays
+##########################################################################
+
+##########################################################################
+def annotate_delays(netlist, block_tree, arc_filename, rr_filename, switch_delays = None, local_delays = None):
+    """Parses the delays from the architecture file and annotates the netlist accordingly.
+
+    Parameters
+    ----------
+    netlist : nx.DiGraph
+        Parsed routing graph (both local and global merged).
+    block_tree : nx.DiGraph
+        Tree of parsed packed blocks.
+    arc_filename : str
+        Name of the architecture file used to produce the routing.
+    rr_filename : str
+        Name of the rr-graph file. Necessary for matching the switch types.
+    switch_delays : Optional[Dict[int, float]], default = None
+        Already read switch delays. If None, they are read from the rr-graph.
+    local_delays : Optional[Dict[object, float]], default = None
+        Already read local delays. If None, they are read from the architecture file.
+
+    Returns
+    -------
+    nx.DiGraph
+        Delay-annotated netlist.
+    """
+
+    if switch_delays is None:
+        switch_delays = read_switch_delays(rr_filename)
+    if local_delays is None:
+        local_delays = read_local_delays(arc_filename)
+
     for u, attrs in netlist.nodes(data = True):
         if attrs.get("node_switch", None) is not None:
             netlist.node[u]["td"] = switch_delays[attrs["node_switch"]]
@@ -426,8 +657,8 @@ def annotate_delays(netlist, block_tree, arc_filename, rr_filename):
 ##########################################################################
 
 ##########################################################################
-def insert_primitive_edges(netlist, block_tree):
-    """Inserts edges through primitives, to enable correct timing analysis
+def get_primitive_edges(netlist, block_tree):
+    """Lists the edges through primitives, to enable correct timing analysis
     (FFs are opened later).
 
     Parameters
@@ -439,8 +670,8 @@ def insert_primitive_edges(netlist, block_tree):
 
     Returns
     -------
-    nx.DiGraph
-        Netlist updated with the cross-primitive edges.
+    List[Tuple[str]]
+        Edges from the inputs to the outputs of each primitive.
     """
 
     ins = {}
@@ -462,6 +693,7 @@ def insert_primitive_edges(netlist, block_tree):
             except:
                 outs.update({instance : set([u])})
 
+    edges = []
     for instance in ins:
         for i in ins[instance]:
             if netlist.node[i]["driver"] is None:
@@ -469,7 +701,41 @@ def insert_primitive_edges(netlist, block_tree):
             for o in outs.get(instance, []):
                 if netlist.node[o]["driver"] is None:
                     continue
-                netlist.add_edge(i, o)
+                edges.append((i, o))
+
+    return edges
+##########################################################################
+
+##########################################################################
+def insert_primitive_edges(netlist, block_tree, edges = None):
+    """Inserts edges through primitives, to enable correct timing analysis
+    (FFs are opened later).
+
+    Parameters
+    ----------
+    netlist : nx.DiGraph
+        Timing-annotated routing netlist.
+    block_tree : nx.DiGraph
+        Tree of parsed packed blocks.
+    edges : Optional[List[Tuple[str]]], default = None
+        Candidate edges, as returned by >>get_primitive_edges<<.
+        Those with an endpoint missing from the netlist are skipped.
+        If None, the candidates are computed from the netlist itself.
+
+    Returns
+    -------
+    nx.DiGraph
+        Netlist updated with the cross-primitive edges.
+    """
+
+    if edges is None:
+        edges = get_primitive_edges(netlist, block_tree)
+
+    for i, o in edges:
+        if netlist.has_node(i) and netlist.has_node(o):
+            netlist.add_edge(i, o)
+
+    return netlist
 ##########################################################################
 
 ##########################################################################
@@ -498,49 +764,167 @@ def strip_unused(netlist):
 ##########################################################################
 
 ##########################################################################
-def sta(netlist):
-    """Performs a simple static timing analysis.
+def get_clock_domain(attrs):
+    """Extracts the clock domain tag from the primitive or driver name of a netlist node.
 
     Parameters
     ----------
-    netlist : nx.DiGraph
-        Timing-annotated routing netlist.
-    
+    attrs : Dict[str, object]
+        Node attributes.
+
     Returns
     -------
-    float
-        Critical path delay.
-    nx.DiGraph
-        Netlist copy with annotated slacks on the edges.
+    bool
+        True if the node carries a tag, else False.
+    str
+        The tag (circ_<i>). May be None if the node is tagged, but the tag is malformed.
+    """
+
+    for name in (attrs.get("primitive", ""), attrs.get("driver", "")):
+        if name is None or not "circ" in name:
+            continue
+        words = name.split('_')
+        for j, w in enumerate(words):
+            if w == "circ":
+                return True, '_'.join([w, words[j + 1]])
+        return True, None
+
+    return False, None
+##########################################################################
+
+##########################################################################
+class TimingGraph(object):
+    """Timing graph of a merged netlist, compiled into arrays.
+
+    Parameters
+    ----------
+    netlist : nx.DiGraph
+        Timing-annotated routing netlist.
+
+    Notes
+    -----
+    Nodes receive integer ids in the iteration order of the netlist. Edges from FF
+    D-pins to FF Q-pins are cut. The remaining edges are stored in CSR form twice:
+    grouped by the sink (fanin) and by the source (fanout), both in the order of
+    increasing topological level of the grouping node, so that each level
+    occupies a contiguous range and can be processed with a single reduction.
+
+    Each weakly connected component of the cut graph belongs to the clock domain of
+    its first tagged node (see >>get_clock_domain<<). Components without a tagged
+    node belong to no domain (-1) and are not analyzed.
     """
 
     #------------------------------------------------------------------------#
-    def open_ffs(netlist):
-        """Opens FFs.
+    def __init__(self, netlist):
+        """Constructor of the TimingGraph class.
+        """
+
+        self.nodes = list(netlist)
+        node_ids = {u : i for i, u in enumerate(self.nodes)}
+        n = len(self.nodes)
+
+        self.td = numpy.array([netlist.node[u].get("td", 0) for u in self.nodes], dtype = numpy.float64)
+
+        src = []
+        dst = []
+        self.cut_edges = []
+        for u, v in netlist.edges():
+            if netlist.node[u].get("FF_D", False) and netlist.node[v].get("FF_Q", False):
+                self.cut_edges.append((u, v))
+                continue
+            src.append(node_ids[u])
+            dst.append(node_ids[v])
+        self.src = numpy.array(src, dtype = numpy.int64)
+        self.dst = numpy.array(dst, dtype = numpy.int64)
+
+        self.indeg = numpy.bincount(self.dst, minlength = n)
+        self.outdeg = numpy.bincount(self.src, minlength = n)
+
+        self.level = self.compute_levels()
+        self.level_order = numpy.lexsort((numpy.arange(n), self.level))
+        level_cnts = numpy.bincount(self.level, minlength = 1)
+        self.level_starts = numpy.concatenate(([0], numpy.cumsum(level_cnts)))
+
+        self.fanin_src, self.fanin_starts = self.group_edges(self.dst, self.src, self.indeg)
+        self.fanout_dst, self.fanout_starts = self.group_edges(self.src, self.dst, self.outdeg)
+
+        self.domain_names = []
+        self.domain = self.assign_clock_domains(netlist)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def compute_levels(self):
+        """Computes the topological level of each node, by peeling off the sources.
 
         Parameters
         ----------
-        netlist : nx.DiGraph
-            Timing-annotated routing netlist.
+        None
 
         Returns
         -------
-        nx.DiGraph
-            A copy of the netlist, with FFs opened.
+        numpy.ndarray
+            Level of each node.
         """
 
-        opened = copy.deepcopy(netlist)
-        for u, v in netlist.edges():
-            if netlist.node[u].get("FF_D", False) and netlist.node[v].get("FF_Q", False):
-                opened.remove_edge(u, v)
+        n = len(self.nodes)
+        succ_order = numpy.argsort(self.src, kind = "mergesort")
+        succs = self.dst[succ_order]
+        succ_starts = numpy.concatenate(([0], numpy.cumsum(self.outdeg)))
+
+        level = numpy.full(n, -1, dtype = numpy.int64)
+        indeg = self.indeg.copy()
+        frontier = numpy.flatnonzero(indeg == 0)
+        lvl = 0
+        while frontier.size:
+            level[frontier] = lvl
+            starts = succ_starts[frontier]
+            cnts = self.outdeg[frontier]
+            #Gather the successors of all frontier nodes.
+            offsets = numpy.repeat(starts - numpy.concatenate(([0], numpy.cumsum(cnts)[:-1])), cnts)
+            touched = succs[numpy.arange(cnts.sum()) + offsets]
+            numpy.subtract.at(indeg, touched, 1)
+            frontier = numpy.unique(touched[indeg[touched] == 0])
+            lvl += 1
+
+        if (level < 0).any():
+            print "Combinational loop in the netlist."
+            raise ValueError
 
-        return opened
+        return level
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
-    def split_clock_domains(netlist):
-        """Splits the netlist into different clock domains.
-        This must be done when wafers are being used.
+    def group_edges(self, key, other, cnts):
+        """Groups the edges by one of their endpoints, in the level order of that endpoint.
+
+        Parameters
+        ----------
+        key : numpy.ndarray
+            Grouping endpoints of the edges.
+        other : numpy.ndarray
+            The other endpoints.
+        cnts : numpy.ndarray
+            Number of edges per grouping node.
+
+        Returns
+        -------
+        numpy.ndarray
+            The other endpoints, grouped.
+        numpy.ndarray
+            Start of the group of each node, in level order, followed by the number of edges.
+        """
+
+        rank = numpy.empty(len(self.nodes), dtype = numpy.int64)
+        rank[self.level_order] = numpy.arange(len(self.nodes))
+        order = numpy.argsort(rank[key], kind = "mergesort")
+        starts = numpy.concatenate(([0], numpy.cumsum(cnts[self.level_order])))
+
+        return other[order], starts
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def assign_clock_domains(self, netlist):
+        """Assigns each node to the clock domain of its weakly connected component.
 
         Parameters
         ----------
@@ -549,98 +933,202 @@ def sta(netlist):
 
         Returns
         -------
-        List[nx.DiGraph]
-            A collection of graphs that represent each clock domain.
-            It may be that some of them are still disconnected.
+        numpy.ndarray
+            Domain index of each node (-1 if none).
         """
 
-        underlying = netlist.to_undirected()
-        components = list(sorted(nx.connected_components(underlying), key = len))
-
-        clock_domains = {}
-        for i, c in enumerate(components):
-            for u in c:
-                primitive = netlist.node[u].get("primitive", "")
-                if "circ" in primitive:
-                    words = primitive.split('_')
-                    domain = None
-                    for j, w in enumerate(words):
-                        if w == "circ":
-                            domain = '_'.join([w, words[j + 1]])
-                            break
-                    try:
-                        clock_domains[domain].append(i)
-                    except:
-                        clock_domains.update({domain : [i]})
-                    break
-                driver = netlist.node[u].get("driver", "")
-                if "circ" in driver:
-                    words = driver.split('_')
-                    domain = None
-                    for j, w in enumerate(words):
-                        if w == "circ":
-                            domain = '_'.join([w, words[j + 1]])
-                            break
-                    try:
-                        clock_domains[domain].append(i)
-                    except:
-                        clock_domains.update({domain : [i]})
+        n = len(self.nodes)
+        parent = numpy.arange(n)
+        while True:
+            pu = parent[self.src]
+            pv = parent[self.dst]
+            merge = pu != pv
+            if not merge.any():
+                break
+            numpy.minimum.at(parent, numpy.maximum(pu, pv)[merge], numpy.minimum(pu, pv)[merge])
+            while True:
+                jumped = parent[parent]
+                if (jumped == parent).all():
                     break
+                parent = jumped
+
+        component_domain = {}
+        domain_ids = {}
+        for i, u in enumerate(self.nodes):
+            root = parent[i]
+            if root in component_domain:
+                continue
+            tagged, domain = get_clock_domain(netlist.node[u])
+            if not tagged:
+                continue
+            if not domain in domain_ids:
+                domain_ids.update({domain : len(self.domain_names)})
+                self.domain_names.append(domain)
+            component_domain.update({root : domain_ids[domain]})
 
-        domain_graphs = []
-        for domain in clock_domains:
-            nodes = set()
-            for c in clock_domains[domain]:
-                nodes |= components[c]
-            domain_graphs.append(copy.deepcopy(netlist))
-            rm_list = [u for u in netlist if not u in nodes]
-            #NOTE: This can probably be done more efficiently, but this is robust.
-            for u in rm_list:
-                domain_graphs[-1].remove_node(u)
+        roots = numpy.full(n, -1, dtype = numpy.int64)
+        for root, d in component_domain.items():
+            roots[root] = d
 
-        return domain_graphs            
+        return roots[parent]
     #------------------------------------------------------------------------#
 
-    netlist_cp = open_ffs(netlist)
+    #------------------------------------------------------------------------#
+    def level_groups(self, starts, l):
+        """Returns the nodes of a level that have edges in a given grouping,
+        along with the range of their edges and the reduction offsets.
 
-    domain_graphs = split_clock_domains(netlist_cp)
+        Parameters
+        ----------
+        starts : numpy.ndarray
+            Group starts (>>fanin_starts<< or >>fanout_starts<<).
+        l : int
+            Level.
 
-    TNS = 0.0
-    WNS = 0.0
-    for dg in domain_graphs:
-        topo_nodes = list(nx.algorithms.dag.topological_sort(dg))
-        rev_topo_nodes = reversed(topo_nodes)
-    
-        cp = nx.algorithms.dag.dag_longest_path(dg)
-        for u in cp:
-            print u, netlist_cp.node[u]
-    
-        for u in topo_nodes:
-            td = netlist_cp.node[u].get("td", 0)
-            tar = td + max([0] + [netlist_cp.node[p]["tar"] for p in netlist_cp.pred[u]])
-            netlist_cp.node[u]["tar"] = tar
-            dg.node[u]["tar"] = tar
-    
-        cpd = max([attrs["tar"] for u, attrs in dg.nodes(data = True)])
-        tns = sum([attrs["tar"] for u, attrs in dg.nodes(data = True) if dg.out_degree(u) == 0])
-    
-        TNS += tns
-        WNS = max(WNS, cpd)
-    
-        for u in rev_topo_nodes:
-            td = netlist_cp.node[u].get("td", 0)
-            treq = min([cpd] + [netlist_cp.node[c]["treq"] for c in netlist_cp[u]])
-            netlist_cp.node[u]["treq"] = treq
-            netlist_cp.node[u]["slack"] = treq - netlist_cp.node[u]["tar"]
-            assert treq >= netlist_cp.node[u]["tar"], "Negative slack on node %s %s" % (str(u), str(netlist_cp.node[u]))
+        Returns
+        -------
+        numpy.ndarray
+            All nodes of the level.
+        numpy.ndarray
+            Nodes of the level that have at least one edge.
+        int
+            First edge.
+        int
+            One past the last edge.
+        numpy.ndarray
+            Offsets of the groups of the nodes with edges, relative to the first edge.
+        """
+
+        lo, hi = self.level_starts[l], self.level_starts[l + 1]
+        ids = self.level_order[lo:hi]
+        group_starts = starts[lo:hi]
+        has_edges = starts[lo + 1:hi + 1] > group_starts
+
+        return ids, ids[has_edges], starts[lo], starts[hi], group_starts[has_edges] - starts[lo]
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def analyze(self):
+        """Computes the arrival times, required times, and slacks of all nodes.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        numpy.ndarray
+            Arrival times.
+        numpy.ndarray
+            Required times.
+        numpy.ndarray
+            Per-domain critical path delays.
+        numpy.ndarray
+            Per-domain total sink arrival times.
+        """
+
+        level_cnt = len(self.level_starts) - 1
+
+        tar = self.td.copy()
+        for l in range(1, level_cnt):
+            ids, with_fanin, lo, hi, offsets = self.level_groups(self.fanin_starts, l)
+            if with_fanin.size:
+                tar[with_fanin] += numpy.maximum(0, numpy.maximum.reduceat(tar[self.fanin_src[lo:hi]], offsets))
+
+        domain_cnt = len(self.domain_names)
+        in_domain = self.domain >= 0
+        cpd = numpy.full(domain_cnt, -numpy.inf)
+        numpy.maximum.at(cpd, self.domain[in_domain], tar[in_domain])
+        cpd = numpy.maximum(cpd, 0)
+        sinks = in_domain & (self.outdeg == 0)
+        tns = numpy.bincount(self.domain[sinks], weights = tar[sinks], minlength = domain_cnt)
+
+        treq = numpy.where(in_domain, numpy.append(cpd, numpy.inf)[self.domain], numpy.inf)
+        for l in range(level_cnt - 2, -1, -1):
+            ids, with_fanout, lo, hi, offsets = self.level_groups(self.fanout_starts, l)
+            if with_fanout.size:
+                treq[with_fanout] = numpy.minimum(treq[with_fanout],\
+                                                  numpy.minimum.reduceat(treq[self.fanout_dst[lo:hi]], offsets))
+
+        return tar, treq, cpd, tns
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def annotate(self, netlist, tar, treq):
+        """Opens the FFs of the netlist and annotates it with the results of the analysis.
+        Nodes outside of all clock domains are left untouched.
+
+        Parameters
+        ----------
+        netlist : nx.DiGraph
+            The netlist from which the graph was compiled.
+        tar : numpy.ndarray
+            Arrival times.
+        treq : numpy.ndarray
+            Required times.
+
+        Returns
+        -------
+        None
+        """
+
+        netlist.remove_edges_from(self.cut_edges)
+
+        in_domain = (self.domain >= 0).tolist()
+        tar_list = tar.tolist()
+        treq_list = treq.tolist()
+        for i, u in enumerate(self.nodes):
+            if in_domain[i]:
+                netlist.node[u].update({"tar" : tar_list[i], "treq" : treq_list[i], "slack" : treq_list[i] - tar_list[i]})
+
+        for u, v in zip(self.src.tolist(), self.dst.tolist()):
+            if in_domain[u]:
+                netlist[self.nodes[u]][self.nodes[v]]["slack"] = treq_list[v] - tar_list[u]
+    #------------------------------------------------------------------------#
+##########################################################################
+
+##########################################################################
+def sta(netlist):
+    """Performs a simple static timing analysis.
+
+    Parameters
+    ----------
+    netlist : nx.DiGraph
+        Timing-annotated routing netlist.
     
-        for u, v in dg.edges():
-            netlist_cp[u][v]["slack"] = netlist_cp.node[v]["treq"] - netlist_cp.node[u]["tar"]
+    Returns
+    -------
+    float
+        Critical path delay (the largest over all clock domains).
+    nx.DiGraph
+        The same netlist, with FFs opened and slacks annotated on the nodes and the edges.
+
+    Notes
+    -----
+    Each clock domain is timed against its own critical path delay.
+    The netlist is modified in place, instead of being copied.
+    """
+
+    tg = TimingGraph(netlist)
+    tar, treq, cpd, tns = tg.analyze()
 
+    in_domain = tg.domain >= 0
+    if (treq[in_domain] < tar[in_domain]).any():
+        u = tg.nodes[numpy.flatnonzero(in_domain & (treq < tar))[0]]
+        print "Negative slack on node %s %s" % (str(u), str(netlist.node[u]))
+        raise ValueError
+
+    tg.annotate(netlist, tar, treq)
+
+    for d, domain in enumerate(tg.domain_names):
+        print "%s: CPD = %g, TNS = %g" % (domain, cpd[d], tns[d])
+
+    WNS = max([0.0] + cpd.tolist())
+    TNS = float(tns.sum())
     print "WNS =", WNS
     print "TNS =", TNS
 
-    return cpd, netlist_cp
+    return WNS, netlist
 ##########################################################################
 
 ##########################################################################
@@ -724,6 +1212,232 @@ def get_wire_type_criticalities(netlist):
     return crits
 ##########################################################################
 
+##########################################################################
+class TimingContext(object):
+    """Parsed timing inputs of a circuit, kept between the iterations of an exploration.
+
+    Parameters
+    ----------
+    None
+
+    Notes
+    -----
+    Each architecture-generation iteration runs in a fresh process, so the context
+    is pickled into the working directory. Every cached item is keyed by its inputs:
+    the packing (block tree, local routing, and primitive edges) by the contents of
+    the .net and .place files, each route tree by the text of its net in the .route
+    file, and the delay tables by the contents of the architecture file and the size
+    and modification time of the rr-graph. Only what changed is parsed again.
+
+    The merged netlist is rebuilt and the full timing analysis rerun whenever anything
+    changed; with the array-based >>sta<< this is cheap compared to parsing.
+    If nothing changed, the last criticalities are returned as they are.
+    """
+
+    #------------------------------------------------------------------------#
+    def __init__(self):
+        """Constructor of the TimingContext class.
+        """
+
+        self.net_key = None
+        self.local_routing_netlist = None
+        self.packing_block_tree = None
+        self.primitive_edges = None
+        self.route_keys = {}
+        self.route_trees = {}
+        self.delay_key = None
+        self.switch_delays = None
+        self.local_delays = None
+        self.crit_key = None
+        self.crits = None
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    @staticmethod
+    def load(filename):
+        """Loads a stored context. If it can not be read, an empty one is returned.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the pickle file.
+
+        Returns
+        -------
+        TimingContext
+            The context.
+        """
+
+        try:
+            with open(filename, "rb") as inf:
+                context = cPickle.load(inf)
+        except:
+            return TimingContext()
+        if not isinstance(context, TimingContext):
+            return TimingContext()
+
+        return context
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def store(self, filename):
+        """Stores the context. The file is replaced atomically, so that an interrupted
+        iteration can not leave a truncated context behind.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the pickle file.
+
+        Returns
+        -------
+        None
+        """
+
+        tmp_filename = "%s.%d.tmp" % (filename, os.getpid())
+        with open(tmp_filename, "wb") as outf:
+            cPickle.dump(self, outf, cPickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_filename, filename)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def update_packing(self, net_filename):
+        """Parses the local routing, unless the packing or the placement did not change.
+
+        Parameters
+        ----------
+        net_filename : str
+            Name of the .net file. The .place file is expected next to it.
+
+        Returns
+        -------
+        str
+            Key of the packing.
+        """
+
+        net_key = artifact_store.fingerprint(artifact_store.fingerprint_file(net_filename),\
+                                             artifact_store.fingerprint_file(net_filename.replace(".net", ".place")))
+        if net_key == self.net_key:
+            return net_key
+
+        self.local_routing_netlist, self.packing_block_tree = parse_local_routing(net_filename)
+        self.primitive_edges = get_primitive_edges(self.local_routing_netlist, self.packing_block_tree)
+        self.net_key = net_key
+
+        return net_key
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def update_global_routing(self, route_filename):
+        """Parses the route trees of the nets whose routing changed.
+
+        Parameters
+        ----------
+        route_filename : str
+            Name of the .route file.
+
+        Returns
+        -------
+        str
+            Key of the entire routing.
+        """
+
+        route_keys = {}
+        route_trees = {}
+        prev_switch = -1
+        reparsed = 0
+        for net, lines in iter_global_routing(route_filename):
+            #The source of a net inherits the switch of the last node of the previous net.
+            key = artifact_store.fingerprint(prev_switch, ''.join(lines))
+            if self.route_keys.get(net, None) == key:
+                tree = self.route_trees[net]
+                prev_switch = tree.last_switch
+            else:
+                tree, prev_switch = parse_route_tree(lines, prev_switch)
+                reparsed += 1
+            route_keys.update({net : key})
+            route_trees.update({net : tree})
+
+        print "Reparsed %d of %d route trees." % (reparsed, len(route_trees))
+        self.route_keys = route_keys
+        self.route_trees = route_trees
+
+        return artifact_store.fingerprint(*sorted(route_keys.items()))
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def update_delays(self, arc_filename, rr_filename):
+        """Reads the delay tables, unless the architecture did not change.
+
+        Parameters
+        ----------
+        arc_filename : str
+            Name of the architecture file.
+        rr_filename : str
+            Name of the rr-graph file.
+
+        Returns
+        -------
+        str
+            Key of the delays.
+        """
+
+        try:
+            rr_stat = os.stat(rr_filename)
+            rr_key = (os.path.abspath(rr_filename), rr_stat.st_size, rr_stat.st_mtime)
+        except OSError:
+            rr_key = "missing"
+        delay_key = artifact_store.fingerprint(artifact_store.fingerprint_file(arc_filename), rr_key)
+        if delay_key == self.delay_key:
+            return delay_key
+
+        self.switch_delays = read_switch_delays(rr_filename)
+        self.local_delays = read_local_delays(arc_filename)
+        self.delay_key = delay_key
+
+        return delay_key
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def get_criticalities(self, circ, arc_name):
+        """Computes the wire type criticalities, reusing whatever did not change.
+
+        Parameters
+        ----------
+        circ : str
+            Name of the circuit.
+        arc_name : str
+            Name of the architecture.
+
+        Returns
+        -------
+        Dict[str, float]
+            A dictionary of criticalities for each wire type.
+        """
+
+        net_key = self.update_packing("%s.net" % circ)
+        route_key = self.update_global_routing("%s.route" % circ)
+        delay_key = self.update_delays("%s.xml" % arc_name, "%s_rr.xml" % arc_name)
+
+        crit_key = artifact_store.fingerprint(net_key, route_key, delay_key)
+        if crit_key == self.crit_key:
+            print "Timing inputs unchanged. Reusing the criticalities."
+            return copy.deepcopy(self.crits)
+
+        netlist = merge_global_and_local_routing(self.route_trees, self.local_routing_netlist)
+        strip_unused(netlist)
+        annotate_delays(netlist, self.packing_block_tree, None, None,\
+                        switch_delays = self.switch_delays, local_delays = self.local_delays)
+        insert_primitive_edges(netlist, self.packing_block_tree, self.primitive_edges)
+        cpd, annotated_netlist = sta(netlist)
+
+        self.crits = get_wire_type_criticalities(annotated_netlist)
+        self.crit_key = crit_key
+
+        return copy.deepcopy(self.crits)
+    #------------------------------------------------------------------------#
+##########################################################################
+
 ##########################################################################
 def fetch_timing_data():
     """Top function for parsing the timing data of a circuit.
@@ -736,6 +1450,11 @@ def fetch_timing_data():
     -------
     Dict[str, float]
         A dictionary of criticalities for each wire type.
+
+    Notes
+    -----
+    The parsed inputs are kept in >>TIMING_CONTEXT_FILENAME<< in the working directory,
+    so that the next call only parses what the new run changed.
     """
 
     with open("vpr_stdout.log", "r") as inf:
@@ -763,13 +1482,9 @@ def fetch_timing_data():
         circ = line.split()[2].split(".blif")[0]
         break
 
-    global_routing_trees = parse_global_routing("%s.route" % circ)
-    local_routing_netlist, packing_block_tree = parse_local_routing("%s.net" % circ)
-    netlist = merge_global_and_local_routing(global_routing_trees, local_routing_netlist)
-    strip_unused(netlist)
-    annotate_delays(netlist, packing_block_tree, "%s.xml" % arc_name, "%s_rr.xml" % arc_name)
-    insert_primitive_edges(netlist, packing_block_tree)
-    cpd, annotated_netlist = sta(netlist)
+    context = TimingContext.load(TIMING_CONTEXT_FILENAME)
+    crits = context.get_criticalities(circ, arc_name)
+    context.store(TIMING_CONTEXT_FILENAME)
 
-    return get_wire_type_criticalities(annotated_netlist)
+    return crits
 #########################################################################
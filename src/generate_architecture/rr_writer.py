@@ -0,0 +1,211 @@
+"""Buffered writer for RR-graph files, with optional in-process compression,
+per-section statistics, and a binary sidecar.
+"""
+
+import sys
+sys.path.insert(0,'..')
+
+import rr_binary
+import rr_artifacts
+
+##########################################################################
+class RRWriter(object):
+    """Writes an RR-graph in chunks, so that no section ever needs to be held
+    in memory as a single string.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the uncompressed RR-graph file.
+    compress : Optional[bool], default = False
+        Specifies that the output should be LZ4-compressed into >>filename.lz4<<,
+        without the uncompressed file ever being written to disk.
+    chunk_size : Optional[int], default = 65536
+        Number of records buffered before they are handed to the file.
+    sidecar : Optional[bool], default = False
+        Specifies that the binary sidecar (see rr_binary) should be written as well.
+
+    Notes
+    -----
+    Compression is handled by rr_artifacts.open_compressed.
+
+    Everything written before the >>rr_nodes<< section is started forms the prologue of the sidecar.
+    Nodes and edges must be written through >>write_node<< and >>write_edge<< to appear in it.
+    """
+
+    #------------------------------------------------------------------------#
+    def __init__(self, filename, compress = False, chunk_size = 65536, sidecar = False):
+        """Constructor of the RRWriter class.
+        """
+
+        self.sidecar_filename = rr_binary.sidecar_filename(filename)
+        self.builder = rr_binary.RRBinaryBuilder() if sidecar else None
+        self.prologue = []
+        self.in_prologue = True
+
+        self.filename = filename + (".lz4" if compress else '')
+        self.chunk_size = chunk_size
+        self.proc = None
+        if not compress:
+            self.outf = open(self.filename, "w")
+        else:
+            self.outf, self.proc = rr_artifacts.open_compressed(self.filename)
+
+        self.buf = []
+        self.sections = []
+        self.stats = {}
+        self.section = None
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def begin_section(self, name):
+        """Starts attributing the written data to a new section.
+
+        Parameters
+        ----------
+        name : str
+            Name of the section.
+
+        Returns
+        -------
+        None
+        """
+
+        self.section = name
+        if name == "rr_nodes":
+            self.in_prologue = False
+        if not name in self.stats:
+            self.sections.append(name)
+            self.stats.update({name : [0, 0]})
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def write(self, txt, records = 1):
+        """Buffers a piece of text.
+
+        Parameters
+        ----------
+        txt : str
+            Text to be written.
+        records : Optional[int], default = 1
+            Number of records (nodes, edges, etc.) the text holds.
+            Opening and closing tags should pass 0.
+
+        Returns
+        -------
+        None
+        """
+
+        self.buf.append(txt)
+        if self.in_prologue and self.builder is not None:
+            self.prologue.append(txt)
+        self.stats[self.section][0] += records
+        self.stats[self.section][1] += len(txt)
+        if len(self.buf) >= self.chunk_size:
+            self.flush()
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def write_node(self, node_id, node_type, capacity, xlow, ylow, xhigh, yhigh, ptc, side = '', direction = '',\
+                   segment_id = -1):
+        """Writes a single node. Parameters are the same as those of >>rr_binary.format_node<<.
+
+        Returns
+        -------
+        None
+        """
+
+        self.write(rr_binary.format_node(node_id, node_type, capacity, xlow, ylow, xhigh, yhigh, ptc,\
+                                         side = side, direction = direction, segment_id = segment_id))
+        if self.builder is not None:
+            self.builder.add_node(node_id, node_type, capacity, xlow, ylow, xhigh, yhigh, ptc,\
+                                  side = side, direction = direction, segment_id = segment_id)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def write_edge(self, src, sink, switch_id):
+        """Writes a single edge. Edges must be written in the order of increasing source node.
+
+        Parameters
+        ----------
+        src : int
+            Source node id.
+        sink : int
+            Sink node id.
+        switch_id : int
+            Switch id.
+
+        Returns
+        -------
+        None
+        """
+
+        self.write(rr_binary.edge_template % (src, sink, switch_id))
+        if self.builder is not None:
+            self.builder.add_edge(src, sink, switch_id)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def flush(self):
+        """Hands all buffered text to the file.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+
+        if self.buf:
+            self.outf.write(''.join(self.buf))
+            self.buf = []
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def close(self):
+        """Flushes the buffer, closes the file, and writes the sidecar, if requested.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+
+        self.flush()
+        self.outf.close()
+        if self.proc is not None:
+            if self.proc.wait() != 0:
+                print "Compression of %s failed." % self.filename
+                raise ValueError
+        if self.builder is not None:
+            self.builder.write(self.sidecar_filename, ''.join(self.prologue))
+            self.builder = None
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def report(self):
+        """Prints the number of records and bytes written per section.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+
+        print "Written %s:" % self.filename
+        total = 0
+        for section in self.sections:
+            records, size = self.stats[section]
+            total += size
+            print "%-12s %10d records %12d bytes" % (section, records, size)
+        print "%-12s %10s         %12d bytes" % ("total", '', total)
+    #------------------------------------------------------------------------#
+##########################################################################
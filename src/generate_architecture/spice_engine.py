@@ -0,0 +1,266 @@
+"""Runs batches of HSPICE netlists on a bounded pool of local workers,
+caching the simulator output on disk.
+"""
+
+import os
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from multiprocessing.pool import ThreadPool
+
+##########################################################################
+def hash_netlist(txt):
+    """Returns the cache key of a netlist.
+
+    Parameters
+    ----------
+    txt : str
+        Netlist text.
+
+    Returns
+    -------
+    str
+        Hexadecimal SHA-256 digest of the netlist text.
+    """
+
+    return hashlib.sha256(txt).hexdigest()
+##########################################################################
+
+##########################################################################
+def is_valid_dump(netlist, lines):
+    """Checks that the simulator output holds all the measurements of the netlist.
+
+    Parameters
+    ----------
+    netlist : str
+        Netlist text.
+    lines : List[str]
+        Lines of the HSPICE standard output.
+
+    Returns
+    -------
+    bool
+        True if every measurement declared in the netlist was reported
+        with a value, else False.
+
+    Notes
+    -----
+    HSPICE reports a measurement as >>name= value ...<<, or with the value >>failed<<
+    if it could not be taken. License-checkout failures and netlist errors produce
+    no measurements at all.
+    """
+
+    measures = set()
+    for line in netlist.splitlines():
+        words = line.split()
+        if len(words) > 1 and words[0].lower() in (".measure", ".meas"):
+            measures.add(words[1].lower())
+    if not measures:
+        return len(lines) > 0
+
+    measured = set()
+    for line in lines:
+        words = line.split()
+        if len(words) > 1 and words[0].endswith('=') and words[1].lower() != "failed":
+            measured.add(words[0][:-1].lower())
+
+    return measures.issubset(measured)
+##########################################################################
+
+##########################################################################
+class SpiceEngine(object):
+    """Collects netlists, simulates the ones that are not cached yet,
+    and serves the simulator output.
+
+    Parameters
+    ----------
+    max_cpu : Optional[int], default = None
+        Maximum number of concurrent HSPICE runs. If not specified,
+        the HSPICE_CPU environment variable is used.
+    cache_dir : Optional[str], default = "spice_cache"
+        Directory holding the cached simulator output.
+    scratch_dir : Optional[str], default = "."
+        Directory in which the per-job scratch directories are created.
+    refresh : Optional[bool], default = False
+        Instructs the engine to simulate all netlists, overwriting any cached output.
+
+    Notes
+    -----
+    Each job runs in its own scratch directory, so the .st0, .ic0, and .mt0
+    files of concurrent runs never collide. The standard output of HSPICE
+    (with measurement results) is stored in the cache as <hash>.dump.
+    Since the netlists already carry all parameters (including the absolute
+    path of the device models), the hash of the netlist text identifies
+    the simulation completely.
+
+    Only dumps holding all measurements declared in the netlist are cached.
+    The output of a failed run is kept as <hash>.failed for inspection,
+    and cached dumps that do not pass the check are simulated again.
+    """
+
+    #------------------------------------------------------------------------#
+    def __init__(self, max_cpu = None, cache_dir = "spice_cache", scratch_dir = '.', refresh = False):
+        """Constructor of the SpiceEngine class.
+        """
+
+        if max_cpu is None:
+            max_cpu = int(os.environ.get("HSPICE_CPU", 1))
+        self.max_cpu = max(1, max_cpu)
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.scratch_dir = os.path.abspath(scratch_dir)
+        self.refresh = refresh
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        self.pending = {}
+        self.hits = 0
+        self.runs = 0
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def cache_filename(self, key):
+        """Returns the name of the cached dump for the given key.
+
+        Parameters
+        ----------
+        key : str
+            Netlist hash.
+
+        Returns
+        -------
+        str
+            Name of the cache file.
+        """
+
+        return os.path.join(self.cache_dir, "%s.dump" % key)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def submit(self, netlist):
+        """Adds a netlist to the batch, unless its results are already known.
+
+        Parameters
+        ----------
+        netlist : str
+            Netlist text.
+
+        Returns
+        -------
+        str
+            Key under which the results can be retrieved.
+        """
+
+        key = hash_netlist(netlist)
+        if key in self.pending:
+            return key
+        if not self.refresh and os.path.exists(self.cache_filename(key)):
+            with open(self.cache_filename(key), "r") as inf:
+                lines = inf.readlines()
+            if is_valid_dump(netlist, lines):
+                self.hits += 1
+                return key
+        self.pending.update({key : netlist})
+
+        return key
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def simulate(self, key):
+        """Simulates a single pending netlist in its own scratch directory.
+
+        Parameters
+        ----------
+        key : str
+            Netlist hash.
+
+        Returns
+        -------
+        bool
+            True if the simulation produced all measurements, else False.
+        """
+
+        scratch = tempfile.mkdtemp(prefix = "hspice_%s_" % key[:12], dir = self.scratch_dir)
+        try:
+            with open(os.path.join(scratch, "sim.sp"), "w") as outf:
+                outf.write(self.pending[key])
+            hspice_call = os.environ["HSPICE"] + " sim.sp > sim.dump"
+            subprocess.call(hspice_call, shell = True, cwd = scratch)
+            dump = os.path.join(scratch, "sim.dump")
+            if not os.path.exists(dump):
+                return False
+            with open(dump, "r") as inf:
+                lines = inf.readlines()
+            if not is_valid_dump(self.pending[key], lines):
+                shutil.copyfile(dump, os.path.join(self.cache_dir, "%s.failed" % key))
+                return False
+            #NOTE: The rename is atomic, so a partially copied dump is never visible in the cache.
+            tmp_filename = self.cache_filename(key) + ".tmp%d" % os.getpid()
+            shutil.copyfile(dump, tmp_filename)
+            os.rename(tmp_filename, self.cache_filename(key))
+        finally:
+            shutil.rmtree(scratch, ignore_errors = True)
+
+        return True
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def run(self):
+        """Simulates all pending netlists.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+
+        keys = sorted(self.pending)
+        if not keys:
+            return
+
+        print "Simulating %d netlists on %d workers (%d cache hits)."\
+              % (len(keys), min(self.max_cpu, len(keys)), self.hits)
+
+        #NOTE: HSPICE runs as a separate process, so threads suffice for keeping the pool busy.
+        pool = ThreadPool(min(self.max_cpu, len(keys)))
+        try:
+            results = pool.map(self.simulate, keys)
+        finally:
+            pool.close()
+            pool.join()
+
+        self.runs += len(keys)
+        failed = [key for key, success in zip(keys, results) if not success]
+        self.pending = {}
+        if failed:
+            print "HSPICE produced no valid output for %d netlists. See %s/<hash>.failed, e.g., %s."\
+                  % (len(failed), self.cache_dir, failed[0])
+            raise ValueError
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def get_dump(self, key):
+        """Returns the simulator output for the given key.
+
+        Parameters
+        ----------
+        key : str
+            Netlist hash.
+
+        Returns
+        -------
+        List[str]
+            Lines of the HSPICE standard output.
+        """
+
+        if key in self.pending:
+            self.run()
+
+        with open(self.cache_filename(key), "r") as inf:
+            lines = inf.readlines()
+
+        return lines
+    #------------------------------------------------------------------------#
+##########################################################################
@@ -0,0 +1,189 @@
+"""Tests of the in-process CBC backend of milp_solver.
+
+The path to the CBC C library is taken from the environment variable CBC_LIB
+(falling back to the system library path). The tests are skipped if it cannot be loaded.
+
+Run with: python -m unittest test_milp_solver
+"""
+
+import os
+import unittest
+
+import milp_solver
+from milp_solver import MILPModel, CbcSolver, LE, USER_CUT, LAZY
+
+try:
+    milp_solver.load_cbc_library(os.environ.get("CBC_LIB"))
+    HAS_CBC = True
+except ValueError:
+    HAS_CBC = False
+
+##########################################################################
+class ModelProblem(object):
+    """Wraps a model in the interface expected by the solvers.
+
+    Parameters
+    ----------
+    model : MILPModel
+        Model.
+    """
+
+    #------------------------------------------------------------------------#
+    def __init__(self, model):
+        """Constructor of the ModelProblem class.
+        """
+
+        self.model = model
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def get_model(self):
+        """Returns the model.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        MILPModel
+            Model.
+        """
+
+        return self.model
+    #------------------------------------------------------------------------#
+##########################################################################
+
+##########################################################################
+def build_model(relax = False):
+    """Builds a small model in which the lazy constraint changes the optimum.
+
+    Parameters
+    ----------
+    relax : Optional[bool], default = False
+        Specifies that the model should be relaxed.
+
+    Returns
+    -------
+    MILPModel
+        Model.
+
+    Notes
+    -----
+    maximize 4 a + 3 b + 2 c + 2 d
+    s.t.     a + b <= 1, b + c <= 1, a + c <= 1
+             a + b + c <= 1 (user cut, implied for binaries by the three rows above)
+             a + d <= 1 (lazy)
+
+    Without the lazy constraint, the optimum is a = d = 1 (6). With it, the optimum is b = d = 1 (5).
+    """
+
+    model = MILPModel(relax = relax)
+    for v in "abcd":
+        model.add_binary(v)
+    model.set_objective(["a", "b", "c", "d"], [4, 3, 2, 2], maximize = True)
+    model.add_row(["a", "b"], None, LE, 1)
+    model.add_row(["b", "c"], None, LE, 1)
+    model.add_row(["a", "c"], None, LE, 1)
+    model.add_row(["a", "b", "c"], None, LE, 1, kind = USER_CUT)
+    model.add_row(["a", "d"], None, LE, 1, kind = LAZY)
+
+    return model
+##########################################################################
+
+##########################################################################
+@unittest.skipUnless(HAS_CBC, "CBC C library not available")
+class TestCbcSolver(unittest.TestCase):
+    """Solves the small model with and without warm starts.
+    """
+
+    #------------------------------------------------------------------------#
+    def setUp(self):
+        """Constructs the solver.
+        """
+
+        self.solver = CbcSolver(cbc_lib = os.environ.get("CBC_LIB"), threads = 1, time_limit = 60, verbose = False)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def check_optimum(self, sol):
+        """Checks that the solution is the optimum under the lazy constraint.
+        """
+
+        self.assertEqual(sol.status, "solved")
+        self.assertEqual(sol.values, {'b' : 1.0, 'd' : 1.0})
+        self.assertAlmostEqual(sol.objective, 5.0)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def test_cold_start(self):
+        self.check_optimum(self.solver.solve(ModelProblem(build_model())))
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def test_suboptimal_warm_start(self):
+        self.check_optimum(self.solver.solve(ModelProblem(build_model()), warm_start = {'c' : 1.0, 'd' : 1.0}))
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def test_optimal_warm_start(self):
+        self.check_optimum(self.solver.solve(ModelProblem(build_model()), warm_start = {'b' : 1.0, 'd' : 1.0}))
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def test_warm_start_violating_lazy_constraint(self):
+        model = build_model()
+        self.assertIsNone(self.solver.complete_start(model, {'a' : 1.0, 'd' : 1.0}))
+        self.check_optimum(self.solver.solve(ModelProblem(model), warm_start = {'a' : 1.0, 'd' : 1.0}))
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def test_warm_start_with_continuous_variable(self):
+        #The value of t given in the start is ignored; it follows from the integer variables.
+        for start in ({'c' : 1.0, 'd' : 1.0, 't' : 7.0}, {'b' : 1.0, 'd' : 1.0, 't' : 7.0}):
+            model = build_model()
+            model.set_bounds('t', 0, 4)
+            model.add_row(['a', 'b', 'c', 'd', 't'], [1, 1, 1, 1, -1], milp_solver.EQ, 0)
+            sol = self.solver.solve(ModelProblem(model), warm_start = start)
+            self.assertEqual(sol.status, "solved")
+            self.assertEqual(sol.values, {'b' : 1.0, 'd' : 1.0, 't' : 2.0})
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def test_user_cut_separation(self):
+        #The root LP optimum (a = b = c = 0.5, d = 1) violates the user cut, which should be seen by the callback.
+        activities = []
+        get_row_activities = milp_solver.get_row_activities
+
+        #........................................................................#
+        def record_activities(starts, cols, vals, x):
+            """Records the computed activities.
+            """
+
+            act = get_row_activities(starts, cols, vals, x)
+            activities.append(act.tolist())
+
+            return act
+        #........................................................................#
+
+        milp_solver.get_row_activities = record_activities
+        try:
+            sol = self.solver.solve(ModelProblem(build_model()))
+        finally:
+            milp_solver.get_row_activities = get_row_activities
+        self.check_optimum(sol)
+        self.assertTrue(any([act[0] > 1 + 1e-6 for act in activities]))
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def test_infeasible(self):
+        model = build_model()
+        model.add_row(["b", "d"], None, milp_solver.GE, 3)
+        sol = self.solver.solve(ModelProblem(model))
+        self.assertNotEqual(sol.status, "solved")
+        self.assertEqual(sol.values, {})
+    #------------------------------------------------------------------------#
+##########################################################################
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,11 @@
 import os
 import time
 import copy
+import errno
+import threading
+import subprocess
+from Queue import Queue
+from ast import literal_eval
 
 ##########################################################################
 class Parallel(object):
@@ -10,19 +15,42 @@ class Parallel(object):
     ----------
     max_cpu : int
         Maximum number of parallel threads.
-    sleep_interval : int
-        Number of seconds to wait between to polls for available threads.
+    state_file : Optional[str], default = None
+        File in which the outcome of each job is recorded. If it already exists,
+        jobs that it lists as successfully finished are not run again.
+    retries : Optional[int], default = 0
+        Number of times a failing job is restarted.
+    log_dir : Optional[str], default = None
+        Directory in which the standard output and error of each job are stored.
+        If None, the jobs share the output of the caller.
+
+    Notes
+    -----
+    Each job is a shell command started through subprocess. Each job gets a waiter thread
+    that blocks in os.wait4 on the job's pid alone, so that other children of the caller
+    are left to whoever started them, and posts the exit status to a queue on which
+    the runner blocks. A freed slot is thus refilled immediately and the resource usage
+    of the job (including its own children) comes for free.
+
+    Each record holds the command, the exit status, the paths of the output files,
+    the wall time in seconds, the peak resident set size in KB, and the attempt number.
+    Records are appended to the state file one per line as soon as a job finishes,
+    so that a crashed run can be resumed without losing any finished jobs.
     """
 
     #------------------------------------------------------------------------#
-    def __init__(self, max_cpu, sleep_interval):
+    def __init__(self, max_cpu, state_file = None, retries = 0, log_dir = None):
         """Constructor of the Parallel class.
         """
 
-        self.max_cpu = max_cpu
-        self.sleep_interval = sleep_interval
+        self.max_cpu = max(1, max_cpu)
+        self.state_file = state_file
+        self.retries = retries
+        self.log_dir = log_dir
         self.cmds = []
-        self.running = []
+        self.running = {}
+        self.records = []
+        self.exits = Queue()
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
@@ -33,7 +61,7 @@ class Parallel(object):
         ----------
         cmds : List[str]
             List of commands to be issued in parallel.
-        
+
         Returns
         -------
         None
@@ -43,96 +71,165 @@ class Parallel(object):
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
-    def spawn_ret_pid(self, cmd):
-        """Calls the command and returns the process's pid.
-        
+    def load_state(self):
+        """Reads the commands that have already finished successfully.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        Set[str]
+            Finished commands.
+        """
+
+        finished = set()
+        if self.state_file is None or not os.path.exists(self.state_file):
+            return finished
+
+        with open(self.state_file, "r") as inf:
+            lines = inf.readlines()
+
+        for line in lines:
+            try:
+                record = literal_eval(line)
+            except:
+                #A crash may have cut the last record short.
+                continue
+            if record["status"] == 0:
+                finished.add(record["cmd"])
+
+        return finished
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def store_record(self, record):
+        """Appends the record of a finished job to the state file.
+
+        Parameters
+        ----------
+        record : Dict[str, object]
+            Record of the job.
+
+        Returns
+        -------
+        None
+        """
+
+        self.records.append(record)
+        if self.state_file is None:
+            return
+
+        with open(self.state_file, "a") as outf:
+            outf.write(repr(record) + "\n")
+            outf.flush()
+            os.fsync(outf.fileno())
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def spawn(self, job_id, cmd, attempt):
+        """Starts a command.
+
         Parameters
         ----------
+        job_id : int
+            Index of the command in the pool.
         cmd : str
             The command to run.
+        attempt : int
+            Number of previous attempts.
 
         Returns
         -------
         int
             pid of the worker process
-
-        Notes
-        -----
-        Taken from stackexchange (https://stackoverflow.com/questions/20218570/
-        how-to-determine-pid-of-process-started-via-os-system)
         """
-    
+
         print cmd
-    
-        cmd += " & echo $! > pid"
-    
-        os.system(cmd)
-        pid_file = open("pid", "r")
-        pid = int(pid_file.read())
-        pid_file.close()
-    
-        print "pid ", pid
-        os.system("rm pid")
-    
-        return pid
+
+        stdout = stderr = None
+        out_filename = err_filename = None
+        if self.log_dir is not None:
+            if not os.path.isdir(self.log_dir):
+                os.makedirs(self.log_dir)
+            out_filename = os.path.abspath(os.path.join(self.log_dir, "job_%d_%d.out" % (job_id, attempt)))
+            err_filename = os.path.abspath(os.path.join(self.log_dir, "job_%d_%d.err" % (job_id, attempt)))
+            stdout = open(out_filename, "w")
+            stderr = open(err_filename, "w")
+
+        proc = subprocess.Popen(cmd, shell = True, stdout = stdout, stderr = stderr)
+        if stdout is not None:
+            stdout.close()
+            stderr.close()
+
+        print "pid ", proc.pid
+
+        self.running.update({proc.pid : {"proc" : proc, "job_id" : job_id, "cmd" : cmd, "attempt" : attempt,\
+                                         "stdout" : out_filename, "stderr" : err_filename,\
+                                         "start" : time.time()}})
+
+        waiter = threading.Thread(target = self.wait_job, args = (proc.pid, ))
+        waiter.daemon = True
+        waiter.start()
+
+        return proc.pid
     #------------------------------------------------------------------------#
 
     #------------------------------------------------------------------------#
-    def poll_pids(self, clean = True):
-        """Polls the list of running pids and returns the number of them
-        that are not alive.
+    def wait_job(self, pid):
+        """Waits for a job to exit and posts its exit status. Run in a separate thread.
 
         Parameters
         ----------
-        clean : Optional[bool], deafult = True
-            Specifies if the dead pids should be popped.
+        pid : int
+            pid of the worker process
 
         Returns
         -------
-        int
-            Number of dead pids.
+        None
         """
-        
-        #........................................................................#
-        def check_pid_alive(pid):
-            """Checks if the pid is alive.
-
-            Parameters
-            ----------
-            pid : int
-               pid to check.
-
-            Returns
-            -------
-            bool
-                True if alive else False
-
-            Notes
-            -----
-            Taken from stackexchange (https://stackoverflow.com/questions/568271/
-            how-to-check-if-there-exists-a-process-with-a-given-pid-in-python)
-            """
 
+        while True:
             try:
-                os.kill(pid, 0)
-            except OSError:
-                return False
-            else:
-                return True
-        #........................................................................#
+                wpid, status, usage = os.wait4(pid, 0)
+                break
+            except OSError as e:
+                if e.errno != errno.EINTR:
+                    raise
+        self.exits.put((pid, status, usage))
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def wait_any(self):
+        """Waits until one of the running jobs exits.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        Dict[str, object]
+            Record of the finished job.
+        """
+
+        pid, status, usage = self.exits.get()
+        job = self.running.pop(pid)
+
+        if os.WIFEXITED(status):
+            status = os.WEXITSTATUS(status)
+        else:
+            status = -os.WTERMSIG(status)
+        job["proc"].returncode = status
 
-        removal_list = []
-        for pid in self.running:
-            if not check_pid_alive(pid):
-                removal_list.append(pid)
-    
-        if clean:
-            for pid in removal_list:
-                self.running.remove(pid)
+        record = {"cmd" : job["cmd"], "status" : status, "stdout" : job["stdout"], "stderr" : job["stderr"],\
+                  "wall_time" : time.time() - job["start"], "peak_rss" : usage.ru_maxrss,\
+                  "attempt" : job["attempt"], "job_id" : job["job_id"]}
 
-        return len(removal_list)            
+        return record
     #------------------------------------------------------------------------#
-    
+
     #------------------------------------------------------------------------#
     def run(self):
         """Runs the initialized pool.
@@ -143,27 +240,36 @@ class Parallel(object):
 
         Returns
         -------
-        None
+        List[Dict[str, object]]
+            Records of all jobs run in this call, including the failed attempts.
         """
-        
-        i = 0
-        done = False
-        while i < len(self.cmds) or done:
-            if done:
-                while self.running:
-                    self.poll_pids()
-                break
-            while len(self.running) < self.max_cpu:
-                self.running.append(self.spawn_ret_pid(self.cmds[i]))
-                i += 1
-                if i == len(self.cmds):
-                    done = True
-                    break
-            if done:
+
+        finished = self.load_state()
+        queue = [(i, cmd, 0) for i, cmd in enumerate(self.cmds) if not cmd in finished]
+        if len(queue) < len(self.cmds):
+            print "Skipping %d jobs finished in a previous run." % (len(self.cmds) - len(queue))
+        queue.reverse()
+
+        self.records = []
+        failed = []
+        while queue or self.running:
+            while queue and len(self.running) < self.max_cpu:
+                self.spawn(*queue.pop())
+            record = self.wait_any()
+            self.store_record(record)
+            if record["status"] == 0:
                 continue
-            freed = 0
-            while freed == 0:
-                freed = self.poll_pids()
-                time.sleep(self.sleep_interval)
+            if record["attempt"] < self.retries:
+                print "Job %d failed with status %d. Retrying." % (record["job_id"], record["status"])
+                queue.append((record["job_id"], record["cmd"], record["attempt"] + 1))
+            else:
+                failed.append(record)
+
+        if failed:
+            print "%d jobs failed:" % len(failed)
+            for record in failed:
+                print "%d (status %d): %s" % (record["job_id"], record["status"], record["cmd"])
+
+        return self.records
     #------------------------------------------------------------------------#
 ##########################################################################
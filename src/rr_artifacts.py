@@ -0,0 +1,269 @@
+"""LZ4 handling of RR-graphs, with reference-counted decompressed copies.
+
+The compressed >>name_rr.xml.lz4<< is the artifact that is kept around. Jobs that need the
+uncompressed >>name_rr.xml<< acquire it and release it once done. The first acquisition
+decompresses the file, the subsequent ones reuse it, and the last release removes it again.
+The count lives in >>name_rr.xml.refs<<, guarded by a lock on >>name_rr.xml.lock<<,
+so that it is shared by all processes working in the same directory.
+"""
+
+import os
+import fcntl
+import shutil
+import subprocess
+
+try:
+    import lz4.frame
+    HAS_LZ4_FRAME = True
+except ImportError:
+    HAS_LZ4_FRAME = False
+
+CHUNK_SIZE = 1 << 22
+#Number of bytes decompressed at once.
+
+##########################################################################
+def open_compressed(filename):
+    """Opens an LZ4 file for writing.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the compressed file.
+
+    Returns
+    -------
+    file
+        Writable stream.
+    subprocess.Popen | None
+        The compressing process, which must be waited on after the stream is closed,
+        or None if the compression happens in-process.
+
+    Notes
+    -----
+    Compression uses the lz4.frame module if available and otherwise pipes
+    the stream through the lz4 command-line tool. Both produce standard LZ4 frames.
+    """
+
+    if HAS_LZ4_FRAME:
+        return lz4.frame.open(filename, mode = "wb"), None
+
+    proc = subprocess.Popen(["lz4", "-q", "-z", "-f", "-", filename], stdin = subprocess.PIPE)
+
+    return proc.stdin, proc
+##########################################################################
+
+##########################################################################
+def decompress(lz4_filename, filename):
+    """Decompresses an LZ4 file.
+
+    Parameters
+    ----------
+    lz4_filename : str
+        Name of the compressed file.
+    filename : str
+        Name of the decompressed file.
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    The output is written to a temporary file and then renamed, so that it is replaced
+    atomically. Sandboxes holding hardlinks to the previous version are left untouched.
+    The output gets the modification time of the compressed file.
+    """
+
+    tmp_filename = "%s.tmp%d" % (filename, os.getpid())
+    if HAS_LZ4_FRAME:
+        with lz4.frame.open(lz4_filename, mode = "rb") as inf:
+            with open(tmp_filename, "wb") as outf:
+                shutil.copyfileobj(inf, outf, CHUNK_SIZE)
+    elif subprocess.call(["lz4", "-q", "-d", "-f", lz4_filename, tmp_filename]) != 0:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        print "Decompression of %s failed." % lz4_filename
+        raise ValueError
+
+    #NOTE: The binary sidecar is rejected if it is older than the XML, so the XML takes over
+    #the modification time of the compressed file, as with the lz4 tool.
+    st = os.stat(lz4_filename)
+    os.utime(tmp_filename, (st.st_atime, st.st_mtime))
+    os.rename(tmp_filename, filename)
+##########################################################################
+
+##########################################################################
+def lock(rr_filename):
+    """Locks the reference count of an RR-graph.
+
+    Parameters
+    ----------
+    rr_filename : str
+        Name of the uncompressed RR-graph file.
+
+    Returns
+    -------
+    file
+        The lock file, to be passed to >>unlock<<.
+    """
+
+    lockf = open(rr_filename + ".lock", "a")
+    fcntl.flock(lockf, fcntl.LOCK_EX)
+
+    return lockf
+##########################################################################
+
+##########################################################################
+def unlock(lockf):
+    """Unlocks the reference count of an RR-graph.
+
+    Parameters
+    ----------
+    lockf : file
+        The lock file returned by >>lock<<.
+
+    Returns
+    -------
+    None
+    """
+
+    fcntl.flock(lockf, fcntl.LOCK_UN)
+    lockf.close()
+##########################################################################
+
+##########################################################################
+def read_refs(rr_filename):
+    """Reads the reference count of an RR-graph.
+
+    Parameters
+    ----------
+    rr_filename : str
+        Name of the uncompressed RR-graph file.
+
+    Returns
+    -------
+    int
+        Number of users of the decompressed file.
+    """
+
+    try:
+        with open(rr_filename + ".refs", "r") as inf:
+            return int(inf.read())
+    except:
+        return 0
+##########################################################################
+
+##########################################################################
+def write_refs(rr_filename, refs):
+    """Writes the reference count of an RR-graph, removing it if it drops to zero.
+
+    Parameters
+    ----------
+    rr_filename : str
+        Name of the uncompressed RR-graph file.
+    refs : int
+        Number of users of the decompressed file.
+
+    Returns
+    -------
+    None
+    """
+
+    if refs <= 0:
+        if os.path.exists(rr_filename + ".refs"):
+            os.remove(rr_filename + ".refs")
+        return
+
+    with open(rr_filename + ".refs", "w") as outf:
+        outf.write("%d\n" % refs)
+##########################################################################
+
+##########################################################################
+def acquire(rr_filename):
+    """Makes the uncompressed RR-graph available, decompressing it if needed.
+
+    Parameters
+    ----------
+    rr_filename : str
+        Name of the uncompressed RR-graph file.
+
+    Returns
+    -------
+    str
+        Name of the uncompressed RR-graph file.
+
+    Notes
+    -----
+    The file is decompressed if it is missing or older than the compressed one.
+    If there is no compressed file, an existing uncompressed one is used as is.
+    """
+
+    lz4_filename = rr_filename + ".lz4"
+    lockf = lock(rr_filename)
+    try:
+        if os.path.exists(lz4_filename):
+            if not os.path.exists(rr_filename)\
+               or os.path.getmtime(rr_filename) < os.path.getmtime(lz4_filename):
+                decompress(lz4_filename, rr_filename)
+        elif not os.path.exists(rr_filename):
+            print "Neither %s nor %s exists." % (rr_filename, lz4_filename)
+            raise ValueError
+        write_refs(rr_filename, read_refs(rr_filename) + 1)
+    finally:
+        unlock(lockf)
+
+    return rr_filename
+##########################################################################
+
+##########################################################################
+def release(rr_filename):
+    """Releases the uncompressed RR-graph, removing it when the last user is done.
+
+    Parameters
+    ----------
+    rr_filename : str
+        Name of the uncompressed RR-graph file.
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    The uncompressed file is removed only if the compressed one exists,
+    so that RR-graphs that were never compressed are not lost.
+    """
+
+    lockf = lock(rr_filename)
+    try:
+        refs = read_refs(rr_filename) - 1
+        write_refs(rr_filename, refs)
+        if refs <= 0 and os.path.exists(rr_filename + ".lz4") and os.path.exists(rr_filename):
+            os.remove(rr_filename)
+    finally:
+        unlock(lockf)
+##########################################################################
+
+##########################################################################
+def evict(rr_filename):
+    """Removes the uncompressed RR-graph and its reference count, regardless of the users.
+    Meant for resetting the state left behind by interrupted runs.
+
+    Parameters
+    ----------
+    rr_filename : str
+        Name of the uncompressed RR-graph file.
+
+    Returns
+    -------
+    None
+    """
+
+    lockf = lock(rr_filename)
+    try:
+        write_refs(rr_filename, 0)
+        if os.path.exists(rr_filename):
+            os.remove(rr_filename)
+    finally:
+        unlock(lockf)
+##########################################################################
@@ -0,0 +1,579 @@
+"""Binary sidecar of VTR8 RR-graphs, holding the nodes as columnar arrays and the edges
+in CSR form, so that the graph can be memory-mapped instead of parsed from XML.
+
+The sidecar of >>name_rr.xml<< (or >>name_rr.xml.lz4<<) is >>name_rr.bin<<.
+"""
+
+import os
+import ast
+import array
+import numpy as np
+
+MAGIC = "RRBIN1\n"
+ALIGNMENT = 64
+#Byte alignment of individual arrays within the file.
+
+NODE_TYPES = ["SOURCE", "SINK", "IPIN", "OPIN", "CHANX", "CHANY"]
+DIRECTIONS = ['', "INC_DIR", "DEC_DIR", "BI_DIR"]
+SIDES = ['', "LEFT", "RIGHT", "TOP", "BOTTOM"]
+
+NODE_COLUMNS = [("id", "<i4"), ("type", "<i1"), ("capacity", "<i4"),\
+                ("xlow", "<i4"), ("ylow", "<i4"), ("xhigh", "<i4"), ("yhigh", "<i4"),\
+                ("side", "<i1"), ("ptc", "<i4"), ("direction", "<i1"), ("segment_id", "<i4")]
+
+indent = "    "
+
+node_template = 2 * indent + "<node id=\"%d\" type=\"%s\" capacity=\"%d\">\n"\
+              + 3 * indent + "<loc xlow=\"%d\" ylow=\"%d\" xhigh=\"%d\" yhigh=\"%d\" %sptc=\"%d\"/>\n"\
+              + 3 * indent + "<timing R=\"0\" C=\"0\"/>\n%s"\
+              + 2 * indent + "</node>\n"
+
+edge_template = 2 * indent + "<edge src_node=\"%d\" sink_node=\"%d\" switch_id=\"%d\"/>\n"
+
+get_attr = lambda line, attr : line.split("%s=\"" % attr, 1)[1].split('"', 1)[0]
+
+##########################################################################
+def sidecar_filename(rr_filename):
+    """Returns the name of the sidecar belonging to an RR-graph.
+
+    Parameters
+    ----------
+    rr_filename : str
+        Name of the RR-graph file, compressed or not.
+
+    Returns
+    -------
+    str
+        Name of the sidecar.
+    """
+
+    if rr_filename.endswith(".lz4"):
+        rr_filename = rr_filename[:-len(".lz4")]
+    if rr_filename.endswith(".xml"):
+        rr_filename = rr_filename[:-len(".xml")]
+
+    return rr_filename + ".bin"
+##########################################################################
+
+##########################################################################
+def format_node(node_id, node_type, capacity, xlow, ylow, xhigh, yhigh, ptc, side = '', direction = '', segment_id = -1):
+    """Returns the XML description of a node.
+
+    Parameters
+    ----------
+    node_id : int
+        Node id.
+    node_type : str
+        Node type (SOURCE, SINK, IPIN, OPIN, CHANX, CHANY).
+    capacity : int
+        Capacity.
+    xlow : int
+        Lower x-coordinate.
+    ylow : int
+        Lower y-coordinate.
+    xhigh : int
+        Higher x-coordinate.
+    yhigh : int
+        Higher y-coordinate.
+    ptc : int
+        Pin, track, or class number.
+    side : Optional[str], default = ''
+        Pin side. Empty for non-pin nodes.
+    direction : Optional[str], default = ''
+        Wire direction. Empty for non-wire nodes.
+    segment_id : Optional[int], default = -1
+        Segment id. Negative for non-wire nodes.
+
+    Returns
+    -------
+    str
+        Text of the node.
+    """
+
+    type_str = node_type + ("\" direction=\"%s" % direction if direction else '')
+    side_str = "side=\"%s\" " % side if side else ''
+    seg_decl = 3 * indent + "<segment segment_id=\"%d\"/>\n" % segment_id if segment_id >= 0 else ''
+
+    return node_template % (node_id, type_str, capacity, xlow, ylow, xhigh, yhigh, side_str, ptc, seg_decl)
+##########################################################################
+
+##########################################################################
+def parse_prologue(prologue):
+    """Parses the switches and the segments from the part of the RR-graph preceding the nodes.
+
+    Parameters
+    ----------
+    prologue : str
+        Text preceding the >>rr_nodes<< tag.
+
+    Returns
+    -------
+    Dict[int, Tuple[str, float]]
+        Switch names and delays, indexed by switch ids.
+    Dict[int, str]
+        Segment names, indexed by segment ids.
+    """
+
+    switches = {}
+    segments = {}
+    switch_id = None
+    for line in prologue.splitlines():
+        if "<switch " in line:
+            switch_id = int(get_attr(line, "id"))
+            switches.update({switch_id : (get_attr(line, "name"), 0.0)})
+        elif switch_id is not None and "Tdel=\"" in line:
+            switches[switch_id] = (switches[switch_id][0], float(get_attr(line, "Tdel")))
+            switch_id = None
+        elif "<segment " in line and "name=\"" in line:
+            segments.update({int(get_attr(line, "id")) : get_attr(line, "name")})
+
+    return switches, segments
+##########################################################################
+
+##########################################################################
+class RRBinaryBuilder(object):
+    """Collects the nodes and edges of an RR-graph during its export.
+
+    Parameters
+    ----------
+    None
+
+    Notes
+    -----
+    Edges must be added in the order of increasing source node.
+    """
+
+    #------------------------------------------------------------------------#
+    def __init__(self):
+        """Constructor of the RRBinaryBuilder class.
+        """
+
+        self.node_cols = {col : array.array('i') for col, dtype in NODE_COLUMNS}
+        self.edge_src = array.array('i')
+        self.edge_sink = array.array('i')
+        self.edge_switch = array.array('i')
+        self.type_codes = {t : i for i, t in enumerate(NODE_TYPES)}
+        self.direction_codes = {d : i for i, d in enumerate(DIRECTIONS)}
+        self.side_codes = {s : i for i, s in enumerate(SIDES)}
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def add_node(self, node_id, node_type, capacity, xlow, ylow, xhigh, yhigh, ptc, side = '', direction = '',\
+                 segment_id = -1):
+        """Adds a node. Parameters are the same as those of >>format_node<<.
+
+        Returns
+        -------
+        None
+        """
+
+        cols = self.node_cols
+        cols["id"].append(node_id)
+        cols["type"].append(self.type_codes[node_type])
+        cols["capacity"].append(capacity)
+        cols["xlow"].append(xlow)
+        cols["ylow"].append(ylow)
+        cols["xhigh"].append(xhigh)
+        cols["yhigh"].append(yhigh)
+        cols["side"].append(self.side_codes[side])
+        cols["ptc"].append(ptc)
+        cols["direction"].append(self.direction_codes[direction])
+        cols["segment_id"].append(segment_id)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def add_edge(self, src, sink, switch_id):
+        """Adds an edge.
+
+        Parameters
+        ----------
+        src : int
+            Source node id.
+        sink : int
+            Sink node id.
+        switch_id : int
+            Switch id.
+
+        Returns
+        -------
+        None
+        """
+
+        self.edge_src.append(src)
+        self.edge_sink.append(sink)
+        self.edge_switch.append(switch_id)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def get_arrays(self):
+        """Converts the collected nodes and edges to the arrays of the sidecar.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        List[Tuple[str, np.ndarray]]
+            Named arrays, in the order in which they are stored.
+        """
+
+        nodes = {col : np.frombuffer(self.node_cols[col], dtype = np.int32).astype(dtype)\
+                 for col, dtype in NODE_COLUMNS}
+        edge_src = np.frombuffer(self.edge_src, dtype = np.int32)
+        if edge_src.size and np.any(np.diff(edge_src) < 0):
+            print "Sidecar edges are not sorted by source."
+            raise ValueError
+        node_cnt = int(nodes["id"].max()) + 1 if nodes["id"].size else 0
+        row_ptr = np.zeros(node_cnt + 1, dtype = "<i8")
+        np.cumsum(np.bincount(edge_src, minlength = node_cnt), out = row_ptr[1:])
+
+        arrays = [("node_%s" % col, nodes[col]) for col, dtype in NODE_COLUMNS]
+        arrays.append(("edge_row_ptr", row_ptr))
+        arrays.append(("edge_sink", np.frombuffer(self.edge_sink, dtype = np.int32).astype("<i4")))
+        arrays.append(("edge_switch", np.frombuffer(self.edge_switch, dtype = np.int32).astype("<i2")))
+
+        return arrays
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def write(self, filename, prologue):
+        """Writes the sidecar.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the sidecar.
+        prologue : str
+            Text of the RR-graph preceding the >>rr_nodes<< tag.
+
+        Returns
+        -------
+        None
+        """
+
+        write_rr_binary(filename, self.get_arrays(), prologue)
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def build(self, prologue):
+        """Returns an in-memory RRBinary, without writing the sidecar.
+
+        Parameters
+        ----------
+        prologue : str
+            Text of the RR-graph preceding the >>rr_nodes<< tag.
+
+        Returns
+        -------
+        RRBinary
+            The graph.
+        """
+
+        return RRBinary(None, arrays = dict(self.get_arrays()), prologue = prologue)
+    #------------------------------------------------------------------------#
+##########################################################################
+
+##########################################################################
+def write_rr_binary(filename, arrays, prologue):
+    """Writes the sidecar file. The write is atomic.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the sidecar.
+    arrays : List[Tuple[str, np.ndarray]]
+        Named arrays, in the order in which they are to be stored.
+    prologue : str
+        Text of the RR-graph preceding the >>rr_nodes<< tag.
+
+    Returns
+    -------
+    None
+    """
+
+    switches, segments = parse_prologue(prologue)
+
+    #The offsets are stored in the header, so its length depends on them.
+    #Iterate until the start of the data no longer moves.
+    data_start = 0
+    while True:
+        layout = {}
+        offset = data_start
+        for name, arr in arrays:
+            layout.update({name : (arr.dtype.str, arr.shape, offset)})
+            offset += (arr.nbytes + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+        header = {"arrays" : layout, "switches" : switches, "segments" : segments, "prologue" : prologue}
+        header_txt = repr(header)
+        header_end = len(MAGIC) + 21 + len(header_txt)
+        if header_end <= data_start:
+            break
+        data_start = (header_end + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+    tmp_filename = filename + ".tmp%d" % os.getpid()
+    with open(tmp_filename, "wb") as outf:
+        outf.write(MAGIC)
+        outf.write("%020d\n" % len(header_txt))
+        outf.write(header_txt)
+        for name, arr in arrays:
+            outf.write('\0' * (layout[name][2] - outf.tell()))
+            outf.write(np.ascontiguousarray(arr).tostring())
+    os.rename(tmp_filename, filename)
+##########################################################################
+
+##########################################################################
+class RRBinary(object):
+    """Memory-mapped view of an RR-graph sidecar.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the sidecar.
+    arrays : Optional[Dict[str, np.ndarray]], default = None
+        Arrays of an in-memory graph. If specified, >>filename<< is ignored.
+    prologue : Optional[str], default = None
+        Prologue of an in-memory graph.
+
+    Attributes
+    ----------
+    nodes : Dict[str, np.ndarray]
+        Node columns (id, type, capacity, xlow, ylow, xhigh, yhigh, side, ptc, direction, segment_id).
+        Types, sides, and directions are indices into NODE_TYPES, SIDES, and DIRECTIONS.
+    edge_row_ptr : np.ndarray
+        Edges of node u are at positions edge_row_ptr[u] to edge_row_ptr[u + 1] - 1.
+    edge_sink : np.ndarray
+        Sink node of each edge.
+    edge_switch : np.ndarray
+        Switch id of each edge.
+    switches : Dict[int, Tuple[str, float]]
+        Switch names and delays, indexed by switch ids.
+    segments : Dict[int, str]
+        Segment names, indexed by segment ids.
+    prologue : str
+        Text of the RR-graph preceding the >>rr_nodes<< tag.
+
+    Notes
+    -----
+    The arrays are read-only memory maps, so the pages are shared between all processes
+    reading the same sidecar.
+    """
+
+    #------------------------------------------------------------------------#
+    def __init__(self, filename, arrays = None, prologue = None):
+        """Constructor of the RRBinary class.
+        """
+
+        self.filename = filename
+        self.node_templates = None
+
+        if arrays is not None:
+            self.switches, self.segments = parse_prologue(prologue)
+            self.prologue = prologue
+        else:
+            with open(filename, "rb") as inf:
+                if inf.read(len(MAGIC)) != MAGIC:
+                    print "%s is not an RR-graph sidecar." % filename
+                    raise ValueError
+                header_len = int(inf.readline())
+                header = ast.literal_eval(inf.read(header_len))
+
+            self.switches = header["switches"]
+            self.segments = header["segments"]
+            self.prologue = header["prologue"]
+
+            arrays = {}
+            for name, (dtype, shape, offset) in header["arrays"].items():
+                if not all(shape):
+                    arrays.update({name : np.zeros(shape, dtype = dtype)})
+                    continue
+                arrays.update({name : np.memmap(filename, dtype = dtype, mode = 'r', offset = offset, shape = shape)})
+
+        self.nodes = {col : arrays["node_%s" % col] for col, dtype in NODE_COLUMNS}
+        self.edge_row_ptr = arrays["edge_row_ptr"]
+        self.edge_sink = arrays["edge_sink"]
+        self.edge_switch = arrays["edge_switch"]
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def edge_src(self):
+        """Returns the source node of each edge.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        np.ndarray
+            Source node ids, aligned with >>edge_sink<<.
+        """
+
+        return np.repeat(np.arange(self.edge_row_ptr.size - 1, dtype = np.int32), np.diff(self.edge_row_ptr))
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def node_text(self, id_offset = 0, x_offset = 0, y_offset = 0):
+        """Returns the XML description of all nodes, optionally translated.
+
+        Parameters
+        ----------
+        id_offset : Optional[int], default = 0
+            Value added to all node ids.
+        x_offset : Optional[int], default = 0
+            Value added to all x-coordinates.
+        y_offset : Optional[int], default = 0
+            Value added to all y-coordinates.
+
+        Returns
+        -------
+        str
+            Text of the nodes, without the enclosing tags.
+        """
+
+        if self.node_templates is None:
+            self.node_templates = self.get_node_templates()
+
+        nodes = self.nodes
+        values = zip((nodes["id"] + id_offset).tolist(),\
+                     (nodes["xlow"] + x_offset).tolist(), (nodes["ylow"] + y_offset).tolist(),\
+                     (nodes["xhigh"] + x_offset).tolist(), (nodes["yhigh"] + y_offset).tolist())
+
+        return ''.join([t % v for t, v in zip(self.node_templates, values)])
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def get_node_templates(self):
+        """Returns the text of each node with the id and the coordinates left as placeholders.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        List[str]
+            Templates taking (id, xlow, ylow, xhigh, yhigh).
+
+        Notes
+        -----
+        Most nodes share their template, so the distinct ones are stored only once.
+        """
+
+        partial_template = node_template.replace("%d", "%%d").replace("type=\"%s\" capacity=\"%%d\"",\
+                                                                      "type=\"%s\" capacity=\"%d\"")
+        partial_template = partial_template.replace("ptc=\"%%d\"", "ptc=\"%d\"")
+
+        cols = [self.nodes[col].tolist() for col in ("type", "capacity", "side", "ptc", "direction", "segment_id")]
+        distinct = {}
+        templates = []
+        for key in zip(*cols):
+            try:
+                templates.append(distinct[key])
+                continue
+            except:
+                pass
+            node_type, capacity, side, ptc, direction, segment_id = key
+            direction = DIRECTIONS[direction]
+            side = SIDES[side]
+            type_str = NODE_TYPES[node_type] + ("\" direction=\"%s" % direction if direction else '')
+            side_str = "side=\"%s\" " % side if side else ''
+            seg_decl = 3 * indent + "<segment segment_id=\"%d\"/>\n" % segment_id if segment_id >= 0 else ''
+            template = partial_template % (type_str, capacity, side_str, ptc, seg_decl)
+            distinct.update({key : template})
+            templates.append(template)
+
+        return templates
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def edge_text(self, id_offset = 0):
+        """Returns the XML description of all edges, optionally translated.
+
+        Parameters
+        ----------
+        id_offset : Optional[int], default = 0
+            Value added to all node ids.
+
+        Returns
+        -------
+        str
+            Text of the edges, without the enclosing tags.
+        """
+
+        srcs = (self.edge_src() + id_offset).tolist()
+        sinks = (self.edge_sink + id_offset).tolist()
+        switches = self.edge_switch.tolist()
+
+        return ''.join([edge_template % e for e in zip(srcs, sinks, switches)])
+    #------------------------------------------------------------------------#
+##########################################################################
+
+##########################################################################
+def parse_rr_xml(rr_filename):
+    """Parses an RR-graph written by arc_gen into an in-memory RRBinary.
+
+    Parameters
+    ----------
+    rr_filename : str
+        Name of the RR-graph file.
+
+    Returns
+    -------
+    RRBinary
+        The graph.
+
+    Notes
+    -----
+    The parser relies on the layout used by arc_gen (and format_node): one tag per line,
+    with the location on the line following the node tag and the segment two lines below it.
+    """
+
+    with open(rr_filename, "r") as inf:
+        lines = inf.readlines()
+
+    builder = RRBinaryBuilder()
+    prologue_end = None
+    for lcnt, line in enumerate(lines):
+        if "<node " in line:
+            loc = lines[lcnt + 1]
+            node_type = get_attr(line, "type")
+            direction = get_attr(line, "direction") if "direction=\"" in line else ''
+            side = get_attr(loc, "side") if "side=\"" in loc else ''
+            segment_id = int(get_attr(lines[lcnt + 3], "segment_id")) if node_type.startswith("CHAN") else -1
+            builder.add_node(int(get_attr(line, "id")), node_type, int(get_attr(line, "capacity")),\
+                             int(get_attr(loc, "xlow")), int(get_attr(loc, "ylow")),\
+                             int(get_attr(loc, "xhigh")), int(get_attr(loc, "yhigh")), int(get_attr(loc, "ptc")),\
+                             side = side, direction = direction, segment_id = segment_id)
+        elif "<edge " in line:
+            builder.add_edge(int(get_attr(line, "src_node")), int(get_attr(line, "sink_node")),\
+                             int(get_attr(line, "switch_id")))
+        elif prologue_end is None and "<rr_nodes>" in line:
+            prologue_end = lcnt
+
+    return builder.build(''.join(lines[:prologue_end]))
+##########################################################################
+
+##########################################################################
+def load_rr_binary(rr_filename):
+    """Loads the sidecar of an RR-graph, if it exists and is not older than the graph.
+
+    Parameters
+    ----------
+    rr_filename : str
+        Name of the RR-graph file.
+
+    Returns
+    -------
+    RRBinary | None
+        The memory-mapped sidecar, or None if the XML should be parsed instead.
+    """
+
+    filename = sidecar_filename(rr_filename)
+    if not os.path.exists(filename):
+        return None
+    for f in (rr_filename, rr_filename + ".lz4"):
+        if os.path.exists(f) and os.path.getmtime(f) > os.path.getmtime(filename):
+            return None
+
+    return RRBinary(filename)
+##########################################################################
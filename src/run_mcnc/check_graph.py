@@ -1,26 +1,52 @@
-filename = "full_ripup_avalanche_at_1.1/agilex_full_ripup_avalanche_at_1.1_5_5_rr.xml"
+import sys
+sys.path.insert(0,'..')
+
+import rr_binary
 
-with open(filename, "r") as inf:
-    lines = inf.readlines()
+filename = "full_ripup_avalanche_at_1.1/agilex_full_ripup_avalanche_at_1.1_5_5_rr.xml"
 
 get_attr = lambda line, attr : line.split("%s=\"" % attr, 1)[1].split('"', 1)[0]
 
+#Wires as (type, id, direction, segment_id, low, high) and edges as (src, sink), all in text form.
+wires = []
+wire_edges = []
+rr = rr_binary.load_rr_binary(filename)
+if rr is not None:
+    nodes = rr.nodes
+    cols = [nodes[col].tolist() for col in ("type", "id", "direction", "segment_id", "xlow", "ylow", "xhigh", "yhigh")]
+    for node_type, node_id, direction, seg, xlow, ylow, xhigh, yhigh in zip(*cols):
+        node_type = rr_binary.NODE_TYPES[node_type]
+        if not node_type.startswith("CHAN"):
+            continue
+        wires.append((node_type, str(node_id), rr_binary.DIRECTIONS[direction], str(seg),\
+                      (str(xlow), str(ylow)), (str(xhigh), str(yhigh))))
+    wire_edges = zip([str(u) for u in rr.edge_src().tolist()], [str(v) for v in rr.edge_sink.tolist()])
+else:
+    with open(filename, "r") as inf:
+        lines = inf.readlines()
+
+    for lcnt, line in enumerate(lines):
+        if "CHANX" in line or "CHANY" in line:
+            low = (get_attr(lines[lcnt + 1], "xlow"), get_attr(lines[lcnt + 1], "ylow"))
+            high = (get_attr(lines[lcnt + 1], "xhigh"), get_attr(lines[lcnt + 1], "yhigh"))
+            wires.append(("CHANX" if "CHANX" in line else "CHANY", get_attr(line, "id"), get_attr(line, "direction"),\
+                          get_attr(lines[lcnt + 3], "segment_id"), low, high))
+        elif "<edge " in line:
+            wire_edges.append((get_attr(line, "src_node"), get_attr(line, "sink_node")))
+
 seg_ids = {'H' : '0', 'V' : '1'}
 chan_nodes = {}
 coord_lookup = {}
-for lcnt, line in enumerate(lines):
-    if "CHANX" in line:
-        if get_attr(lines[lcnt + 3], "segment_id") != seg_ids['H']:
+for node_type, node_id, direction, seg, low, high in wires:
+    if node_type == "CHANX":
+        if seg != seg_ids['H']:
             print "Wrong segment id for H wire."
             raise ValueError
-        low = (get_attr(lines[lcnt + 1], "xlow"), get_attr(lines[lcnt + 1], "ylow"))
-        high = (get_attr(lines[lcnt + 1], "xhigh"), get_attr(lines[lcnt + 1], "yhigh"))
         if high != low:
             print "H wire different low and high coords."
             raise ValueError
 
-        name = "H1R" if get_attr(line, "direction") == "INC_DIR" else "H1L"
-        node_id = get_attr(line, "id")
+        name = "H1R" if direction == "INC_DIR" else "H1L"
         attr_dict = {node_id : name}
         coord_lookup.update({node_id : low})
         try:
@@ -28,18 +54,15 @@ for lcnt, line in enumerate(lines):
         except:
             chan_nodes.update({low : attr_dict})
 
-    if "CHANY" in line:
-        if get_attr(lines[lcnt + 3], "segment_id") != seg_ids['V']:
+    if node_type == "CHANY":
+        if seg != seg_ids['V']:
             print "Wrong segment id for V wire."
             raise ValueError
-        low = (get_attr(lines[lcnt + 1], "xlow"), get_attr(lines[lcnt + 1], "ylow"))
-        high = (get_attr(lines[lcnt + 1], "xhigh"), get_attr(lines[lcnt + 1], "yhigh"))
         if high != low:
             print "V wire different low and high coords."
             raise ValueError
 
-        name = "V1U" if get_attr(line, "direction") == "INC_DIR" else "V1D"
-        node_id = get_attr(line, "id")
+        name = "V1U" if direction == "INC_DIR" else "V1D"
         attr_dict = {node_id : name}
         coord_lookup.update({node_id : low})
         try:
@@ -52,17 +75,14 @@ h_io = ['H1L', 'H1L', 'H1R', 'H1R']
 v_io = ['V1D', 'V1D', 'V1U', 'V1U']
 
 edges = {}
-for line in lines:
-    if "<edge " in line:
-        src = get_attr(line, "src_node")
-        sink = get_attr(line, "sink_node")
-        if src in coord_lookup and sink in coord_lookup:
-            src_coords = coord_lookup[src]
-            sink_coords = coord_lookup[sink]
-            try:
-                edges[src].append(sink)
-            except:
-                edges.update({src : [sink]})
+for src, sink in wire_edges:
+    if src in coord_lookup and sink in coord_lookup:
+        src_coords = coord_lookup[src]
+        sink_coords = coord_lookup[sink]
+        try:
+            edges[src].append(sink)
+        except:
+            edges.update({src : [sink]})
 
 for coords in sorted(chan_nodes):
     print coords
@@ -11,6 +11,7 @@ from parallelize import Parallel
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--max_cpu")
+parser.add_argument("--resume")
 args = parser.parse_args()
 
 max_cpu = 1
@@ -18,7 +19,20 @@ try:
     max_cpu = int(args.max_cpu)
 except:
     pass
-sleep_interval = 5
+
+RESUME = False
+try:
+    RESUME = int(args.resume)
+except:
+    pass
+#If set, the run directories are left as they are and only the jobs that
+#did not finish in the previous run are started.
+
+state_files = ["resize_all_grids_spice.jobs", "resize_all_grids_resize.jobs"]
+if not RESUME:
+    for state_file in state_files:
+        if os.path.exists(state_file):
+            os.remove(state_file)
 
 grid_sizes =  {'spla': 22,\
                'diffeq': 13,\
@@ -52,6 +66,8 @@ print patterns
 
 #Create the necessary directories and copy the needed files.
 for pattern in patterns:
+    if RESUME:
+        break
     local_dir = pattern.rsplit('.', 1)[0]
     os.system("rm -rf %s/" % local_dir)
     os.system("mkdir %s/" % local_dir)
@@ -68,12 +84,13 @@ size = min_grid_size
 meas = " --measure_delays 1"
 for pattern in patterns:
     rundir = pattern.rsplit('.', 1)[0]
-    os.system("rm -rf %s/src/" % rundir)
-    os.system("mkdir %s/src/" % rundir)
-    os.system("cp -r ../ %s/src/" % rundir) 
+    if not RESUME:
+        os.system("rm -rf %s/src/" % rundir)
+        os.system("mkdir %s/src/" % rundir)
+        os.system("cp -r ../ %s/src/" % rundir) 
     calls.append("python run_arc_gen_pattern_swap_only.py --grid_w %d --grid_h %d --arc_name agilex --run_dir %s/ %s"\
                  % (size, size, rundir, meas))
-runner = Parallel(max_cpu, sleep_interval)
+runner = Parallel(max_cpu, state_file = state_files[0])
 runner.init_cmd_pool(calls)
 runner.run()
 del runner
@@ -92,7 +109,7 @@ for pattern in patterns:
 
 print calls
 
-runner = Parallel(max_cpu, sleep_interval)
+runner = Parallel(max_cpu, state_file = state_files[1])
 runner.init_cmd_pool(calls)
 runner.run()
 del runner
@@ -5,14 +5,15 @@ import random
 import math
 import sys
 sys.path.insert(0,'..')
-sys.path.insert(0,'../..')
 
 seeds = [19225]
 
 from parallelize import Parallel
+import rr_artifacts
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--max_cpu")
+parser.add_argument("--resume")
 args = parser.parse_args()
 
 max_cpu = 1
@@ -20,7 +21,20 @@ try:
     max_cpu = int(args.max_cpu)
 except:
     pass
-sleep_interval = 5
+
+RESUME = False
+try:
+    RESUME = int(args.resume)
+except:
+    pass
+#If set, the run directories are left as they are and only the jobs that
+#did not finish in the previous run are started.
+
+state_files = ["run_gnl.jobs"]
+if not RESUME:
+    for state_file in state_files:
+        if os.path.exists(state_file):
+            os.remove(state_file)
 
 grid_sizes = {\
 "synth_p0.70_size10000_seed25891" : 39,\
@@ -42,18 +56,19 @@ print arc_dirs, len(arc_dirs)
 
 wd = os.getcwd()
 calls = []
+held_rr_files = []
 for d in arc_dirs:
     if not os.path.isdir(d) or not "sol" in d:
         continue
     for size in sorted(set(grid_sizes.values())):
         arc = "agilex_%d_%d" % (size, size)
-        rr_file = "%s_rr.xml" % arc
-        os.chdir(d)
-        os.system("rm -f %s" % rr_file)
-        os.system("lz4 -d %s.lz4" % rr_file)
-        os.chdir('..')
-        os.system("cp -r %s/benchmarks ./" % wd)
-        os.chdir(wd)
+        if RESUME:
+            continue
+        #NOTE: The reference held here keeps the RR-graph decompressed until all jobs are done.
+        rr_file = "%s%s_rr.xml" % (d, arc)
+        rr_artifacts.evict(rr_file)
+        held_rr_files.append(rr_artifacts.acquire(rr_file))
+        os.system("cp -r %s/benchmarks %s/" % (wd, os.path.dirname(d.rstrip('/'))))
 
     for b in sorted(grid_sizes):
         for s in seeds:
@@ -61,6 +76,9 @@ for d in arc_dirs:
                          % (d, arc, b, s))
 print calls, len(calls)
 
-runner = Parallel(max_cpu, sleep_interval)
+runner = Parallel(max_cpu, state_file = state_files[0])
 runner.init_cmd_pool(calls)
 runner.run()
+
+for rr_file in held_rr_files:
+    rr_artifacts.release(rr_file)
@@ -1,16 +1,18 @@
 import time
 import os
 import argparse
+import subprocess
 import random
 import math
 import sys
 sys.path.insert(0,'..')
-sys.path.insert(0,'../..')
 
 from parallelize import Parallel
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--max_cpu")
+parser.add_argument("--resume")
+parser.add_argument("--per_unit")
 args = parser.parse_args()
 
 max_cpu = 1
@@ -18,7 +20,29 @@ try:
     max_cpu = int(args.max_cpu)
 except:
     pass
-sleep_interval = 5
+
+RESUME = False
+try:
+    RESUME = int(args.resume)
+except:
+    pass
+#If set, the run directories are left as they are and only the jobs that
+#did not finish in the previous run are started.
+
+PER_UNIT = False
+try:
+    PER_UNIT = int(args.per_unit)
+except:
+    pass
+#If set, each (architecture, circuit, seed) unit is a separate job, instead of
+#each architecture directory running all of its units serially.
+#Units whose logs already hold a final critical path are skipped.
+
+state_files = ["run_mcnc.jobs"]
+if not RESUME:
+    for state_file in state_files:
+        if os.path.exists(state_file):
+            os.remove(state_file)
 
 root_dir = os.path.abspath("../../cleaned_patterns/")
 arc_dirs = ["%s/%s/%s/" % (root_dir, feature_dir, sol_dir) for feature_dir in os.listdir(root_dir)\
@@ -30,10 +54,14 @@ calls = []
 for d in arc_dirs:
     if not os.path.isdir(d) or not "sol" in d:
         continue
-    calls.append("python -u run_pnr.py --arc_dir %s" % d)
+    if PER_UNIT:
+        units = subprocess.check_output("python -u run_pnr.py --arc_dir %s --list_units 1" % d, shell = True)
+        calls += [unit for unit in units.splitlines() if unit.strip()]
+    else:
+        calls.append("python -u run_pnr.py --arc_dir %s" % d)
 
 print calls, len(calls)
 
-runner = Parallel(max_cpu, sleep_interval)
+runner = Parallel(max_cpu, state_file = state_files[0])
 runner.init_cmd_pool(calls)
 runner.run()
@@ -10,6 +10,14 @@ circ : str
     Name of the circuit.
 seed : int
     Placement seed.
+list_units : bool
+    Instructs the script to only print the commands running the individual
+    (arc, circ, seed) units that have not finished yet, one per line,
+    so that they can be handed to a shared scheduler.
+
+Notes
+-----
+If no circuit is given, all circuits are run with all seeds.
 """
 
 import time
@@ -19,10 +27,16 @@ import sys
 sys.path.insert(0,'..')
 
 import setenv_testing
+import vpr_sandbox
+import rr_artifacts
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--arc_dir")
 parser.add_argument("--benchmark_path")
+parser.add_argument("--arc")
+parser.add_argument("--circ")
+parser.add_argument("--seed")
+parser.add_argument("--list_units")
 
 seeds = [19225, 25124, 43033, 50936, 5300]
 
@@ -48,8 +62,43 @@ grid_sizes =  {\
 
 args = parser.parse_args()
 
+LIST_UNITS = False
+try:
+    LIST_UNITS = int(args.list_units)
+except:
+    pass
+
 wd = os.getcwd()
 os.chdir(args.arc_dir)
+
+##########################################################################
+def is_finished(circ, seed):
+    """Checks if the log of a unit already holds a final critical path.
+
+    Parameters
+    ----------
+    circ : str
+        Name of the circuit.
+    seed : int
+        Placement seed.
+
+    Returns
+    -------
+    bool
+        True if the unit need not be run again, False otherwise.
+    """
+
+    try:
+        with open("vpr_%s_%d.log" % (circ, seed), "r") as inf:
+            for line in inf:
+                if "Final critical path:" in line:
+                    return True
+    except IOError:
+        pass
+
+    return False
+##########################################################################
+
 ##########################################################################
 def call_vpr(arc, circ, seed):
     """Calls VPR
@@ -92,12 +141,14 @@ def call_vpr(arc, circ, seed):
     #if os.path.exists(final_res_file):
     #    return
 
-    rr_file = "%s_rr.xml" % arc
-    os.system("lz4 -d -f %s.lz4" % rr_file)
+    rr_file = rr_artifacts.acquire("%s_rr.xml" % arc)
 
+    #NOTE: Written to a temporary file and renamed, as sandboxes of concurrent units may hold links to it.
     default_base_costs_content = "0 0 0 0 0 0\n1 0.001000\n0 -9"
-    with open("base_costs.dump", "w") as outf:
+    tmp_filename = "base_costs.dump.tmp%d" % os.getpid()
+    with open(tmp_filename, "w") as outf:
         outf.write(default_base_costs_content)
+    os.rename(tmp_filename, "base_costs.dump")
 
     run_req_files = ["%s.xml" % arc,\
                      "%s_rr.xml" % arc,\
@@ -105,27 +156,48 @@ def call_vpr(arc, circ, seed):
                      "%s/%s.blif" % (args.benchmark_path, circ)\
                     ]
 
-    sandbox = "sandbox_%s_%s_%d_%s" % (os.getcwd().replace('/', "__"), circ, seed, str(time.time()))
-    os.system("mkdir %s" % (os.environ["VPR_RUN_PATH"] % sandbox))
-
-    for f in run_req_files:
-        os.system("cp %s %s/" % (f, os.environ["VPR_RUN_PATH"] % sandbox))
+    sandbox = vpr_sandbox.Sandbox("sandbox_%s_%s_%d_%s" % (os.getcwd().replace('/', "__"), circ, seed, str(time.time())),\
+                                  run_req_files)
+    sandbox.stage()
 
     elim = " --random_sort_nets true --random_sort_nets_seed %SHUFFLE_SEED%"
 
-    vpr_call = "time %s" % (os.environ["VPR"].replace(elim, '').replace(" -it ", " -i ") % (sandbox, ' '.join(vpr_arguments + vpr_switches)))
+    vpr_call = "time %s" % (os.environ["VPR"].replace(elim, '').replace(" -it ", " -i ") % (sandbox.name, ' '.join(vpr_arguments + vpr_switches)))
     print vpr_call
     os.system(vpr_call)
 
-    os.system("cp %s/vpr_stdout.log ./vpr_%s_%d.log" % (os.environ["VPR_RUN_PATH"] % sandbox, circ, seed))
-
-    os.system("rm -rf %s" % (os.environ["VPR_RUN_PATH"] % sandbox))
+    sandbox.collect(outputs = {"vpr_stdout.log" : "vpr_%s_%d.log" % (circ, seed)})
+    sandbox.remove()
+    rr_artifacts.release(rr_file)
 ##########################################################################
 
-for circ in grid_sizes:
-    arc = "agilex_%d_%d" % (grid_sizes[circ], grid_sizes[circ])
-    for seed in seeds:
-        call_vpr(arc, circ, seed)
-        os.system("rm -f %s_rr.xml" % arc)
+if LIST_UNITS:
+    #NOTE: Units are grouped by grid size, so that concurrently running ones share one RR-graph.
+    for size in sorted(set(grid_sizes.values())):
+        arc = "agilex_%d_%d" % (size, size)
+        for circ in sorted(grid_sizes):
+            if grid_sizes[circ] != size:
+                continue
+            for seed in seeds:
+                if is_finished(circ, seed):
+                    continue
+                cmd = "python -u run_pnr.py --arc_dir %s --arc %s --circ %s --seed %d" % (args.arc_dir, arc, circ, seed)
+                if args.benchmark_path is not None:
+                    cmd += " --benchmark_path %s" % args.benchmark_path
+                print cmd
+elif args.circ is not None:
+    call_vpr(args.arc, args.circ, int(args.seed))
+else:
+    #NOTE: Circuits sharing a grid size are run while holding a reference to their RR-graph,
+    #so that it is decompressed only once.
+    for size in sorted(set(grid_sizes.values())):
+        arc = "agilex_%d_%d" % (size, size)
+        rr_artifacts.acquire("%s_rr.xml" % arc)
+        for circ in sorted(grid_sizes):
+            if grid_sizes[circ] != size:
+                continue
+            for seed in seeds:
+                call_vpr(arc, circ, seed)
+        rr_artifacts.release("%s_rr.xml" % arc)
 
 os.chdir(wd)
@@ -19,6 +19,8 @@ import sys
 sys.path.insert(0,'..')
 
 import setenv_testing
+import vpr_sandbox
+import rr_artifacts
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--arc_dir")
@@ -68,9 +70,7 @@ def call_vpr(arc, circ, seed):
                      "--max_criticality %s" % "0.00"\
                     ]
 
-    rr_file = "%s_rr.xml" % arc
-    #if not os.path.exists(rr_file):
-    #    os.system("lz4 -d %s.lz4" % rr_file)
+    rr_file = rr_artifacts.acquire("%s_rr.xml" % arc)
 
     run_req_files = ["%s.xml" % arc,\
                      "%s_rr.xml" % arc,\
@@ -78,21 +78,19 @@ def call_vpr(arc, circ, seed):
                      "../benchmarks/%s.blif" % circ\
                     ]
 
-    sandbox = "sandbox_%s_%s_%d_%s" % (os.getcwd().replace('/', "__"), circ, seed, str(time.time()))
-    os.system("mkdir %s" % (os.environ["VPR_RUN_PATH"] % sandbox))
-
-    for f in run_req_files:
-        os.system("cp %s %s/" % (f, os.environ["VPR_RUN_PATH"] % sandbox))
+    sandbox = vpr_sandbox.Sandbox("sandbox_%s_%s_%d_%s" % (os.getcwd().replace('/', "__"), circ, seed, str(time.time())),\
+                                  run_req_files)
+    sandbox.stage()
 
     elim = " --random_sort_nets true --random_sort_nets_seed %SHUFFLE_SEED%"
 
-    vpr_call = "time %s" % (os.environ["VPR"].replace(elim, '').replace(" -it ", " -i ") % (sandbox, ' '.join(vpr_arguments + vpr_switches)))
+    vpr_call = "time %s" % (os.environ["VPR"].replace(elim, '').replace(" -it ", " -i ") % (sandbox.name, ' '.join(vpr_arguments + vpr_switches)))
     print vpr_call
     os.system(vpr_call)
 
-    os.system("cp %s/vpr_stdout.log ./vpr_%s_%d.log" % (os.environ["VPR_RUN_PATH"] % sandbox, circ, seed))
-
-    os.system("rm -rf %s" % (os.environ["VPR_RUN_PATH"] % sandbox))
+    sandbox.collect(outputs = {"vpr_stdout.log" : "vpr_%s_%d.log" % (circ, seed)})
+    sandbox.remove()
+    rr_artifacts.release(rr_file)
 ##########################################################################
 
 call_vpr(args.arc, args.circ, int(args.seed))
@@ -16,3 +16,10 @@ os.environ["HSPICE_CPU"] = "20"
 
 #Maximum number of parallel VPR and other non-SPICE jobs
 os.environ["VPR_CPU"] = "47"
+
+#Shared store of generated architecture artifacts (empty string disables it) and its maximum size in MB
+os.environ["ARC_GEN_STORE"] = "/home/snikolic/FPGA23/arc_gen_store/"
+os.environ["ARC_GEN_STORE_SIZE"] = "20000"
+
+#Shared directory of load-model calibrations
+os.environ["ARC_GEN_LOAD_MODEL_CACHE"] = "/home/snikolic/FPGA23/load_model_cache/"
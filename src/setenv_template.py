@@ -16,3 +16,10 @@ os.environ["HSPICE_CPU"] = "%%max_hspice_cpu%%"
 
 #Maximum number of parallel VPR and other non-SPICE jobs
 os.environ["VPR_CPU"] = "%%max_vpr_cpu%%"
+
+#Shared store of generated architecture artifacts (empty string disables it) and its maximum size in MB
+os.environ["ARC_GEN_STORE"] = "%%arc_gen_store_path%%"
+os.environ["ARC_GEN_STORE_SIZE"] = "%%max_arc_gen_store_size%%"
+
+#Shared directory of load-model calibrations
+os.environ["ARC_GEN_LOAD_MODEL_CACHE"] = "%%load_model_cache_path%%"
@@ -0,0 +1,184 @@
+"""Staging of the VPR sandboxes, shared by all scripts that call VPR.
+
+The read-only inputs are hardlinked into the sandbox, or reflinked if that is not possible,
+and copied only as a last resort. The outputs are moved back instead of being copied.
+The time spent on staging and the number of bytes moved around are appended to
+>>sandbox_stats.log<< in the caller's working directory, one line per run.
+"""
+
+import os
+import time
+import shutil
+import subprocess
+
+STATS_FILE = "sandbox_stats.log"
+#File to which the staging statistics of each run are appended.
+
+STAGING_METHODS = ["link", "reflink", "copy"]
+
+##########################################################################
+def stage_file(src, dst):
+    """Makes a file available at a new path, as cheaply as possible.
+
+    Parameters
+    ----------
+    src : str
+        Path of the existing file.
+    dst : str
+        Path at which it should appear.
+
+    Returns
+    -------
+    str
+        Method used. One of STAGING_METHODS.
+
+    Notes
+    -----
+    Hardlinks fail across filesystems, in which case a copy-on-write clone is attempted.
+    Both share the data with the original, so VPR must not modify the staged file in place.
+    """
+
+    try:
+        os.link(src, dst)
+        return "link"
+    except OSError:
+        pass
+
+    with open(os.devnull, "w") as null:
+        if subprocess.call(["cp", "--reflink=always", src, dst], stdout = null, stderr = null) == 0:
+            return "reflink"
+
+    shutil.copyfile(src, dst)
+    shutil.copymode(src, dst)
+
+    return "copy"
+##########################################################################
+
+##########################################################################
+class Sandbox(object):
+    """A VPR sandbox, living in VPR_RUN_PATH.
+
+    Parameters
+    ----------
+    name : str
+        Name of the sandbox. Substituted into VPR_RUN_PATH and the VPR command.
+    inputs : List[str]
+        Paths of the files needed by VPR. They are staged under their basenames.
+
+    Attributes
+    ----------
+    path : str
+        Path of the sandbox directory.
+    stats : Dict[str, float]
+        Time spent staging and collecting [s], and the bytes staged with each method and collected.
+    """
+
+    #------------------------------------------------------------------------#
+    def __init__(self, name, inputs):
+        """Constructor of the Sandbox class.
+        """
+
+        self.name = name
+        self.inputs = inputs
+        self.path = os.environ["VPR_RUN_PATH"] % name
+        self.staged = set(os.path.basename(f) for f in inputs)
+        self.stats = {"stage_time" : 0.0, "collect_time" : 0.0, "collected_bytes" : 0}
+        for method in STAGING_METHODS:
+            self.stats["%s_bytes" % method] = 0
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def stage(self):
+        """Creates the sandbox and stages the inputs.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+
+        start_time = time.time()
+
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        for f in self.inputs:
+            dst = os.path.join(self.path, os.path.basename(f))
+            if os.path.lexists(dst):
+                os.remove(dst)
+            method = stage_file(f, dst)
+            self.stats["%s_bytes" % method] += os.path.getsize(f)
+
+        self.stats["stage_time"] += time.time() - start_time
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def collect(self, dest_dir = '.', outputs = None):
+        """Moves the outputs out of the sandbox.
+
+        Parameters
+        ----------
+        dest_dir : Optional[str], default = '.'
+            Directory to which the outputs are moved.
+        outputs : Optional[Dict[str, str]], default = None
+            Mapping from the file names in the sandbox to the destination names.
+            If None, all files that were not staged are moved under their own names.
+            Files missing from the sandbox are skipped.
+
+        Returns
+        -------
+        None
+        """
+
+        start_time = time.time()
+
+        if outputs is None:
+            outputs = {}
+            for f in os.listdir(self.path):
+                if not f in self.staged:
+                    outputs.update({f : f})
+
+        for f, dst in outputs.items():
+            src = os.path.join(self.path, f)
+            if not os.path.exists(src):
+                continue
+            if os.path.isfile(src):
+                self.stats["collected_bytes"] += os.path.getsize(src)
+            dst = os.path.join(dest_dir, dst)
+            if os.path.isdir(dst):
+                shutil.rmtree(dst)
+            shutil.move(src, dst)
+
+        self.stats["collect_time"] += time.time() - start_time
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def remove(self):
+        """Removes the sandbox and records the staging statistics.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+
+        start_time = time.time()
+        shutil.rmtree(self.path, ignore_errors = True)
+        self.stats["collect_time"] += time.time() - start_time
+
+        txt = "%s stage_time %.3f collect_time %.3f" % (self.name, self.stats["stage_time"],\
+                                                        self.stats["collect_time"])
+        for method in STAGING_METHODS:
+            txt += " %s_bytes %d" % (method, self.stats["%s_bytes" % method])
+        txt += " collected_bytes %d\n" % self.stats["collected_bytes"]
+
+        #NOTE: A single write in append mode, so that concurrent runs do not interleave.
+        with open(STATS_FILE, "a") as outf:
+            outf.write(txt)
+    #------------------------------------------------------------------------#
+##########################################################################
@@ -26,6 +26,9 @@ fixed_length : Optional[int], default = 0
 horizontal : Optional[bool], default = False
     Specifies that the measurement is performed on a horizontal wire.
     otherwise, vertical is assumed.
+coarse_to_fine : Optional[bool], default = False
+    Specifies that the buffer sizes should be found by refining the best point
+    of a coarse grid, instead of sweeping all of them.
 
 Returns
 -------
@@ -40,6 +43,11 @@ Buffer sizes determined here are later used in the more precise model,
 where less optimistic alignment between the wire and its driver and the
 sink multiplexers is assumed. Thus obtained delay is used for the final
 architecture annotation.
+
+All candidates of a given length are simulated in one batch, on HSPICE_CPU
+workers. Each result is recorded in sweep_cache/, keyed by the technology,
+the cluster parameters, the length, the buffer sizes, and the repeater count,
+so that repeated sweeps only simulate what changed.
 """
 
 import os
@@ -51,6 +59,9 @@ sys.path.insert(0,'..')
 import setenv
 import tech
 
+sys.path.insert(0,'../generate_architecture')
+import spice_engine
+
 parser = argparse.ArgumentParser()
 parser.add_argument("--K")
 parser.add_argument("--N")
@@ -58,6 +69,7 @@ parser.add_argument("--tech")
 parser.add_argument("--insert_rep")
 parser.add_argument("--fixed_length")
 parser.add_argument("--horizontal")
+parser.add_argument("--coarse_to_fine")
 args = parser.parse_args()
 
 K = int(args.K)
@@ -86,6 +98,12 @@ try:
 except:
     pass
 
+COARSE_TO_FINE = False
+try:
+    COARSE_TO_FINE = int(args.coarse_to_fine)
+except:
+    pass
+
 node_index = tech.nodes.index(tech_node)
 device_node_index = tech.nodes.index(int(tech_node))
 
@@ -112,6 +130,8 @@ orig_Rw = Rw
 
 ptm_path = "\"/home/snikolic/FPGA21/ptm/%dnm.l\" %dNM_FINFET_HP\n"
 
+memo_filename = "sweep_cache/%sK%dN%dT%s.memo" % ('H' if HORIZONTAL else '', K, N, args.tech)
+
 ##########################################################################
 def update_rc(rep_no, D0, D1, WL):
     """Conservatively scales the tile height due to repeater insertion.
@@ -379,8 +399,8 @@ def gen_wire(hops):
 ##########################################################################
 
 ##########################################################################
-def measure(D0, D1, L, rep_no):
-    """Constructs the SPICE netlist and measures the delay of a given buffering.
+def gen_netlist(D0, D1, L, rep_no):
+    """Constructs the SPICE netlist of a given buffering.
 
     Parameters
     ----------
@@ -395,8 +415,8 @@ def measure(D0, D1, L, rep_no):
     
     Returns
     -------
-    float
-        Average between the rise and the fall times.
+    str
+        The netlist.
     """
 
     update_rc(rep_no, D0, D1, L)
@@ -411,25 +431,27 @@ def measure(D0, D1, L, rep_no):
     else:
         hops = '0' * L
 
-    print hops
-
     txt += gen_wire(hops)
 
-    netlist_filename = "sim_wl_K%dN%dT%s%s.sp" % (K, N, str(tech_node), ("L%d" % L if FIXED_LENGTH else ""))
-    hspice_dump = "hspice_K%dN%dT%s%s.dump" % (K, N, str(tech_node), ("L%d" % L if FIXED_LENGTH else ""))
- 
-    with open(netlist_filename, "w") as outf:
-        outf.write(txt)
-
-    hspice_call = os.environ["HSPICE"] + " %s > %s" % (netlist_filename, hspice_dump)
-    os.system(hspice_call)
+    return txt
+##########################################################################
 
-    scale_dict = {'f' : 1e-15, 'p' : 1e-12, 'n' : 1e-9}
+##########################################################################
+def parse_delay(lines):
+    """Parses the delay from the HSPICE output.
 
-    with open(hspice_dump, "r") as inf:
-        lines = inf.readlines()
+    Parameters
+    ----------
+    lines : List[str]
+        Lines of the HSPICE standard output.
+    
+    Returns
+    -------
+    float
+        Average between the rise and the fall times.
+    """
 
-    os.system("rm %s" % hspice_dump)
+    scale_dict = {'f' : 1e-15, 'p' : 1e-12, 'n' : 1e-9}
 
     for line in lines:
         if "tfall=" in line:
@@ -440,6 +462,146 @@ def measure(D0, D1, L, rep_no):
     return (trise + tfall) / 2
 ##########################################################################
 
+##########################################################################
+def read_memo():
+    """Reads the table of previously measured bufferings.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    Dict[Tuple, Tuple[str, float]]
+        Netlist hash and delay for each (tech, K, N, L, D0, D1, rep_no).
+
+    Notes
+    -----
+    Each line of the table holds one measurement. Later lines override earlier ones.
+    """
+
+    memo = {}
+    try:
+        with open(memo_filename, "r") as inf:
+            lines = inf.readlines()
+    except IOError:
+        return memo
+
+    for line in lines:
+        words = line.split()
+        if len(words) != 9:
+            continue
+        key = tuple([words[0]] + [int(w) for w in words[1:7]])
+        memo.update({key : (words[7], float(words[8]))})
+
+    return memo
+##########################################################################
+
+##########################################################################
+def write_memo(entries):
+    """Appends the new measurements to the table.
+
+    Parameters
+    ----------
+    entries : List[Tuple[Tuple, str, float]]
+        Key, netlist hash, and delay of each new measurement.
+
+    Returns
+    -------
+    None
+    """
+
+    if not entries:
+        return
+
+    memo_dir = os.path.dirname(memo_filename)
+    if not os.path.isdir(memo_dir):
+        try:
+            os.makedirs(memo_dir)
+        except OSError:
+            pass
+
+    txt = ""
+    for key, netlist_hash, td in entries:
+        txt += "%s %d %d %d %d %d %d %s %s\n" % (key + (netlist_hash, repr(td)))
+
+    with open(memo_filename, "a") as outf:
+        outf.write(txt)
+##########################################################################
+
+##########################################################################
+def measure_all(L, candidates):
+    """Measures the delays of several bufferings of the same wire at once.
+
+    Parameters
+    ----------
+    L : int
+        Length of the wire in tile lengths.
+    candidates : List[Tuple[int]]
+        D0, D1, and rep_no of each buffering.
+
+    Returns
+    -------
+    Dict[Tuple[int], float]
+        Average between the rise and the fall times, for each candidate.
+
+    Notes
+    -----
+    A memoized result is used only if the netlist from which it was obtained
+    is identical to the current one, so that changes in the technology
+    parameters invalidate the table automatically.
+    """
+
+    memo = read_memo()
+    engine = spice_engine.SpiceEngine(cache_dir = "sweep_cache/spice")
+
+    tds = {}
+    pending = {}
+    for D0, D1, rep_no in candidates:
+        netlist = gen_netlist(D0, D1, L, rep_no)
+        netlist_hash = spice_engine.hash_netlist(netlist)
+        key = (str(tech_node), K, N, L, D0, D1, rep_no)
+        if memo.get(key, (None, None))[0] == netlist_hash:
+            tds.update({(D0, D1, rep_no) : memo[key][1]})
+            continue
+        pending.update({(D0, D1, rep_no) : (key, engine.submit(netlist))})
+
+    engine.run()
+
+    entries = []
+    for cand, (key, netlist_hash) in sorted(pending.items()):
+        td = parse_delay(engine.get_dump(netlist_hash))
+        tds.update({cand : td})
+        entries.append((key, netlist_hash, td))
+    write_memo(entries)
+
+    return tds
+##########################################################################
+
+##########################################################################
+def measure(D0, D1, L, rep_no):
+    """Constructs the SPICE netlist and measures the delay of a given buffering.
+
+    Parameters
+    ----------
+    D0 : int
+        Drive strength of the first inverter.
+    D1 : int
+        Drive strength of subsequent inverters.
+    L : int
+        Length of the wire in tile lengths.
+    rep_no : int
+        Number of repeaters.
+    
+    Returns
+    -------
+    float
+        Average between the rise and the fall times.
+    """
+
+    return measure_all(L, [(D0, D1, rep_no)])[(D0, D1, rep_no)]
+##########################################################################
+
 ##########################################################################
 def find_optimum(L):
     """Finds the delay of the optimally buffered wire of L hops.
@@ -453,6 +615,13 @@ def find_optimum(L):
     -------
     float
         Delay of the optimal buffering
+
+    Notes
+    -----
+    With COARSE_TO_FINE, only every other size is measured at first.
+    Then, the neighbors of the best point are added until it stops moving.
+    Ties are always broken as in the full sweep, so when the best point
+    of the full sweep is reached, the result is the same.
     """
 
     max_D0 = 5
@@ -460,20 +629,80 @@ def find_optimum(L):
 
     rep_nos = [0] if not INSERT_REP else [2 ** i - 1 for i in range(int(math.log(L, 2)), -1, -1)]
 
-    min_td = float("inf")
-    for D0 in range(max_D0, 0, -1):
-        for D1_over_D0 in range(max_D1_over_D0, 0, -1):
-            D1 = D0 * D1_over_D0
+    #NOTE: The order of the full sweep determines tie breaking.
+    sweep_order = [(D0, D1_over_D0) for D0 in range(max_D0, 0, -1)\
+                   for D1_over_D0 in range(max_D1_over_D0, 0, -1)]
+
+    #------------------------------------------------------------------------#
+    def expand(sizes):
+        """Returns all candidates for the given sizes.
+
+        Parameters
+        ----------
+        sizes : List[Tuple[int]]
+            D0 and D1/D0 pairs.
+
+        Returns
+        -------
+        List[Tuple[int]]
+            D0, D1, and rep_no of each candidate.
+        """
+
+        return [(D0, D0 * D1_over_D0, rep_no) for D0, D1_over_D0 in sizes for rep_no in rep_nos]
+    #------------------------------------------------------------------------#
+
+    #------------------------------------------------------------------------#
+    def pick_best(tds):
+        """Returns the best of the measured candidates.
+
+        Parameters
+        ----------
+        tds : Dict[Tuple[int], float]
+            Measured delays.
+
+        Returns
+        -------
+        Tuple[int]
+            D0, D1/D0, and rep_no of the best candidate.
+        float
+            Its delay.
+        """
+
+        min_td = float("inf")
+        best = None
+        for D0, D1_over_D0 in sweep_order:
             for rep_no in rep_nos:
-                td = measure(D0, D1, L, rep_no)
-                print D0, D1, rep_no, td
-                if td < min_td:
+                td = tds.get((D0, D0 * D1_over_D0, rep_no), None)
+                if td is not None and td < min_td:
                     min_td = td
-                    best_D0 = D0
-                    best_D1 = D1
-                    best_rep_no = rep_no
+                    best = (D0, D1_over_D0, rep_no)
 
-    return min_td, best_D0, best_D1, best_rep_no
+        return best, min_td
+    #------------------------------------------------------------------------#
+
+    if not COARSE_TO_FINE:
+        tds = measure_all(L, expand(sweep_order))
+    else:
+        coarse = [(D0, D1_over_D0) for D0, D1_over_D0 in sweep_order if D0 % 2 and D1_over_D0 % 2]
+        tds = measure_all(L, expand(coarse))
+        visited = set(coarse)
+        while True:
+            best = pick_best(tds)[0]
+            neighbors = [(best[0] + i, best[1] + j) for i in (-1, 0, 1) for j in (-1, 0, 1)]
+            neighbors = [n for n in neighbors if 1 <= n[0] <= max_D0 and 1 <= n[1] <= max_D1_over_D0\
+                         and not n in visited]
+            if not neighbors:
+                break
+            visited |= set(neighbors)
+            tds.update(measure_all(L, expand(neighbors)))
+
+    for cand in sorted(tds, reverse = True):
+        print cand[0], cand[1], cand[2], tds[cand]
+
+    best, min_td = pick_best(tds)
+    best_D0, best_D1_over_D0, best_rep_no = best
+
+    return min_td, best_D0, best_D0 * best_D1_over_D0, best_rep_no
 ##########################################################################
 
 ##########################################################################
@@ -41,6 +41,13 @@ Tuple[int]
     Buffer sizes
 float
     Measured delay
+
+Notes
+-----
+Every evaluated point (repeater combination, buffer sizes, and target multiplexer)
+is described by its own copy of the net, so all points of a sweep are simulated
+in one batch, on HSPICE_CPU workers. The results are recorded in sweep_cache/,
+keyed by the technology, density, flags, combination, and buffer sizes.
 """ 
 
 import math
@@ -54,6 +61,9 @@ sys.path.insert(0,'..')
 import setenv
 import tech
 
+sys.path.insert(0,'../generate_architecture')
+import spice_engine
+
 parser = argparse.ArgumentParser()
 parser.add_argument("--K")
 parser.add_argument("--N")
@@ -324,8 +334,13 @@ net.add_edge(target_mux, 't')
 if meas_cb:
     net.node['s']["state"] = "on"
 
+spine = [(u, v) for u, v, attrs in net.edges(data = True)
+         if attrs.get("spine", False) and net.node[u]["coords"][1] > lut_y\
+                                      and net.node[v]["coords"][1] > lut_y]
+spine.sort(key = lambda e : min(net.node[e[0]]["coords"][1], net.node[e[1]]["coords"][1]))
+
 ##########################################################################
-def conv_nx_to_spice(net, invert_trig = False):
+def conv_nx_to_spice(net, invert_trig = False, sizes = None):
     """Converts the net to a spice netlist.
 
     Parameters
@@ -334,6 +349,8 @@ def conv_nx_to_spice(net, invert_trig = False):
         The net graph.
     invert_trig : Optional[bool], default = False
         Specifies if the trigger signal should be inverted or not.
+    sizes : Optional[Tuple[int]], default = None
+        D0 and D1 of the driver. If not specified, the global ones are used.
 
     Returns
     -------
@@ -341,6 +358,8 @@ def conv_nx_to_spice(net, invert_trig = False):
         SPICE netlist description.
     """
 
+    D0, D1 = sizes if sizes is not None else (globals()["D0"], globals()["D1"])
+
     txt = ".TITLE LOCAL_WIRE_MEAS\n\n"
     txt += ".LIB %s\n" % (spice_model_path % (int(tech_node), int(tech_node)))
     txt += ".TRAN 1p 16n\n.OPTIONS BRIEF=1\n\n"
@@ -552,47 +571,67 @@ def conv_nx_to_spice(net, invert_trig = False):
     return txt
 ##########################################################################
 
-netlist_filename = "sim_local_K%dN%dT%s.sp" % (K, N, str(tech_node))
-hspice_dump = "hspice_K%dN%dT%s.dump" % (K, N, str(tech_node))
+memo_filename = "sweep_cache/local_" + os.path.basename(buf_log_filename).replace(".log", ".memo")
+memo_cb = "%f_%f_%d" % (wire_x, cb_x, cb_size) if meas_cb else '-'
 
 ##########################################################################
-def measure(invert_trig = False):
-    """Calls HSPICE to obtain the delay.
-    
+def configure_net(comb = None, target = None):
+    """Returns a copy of the net with the given repeaters and target.
+
     Parameters
     ----------
-    invert_trig : Optional[bool], default = False
-        Specifies if the trigger signal should be inverted or not.
+    comb : Optional[List[int]], default = None
+        Repeater presence on each spine segment. If not specified, there are no repeaters.
+    target : Optional[int], default = None
+        Index of the target multiplexer in >>mux_nodes<<.
+        If not specified, the default target is kept.
 
     Returns
     -------
-    float
-        Delay.
+    nx.Graph
+        The configured net.
     """
 
-    to_write = conv_nx_to_spice(net, invert_trig = invert_trig)
+    configured = copy.deepcopy(net)
+    if comb is not None:
+        for i, e in enumerate(spine):
+            u, v = e
+            configured[u][v]["buf"] = comb[i]
 
-    wd = os.getcwd()
-    if WD is not None:
-        os.chdir(WD)
+    if target is not None:
+        target_mux = mux_nodes[target]
+        configured.remove_node('t')
+        for i, m in enumerate(mux_nodes):
+            if i % partial_space == 0:
+                configured.node[m]["state"] = "partial"
+            else:
+                configured.node[m]["state"] = "off"
 
-    with open(netlist_filename, "w") as outf:
-        outf.write(to_write)
-   
-    hspice_call = os.environ["HSPICE"] + " %s > %s" % (netlist_filename, hspice_dump)
-    os.system(hspice_call)
-   
-    scale_dict = {'f' : 1e-15, 'p' : 1e-12, 'n' : 1e-9}
-   
-    with open(hspice_dump, "r") as inf:
-        lines = inf.readlines()
+        configured.node[mux_nodes[-1]]["state"] = "on"
+        configured.node[target_mux]["state"] = "on"
+        configured.add_node('t', coords = (0, configured.node[target_mux]["coords"][1]), mux = False)
+        configured.add_edge(target_mux, 't')
 
-    os.system("rm " + hspice_dump)
-    os.system("rm -f *.sp *.st0 *.ic0 *.mt0")
-    
-    if WD is not None:
-        os.chdir(wd)
+    return configured
+##########################################################################
+
+##########################################################################
+def parse_delay(lines):
+    """Parses the delay from the HSPICE output.
 
+    Parameters
+    ----------
+    lines : List[str]
+        Lines of the HSPICE standard output.
+
+    Returns
+    -------
+    float
+        Delay.
+    """
+
+    scale_dict = {'f' : 1e-15, 'p' : 1e-12, 'n' : 1e-9}
+   
     for line in lines:
         if "tfall=" in line:
             tfall = float(line.split()[1][:-1]) * scale_dict[line.split()[1][-1]]
@@ -609,9 +648,130 @@ def measure(invert_trig = False):
 ##########################################################################
 
 ##########################################################################
-def rebuffer(invert_trig = False):
-    """Finds another optimal buffer, given that we now know the precise load.
+def read_memo():
+    """Reads the table of previously measured points.
 
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    Dict[Tuple, Tuple[str, float]]
+        Netlist hash and delay for each (cb, comb, D0, D1, target, invert_trig).
+
+    Notes
+    -----
+    Technology, density, and flags are encoded in the name of the table.
+    Each line holds one measurement. Later lines override earlier ones.
+    """
+
+    memo = {}
+    try:
+        with open(memo_filename, "r") as inf:
+            lines = inf.readlines()
+    except IOError:
+        return memo
+
+    for line in lines:
+        words = line.split()
+        if len(words) != 8:
+            continue
+        key = tuple(words[:2] + [int(w) for w in words[2:6]])
+        memo.update({key : (words[6], float(words[7]))})
+
+    return memo
+##########################################################################
+
+##########################################################################
+def write_memo(entries):
+    """Appends the new measurements to the table.
+
+    Parameters
+    ----------
+    entries : List[Tuple[Tuple, str, float]]
+        Key, netlist hash, and delay of each new measurement.
+
+    Returns
+    -------
+    None
+    """
+
+    if not entries:
+        return
+
+    memo_dir = os.path.dirname(memo_filename)
+    if not os.path.isdir(memo_dir):
+        try:
+            os.makedirs(memo_dir)
+        except OSError:
+            pass
+
+    txt = ""
+    for key, netlist_hash, td in entries:
+        txt += "%s %s %d %d %d %d %s %s\n" % (key + (netlist_hash, repr(td)))
+
+    with open(memo_filename, "a") as outf:
+        outf.write(txt)
+##########################################################################
+
+##########################################################################
+def measure_all(points):
+    """Calls HSPICE to obtain the delays of several points at once.
+
+    Parameters
+    ----------
+    points : List[Tuple]
+        Repeater combination (a tuple, or None), D0, D1, target index (or None),
+        and trigger inversion of each point.
+
+    Returns
+    -------
+    Dict[Tuple, float]
+        Delay of each point.
+
+    Notes
+    -----
+    A memoized result is used only if the netlist from which it was obtained
+    is identical to the current one.
+    """
+
+    memo = read_memo()
+    engine = spice_engine.SpiceEngine(cache_dir = "sweep_cache/spice",\
+                                      scratch_dir = WD if WD is not None else '.')
+
+    tds = {}
+    pending = {}
+    for point in points:
+        comb, d0, d1, target, invert_trig = point
+        netlist = conv_nx_to_spice(configure_net(comb, target), invert_trig = invert_trig, sizes = (d0, d1))
+        netlist_hash = spice_engine.hash_netlist(netlist)
+        key = (memo_cb, ''.join(str(i) for i in comb) if comb else '-', d0, d1,\
+               -1 if target is None else target, int(invert_trig))
+        if memo.get(key, (None, None))[0] == netlist_hash:
+            tds.update({point : memo[key][1]})
+            continue
+        pending.update({point : (key, engine.submit(netlist))})
+
+    engine.run()
+
+    entries = []
+    for point in points:
+        if point in tds:
+            continue
+        key, netlist_hash = pending[point]
+        td = parse_delay(engine.get_dump(netlist_hash))
+        tds.update({point : td})
+        entries.append((key, netlist_hash, td))
+    write_memo(entries)
+
+    return tds
+##########################################################################
+
+##########################################################################
+def measure(invert_trig = False):
+    """Calls HSPICE to obtain the delay.
+    
     Parameters
     ----------
     invert_trig : Optional[bool], default = False
@@ -619,38 +779,108 @@ def rebuffer(invert_trig = False):
 
     Returns
     -------
-    Tuple[int, float]
-        Buffer size and delay.
+    float
+        Delay.
+    """
+
+    point = (None, D0, D1, None, invert_trig)
+
+    return measure_all([point])[point]
+##########################################################################
+
+##########################################################################
+def get_rebuffer_points(comb = None, invert_trig = False):
+    """Returns all buffer sizes that should be tried for the given repeaters.
+
+    Parameters
+    ----------
+    comb : Optional[List[int]], default = None
+        Repeater presence on each spine segment.
+    invert_trig : Optional[bool], default = False
+        Specifies if the trigger signal should be inverted or not.
+
+    Returns
+    -------
+    List[Tuple]
+        Points, as accepted by >>measure_all<<, in the order of the sweep.
     """
 
     max_D0 = 5
     max_D1_over_D0 = 5
-    
-    min_td = float("inf")
+
+    if comb is not None:
+        comb = tuple(comb)
+
+    points = []
     for d0 in range(max_D0, 0, -1):
         for d1_over_D0 in range(max_D1_over_D0, 0, -1):
-            d1 = d0 * d1_over_D0
-            global D0
-            D0 = d0
-            global D1
-            D1 = d1
-            td = measure(invert_trig = invert_trig)
-            print D0, D1, td
-            if td > 0 and td < min_td:
-                min_td = td
-                best_D0 = D0
-                best_D1 = D1
+            points.append((comb, d0, d0 * d1_over_D0, None, invert_trig))
+
+    return points
+##########################################################################
+
+##########################################################################
+def pick_buffer(points, tds):
+    """Picks the best of the swept buffer sizes.
+
+    Parameters
+    ----------
+    points : List[Tuple]
+        Points, as returned by >>get_rebuffer_points<<.
+    tds : Dict[Tuple, float]
+        Delay of each point.
+
+    Returns
+    -------
+    Tuple[int, float]
+        Buffer size and delay.
+    """
+
+    min_td = float("inf")
+    best_D0 = best_D1 = None
+    for point in points:
+        td = tds[point]
+        print point[1], point[2], td
+        if td > 0 and td < min_td:
+            min_td = td
+            best_D0 = point[1]
+            best_D1 = point[2]
 
     return min_td, best_D0, best_D1
 ##########################################################################
 
 ##########################################################################
-def sim_all_endpoints():
+def rebuffer(invert_trig = False, comb = None):
+    """Finds another optimal buffer, given that we now know the precise load.
+
+    Parameters
+    ----------
+    invert_trig : Optional[bool], default = False
+        Specifies if the trigger signal should be inverted or not.
+    comb : Optional[List[int]], default = None
+        Repeater presence on each spine segment.
+
+    Returns
+    -------
+    Tuple[int, float]
+        Buffer size and delay.
+    """
+
+    points = get_rebuffer_points(comb, invert_trig)
+
+    return pick_buffer(points, measure_all(points))
+##########################################################################
+
+##########################################################################
+def sim_all_endpoints(comb = None, sizes = None):
     """Finds the delays to all endpoints, without rebuffering.
 
     Parameters
     ----------
-    None
+    comb : Optional[List[int]], default = None
+        Repeater presence on each spine segment.
+    sizes : Optional[Tuple[int]], default = None
+        D0 and D1 of the driver. If not specified, the global ones are used.
 
     Returns
     -------
@@ -658,32 +888,25 @@ def sim_all_endpoints():
         A sorted list of all delays.
     """
 
-    tds = []
-
-    for target_mux in mux_nodes:
-        net.remove_node('t')
-        for i, m in enumerate(mux_nodes):
-            if i % partial_space == 0:
-                net.node[m]["state"] = "partial"
-            else:
-                net.node[m]["state"] = "off"
+    d0, d1 = sizes if sizes is not None else (D0, D1)
+    if comb is not None:
+        comb = tuple(comb)
 
-        net.node[mux_nodes[-1]]["state"] = "on"
-        print net.node[target_mux]["coords"]
-        net.node[target_mux]["state"] = "on"
-        net.add_node('t', coords = (0, net.node[target_mux]["coords"][1]), mux = False)
-        net.add_edge(target_mux, 't')
+    points = []
+    for target, target_mux in enumerate(mux_nodes):
+        configured = configure_net(comb, target)
+        print configured.node[target_mux]["coords"]
 
-        sp = nx.shortest_path(net, 's', target_mux)
+        sp = nx.shortest_path(configured, 's', target_mux)
         inv_cnt = 0
         for i, u in enumerate(sp[:-1]):
-            if net[u][sp[i + 1]].get("buf", False):
+            if configured[u][sp[i + 1]].get("buf", False):
                 inv_cnt += 1
+        points.append((comb, d0, d1, target, inv_cnt % 2))
 
-        td = measure(invert_trig = inv_cnt % 2)
-        tds.append(td)
+    tds = measure_all(points)
 
-    return sorted(tds)
+    return sorted([tds[point] for point in points])
 ##########################################################################
 
 ##########################################################################
@@ -707,16 +930,15 @@ def insert_reps(fixed_comb = None, sim_all = False):
         D1
     List[int]
         Repeater presence list
+
+    Notes
+    -----
+    All combinations are swept in a single batch.
     """
 
     if not INSERT_REP:
         return
     
-    spine = [(u, v) for u, v, attrs in net.edges(data = True)
-             if attrs.get("spine", False) and net.node[u]["coords"][1] > lut_y\
-                                          and net.node[v]["coords"][1] > lut_y]
-    spine.sort(key = lambda e : min(net.node[e[0]]["coords"][1], net.node[e[1]]["coords"][1]))
-
     if fixed_comb:
         combs = [fixed_comb]
     else:
@@ -730,18 +952,17 @@ def insert_reps(fixed_comb = None, sim_all = False):
                     combs[-1].append(0)
         combs.append([0 for i in range(0, len(spine))])
 
+    comb_points = [get_rebuffer_points(comb, len([i for i in comb if i]) % 2) for comb in combs]
+    tds = measure_all([point for points in comb_points for point in points])
+
     all_min_td = float("inf")
     all_best_D0 = 0
     all_best_D1 = 0
     all_best_comb = []
     
-    for comb in reversed(combs):
+    for comb, points in reversed(zip(combs, comb_points)):
         print comb
-        invert_trig = len([i for i in comb if i]) % 2
-        for i, e in enumerate(spine):
-            u, v = e
-            net[u][v]["buf"] = comb[i]
-        min_td, best_D0, best_D1 = rebuffer(invert_trig = invert_trig)
+        min_td, best_D0, best_D1 = pick_buffer(points, tds)
         print best_D0, best_D1
         print min_td
         if min_td < all_min_td:
@@ -751,18 +972,7 @@ def insert_reps(fixed_comb = None, sim_all = False):
             all_best_comb = comb
 
     if sim_all:
-        comb = all_best_comb
-        invert_trig = len([i for i in comb if i]) % 2
-        for i, e in enumerate(spine):
-            u, v = e
-            net[u][v]["buf"] = comb[i]
-
-        global D0
-        D0 = all_best_D0
-        global D1
-        D1 = all_best_D1
-        
-        return sim_all_endpoints(), all_best_D0, all_best_D1, all_best_comb
+        return sim_all_endpoints(all_best_comb, (all_best_D0, all_best_D1)), all_best_D0, all_best_D1, all_best_comb
 
     return all_min_td, all_best_D0, all_best_D1, all_best_comb
 ##########################################################################
@@ -798,10 +1008,6 @@ if INSERT_REP:
     print(min_td)
     #NOTE: No need to cache the buffers here, as these are one-time experiments.
     if SIM_ALL:
-        global D0
-        D0 = d0
-        global D1
-        D1 = d1
         print(insert_reps(fixed_comb = comb, sim_all = True)[0])   
 elif DO_REBUFFER:
     min_td, best_D0, best_D1 = rebuffer()
@@ -809,11 +1015,7 @@ elif DO_REBUFFER:
     print(min_td)
     log_results(best_D0, best_D1, min_td, buf_log_filename)
     if SIM_ALL:
-        global D0
-        D0 = best_D0
-        global D1
-        D1 = best_D1
-        print(sim_all_endpoints())
+        print(sim_all_endpoints(sizes = (best_D0, best_D1)))
 elif SIM_ALL:
     print(sim_all_endpoints())
 else: